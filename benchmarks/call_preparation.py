@@ -0,0 +1,80 @@
+"""
+Measures how long it takes to prepare a call to an endpoint, without sending it.
+
+Run with ``python benchmarks/call_preparation.py``.
+"""
+
+import string
+import timeit
+
+import requests
+
+import apiron
+from apiron import client, instrumentation
+
+NUMBER = 100_000
+
+
+class SomeService(apiron.Service):
+    domain = "https://api.example.com"
+
+    post = apiron.JsonEndpoint(path="/users/{user_id}/posts/{post_id}", default_params={"expand": "author"})
+
+
+ENDPOINT = SomeService.__dict__["post"]
+PATH_KWARGS = {"user_id": 42, "post_id": "hello-world"}
+
+
+def format_path_with_formatter():
+    # How paths were formatted before they were compiled into templates
+    placeholders = [name for _, name, _, _ in string.Formatter().parse(ENDPOINT.path) if name]
+    any(path_kwarg not in placeholders for path_kwarg in PATH_KWARGS)
+    return ENDPOINT.path.format(**PATH_KWARGS)
+
+
+def format_path_with_template():
+    return ENDPOINT.get_formatted_path(**PATH_KWARGS)
+
+
+def access_endpoint():
+    return SomeService.post
+
+
+def build_request_with_prepare_request():
+    # How requests were built before they were prepared from request templates
+    headers = client._get_required_headers(SomeService, ENDPOINT)
+    request = requests.Request(
+        method="GET",
+        url=client._build_url("https://api.example.com", ENDPOINT.get_formatted_path(**PATH_KWARGS)),
+        params=ENDPOINT.get_merged_params({"page": 2}),
+        headers=headers,
+    )
+    return SESSION.prepare_request(request)
+
+
+def build_request_with_template():
+    return client._build_request_object(
+        SESSION, SomeService, ENDPOINT, "https://api.example.com", method="GET", params={"page": 2}, **PATH_KWARGS
+    )
+
+
+def start_timing_without_listeners():
+    # What every call pays for timing events when nothing is subscribed to them
+    return instrumentation.start_call(SomeService, ENDPOINT, "GET")
+
+
+SESSION = requests.Session()
+
+
+def report(name, function, number=NUMBER):
+    seconds = min(timeit.repeat(function, number=number, repeat=5))
+    print(f"{name:<32} {seconds / number * 1e6:8.2f} µs per call")
+
+
+if __name__ == "__main__":
+    report("access endpoint", access_endpoint)
+    report("format path (str.format)", format_path_with_formatter)
+    report("format path (PathTemplate)", format_path_with_template)
+    report("build request (prepare_request)", build_request_with_prepare_request, number=NUMBER // 100)
+    report("build request (template)", build_request_with_template, number=NUMBER // 100)
+    report("start timing (no listeners)", start_timing_without_listeners)
@@ -0,0 +1,91 @@
+"""
+Measures how many requests a second succeed against a simulated service with more callers than it can serve,
+with and without limits on the number of requests in flight.
+
+The service works on 8 requests at a time, taking 10 ms over each, and queues the rest in the order they arrive.
+Its callers give up on requests that take longer than 50 ms, but the service still works through them.
+
+Run with ``python benchmarks/concurrency.py``.
+"""
+
+import queue
+import statistics
+import threading
+import time
+
+from apiron.concurrency import (
+    AimdConcurrencyLimiter,
+    ConcurrencyLimiter,
+    GradientConcurrencyLimiter,
+)
+
+CALLERS = 64
+SECONDS = 3
+SERVICE_WORKERS = 8
+SERVICE_TIME = 0.01
+TIMEOUT = 0.05
+
+
+def run(limiter):
+    requests = queue.Queue()
+    stop_at = time.perf_counter() + SECONDS
+    latencies = []
+    failures = []
+
+    def work():
+        while (done := requests.get()) is not None:
+            time.sleep(SERVICE_TIME)
+            done.set()
+
+    def serve():
+        done = threading.Event()
+        requests.put(done)
+        done.wait()
+
+    workers = [threading.Thread(target=work) for _ in range(SERVICE_WORKERS)]
+    for worker in workers:
+        worker.start()
+
+    def call():
+        while time.perf_counter() < stop_at:
+            if limiter is not None:
+                limiter.acquire()
+            start = time.perf_counter()
+            serve()
+            elapsed = time.perf_counter() - start
+            failed = elapsed > TIMEOUT
+            if limiter is not None:
+                limiter.release(elapsed, failed=failed)
+            (failures if failed else latencies).append(elapsed)
+
+    threads = [threading.Thread(target=call) for _ in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for _ in workers:
+        requests.put(None)
+    for worker in workers:
+        worker.join()
+
+    limit = "-" if limiter is None else limiter.limit
+    median = statistics.median(latencies) * 1000 if latencies else float("nan")
+    return len(latencies) / SECONDS, len(failures) / SECONDS, median, limit
+
+
+def main():
+    print(f"Service capacity: {SERVICE_WORKERS / SERVICE_TIME:.0f} requests/s\n")
+    print(f"{'limiter':<12}{'successes/s':>14}{'timeouts/s':>14}{'median (ms)':>14}{'final limit':>14}")
+    limiters = {
+        "none": None,
+        "fixed": ConcurrencyLimiter(initial_limit=CALLERS, max_limit=CALLERS),
+        "aimd": AimdConcurrencyLimiter(initial_limit=CALLERS, max_limit=CALLERS),
+        "gradient": GradientConcurrencyLimiter(initial_limit=CALLERS, max_limit=CALLERS),
+    }
+    for name, limiter in limiters.items():
+        successes, timeouts, median, limit = run(limiter)
+        print(f"{name:<12}{successes:>14.0f}{timeouts:>14.0f}{median:>14.1f}{limit:>14}")
+
+
+if __name__ == "__main__":
+    main()
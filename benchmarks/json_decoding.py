@@ -0,0 +1,107 @@
+"""
+Compares how long each JSON decoder takes to decode a response, for payloads of a few sizes,
+and how long and how much memory it takes to decode a large response into dataclasses.
+Decoders whose backend isn't installed are skipped.
+
+Run with ``python benchmarks/json_decoding.py``.
+"""
+
+import dataclasses
+import json
+import timeit
+import tracemalloc
+
+import requests
+
+import apiron
+from apiron import decoders
+
+SIZES = {"1 KB": 5, "100 KB": 500, "10 MB": 50_000}
+
+
+@dataclasses.dataclass
+class Owner:
+    __slots__ = ("email", "id")
+    id: int
+    email: str
+
+
+@dataclasses.dataclass
+class Record:
+    __slots__ = ("active", "id", "name", "owner", "score", "tags", "uuid")
+    id: int
+    uuid: str
+    name: str
+    active: bool
+    score: float
+    tags: list[str]
+    owner: Owner
+
+
+def convert_by_hand(document):
+    # How records were built from plain dictionaries before decoders could build them
+    return [Record(**{**record, "owner": Owner(**record["owner"])}) for record in document]
+
+
+def make_record(index):
+    return {
+        "id": index,
+        "uuid": f"00000000-0000-4000-8000-{index:012d}",
+        "name": f"Record number {index}",
+        "active": index % 3 != 0,
+        "score": index * 1.5,
+        "tags": ["alpha", "beta", "gamma"][: index % 4],
+        "owner": {"id": index % 97, "email": f"owner{index % 97}@example.com"},
+    }
+
+
+def make_response(records):
+    response = requests.Response()
+    response.headers["Content-Type"] = "application/json"
+    response.encoding = "utf-8"
+    response._content = json.dumps([make_record(index) for index in range(records)]).encode()
+    return response
+
+
+def get_decoders():
+    for decoder_class in (decoders.StdlibJsonDecoder, decoders.OrjsonDecoder, decoders.MsgspecDecoder):
+        try:
+            yield decoder_class.__name__, decoder_class()
+        except ImportError:
+            print(f"{decoder_class.__name__:<40} skipped, its backend isn't installed")
+
+
+def report(name, function, number, memory=False):
+    seconds = min(timeit.repeat(function, number=number, repeat=5))
+    peak = ""
+    if memory:
+        tracemalloc.start()
+        function()
+        peak = f" {tracemalloc.get_traced_memory()[1] / 2**20:10.1f} MB peak"
+        tracemalloc.stop()
+    print(f"{name:<40} {seconds / number * 1e3:10.3f} ms per call{peak}")
+
+
+if __name__ == "__main__":
+    installed_decoders = list(get_decoders())
+    for size, records in SIZES.items():
+        response = make_response(records)
+        number = max(1, 20_000 // records)
+        print(f"\n{size} ({len(response.content):,} bytes)")
+        report("response.json()", response.json, number)
+        for name, decoder in installed_decoders:
+            endpoint = apiron.JsonEndpoint(decoder=decoder)
+            report(name, lambda endpoint=endpoint, response=response: endpoint.format_response(response), number)
+
+    response = make_response(SIZES["10 MB"])
+    print(f"\nlist[Record] from 10 MB ({len(response.content):,} bytes)")
+    for name, decoder in installed_decoders:
+        untyped = apiron.JsonEndpoint(decoder=decoder)
+        typed = apiron.JsonEndpoint(decoder=decoder, response_type=list[Record])
+        report(
+            f"{name}, then by hand",
+            lambda endpoint=untyped: convert_by_hand(endpoint.format_response(response)),
+            3,
+            True,
+        )
+        report(f"{name}, response_type", lambda endpoint=typed: endpoint.format_response(response), 3, True)
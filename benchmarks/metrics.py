@@ -0,0 +1,66 @@
+"""
+Compares the cost of recording the latency of a call, and the memory it takes,
+between keeping every latency to take percentiles from and counting it in a :class:`apiron.MetricsRegistry`.
+
+Run with ``python benchmarks/metrics.py``.
+"""
+
+import collections
+import random
+import statistics
+import time
+import tracemalloc
+
+from apiron import MetricsRegistry
+from apiron.instrumentation import TimingEvent
+
+CALLS = 1_000_000
+
+
+class SomeService:
+    pass
+
+
+LATENCIES = [random.lognormvariate(-3, 1) for _ in range(CALLS)]
+EVENTS = [
+    (
+        TimingEvent("start", 0.0, SomeService, "/items/{item_id}", "GET", None, 1, None, None, None),
+        TimingEvent("call", latency, SomeService, "/items/{item_id}", "GET", "https://a", 1, 200, None, None),
+    )
+    for latency in LATENCIES
+]
+
+
+def keep_every_latency():
+    # How a hand-written wrapper around each endpoint kept latencies to take percentiles from
+    latencies = collections.defaultdict(list)
+    for latency in LATENCIES:
+        latencies["SomeService", "/items/{item_id}", "GET"].append(latency)
+    return statistics.quantiles(latencies["SomeService", "/items/{item_id}", "GET"], n=100)[98]
+
+
+def record_in_registry():
+    registry = MetricsRegistry()
+    for start, end in EVENTS:
+        registry.record(start)
+        registry.record(end)
+    return registry.snapshot()["calls"][0]["quantiles"][0.99]
+
+
+def report(name, function):
+    start = time.perf_counter()
+    p99 = function()
+    seconds = time.perf_counter() - start
+    # Memory is measured on a second run, since tracing allocations slows everything down
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    print(f"{name:<24} p99 {p99:.3f}s {seconds / CALLS * 1e6:8.2f} µs per call {peak / 2**20:8.2f} MB peak")
+
+
+if __name__ == "__main__":
+    report("keep every latency", keep_every_latency)
+    report("MetricsRegistry", record_in_registry)
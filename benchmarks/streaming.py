@@ -0,0 +1,79 @@
+"""
+Compares ways of reading a large streamed response that the server sends in many small chunks:
+iterating over the chunks as they were framed, iterating over chunks of a fixed size,
+and streaming the body to a file through a single reused buffer.
+
+Run with ``python benchmarks/streaming.py``.
+"""
+
+import http.client
+import io
+import timeit
+
+import requests
+import urllib3
+
+import apiron
+
+BODY_SIZE = 64 * 2**20
+FRAME_SIZE = 512
+
+
+class FakeSocket:
+    def __init__(self, data):
+        self.data = data
+
+    def makefile(self, mode):
+        return io.BytesIO(self.data)
+
+
+def make_wire_response():
+    # A response with chunked transfer encoding, framed in small chunks like many servers send
+    frame = f"{FRAME_SIZE:x}\r\n".encode() + b"x" * FRAME_SIZE + b"\r\n"
+    return b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n" + frame * (BODY_SIZE // FRAME_SIZE) + b"0\r\n\r\n"
+
+
+def make_response(wire_response):
+    original_response = http.client.HTTPResponse(FakeSocket(wire_response), method="GET")
+    original_response.begin()
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = urllib3.HTTPResponse(
+        body=original_response,
+        headers=dict(original_response.getheaders()),
+        original_response=original_response,
+        preload_content=False,
+        decode_content=False,
+    )
+    return response
+
+
+class NullFile:
+    def write(self, data):
+        return len(data)
+
+
+def iterate(wire_response, chunk_size):
+    chunks = 0
+    for _ in apiron.StreamingEndpoint(chunk_size=chunk_size).format_response(make_response(wire_response)):
+        chunks += 1
+    return chunks
+
+
+def stream_to(wire_response):
+    return apiron.StreamingEndpoint().format_response(make_response(wire_response)).stream_to(NullFile())
+
+
+def report(name, function):
+    seconds = min(timeit.repeat(function, number=1, repeat=3))
+    print(f"{name:<40} {seconds * 1e3:10.1f} ms {BODY_SIZE / seconds / 2**20:10.0f} MB/s")
+
+
+if __name__ == "__main__":
+    wire_response = make_wire_response()
+    print(f"{BODY_SIZE // 2**20} MB in {FRAME_SIZE} byte chunks")
+    print(f"{'chunks as framed':<40} {iterate(wire_response, None):>10,} chunks")
+    print(f"{'64 KB chunks':<40} {iterate(wire_response, 64 * 1024):>10,} chunks")
+    report("iterate, chunk_size=None", lambda: iterate(wire_response, None))
+    report("iterate, chunk_size=65536", lambda: iterate(wire_response, 64 * 1024))
+    report("stream_to", lambda: stream_to(wire_response))
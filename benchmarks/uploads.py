@@ -0,0 +1,55 @@
+"""
+Compares the peak memory of preparing a large file upload:
+encoding it as multipart form data the way requests does for ``files``,
+and streaming it with :class:`apiron.upload.MultipartEncoder` or :class:`apiron.upload.MappedFile`.
+
+Run with ``python benchmarks/uploads.py``.
+"""
+
+import os
+import tempfile
+import time
+import tracemalloc
+
+import requests
+
+from apiron import upload
+
+FILE_SIZE = 128 * 2**20
+
+
+def encode_with_requests(path):
+    with open(path, "rb") as file:
+        return len(requests.Request("POST", "http://localhost", files={"file": file}).prepare().body)
+
+
+def stream_multipart(path):
+    with open(path, "rb") as file:
+        return sum(len(chunk) for chunk in upload.MultipartEncoder(files={"file": file}))
+
+
+def stream_mapped_file(path):
+    return sum(len(chunk) for chunk in upload.MappedFile(path))
+
+
+def report(name, function, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        sent = function(path)
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    print(f"{name:<40} {sent / 2**20:8.0f} MB sent {peak / 2**20:10.2f} MB peak {seconds * 1e3:10.1f} ms")
+
+
+if __name__ == "__main__":
+    with tempfile.NamedTemporaryFile(delete=False) as file:
+        file.write(os.urandom(2**20) * (FILE_SIZE // 2**20))
+    try:
+        report("requests files=", encode_with_requests, file.name)
+        report("MultipartEncoder", stream_multipart, file.name)
+        report("MappedFile", stream_mapped_file, file.name)
+    finally:
+        os.unlink(file.name)
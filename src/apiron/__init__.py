@@ -1,21 +1,49 @@
-from apiron.client import Timeout
-from apiron.endpoint import Endpoint, JsonEndpoint, StreamingEndpoint, StubEndpoint
+from apiron.client import Failover, Timeout
+from apiron.compression import Compression
+from apiron.endpoint import (
+    Endpoint,
+    JsonEndpoint,
+    NdjsonEndpoint,
+    ServerSentEventsEndpoint,
+    StreamingEndpoint,
+    StreamingJsonEndpoint,
+    StubEndpoint,
+)
 from apiron.exceptions import (
     APIException,
+    CircuitOpenException,
+    ConcurrencyLimitExceededException,
     NoHostsAvailableException,
+    RateLimitExceededException,
+    ResponseValidationException,
     UnfulfilledParameterException,
 )
+from apiron.metrics import MetricsRegistry
+from apiron.pool import SessionPool
+from apiron.ratelimit import RateLimiter
 from apiron.service import DiscoverableService, Service, ServiceBase
 
 __all__ = [
     "APIException",
+    "CircuitOpenException",
+    "Compression",
+    "ConcurrencyLimitExceededException",
     "DiscoverableService",
     "Endpoint",
+    "Failover",
     "JsonEndpoint",
+    "MetricsRegistry",
+    "NdjsonEndpoint",
     "NoHostsAvailableException",
+    "RateLimitExceededException",
+    "RateLimiter",
+    "ResponseValidationException",
+    "ServerSentEventsEndpoint",
     "Service",
     "ServiceBase",
+    "SessionPool",
     "StreamingEndpoint",
+    "StreamingJsonEndpoint",
     "StubEndpoint",
     "Timeout",
     "UnfulfilledParameterException",
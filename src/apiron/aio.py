@@ -0,0 +1,712 @@
+"""
+An :mod:`asyncio` counterpart of :mod:`apiron.client` built on `httpx <https://www.python-httpx.org>`_.
+
+Endpoints declared on a service with ``asynchronous = True`` are called through :func:`call`,
+so ``await MyService.my_endpoint(...)`` sends the request without blocking the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import time
+import weakref
+from collections.abc import AsyncIterable, AsyncIterator, Callable
+from typing import TYPE_CHECKING, Any
+
+try:
+    import httpx
+except ImportError as exc:  # pragma: no cover
+    raise ImportError("apiron.aio requires httpx; install it with `pip install apiron[aio]`") from exc
+
+from urllib3.exceptions import MaxRetryError
+from urllib3.util import retry
+
+from apiron import cache, coalescing, compression, concurrency, ratelimit, upload
+from apiron.client import (
+    Failover,
+    Timeout,
+    _build_url,
+    _choose_host,
+    _get_cache_key,
+    _get_cache_request_headers,
+    _get_coalescing_key,
+    _get_compression_spec,
+    _get_failover_backoff,
+    _get_failover_spec,
+    _get_rate_limiters,
+    _get_request_observers,
+    _get_required_headers,
+    _get_retry_spec,
+    _get_timeout_spec,
+    _should_coalesce,
+    _should_fail_over,
+    _update_cache,
+    _with_accept_encoding,
+)
+
+if TYPE_CHECKING:
+    import apiron  # pragma: no cover
+
+LOGGER = logging.getLogger(__name__)
+
+_SINGLE_FLIGHT = coalescing.AsyncSingleFlight()
+
+# Closing responses that lost a hedged race, kept here so they aren't garbage collected while running
+_CLOSING: set[asyncio.Future] = set()
+
+_CLIENTS: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[Any, httpx.AsyncClient]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_connect_retries(retry_spec: retry.Retry) -> int:
+    retries = retry_spec.connect if retry_spec.connect is not None else retry_spec.total
+    return int(retries or 0)
+
+
+def _get_client(service: apiron.Service | type[apiron.Service], retry_spec: retry.Retry) -> httpx.AsyncClient:
+    """
+    Get the long-lived client for a service on the running event loop, creating it if necessary.
+    Clients cannot be shared across event loops, so each loop keeps its own.
+    """
+    clients = _CLIENTS.setdefault(asyncio.get_running_loop(), {})
+    connect_retries = _get_connect_retries(retry_spec)
+    key = (service, connect_retries)
+
+    client = clients.get(key)
+    if client is None or client.is_closed:
+        mounts = {
+            f"{scheme}://": httpx.AsyncHTTPTransport(retries=connect_retries, proxy=proxy)
+            for scheme, proxy in service.proxies.items()
+        }
+        client = clients[key] = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(retries=connect_retries),
+            mounts=mounts or None,
+        )
+    return client
+
+
+async def close():
+    """
+    Close the clients that :func:`call` has pooled on the running event loop
+    """
+    clients = _CLIENTS.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+def _build_request_object(
+    client: httpx.AsyncClient,
+    service: apiron.Service,
+    endpoint: apiron.Endpoint,
+    host: str,
+    /,
+    method: str,
+    params: dict[str, Any] | None = None,
+    data: Any | None = None,
+    files: dict[str, Any] | None = None,
+    json: Any | None = None,
+    headers: dict[str, Any] | None = None,
+    cookies: dict[str, Any] | None = None,
+    timeout_spec: Timeout | None = None,
+    compression_spec: compression.Compression | None = None,
+    **kwargs,
+) -> httpx.Request:
+    path = endpoint.get_formatted_path(**kwargs)
+
+    merged_params = endpoint.get_merged_params(params)
+
+    headers = headers or {}
+    headers.update(_get_required_headers(service, endpoint))
+
+    # httpx sends raw bodies through ``content`` rather than ``data``
+    content: str | bytes | AsyncIterator[bytes] | None = None
+    if isinstance(data, (str, bytes)):
+        content, data = data, None
+    elif upload.is_streamed(data):
+        # An asynchronous client needs an asynchronous iterator, which sends a body of unknown length chunked
+        content, data = data.__aiter__() if isinstance(data, AsyncIterable) else upload.aiter_chunks(data), None
+
+    timeout = None
+    if timeout_spec:
+        timeout = httpx.Timeout(timeout_spec.read_timeout, connect=timeout_spec.connection_timeout)
+
+    request = client.build_request(
+        method,
+        _build_url(host, path),
+        content=content,
+        data=data,
+        files=files,
+        json=json,
+        params=merged_params,
+        headers=headers,
+        cookies=cookies,
+        timeout=timeout,
+    )
+    return _compress_request_body(request, compression_spec)
+
+
+def _compress_request_body(request: httpx.Request, compression_spec: compression.Compression | None) -> httpx.Request:
+    if (
+        compression_spec is None
+        or not isinstance(request.stream, httpx.ByteStream)
+        or "Content-Encoding" in request.headers
+    ):
+        return request
+    compressed = compression.compress(request.content, compression_spec)
+    if compressed is None:
+        return request
+    headers = request.headers.copy()
+    headers["Content-Encoding"] = compression_spec.encoding
+    headers["Content-Length"] = str(len(compressed))
+    return httpx.Request(
+        request.method, request.url, headers=headers, content=compressed, extensions=request.extensions
+    )
+
+
+async def _send_request(
+    client: httpx.AsyncClient,
+    service: apiron.Service,
+    host: str,
+    request: httpx.Request,
+    rate_limiters: tuple[ratelimit.RateLimiter, ...] = (),
+    concurrency_limiter: concurrency.ConcurrencyLimiter | None = None,
+    **send_kwargs,
+) -> httpx.Response:
+    if rate_limiters:
+        service_name = getattr(service, "service_name", str(service))
+        for limiter in rate_limiters:
+            await limiter.acquire_async(service_name)
+        response = await _send_request(
+            client, service, host, request, concurrency_limiter=concurrency_limiter, **send_kwargs
+        )
+        for limiter in rate_limiters:
+            limiter.on_response(response.status_code, response.headers)
+        return response
+
+    if concurrency_limiter is not None:
+        await concurrency_limiter.acquire_async(getattr(service, "service_name", str(service)))
+        start = time.perf_counter()
+        try:
+            response = await _send_request(client, service, host, request, **send_kwargs)
+        except asyncio.CancelledError:
+            # A request cancelled by its caller says nothing about the service
+            concurrency_limiter.release(None)
+            raise
+        except BaseException:
+            concurrency_limiter.release(time.perf_counter() - start, failed=True)
+            raise
+        concurrency_limiter.release(time.perf_counter() - start, failed=concurrency.is_failure(response.status_code))
+        return response
+
+    observers = _get_request_observers(service)
+    if not observers:
+        return await client.send(request, **send_kwargs)
+
+    for observer in observers:
+        observer.on_request_start(host)
+    start = time.perf_counter()
+    try:
+        response = await client.send(request, **send_kwargs)
+    except Exception:
+        for observer in observers:
+            observer.on_request_end(host, time.perf_counter() - start, failed=True)
+        raise
+    for observer in observers:
+        observer.on_request_end(host, time.perf_counter() - start, failed=response.status_code >= 500)
+    return response
+
+
+class _RetryResponse:
+    """
+    The parts of a urllib3 response that :meth:`urllib3.util.retry.Retry.increment` reads,
+    so that retries on bad statuses count against the ``status`` budget of the retry spec
+    """
+
+    def __init__(self, response: httpx.Response):
+        self.status = response.status_code
+        self.headers = response.headers
+
+    def get_redirect_location(self) -> bool:
+        # Redirects are followed by httpx, so a response is never retried as one
+        return False
+
+
+async def _send_with_status_retries(
+    client: httpx.AsyncClient,
+    service: apiron.Service,
+    host: str,
+    prepare_request: Callable[[str], httpx.Request],
+    method: str,
+    retry_spec: retry.Retry,
+    logger: logging.Logger,
+    **send_kwargs,
+) -> httpx.Response:
+    """
+    Sends a request to ``host``, sending it again after a backoff while the response status is one that
+    ``retry_spec`` retries, as urllib3 does for :mod:`apiron.client`
+    """
+    retry_state = retry_spec
+
+    while True:
+        request = prepare_request(host)
+
+        logger.info("%s %s", method, request.url)
+
+        response = await _send_request(client, service, host, request, **send_kwargs)
+
+        logger.info(
+            "%d %s%s",
+            response.status_code,
+            response.url,
+            f" ({len(response.history)} redirect(s))" if response.history else "",
+        )
+
+        if not retry_state.is_retry(method, response.status_code, "Retry-After" in response.headers):
+            return response
+
+        try:
+            retry_state = retry_state.increment(
+                method, str(request.url), response=_RetryResponse(response)  # type: ignore[arg-type]
+            )
+        except MaxRetryError:
+            return response
+
+        await response.aclose()
+        await asyncio.sleep(retry_state.get_backoff_time())
+
+
+async def _send_timed(
+    client: httpx.AsyncClient,
+    service: apiron.Service,
+    host: str,
+    prepare_request: Callable[[str], httpx.Request],
+    method: str,
+    retry_spec: retry.Retry,
+    logger: logging.Logger,
+    record_latency: Callable[[float], None],
+    sent_at: asyncio.Future[float] | None = None,
+    **send_kwargs,
+) -> httpx.Response:
+    # Streamed httpx responses only know their elapsed time once read, so the latency is timed here
+    start = time.monotonic()
+    if sent_at is not None:
+        sent_at.set_result(start)
+    response = await _send_with_status_retries(
+        client, service, host, prepare_request, method, retry_spec, logger, **send_kwargs
+    )
+    record_latency(time.monotonic() - start)
+    return response
+
+
+def _close_losing_response(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is None:
+        closing = asyncio.ensure_future(task.result().aclose())
+        _CLOSING.add(closing)
+        closing.add_done_callback(_CLOSING.discard)
+
+
+async def _send_hedged_request(
+    client: httpx.AsyncClient,
+    service: apiron.Service,
+    host: str,
+    prepare_request: Callable[[str], httpx.Request],
+    method: str,
+    retry_spec: retry.Retry,
+    hedge_delay: float,
+    logger: logging.Logger,
+    record_latency: Callable[[float], None],
+    **send_kwargs,
+) -> httpx.Response:
+    """
+    Sends a request to ``host`` and, if no response has arrived ``hedge_delay`` seconds after it was sent,
+    sends an identical request to another host.
+    The first response to arrive is returned and the other is closed when it completes.
+    The latency of the request to ``host`` is passed to ``record_latency`` whether or not it wins.
+    """
+    sent_at: asyncio.Future[float] = asyncio.get_running_loop().create_future()
+    # Tasks run in a copy of this context, so a circuit breaker probe claimed for a request goes with it
+    primary = asyncio.ensure_future(
+        _send_timed(
+            client, service, host, prepare_request, method, retry_spec, logger, record_latency, sent_at, **send_kwargs
+        )
+    )
+    tasks = {primary}
+
+    try:
+        # The hedge delay counts from when the request is sent rather than from when its task was created
+        timeout = max(await sent_at + hedge_delay - time.monotonic(), 0)
+        done, _ = await asyncio.wait(tasks, timeout=timeout)
+        hedge_host = _choose_host(service, {host}) if not done else host
+        if hedge_host == host:
+            return await primary
+
+        logger.info("%s %s (hedging after %.3fs)", method, hedge_host, hedge_delay)
+        tasks.add(
+            asyncio.ensure_future(
+                _send_with_status_retries(
+                    client, service, hedge_host, prepare_request, method, retry_spec, logger, **send_kwargs
+                )
+            )
+        )
+
+        pending = tasks
+        exceptions: list[BaseException] = []
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                exception = task.exception()
+                if exception is None:
+                    for loser in pending:
+                        loser.add_done_callback(_close_losing_response)
+                    tasks = pending
+                    return task.result()
+                exceptions.append(exception)
+
+        raise exceptions[0]
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+def _rebuild_response(cached_response: cache.CachedResponse, request: httpx.Request | None = None) -> httpx.Response:
+    """
+    Rebuild an :class:`httpx.Response` from the parts kept by a response cache
+    """
+    # The cached content has already been decoded, so it mustn't be decoded again
+    headers = [(name, value) for name, value in cached_response.headers.items() if name.lower() != "content-encoding"]
+    response = httpx.Response(
+        cached_response.status_code,
+        headers=headers,
+        content=cached_response.content,
+        request=request or httpx.Request("GET", cached_response.url),
+    )
+    if cached_response.encoding:
+        response.encoding = cached_response.encoding
+    return response
+
+
+def _format_response(
+    endpoint: apiron.Endpoint,
+    response: httpx.Response,
+    encoding: str | None,
+    return_raw_response_object: bool | None,
+) -> Any:
+    if encoding:
+        response.encoding = encoding
+
+    if return_raw_response_object is None:
+        return_raw_response_object = endpoint.return_raw_response_object
+
+    # Endpoints read only the parts of a response that httpx shares with requests
+    return response if return_raw_response_object else endpoint.format_response(response)  # type: ignore[arg-type]
+
+
+async def _iter_response(response: httpx.Response, chunk_size: int | None = None) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in response.aiter_bytes(chunk_size):
+            yield chunk
+    finally:
+        await response.aclose()
+
+
+async def _resume(
+    service: apiron.Service,
+    endpoint: apiron.Endpoint,
+    headers: dict[str, Any] | None,
+    resume_headers: dict[str, str],
+    **call_kwargs,
+) -> httpx.Response:
+    """
+    Call an endpoint again to resume a stream that ended, like an event stream, adding the headers it resumes from.
+    The raw response is returned unread, and the caller is responsible for closing it.
+    """
+    return await call(
+        service,
+        endpoint,
+        headers={**(headers or {}), **resume_headers},
+        return_raw_response_object=True,
+        coalesce=False,
+        **call_kwargs,
+    )
+
+
+async def call(
+    service: apiron.Service,
+    endpoint: apiron.Endpoint,
+    method: str | None = None,
+    session: httpx.AsyncClient | None = None,
+    params: dict[str, Any] | None = None,
+    data: dict[str, Any] | None = None,
+    files: dict[str, Any] | None = None,
+    json: dict[str, Any] | None = None,
+    headers: dict[str, Any] | None = None,
+    cookies: dict[str, Any] | None = None,
+    auth: Any | None = None,
+    encoding: str | None = None,
+    retry_spec: retry.Retry | None = None,
+    timeout_spec: Timeout | None = None,
+    failover_spec: Failover | None = None,
+    logger: logging.Logger | None = None,
+    allow_redirects: bool = True,
+    return_raw_response_object: bool | None = None,
+    coalesce: bool | None = None,
+    chunk_size: int | None = None,
+    compression_spec: compression.Compression | None = None,
+    **kwargs,
+):
+    """
+    Asynchronously call an endpoint.
+    Arguments mirror :func:`apiron.client.call`, except as noted.
+
+    :param Service service:
+        The service that hosts the endpoint being called
+    :param Endpoint endpoint:
+        The endpoint being called
+    :param str method:
+        The HTTP method to use for the call
+    :param httpx.AsyncClient session:
+        (optional)
+        An existing client, useful for sharing cookies across calls.
+        When omitted, a long-lived client for ``service`` on the running event loop is used.
+        (default ``None``)
+    :param urllib3.util.retry.Retry retry_spec:
+        (optional)
+        An override of the retry behavior for this call.
+        Connection retries are handled by the transport of pooled clients;
+        retries on bad statuses are honored for every client.
+        (default ``None``)
+    :param Failover failover_spec:
+        (optional)
+        An override of how to retry this call on a different host after a failure.
+        A connection that timed out is failed over for any method; other transport errors,
+        and the statuses in the spec once status retries are exhausted, only for idempotent methods.
+        (default ``None``)
+    :param ``**kwargs``:
+        Arguments to be formatted into the ``endpoint`` argument's ``path`` attribute
+    :return:
+        The result of ``endpoint``'s :func:`format_response`.
+        Streaming endpoints return an asynchronous iterator of :class:`bytes` chunks instead.
+    :raises httpx.HTTPStatusError:
+        if the response has a bad HTTP status once retries are exhausted
+    :raises httpx.TransportError:
+        if the connection fails or times out
+    """
+    logger = logger or LOGGER
+
+    method = method or endpoint.default_method
+
+    if chunk_size is not None and not getattr(endpoint, "streaming", False):
+        raise ValueError(f"chunk_size only applies to streaming endpoints, not {endpoint!r}")
+
+    if _should_coalesce(endpoint, method, coalesce, data=data, files=files, json=json, cookies=cookies, auth=auth):
+        options: dict[str, Any] = {
+            "encoding": encoding,
+            "retry_spec": retry_spec,
+            "timeout_spec": timeout_spec,
+            "failover_spec": failover_spec,
+            "allow_redirects": allow_redirects,
+            "return_raw_response_object": return_raw_response_object,
+            "compression_spec": compression_spec,
+        }
+        coalescing_key = _get_coalescing_key(service, endpoint, method, session, params, headers, options, **kwargs)
+        return await _SINGLE_FLIGHT.do(
+            coalescing_key,
+            lambda: call(
+                service,
+                endpoint,
+                method=method,
+                session=session,
+                params=params,
+                headers=headers,
+                logger=logger,
+                coalesce=False,
+                **options,
+                **kwargs,
+            ),
+        )
+
+    retry_spec_to_use = _get_retry_spec(endpoint, retry_spec)
+    client = session or _get_client(service, retry_spec_to_use)
+
+    streaming = getattr(endpoint, "streaming", False)
+
+    headers = _with_accept_encoding(service, endpoint, headers)
+
+    # The cache is consulted before a host is chosen, so a fresh response costs no network traffic at all
+    response_cache = endpoint.cache if method.upper() == "GET" and not streaming else None
+    cached_response = None
+    cache_request_headers = None
+    if response_cache is not None:
+        cache_request_headers = _get_cache_request_headers(session, client, service, endpoint, headers, cookies, auth)
+    if response_cache is not None and cache_request_headers is not None:
+        cache_key = _get_cache_key(service, endpoint, method, params, **kwargs)
+        cached_response = response_cache.get(cache_key)
+        if cached_response is not None and not cached_response.matches(cache_request_headers):
+            cached_response = None
+        if cached_response is not None:
+            if cached_response.is_fresh():
+                logger.info("%s %s (cached)", method, cached_response.url)
+                return _format_response(
+                    endpoint, _rebuild_response(cached_response), encoding, return_raw_response_object
+                )
+            if cached_response.etag:
+                headers = {**(headers or {}), "If-None-Match": cached_response.etag}
+
+    auth = auth or getattr(session, "auth", None) or service.auth or None
+
+    failover_spec_to_use = _get_failover_spec(endpoint, failover_spec)
+    # Files are read as the request is sent rather than encoded in memory first
+    data, files = upload.encode_files(data, files)
+    if isinstance(data, upload.StreamingBody):
+        headers = {**data.headers, **(headers or {})}
+    # A body that can only be read once, like a generator or an open file, is never sent to a second host
+    if not upload.is_replayable(data):
+        failover_spec_to_use = None
+
+    attempts = failover_spec_to_use.attempts if failover_spec_to_use else 1
+    deadline = None
+    if failover_spec_to_use and failover_spec_to_use.deadline is not None:
+        deadline = time.monotonic() + failover_spec_to_use.deadline
+    tried_hosts: set[str] = set()
+
+    prepare_request = functools.partial(
+        _build_request_object,
+        client,
+        service,
+        endpoint,
+        method=method,
+        params=params,
+        data=data,
+        files=files,
+        json=json,
+        headers=headers,
+        cookies=cookies,
+        timeout_spec=_get_timeout_spec(endpoint, timeout_spec),
+        compression_spec=_get_compression_spec(endpoint, compression_spec),
+        **kwargs,
+    )
+    send_kwargs: dict[str, Any] = {
+        "stream": True,
+        "auth": auth,
+        "follow_redirects": allow_redirects,
+        "rate_limiters": _get_rate_limiters(service, endpoint),
+        "concurrency_limiter": service.concurrency_limiter,
+    }
+    hedge_delay = None
+    # Hedged requests are sent at the same time, so they can't share a body that is read as it is sent
+    if method.upper() in retry.Retry.DEFAULT_ALLOWED_METHODS and not upload.is_streamed(data):
+        hedge_delay = endpoint.get_hedge_delay()
+
+    for attempt in range(1, attempts + 1):
+        host = _choose_host(service, tried_hosts)
+        tried_hosts.add(host)
+
+        try:
+            if hedge_delay is None:
+                response = await _send_timed(
+                    client,
+                    service,
+                    host,
+                    prepare_request,
+                    method,
+                    retry_spec_to_use,
+                    logger,
+                    endpoint.record_latency,
+                    **send_kwargs,
+                )
+            else:
+                response = await _send_hedged_request(
+                    client,
+                    service,
+                    host,
+                    prepare_request,
+                    method,
+                    retry_spec_to_use,
+                    hedge_delay,
+                    logger,
+                    endpoint.record_latency,
+                    **send_kwargs,
+                )
+        except httpx.TransportError as exception:
+            if failover_spec_to_use is None or not _should_fail_over(
+                failover_spec_to_use,
+                method,
+                attempt,
+                deadline,
+                exception=exception,
+                connect_timeout_errors=(httpx.ConnectTimeout,),
+                failover_errors=(httpx.TransportError,),
+            ):
+                raise
+            logger.info("%s %s failed, trying another host: %s", method, host, exception)
+            await asyncio.sleep(_get_failover_backoff(failover_spec_to_use, attempt, deadline))
+            continue
+
+        if failover_spec_to_use is None or not _should_fail_over(
+            failover_spec_to_use, method, attempt, deadline, status_code=response.status_code
+        ):
+            break
+
+        await response.aclose()
+        await asyncio.sleep(_get_failover_backoff(failover_spec_to_use, attempt, deadline))
+
+    if response.is_error:
+        await response.aread()
+        await response.aclose()
+        response.raise_for_status()
+
+    if streaming:
+        if encoding:
+            response.encoding = encoding
+        # A raw streaming response is handed back unread, and the caller is responsible for closing it
+        raw = endpoint.return_raw_response_object if return_raw_response_object is None else return_raw_response_object
+        if raw:
+            return response
+        # Endpoints that decode their stream, like StreamingJsonEndpoint, do so as the chunks arrive
+        if chunk_size is None:
+            chunk_size = getattr(endpoint, "chunk_size", None)
+        aiter_elements = getattr(endpoint, "aiter_elements", None)
+        if aiter_elements is None:
+            return _iter_response(response, chunk_size)
+        if not getattr(endpoint, "reconnect", False):
+            return aiter_elements(_iter_response(response, chunk_size), response.encoding)
+        # Endpoints that resume their streams, like ServerSentEventsEndpoint, are given a way to call again
+        resume = functools.partial(
+            _resume,
+            service,
+            endpoint,
+            headers,
+            method=method,
+            session=session,
+            params=params,
+            data=data,
+            files=files,
+            json=json,
+            cookies=cookies,
+            auth=auth,
+            encoding=encoding,
+            retry_spec=retry_spec,
+            timeout_spec=timeout_spec,
+            failover_spec=failover_spec,
+            logger=logger,
+            allow_redirects=allow_redirects,
+            compression_spec=compression_spec,
+            **kwargs,
+        )
+        return aiter_elements(
+            _iter_response(response, chunk_size), response.encoding, resume=resume, chunk_size=chunk_size
+        )
+
+    await response.aread()
+    await response.aclose()
+
+    if response_cache is not None and cache_request_headers is not None:
+        revalidated = _update_cache(response_cache, cache_key, cached_response, response, cache_request_headers)
+        if revalidated is not None:
+            response = _rebuild_response(revalidated, response.request)
+
+    return _format_response(endpoint, response, encoding, return_raw_response_object)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import collections
+import itertools
+import math
+import random
+import threading
+import time
+
+
+class LoadBalancer:
+    """
+    Chooses which of a service's hosts receives each call.
+
+    Declare an instance on a service as its ``load_balancer``.
+    :func:`apiron.client.call` reports the start and end of every request to the load balancer,
+    which strategies can use to steer traffic away from slow or failing hosts.
+    Each service should declare its own instance, since the observations are specific to the service's hosts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.outstanding: collections.Counter[str] = collections.Counter()
+
+    def choose(self, hosts: list[str]) -> str:
+        """
+        Choose a host for the next request
+
+        :param list hosts:
+            The non-empty list of hosts currently available for the service
+        :return:
+            One of ``hosts``
+        :rtype:
+            str
+        """
+        return random.choice(hosts)
+
+    def on_request_start(self, host: str):
+        """
+        Record that a request to ``host`` has been sent
+        """
+        with self._lock:
+            self.outstanding[host] += 1
+
+    def on_request_end(self, host: str, elapsed: float, failed: bool):
+        """
+        Record that a request to ``host`` has finished
+
+        :param str host:
+            The host the request was sent to
+        :param float elapsed:
+            The number of seconds the request took
+        :param bool failed:
+            Whether the request raised an error or responded with a server error status
+        """
+        with self._lock:
+            self.outstanding[host] -= 1
+            if self.outstanding[host] <= 0:
+                del self.outstanding[host]
+
+
+class RandomLoadBalancer(LoadBalancer):
+    """
+    Chooses a host uniformly at random, which is the behavior of services without a load balancer
+    """
+
+
+class RoundRobinLoadBalancer(LoadBalancer):
+    """
+    Cycles through the hosts in order
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._counter = itertools.count()
+
+    def choose(self, hosts: list[str]) -> str:
+        return hosts[next(self._counter) % len(hosts)]
+
+
+class LeastOutstandingLoadBalancer(LoadBalancer):
+    """
+    Chooses the host with the fewest requests in flight, breaking ties at random
+    """
+
+    def choose(self, hosts: list[str]) -> str:
+        fewest = min(self.outstanding[host] for host in hosts)
+        return random.choice([host for host in hosts if self.outstanding[host] == fewest])
+
+
+class PowerOfTwoChoicesLoadBalancer(LoadBalancer):
+    """
+    Picks two hosts at random and chooses the one with fewer requests in flight.
+    This avoids herding onto a single idle host while still avoiding busy ones.
+    """
+
+    def choose(self, hosts: list[str]) -> str:
+        if len(hosts) == 1:
+            return hosts[0]
+        first, second = random.sample(hosts, 2)
+        return first if self.outstanding[first] <= self.outstanding[second] else second
+
+
+class EwmaLoadBalancer(PowerOfTwoChoicesLoadBalancer):
+    """
+    Picks two hosts at random and chooses the one with the lower expected latency.
+
+    Each host's latency is tracked as an exponentially-weighted moving average
+    that decays toward recent observations over ``decay_seconds``,
+    and is scaled by the number of requests in flight to that host.
+    Failures count as ``failure_penalty`` seconds of latency.
+    Hosts without observations are preferred so that they get probed.
+    """
+
+    def __init__(self, decay_seconds: float = 10.0, failure_penalty: float = 5.0):
+        super().__init__()
+        self.decay_seconds = decay_seconds
+        self.failure_penalty = failure_penalty
+        self.latencies: dict[str, float] = {}
+        self._updated_at: dict[str, float] = {}
+
+    def _cost(self, host: str) -> float:
+        return self.latencies.get(host, 0.0) * (self.outstanding[host] + 1)
+
+    def choose(self, hosts: list[str]) -> str:
+        if len(hosts) == 1:
+            return hosts[0]
+        first, second = random.sample(hosts, 2)
+        return first if self._cost(first) <= self._cost(second) else second
+
+    def on_request_end(self, host: str, elapsed: float, failed: bool):
+        super().on_request_end(host, elapsed, failed)
+
+        observed = max(elapsed, self.failure_penalty) if failed else elapsed
+        now = time.monotonic()
+
+        with self._lock:
+            if host not in self.latencies:
+                self.latencies[host] = observed
+            else:
+                weight = math.exp(-(now - self._updated_at[host]) / self.decay_seconds)
+                self.latencies[host] = self.latencies[host] * weight + observed * (1 - weight)
+            self._updated_at[host] = now
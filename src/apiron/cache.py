@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import collections
+import email.utils
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any
+
+import requests
+from requests import structures
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class CachedResponse:
+    """
+    The parts of a :class:`requests.Response` needed to serve it again from a cache
+    """
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: dict[str, str],
+        content: bytes,
+        url: str,
+        encoding: str | None,
+        expires_at: float,
+        vary: dict[str, str | None] | None = None,
+    ):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.encoding = encoding
+        self.expires_at = expires_at
+        #: The values of the request headers named by the response's ``Vary`` header when it was stored
+        self.vary = vary or {}
+
+    @classmethod
+    def from_response(
+        cls, response: requests.Response, expires_at: float, vary: dict[str, str | None] | None = None
+    ) -> CachedResponse:
+        """
+        Keep the parts of a response that has been read, from :mod:`requests` or :mod:`httpx`
+        """
+        return cls(
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            content=response.content,
+            url=str(response.url),
+            encoding=response.encoding,
+            expires_at=expires_at,
+            vary=vary,
+        )
+
+    @property
+    def etag(self) -> str | None:
+        return structures.CaseInsensitiveDict(self.headers).get("ETag")
+
+    @property
+    def size(self) -> int:
+        return len(self.content) + sum(len(name) + len(value) for name, value in self.headers.items())
+
+    def is_fresh(self, now: float | None = None) -> bool:
+        return (now or time.time()) < self.expires_at
+
+    def matches(self, request_headers: Mapping[str, str]) -> bool:
+        """
+        Whether a request with ``request_headers`` would have received this response, according to its ``Vary`` header
+        """
+        return all(request_headers.get(name) == value for name, value in self.vary.items())
+
+    def to_response(self, request: requests.PreparedRequest | None = None) -> requests.Response:
+        """
+        Rebuild a :class:`requests.Response` from the cached parts
+        """
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.headers = structures.CaseInsensitiveDict(self.headers)
+        response._content = self.content
+        response.url = self.url
+        response.encoding = self.encoding
+        response.request = request  # type: ignore[assignment]
+        return response
+
+
+def get_expiry(response: requests.Response, default_ttl: float = 0, now: float | None = None) -> float | None:
+    """
+    When a response stops being fresh, according to its ``Cache-Control`` or ``Expires`` headers
+
+    :param requests.Response response:
+        The response to inspect
+    :param float default_ttl:
+        The number of seconds a response without freshness headers stays fresh
+    :return:
+        The time the response expires as a timestamp,
+        or ``None`` if it must not be stored at all
+    :rtype:
+        float
+    """
+    now = now or time.time()
+    directives = {}
+    for directive in response.headers.get("Cache-Control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return now
+
+    if "max-age" in directives:
+        try:
+            max_age = int(directives["max-age"])
+            age = int(response.headers.get("Age", 0))
+        except ValueError:
+            return now
+        return now + max_age - age
+
+    expires = response.headers.get("Expires")
+    if expires:
+        try:
+            return email.utils.parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            return now
+
+    return now + default_ttl
+
+
+def get_vary(headers: Mapping[str, str], request_headers: Mapping[str, str]) -> dict[str, str | None] | None:
+    """
+    The values of the request headers that a response varies by, according to its ``Vary`` header
+
+    :param headers:
+        The response's headers, with case-insensitive names
+    :param request_headers:
+        The headers of the request, with case-insensitive names
+    :return:
+        Lowercase header name, value pairs,
+        or ``None`` if the response varies by more than the request headers (``Vary: *``) and must not be stored
+    :rtype:
+        dict
+    """
+    names = [name.strip().lower() for name in headers.get("Vary", "").split(",") if name.strip()]
+    if "*" in names:
+        return None
+    return {name: request_headers.get(name) for name in names}
+
+
+class ResponseCache:
+    """
+    A store for cached responses.
+    Set an instance as an endpoint's ``cache`` to serve ``GET`` calls from it.
+
+    Responses are stored for as long as their ``Cache-Control`` or ``Expires`` headers allow,
+    or for ``default_ttl`` seconds when they have neither.
+    Stale responses with an ``ETag`` are revalidated with ``If-None-Match``
+    so an unchanged resource is not downloaded again.
+    """
+
+    def __init__(self, default_ttl: float = 0):
+        self.default_ttl = default_ttl
+
+    def get(self, key: str) -> CachedResponse | None:
+        raise NotImplementedError  # pragma: no cover
+
+    def set(self, key: str, cached_response: CachedResponse):
+        raise NotImplementedError  # pragma: no cover
+
+    def delete(self, key: str):
+        raise NotImplementedError  # pragma: no cover
+
+    def clear(self):
+        raise NotImplementedError  # pragma: no cover
+
+
+class MemoryCache(ResponseCache):
+    """
+    An in-process cache that evicts the least recently used responses once it holds more than ``max_bytes``
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, default_ttl: float = 0):
+        super().__init__(default_ttl=default_ttl)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: collections.OrderedDict[str, CachedResponse] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            cached_response = self._entries.get(key)
+            if cached_response is not None:
+                self._entries.move_to_end(key)
+            return cached_response
+
+    def set(self, key: str, cached_response: CachedResponse):
+        if cached_response.size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = cached_response
+            self.size += cached_response.size
+
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+
+    def _remove(self, key: str):
+        cached_response = self._entries.pop(key, None)
+        if cached_response is not None:
+            self.size -= cached_response.size
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCache(ResponseCache):
+    """
+    A cache that stores each response in its own file in ``directory``, so it survives restarts
+    and can be shared by the processes on a machine
+    """
+
+    def __init__(self, directory: str, default_ttl: float = 0):
+        super().__init__(default_ttl=default_ttl)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    def get(self, key: str) -> CachedResponse | None:
+        try:
+            with open(self._path(key), "rb") as cache_file:
+                metadata: dict[str, Any] = json.loads(cache_file.readline())
+                content = cache_file.read()
+        except (OSError, ValueError):
+            return None
+        return CachedResponse(content=content, **metadata)
+
+    def set(self, key: str, cached_response: CachedResponse):
+        metadata = {
+            "status_code": cached_response.status_code,
+            "headers": cached_response.headers,
+            "url": cached_response.url,
+            "encoding": cached_response.encoding,
+            "expires_at": cached_response.expires_at,
+            "vary": cached_response.vary,
+        }
+
+        # Write to a temporary file and move it into place so that readers never see a partial file
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(file_descriptor, "wb") as cache_file:
+            cache_file.write(json.dumps(metadata).encode() + b"\n")
+            cache_file.write(cached_response.content)
+        os.replace(temporary_path, self._path(key))
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
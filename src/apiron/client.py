@@ -1,19 +1,40 @@
 from __future__ import annotations
 
 import collections
+import contextvars
+import functools
+import itertools
 import logging
 import random
+import re
+import threading
+import time
+import weakref
+from collections.abc import Callable, Collection, Hashable, Iterable, Iterator, Mapping
+from concurrent import futures
 from typing import TYPE_CHECKING, Any
 from urllib import parse
 
 import requests
-from requests import adapters
+from requests import adapters, structures
 from urllib3.util import retry
 
 if TYPE_CHECKING:
+    import httpx  # pragma: no cover
+
     import apiron  # pragma: no cover
 
-from apiron.exceptions import NoHostsAvailableException
+from apiron import (
+    cache,
+    coalescing,
+    compression,
+    concurrency,
+    instrumentation,
+    pool,
+    ratelimit,
+    upload,
+)
+from apiron.exceptions import APIException, NoHostsAvailableException
 
 LOGGER = logging.getLogger(__name__)
 
@@ -25,7 +46,27 @@ DEFAULT_READ_RETRIES = 1
 DEFAULT_TOTAL_RETRIES = 1
 DEFAULT_STATUS_CODES_TO_RETRY_ON = range(500, 600)
 
+DEFAULT_FAILOVER_ATTEMPTS = 3
+DEFAULT_FAILOVER_BACKOFF_FACTOR = 0.1
+DEFAULT_FAILOVER_MAX_BACKOFF = 2
+
 Timeout = collections.namedtuple("Timeout", ["connection_timeout", "read_timeout"])
+Failover = collections.namedtuple(
+    "Failover",
+    ["attempts", "backoff_factor", "max_backoff", "deadline", "status_codes"],
+    defaults=[
+        DEFAULT_FAILOVER_ATTEMPTS,
+        DEFAULT_FAILOVER_BACKOFF_FACTOR,
+        DEFAULT_FAILOVER_MAX_BACKOFF,
+        None,
+        DEFAULT_STATUS_CODES_TO_RETRY_ON,
+    ],
+)
+
+DEFAULT_MAX_WORKERS = 10
+DEFAULT_HEDGE_WORKERS = 32
+
+CallResult = collections.namedtuple("CallResult", ["arguments", "result", "exception"])
 
 DEFAULT_TIMEOUT = Timeout(connection_timeout=DEFAULT_CONNECTION_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT)
 DEFAULT_RETRY = retry.Retry(
@@ -57,7 +98,7 @@ def _build_url(host: str, path: str) -> str:
     return parse.urljoin(host, path)
 
 
-def _adapt_session(session: requests.Session, adapter: requests.adapters.HTTPAdapter) -> requests.Session:
+def _adapt_session(session: requests.Session, adapter: requests.adapters.BaseAdapter) -> requests.Session:
     """
     Mounts an adapter capable of communication over HTTP or HTTPS to the supplied session.
 
@@ -71,6 +112,82 @@ def _adapt_session(session: requests.Session, adapter: requests.adapters.HTTPAda
     return session
 
 
+_RETRY_SPEC: contextvars.ContextVar[retry.Retry | None] = contextvars.ContextVar("apiron_retry_spec", default=None)
+
+
+class _RetrySpecAdapter(adapters.BaseAdapter):
+    """
+    An adapter mounted once on a supplied session that sends each request
+    through an :class:`requests.adapters.HTTPAdapter` for the retry spec of the call sending it.
+    The adapters are kept per distinct retry spec, so their connection pools are reused across calls,
+    and concurrent calls with different retry specs never swap the mounted adapter under each other.
+    """
+
+    def __init__(self, default_retry_spec: retry.Retry):
+        super().__init__()
+        self.default_retry_spec = default_retry_spec
+        self._adapters: dict[Hashable, adapters.HTTPAdapter] = {}
+        self._lock = threading.Lock()
+
+    def get_adapter(self, retry_spec: retry.Retry) -> adapters.HTTPAdapter:
+        key = pool._retry_spec_key(retry_spec)
+        adapter = self._adapters.get(key)
+        if adapter is None:
+            with self._lock:
+                adapter = self._adapters.get(key)
+                if adapter is None:
+                    adapter = self._adapters[key] = adapters.HTTPAdapter(max_retries=retry_spec)
+                    instrumentation.time_connections(adapter)
+        return adapter
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout: float | tuple[float, float] | tuple[float, None] | None = None,
+        verify: bool | str = True,
+        cert: bytes | str | tuple[bytes | str, bytes | str] | None = None,
+        proxies: Mapping[str, str] | None = None,
+    ) -> requests.Response:
+        return self.get_adapter(_RETRY_SPEC.get() or self.default_retry_spec).send(
+            request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies
+        )
+
+    def close(self):
+        for adapter in list(self._adapters.values()):
+            adapter.close()
+
+
+_SESSION_ADAPTERS: weakref.WeakKeyDictionary[requests.Session, _RetrySpecAdapter] = weakref.WeakKeyDictionary()
+_SESSION_ADAPTERS_LOCK = threading.Lock()
+
+_SINGLE_FLIGHT = coalescing.SingleFlight()
+
+_HEDGE_EXECUTOR: futures.ThreadPoolExecutor | None = None
+_HEDGE_EXECUTOR_LOCK = threading.Lock()
+
+
+def _adapt_session_for_retry_spec(session: requests.Session, retry_spec: retry.Retry) -> requests.Session:
+    """
+    Mounts an adapter that honors the retry spec of each call to the supplied session,
+    the first time the session is seen.
+    The adapter keeps one connection pool per distinct retry spec and reuses it on later calls.
+
+    :param requests.Session session:
+        The session to adapt
+    :param urllib3.util.retry.Retry retry_spec:
+        The retry behavior for requests sent outside of :func:`call`
+    :return:
+        The adapted :class:`requests.Session` instance
+    """
+    with _SESSION_ADAPTERS_LOCK:
+        if session in _SESSION_ADAPTERS:
+            return session
+
+        adapter = _SESSION_ADAPTERS[session] = _RetrySpecAdapter(retry_spec)
+        return _adapt_session(session, adapter)
+
+
 def _get_required_headers(service: apiron.Service, endpoint: apiron.Endpoint) -> dict[str, str]:
     """
     :param Service service:
@@ -88,38 +205,247 @@ def _get_required_headers(service: apiron.Service, endpoint: apiron.Endpoint) ->
     return headers
 
 
-def _choose_host(service: apiron.Service) -> str:
+def _get_accept_encoding(service: apiron.Service, endpoint: apiron.Endpoint) -> str | None:
+    """
+    :return:
+        The ``Accept-Encoding`` header for calls to ``endpoint``,
+        or ``None`` when neither it nor ``service`` chooses content codings
+    :rtype:
+        str
+    """
+    encodings = endpoint.accept_encoding if endpoint.accept_encoding is not None else service.accept_encoding
+    return None if encodings is None else compression.get_accept_encoding(encodings)
+
+
+def _with_accept_encoding(
+    service: apiron.Service, endpoint: apiron.Endpoint, headers: dict[str, Any] | None
+) -> dict[str, Any] | None:
+    # The configured codings replace the session's default, but not an Accept-Encoding passed to the call
+    accept_encoding = _get_accept_encoding(service, endpoint)
+    if accept_encoding is None or any(name.lower() == "accept-encoding" for name in headers or {}):
+        return headers
+    return {"Accept-Encoding": accept_encoding, **(headers or {})}
+
+
+def _get_rate_limiters(service: apiron.Service, endpoint: apiron.Endpoint) -> tuple[ratelimit.RateLimiter, ...]:
+    """
+    The rate limiters that requests to ``endpoint`` need a token from, the endpoint's own first
+    """
+    return tuple(limiter for limiter in (endpoint.rate_limiter, service.rate_limiter) if limiter is not None)
+
+
+def _get_compression_spec(
+    endpoint: apiron.Endpoint, compression_spec: compression.Compression | None = None
+) -> compression.Compression | None:
+    return compression_spec or endpoint.compression_spec
+
+
+def _compress_request_body(
+    request: requests.PreparedRequest, compression_spec: compression.Compression | None
+) -> requests.PreparedRequest:
+    body = request.body
+    if compression_spec is None or not isinstance(body, (str, bytes)) or "Content-Encoding" in request.headers:
+        return request
+    # http.client sends a str body encoded as ISO-8859-1, so it is compressed in that encoding too
+    compressed = compression.compress(body.encode("iso-8859-1") if isinstance(body, str) else body, compression_spec)
+    if compressed is not None:
+        request.body = compressed
+        request.headers["Content-Encoding"] = compression_spec.encoding
+        request.headers["Content-Length"] = str(len(compressed))
+    return request
+
+
+def _choose_host(service: apiron.Service, excluded_hosts: Collection[str] = ()) -> str:
     hosts = service.get_hosts()
     if not hosts:
         raise NoHostsAvailableException(getattr(service, "service_name", "UNKNOWN SERVICE"))
+    if excluded_hosts:
+        # Fall back to every host once they have all been excluded, e.g. for a service with a single host
+        hosts = [host for host in hosts if host not in excluded_hosts] or hosts
+    if service.circuit_breaker:
+        hosts = service.circuit_breaker.available_hosts(getattr(service, "service_name", str(service)), hosts)
+    if service.load_balancer:
+        return service.load_balancer.choose(hosts)
     return random.choice(hosts)
 
 
+# Paths that can be appended to a base URL as they are, without requests quoting or normalizing them
+_is_plain_path = re.compile(r"(?:[A-Za-z0-9_.~!$&'()*+,;=@/-]|%[0-9A-Fa-f]{2})*").fullmatch
+
+
+def _get_declared_required_headers(service: apiron.Service) -> dict[str, Any] | None:
+    """
+    The headers required by ``service`` when they are declared as a plain dictionary rather than a property,
+    which can be read without creating an instance of the service.
+    The dictionary itself is returned rather than a copy, so that changes made to it later still apply.
+    """
+    for klass in getattr(service, "__mro__", ()):
+        if "required_headers" in vars(klass):
+            headers = vars(klass)["required_headers"]
+            return headers if isinstance(headers, dict) else None
+    return None
+
+
+def _encode_params(params: dict[str, Any]) -> str:
+    # The same query string that requests builds from a dictionary of parameters
+    pairs = []
+    for name, values in params.items():
+        if isinstance(values, (str, bytes)) or not hasattr(values, "__iter__"):
+            values = [values]
+        for value in values:
+            if value is not None:
+                pairs.append(
+                    (
+                        name.encode("utf-8") if isinstance(name, str) else name,
+                        value.encode("utf-8") if isinstance(value, str) else value,
+                    )
+                )
+    return parse.urlencode(pairs, doseq=True)
+
+
+def _can_prepare_directly(session: requests.Session) -> bool:
+    """
+    Whether ``session`` has nothing of its own to merge into a request besides its headers,
+    so a request can be prepared without :meth:`requests.Session.prepare_request`
+    """
+    return (
+        getattr(type(session), "prepare_request", None) is requests.Session.prepare_request
+        and not session.cookies
+        and not session.auth
+        and not session.params
+        and not any(session.hooks.values())
+    )
+
+
+class _RequestTemplate:
+    """
+    The parts of a request to an endpoint on a host that are the same on every call:
+    the base URL joined by :func:`_build_url` and, when they never change, the endpoint's required headers.
+    Requests prepared from a template only encode their path, query string, and body.
+    """
+
+    def __init__(self, service: apiron.Service, endpoint: apiron.Endpoint, host: str):
+        self.base_url = _build_url(host, "")
+        self.service_headers = _get_declared_required_headers(service)
+        self.endpoint_headers = (
+            endpoint.required_headers if getattr(type(endpoint), "_static_required_headers", False) else None
+        )
+
+        # Paths can only be appended to a base URL that requests would send exactly as it is
+        prepared = requests.PreparedRequest()
+        try:
+            prepared.prepare_url(self.base_url, None)
+        except requests.RequestException:
+            self.extensible = False
+        else:
+            self.extensible = prepared.url == self.base_url
+
+    @functools.cached_property
+    def netrc_auth(self) -> tuple[str, str] | None:
+        # Read once per host rather than on every call, as requests does
+        return requests.utils.get_netrc_auth(self.base_url)
+
+    def get_required_headers(self, service: apiron.Service, endpoint: apiron.Endpoint) -> dict[str, Any]:
+        """
+        The same headers as :func:`_get_required_headers`, reading the service's dictionary of headers on every call
+        so that changes to it apply, and computing only those that may change from call to call
+        """
+        service_headers = self.service_headers
+        if service_headers is None:
+            service_headers = service.required_headers
+        endpoint_headers = self.endpoint_headers
+        if endpoint_headers is None:
+            endpoint_headers = endpoint.required_headers
+        return {**service_headers, **endpoint_headers}
+
+    def prepare(
+        self,
+        session: requests.Session,
+        service: apiron.Service,
+        endpoint: apiron.Endpoint,
+        method: str,
+        path: str,
+        params: dict[str, Any],
+        data: Any | None,
+        files: dict[str, Any] | None,
+        json: Any | None,
+        headers: dict[str, Any] | None,
+    ) -> requests.PreparedRequest | None:
+        """
+        Prepare a request the way :meth:`requests.Session.prepare_request` would,
+        for a session that :func:`_can_prepare_directly`
+
+        :return:
+            The prepared request, or ``None`` if the request needs :meth:`requests.Session.prepare_request` after all
+        """
+        relative_path = path.lstrip("/")
+        if not self.extensible or not _is_plain_path(relative_path) or "/." in f"/{relative_path}":
+            return None
+        if session.trust_env and self.netrc_auth:
+            return None
+
+        url = self.base_url + relative_path
+        query = _encode_params(params) if params else ""
+        if query:
+            url = f"{url}?{query}"
+
+        merged_headers = structures.CaseInsensitiveDict(session.headers)
+        merged_headers.update(headers or {})
+        merged_headers.update(self.get_required_headers(service, endpoint))
+
+        prepared = requests.PreparedRequest()
+        prepared.prepare_method(method)
+        prepared.url = url
+        prepared.prepare_headers({name: value for name, value in merged_headers.items() if value is not None})
+        # An empty jar, as prepare_cookies would leave for a request without cookies
+        prepared._cookies = requests.cookies.RequestsCookieJar()  # type: ignore[attr-defined]
+        prepared.prepare_body(data, files, json)
+        return prepared
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_request_template(service: apiron.Service, endpoint: apiron.Endpoint, host: str) -> _RequestTemplate:
+    return _RequestTemplate(service, endpoint, host)
+
+
 def _build_request_object(
     session: requests.Session,
     service: apiron.Service,
     endpoint: apiron.Endpoint,
+    host: str | None = None,
+    /,
     method: str | None = None,
     params: dict[str, Any] | None = None,
     data: dict[str, Any] | None = None,
-    files: dict[str, str] | None = None,
+    files: dict[str, Any] | None = None,
     json: dict[str, Any] | None = None,
     headers: dict[str, Any] | None = None,
     cookies: dict[str, Any] | None = None,
     auth: Any | None = None,
+    compression_spec: compression.Compression | None = None,
     **kwargs,
 ):
-    host = _choose_host(service=service)
+    # The host is positional-only so that a path placeholder named "host" can still be passed through kwargs
+    host = host or _choose_host(service=service)
 
     path = endpoint.get_formatted_path(**kwargs)
 
     merged_params = endpoint.get_merged_params(params)
 
+    method = method or endpoint.default_method
+
+    # Requests with no cookies or credentials to merge skip requests.Request and Session.prepare_request
+    template = _get_request_template(service, endpoint, host)
+    if not cookies and not auth and _can_prepare_directly(session):
+        prepared = template.prepare(session, service, endpoint, method, path, merged_params, data, files, json, headers)
+        if prepared is not None:
+            return _compress_request_body(prepared, compression_spec)
+
     headers = headers or {}
-    headers.update(_get_required_headers(service, endpoint))
+    headers.update(template.get_required_headers(service, endpoint))
 
     request = requests.Request(
-        method=method or endpoint.default_method,
+        method=method,
         url=_build_url(host, path),
         params=merged_params,
         data=data,
@@ -130,19 +456,380 @@ def _build_request_object(
         auth=auth,
     )
 
-    return session.prepare_request(request)
+    return _compress_request_body(session.prepare_request(request), compression_spec)
+
+
+def _get_request_observers(service: apiron.Service) -> list[Any]:
+    """
+    The objects on ``service`` that want to know when each request starts and ends
+    """
+    return [observer for observer in (service.load_balancer, service.circuit_breaker) if observer]
+
+
+def _send_request(
+    session: requests.Session,
+    service: apiron.Service,
+    host: str,
+    request: requests.PreparedRequest,
+    retry_spec: retry.Retry | None = None,
+    timer: instrumentation.CallTimer | None = None,
+    rate_limiters: tuple[ratelimit.RateLimiter, ...] = (),
+    concurrency_limiter: concurrency.ConcurrencyLimiter | None = None,
+    **send_kwargs,
+) -> requests.Response:
+    """
+    Sends a prepared request to ``host``, reporting how it went to the service's load balancer and circuit breaker,
+    and timing it with the call's ``timer`` if anything is subscribed to timing events.
+    The ``retry_spec`` is made available to the adapter mounted by :func:`_adapt_session_for_retry_spec`.
+    The request waits for a token from each of the ``rate_limiters`` before it is sent,
+    and then for a slot from the ``concurrency_limiter``, which it holds until the response's headers arrive.
+    """
+    if retry_spec is not None:
+        token = _RETRY_SPEC.set(retry_spec)
+        try:
+            return _send_request(
+                session,
+                service,
+                host,
+                request,
+                timer=timer,
+                rate_limiters=rate_limiters,
+                concurrency_limiter=concurrency_limiter,
+                **send_kwargs,
+            )
+        finally:
+            _RETRY_SPEC.reset(token)
+
+    if rate_limiters:
+        service_name = getattr(service, "service_name", str(service))
+        waited = sum(limiter.acquire(service_name) for limiter in rate_limiters)
+        if timer is not None and waited:
+            timer.emit("throttle", waited, host=host)
+        response = _send_request(
+            session, service, host, request, timer=timer, concurrency_limiter=concurrency_limiter, **send_kwargs
+        )
+        for limiter in rate_limiters:
+            limiter.on_response(response.status_code, response.headers)
+        return response
+
+    if concurrency_limiter is not None:
+        waited = concurrency_limiter.acquire(getattr(service, "service_name", str(service)))
+        if timer is not None and waited:
+            timer.emit("throttle", waited, host=host)
+        start = time.perf_counter()
+        try:
+            response = _send_request(session, service, host, request, timer=timer, **send_kwargs)
+        except BaseException:
+            concurrency_limiter.release(time.perf_counter() - start, failed=True)
+            raise
+        concurrency_limiter.release(time.perf_counter() - start, failed=concurrency.is_failure(response.status_code))
+        return response
+
+    send = functools.partial(session.send, request, **send_kwargs)
+    if timer is not None:
+        send = functools.partial(timer.send, send, host, stream=send_kwargs.get("stream", False))
+
+    observers = _get_request_observers(service)
+    if not observers:
+        return send()
+
+    for observer in observers:
+        observer.on_request_start(host)
+    start = time.perf_counter()
+    try:
+        response = send()
+    except Exception:
+        for observer in observers:
+            observer.on_request_end(host, time.perf_counter() - start, failed=True)
+        raise
+    for observer in observers:
+        observer.on_request_end(host, time.perf_counter() - start, failed=response.status_code >= 500)
+    return response
 
 
-def _get_guaranteed_session(session: requests.Session | None) -> requests.Session:
-    if session:
-        return session
-    return requests.Session()
+def _get_hedge_executor() -> futures.ThreadPoolExecutor:
+    global _HEDGE_EXECUTOR
+
+    with _HEDGE_EXECUTOR_LOCK:
+        if _HEDGE_EXECUTOR is None:
+            _HEDGE_EXECUTOR = futures.ThreadPoolExecutor(
+                max_workers=DEFAULT_HEDGE_WORKERS, thread_name_prefix="apiron-hedge"
+            )
+        return _HEDGE_EXECUTOR
+
+
+def _close_losing_response(future: futures.Future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _record_response_latency(record_latency: Callable[[float], None]) -> Callable[[futures.Future], None]:
+    def record(future: futures.Future):
+        if future.exception() is None:
+            record_latency(future.result().elapsed.total_seconds())
+
+    return record
+
+
+def _send_hedged_request(
+    session: requests.Session,
+    service: apiron.Service,
+    host: str,
+    request: requests.PreparedRequest,
+    prepare_request: Callable[[str], requests.PreparedRequest],
+    hedge_delay: float,
+    logger: logging.Logger,
+    record_latency: Callable[[float], None],
+    **send_kwargs,
+) -> requests.Response:
+    """
+    Sends a request to ``host`` and, if no response has arrived ``hedge_delay`` seconds after it was sent,
+    sends an identical request to another host.
+    The first response to arrive is returned and the other is closed when it completes.
+    The latency of the request to ``host`` is passed to ``record_latency`` whether or not it wins,
+    so that a percentile hedge delay reflects how the host actually responds.
+    """
+    executor = _get_hedge_executor()
+    sent_at: list[float] = []
+    sending = threading.Event()
+
+    def send_primary() -> requests.Response:
+        # The hedge delay counts from here rather than from submission, so time spent queued for a worker
+        # doesn't cause hedges
+        sent_at.append(time.monotonic())
+        sending.set()
+        return _send_request(session, service, host, request, **send_kwargs)
+
+    # Requests run in a copy of this context so that a circuit breaker probe claimed for them goes with them
+    primary = executor.submit(contextvars.copy_context().run, send_primary)
+    primary.add_done_callback(_record_response_latency(record_latency))
+
+    sending.wait()
+    done, _ = futures.wait([primary], timeout=max(sent_at[0] + hedge_delay - time.monotonic(), 0))
+    hedge_host = _choose_host(service, {host}) if not done else host
+    if hedge_host == host:
+        return primary.result()
+
+    hedge_request = prepare_request(hedge_host)
+    logger.info("%s %s (hedging after %.3fs)", request.method, hedge_request.url, hedge_delay)
+    hedge = executor.submit(
+        contextvars.copy_context().run,
+        functools.partial(_send_request, session, service, hedge_host, hedge_request, **send_kwargs),
+    )
+
+    pending = {primary, hedge}
+    exceptions: list[BaseException] = []
+    while pending:
+        done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+        for future in done:
+            exception = future.exception()
+            if exception is None:
+                for loser in pending:
+                    loser.add_done_callback(_close_losing_response)
+                return future.result()
+            exceptions.append(exception)
+
+    raise exceptions[0]
 
 
 def _get_retry_spec(endpoint: apiron.Endpoint, retry_spec: retry.Retry | None = None) -> retry.Retry:
     return retry_spec or endpoint.retry_spec or DEFAULT_RETRY
 
 
+@functools.lru_cache(maxsize=256)
+def _get_rate_limited_retry_spec(retry_spec: retry.Retry) -> retry.Retry:
+    """
+    ``retry_spec`` without retries of the responses whose ``Retry-After`` header pauses a rate limiter.
+    urllib3 would otherwise retry them itself and raise once retries run out,
+    so the rate limiter would never see the header and other calls would carry on at the same rate.
+    """
+    return retry_spec.new(
+        status_forcelist=set(retry_spec.status_forcelist or ()) - ratelimit.RETRY_AFTER_STATUSES,
+        respect_retry_after_header=False,
+    )
+
+
+def _get_failover_spec(endpoint: apiron.Endpoint, failover_spec: Failover | None = None) -> Failover | None:
+    return failover_spec or endpoint.failover_spec
+
+
+def _should_fail_over(
+    failover_spec: Failover,
+    method: str,
+    attempt: int,
+    deadline: float | None,
+    exception: Exception | None = None,
+    status_code: int | None = None,
+    connect_timeout_errors: tuple[type[Exception], ...] = (requests.ConnectTimeout,),
+    failover_errors: tuple[type[Exception], ...] = (
+        requests.ConnectionError,
+        requests.Timeout,
+        requests.exceptions.RetryError,
+    ),
+) -> bool:
+    """
+    Whether a failed attempt should be retried on another host.
+    A connection that timed out never reached the host, so it can be retried for any method;
+    other failures are only retried for idempotent methods.
+    The exception types default to those raised by :mod:`requests`.
+    """
+    if attempt >= failover_spec.attempts:
+        return False
+    if deadline is not None and time.monotonic() >= deadline:
+        return False
+
+    if isinstance(exception, connect_timeout_errors):
+        return True
+
+    if method.upper() not in retry.Retry.DEFAULT_ALLOWED_METHODS:
+        return False
+
+    if exception is not None:
+        return isinstance(exception, failover_errors)
+    return status_code in failover_spec.status_codes
+
+
+def _get_failover_backoff(failover_spec: Failover, attempt: int, deadline: float | None) -> float:
+    # Exponential backoff with full jitter, without sleeping past the deadline
+    backoff = random.uniform(0, min(failover_spec.max_backoff, failover_spec.backoff_factor * 2 ** (attempt - 1)))
+    if deadline is not None:
+        backoff = min(backoff, max(deadline - time.monotonic(), 0))
+    return backoff
+
+
+def _wait_to_fail_over(failover_spec: Failover, attempt: int, deadline: float | None):
+    time.sleep(_get_failover_backoff(failover_spec, attempt, deadline))
+
+
+def _get_cache_key(
+    service: apiron.Service, endpoint: apiron.Endpoint, method: str, params: dict[str, Any] | None, **kwargs
+) -> str:
+    """
+    Identifies a call to ``endpoint`` by its method, path and merged parameters, independently of the host it is sent to
+    """
+    path = endpoint.get_formatted_path(**kwargs)
+    query = parse.urlencode(sorted(endpoint.get_merged_params(params).items()), doseq=True)
+    name = getattr(service, "__qualname__", None) or type(service).__qualname__
+    return f"{method.upper()} {service.__module__}.{name} {path}?{query}"
+
+
+def _get_coalescing_option_key(value: Any) -> Hashable:
+    if isinstance(value, retry.Retry):
+        return pool._retry_spec_key(value)
+    if isinstance(value, pool.SessionPool):
+        return id(value)
+    return pool._freeze(value)
+
+
+def _get_coalescing_key(
+    service: apiron.Service,
+    endpoint: apiron.Endpoint,
+    method: str,
+    session: Any,
+    params: dict[str, Any] | None,
+    headers: dict[str, Any] | None,
+    options: dict[str, Any],
+    /,
+    **kwargs,
+) -> tuple:
+    """
+    Identifies calls that would send identical requests and return identical results, and can therefore share one.
+    ``options`` are the call's other arguments that affect how the request is sent or the result is returned,
+    such as its timeout, retries, or encoding.
+    Calls with different sessions are never shared, since sessions can carry their own cookies and authentication.
+    """
+    return (
+        _get_cache_key(service, endpoint, method, params, **kwargs),
+        endpoint,
+        id(session) if session else None,
+        tuple(sorted((name.lower(), str(value)) for name, value in (headers or {}).items())),
+        tuple(sorted((name, _get_coalescing_option_key(value)) for name, value in options.items())),
+    )
+
+
+def _should_coalesce(endpoint: apiron.Endpoint, method: str, coalesce: bool | None, **request_kwargs) -> bool:
+    """
+    Whether a call may share an identical in-flight call's result.
+    Only idempotent calls without a body are shared, and never for streaming endpoints.
+    """
+    if coalesce is None:
+        coalesce = getattr(endpoint, "coalesce", False)
+    return (
+        coalesce
+        and method.upper() in retry.Retry.DEFAULT_ALLOWED_METHODS
+        and not getattr(endpoint, "streaming", False)
+        and not any(request_kwargs.values())
+    )
+
+
+def _get_cache_request_headers(
+    session: requests.Session | httpx.AsyncClient | None,
+    adapted_session: requests.Session | httpx.AsyncClient,
+    service: apiron.Service,
+    endpoint: apiron.Endpoint,
+    headers: dict[str, Any] | None,
+    cookies: dict[str, Any] | None,
+    auth: Any | None,
+) -> structures.CaseInsensitiveDict | None:
+    """
+    The headers a call will send, for matching cached responses against their ``Vary`` header.
+
+    Responses to calls that carry credentials may be specific to one user,
+    so those calls return ``None`` and are neither served from nor stored in the cache.
+    """
+    if auth or cookies or service.auth or (session is not None and (session.auth or session.cookies)):
+        return None
+
+    request_headers = structures.CaseInsensitiveDict(adapted_session.headers)
+    request_headers.update(headers or {})
+    request_headers.update(_get_required_headers(service, endpoint))
+    if "Authorization" in request_headers or "Cookie" in request_headers:
+        return None
+    return request_headers
+
+
+def _update_cache(
+    response_cache: cache.ResponseCache,
+    key: str,
+    cached_response: cache.CachedResponse | None,
+    response: Any,
+    request_headers: structures.CaseInsensitiveDict,
+) -> cache.CachedResponse | None:
+    """
+    Stores a cacheable response, which may come from :mod:`requests` or :mod:`httpx`
+
+    :return:
+        The cached response to serve again when the server says it has not changed, otherwise ``None``
+    """
+    if response.status_code == 304 and cached_response is not None:
+        expires_at = cache.get_expiry(response, response_cache.default_ttl)
+        merged_headers = structures.CaseInsensitiveDict({**cached_response.headers, **response.headers})
+        vary = cache.get_vary(merged_headers, request_headers)
+        revalidated = cache.CachedResponse(
+            status_code=cached_response.status_code,
+            headers=dict(merged_headers),
+            content=cached_response.content,
+            url=cached_response.url,
+            encoding=cached_response.encoding,
+            expires_at=expires_at or 0,
+            vary=vary,
+        )
+        if expires_at is None or vary is None:
+            response_cache.delete(key)
+        else:
+            response_cache.set(key, revalidated)
+        return revalidated
+
+    if response.status_code == 200:
+        expires_at = cache.get_expiry(response, response_cache.default_ttl)
+        vary = cache.get_vary(response.headers, request_headers)
+        # A response that is already stale is only worth keeping if it can be revalidated
+        if expires_at is not None and vary is not None and (expires_at > time.time() or "ETag" in response.headers):
+            response_cache.set(key, cache.CachedResponse.from_response(response, expires_at, vary))
+
+    return None
+
+
 def _get_timeout_spec(endpoint: apiron.Endpoint, timeout_spec: Timeout | None = None) -> Timeout:
     return timeout_spec or endpoint.timeout_spec or DEFAULT_TIMEOUT
 
@@ -154,17 +841,23 @@ def call(
     session: requests.Session | None = None,
     params: dict[str, Any] | None = None,
     data: dict[str, Any] | None = None,
-    files: dict[str, str] | None = None,
+    files: dict[str, Any] | None = None,
     json: dict[str, Any] | None = None,
     headers: dict[str, Any] | None = None,
     cookies: dict[str, Any] | None = None,
     auth: Any | None = None,
+    session_pool: pool.SessionPool | None = None,
+    mount_adapter: bool = True,
     encoding: str | None = None,
     retry_spec: retry.Retry | None = None,
     timeout_spec: Timeout | None = None,
+    failover_spec: Failover | None = None,
     logger: logging.Logger | None = None,
     allow_redirects: bool = True,
     return_raw_response_object: bool | None = None,
+    coalesce: bool | None = None,
+    chunk_size: int | None = None,
+    compression_spec: compression.Compression | None = None,
     **kwargs,
 ):
     """
@@ -176,7 +869,8 @@ def call(
         The HTTP method to use for the call
     :param requests.Session session:
         (optional)
-        An existing session, useful for making many calls in a single session
+        An existing session, useful for making many calls in a single session.
+        When omitted, a long-lived session for ``service`` is taken from ``session_pool``.
         (default ``None``)
     :param dict params:
         (optional)
@@ -185,11 +879,13 @@ def call(
     :param dict data:
         (optional)
         ``POST`` data to send to the endpoint.
-        A :class:`dict` will be form-encoded, while a :class:`str` will be sent raw
+        A :class:`dict` will be form-encoded, while a :class:`str` will be sent raw.
+        A generator, an open file, or an :class:`apiron.upload.MappedFile` is streamed as it is sent.
         (default ``None``)
     :param dict files:
         (optional)
         Dictionary of ``'filename': file-like-objects`` for multipart encoding upload.
+        The files are streamed with an :class:`apiron.upload.MultipartEncoder` rather than read into memory.
         (default ``None``)
     :param dict json:
         (optional)
@@ -203,6 +899,16 @@ def call(
         (default ``None``)
     :param auth:
         An object suitable for the :class:`requests.Request` object's ``auth`` argument
+    :param SessionPool session_pool:
+        (optional)
+        The pool to take a session from when no ``session`` is supplied.
+        (default :data:`apiron.pool.DEFAULT_SESSION_POOL`)
+    :param bool mount_adapter:
+        (optional)
+        Whether to mount an adapter for the retry behavior on a supplied ``session``.
+        Pass ``False`` to leave adapters you have mounted on the session yourself alone,
+        in which case ``retry_spec`` has no effect.
+        (default ``True``)
     :param str encoding:
         The codec to use when decoding the response.
         Default behavior is to have ``requests`` guess the codec.
@@ -215,6 +921,10 @@ def call(
         (optional)
         An override of the timeout behavior for this call.
         (default ``None``)
+    :param Failover failover_spec:
+        (optional)
+        An override of the behavior for retrying this call on a different host.
+        (default ``None``)
     :param logging.Logger logger:
         (optional)
         An existing logger for logging from the proper caller for better correlation
@@ -225,6 +935,18 @@ def call(
     :param bool return_raw_response_object:
         Whether to return a :class:`requests.Response` object or call :func:`format_response` on it first.
         (Default ``False``)
+    :param bool coalesce:
+        Whether to share the result of an identical call that is already in flight instead of sending another request.
+        Every call sharing a request receives the same result object, so treat it as read-only.
+        (Default is the endpoint's ``coalesce`` setting)
+    :param int chunk_size:
+        (optional)
+        For streaming endpoints, an override of the number of bytes to read from the response at a time.
+        (Default is the endpoint's ``chunk_size`` setting)
+    :param Compression compression_spec:
+        (optional)
+        An override of how to compress the ``data`` or ``json`` body of this call.
+        (default ``None``)
     :param ``**kwargs``:
         Arguments to be formatted into the ``endpoint`` argument's ``path`` attribute
     :return:
@@ -234,57 +956,272 @@ def call(
         if retry threshold exceeded due to bad HTTP codes (default 500 range)
     :raises requests.ConnectionError:
         if retry threshold exceeded due to connection or request timeouts
+    :raises apiron.exceptions.CircuitOpenException:
+        if the service's circuit breaker is open or has ejected every host
     """
     logger = logger or LOGGER
 
-    managing_session = not session
-    guaranteed_session = _get_guaranteed_session(session)
+    method = method or endpoint.default_method
 
-    retry_spec_to_use = _get_retry_spec(endpoint, retry_spec)
+    if chunk_size is not None and not getattr(endpoint, "streaming", False):
+        raise ValueError(f"chunk_size only applies to streaming endpoints, not {endpoint!r}")
 
-    adapted_session = _adapt_session(guaranteed_session, adapters.HTTPAdapter(max_retries=retry_spec_to_use))
+    if _should_coalesce(endpoint, method, coalesce, data=data, files=files, json=json, cookies=cookies, auth=auth):
+        options: dict[str, Any] = {
+            "session_pool": session_pool,
+            "mount_adapter": mount_adapter,
+            "encoding": encoding,
+            "retry_spec": retry_spec,
+            "timeout_spec": timeout_spec,
+            "failover_spec": failover_spec,
+            "allow_redirects": allow_redirects,
+            "return_raw_response_object": return_raw_response_object,
+            "compression_spec": compression_spec,
+        }
+        coalescing_key = _get_coalescing_key(service, endpoint, method, session, params, headers, options, **kwargs)
+        return _SINGLE_FLIGHT.do(
+            coalescing_key,
+            functools.partial(
+                call,
+                service,
+                endpoint,
+                method=method,
+                session=session,
+                params=params,
+                headers=headers,
+                logger=logger,
+                coalesce=False,
+                **options,
+                **kwargs,
+            ),
+        )
 
-    method = method or endpoint.default_method
+    timer = instrumentation.start_call(service, endpoint, method)
+    try:
+        retry_spec_to_use = _get_retry_spec(endpoint, retry_spec)
+        rate_limiters = _get_rate_limiters(service, endpoint)
+        if rate_limiters:
+            retry_spec_to_use = _get_rate_limited_retry_spec(retry_spec_to_use)
 
-    auth = auth or getattr(session, "auth", None) or service.auth
+        if session:
+            adapted_session = _adapt_session_for_retry_spec(session, retry_spec_to_use) if mount_adapter else session
+        else:
+            adapted_session = (session_pool or pool.DEFAULT_SESSION_POOL).get_session(service, retry_spec_to_use)
 
-    request = _build_request_object(
-        adapted_session,
-        service,
-        endpoint,
-        method=method,
-        params=params,
-        data=data,
-        files=files,
-        json=json,
-        headers=headers,
-        cookies=cookies,
-        auth=auth,
-        **kwargs,
-    )
+        headers = _with_accept_encoding(service, endpoint, headers)
 
-    logger.info("%s %s", method, request.url)
+        # The cache is consulted before a host is chosen, so a fresh response costs no network traffic at all
+        response_cache = (
+            endpoint.cache if method.upper() == "GET" and not getattr(endpoint, "streaming", False) else None
+        )
+        cached_response = None
+        cache_request_headers = None
+        if response_cache is not None:
+            cache_request_headers = _get_cache_request_headers(
+                session, adapted_session, service, endpoint, headers, cookies, auth
+            )
+        if response_cache is not None and cache_request_headers is not None:
+            cache_key = _get_cache_key(service, endpoint, method, params, **kwargs)
+            cached_response = response_cache.get(cache_key)
+            if cached_response is not None and not cached_response.matches(cache_request_headers):
+                cached_response = None
+            if cached_response is not None:
+                if cached_response.is_fresh():
+                    logger.info("%s %s (cached)", method, cached_response.url)
+                    response = cached_response.to_response()
+                    if timer is None:
+                        return _format_response(endpoint, response, encoding, return_raw_response_object)
+                    return timer.finish(
+                        functools.partial(_format_response, endpoint, response, encoding, return_raw_response_object),
+                        None,
+                        response.status_code,
+                    )
+                if cached_response.etag:
+                    headers = {**(headers or {}), "If-None-Match": cached_response.etag}
 
-    timeout_spec_to_use = _get_timeout_spec(endpoint, timeout_spec)
+        auth = auth or getattr(session, "auth", None) or service.auth
 
-    response = adapted_session.send(
-        request,
-        timeout=(timeout_spec_to_use.connection_timeout, timeout_spec_to_use.read_timeout),
-        stream=getattr(endpoint, "streaming", False),
-        allow_redirects=allow_redirects,
-        proxies=adapted_session.proxies or service.proxies,
-    )
+        timeout_spec_to_use = _get_timeout_spec(endpoint, timeout_spec)
+        failover_spec_to_use = _get_failover_spec(endpoint, failover_spec)
+
+        # Files are read as the request is sent rather than encoded in memory first
+        data, files = upload.encode_files(data, files)
+        if isinstance(data, upload.StreamingBody):
+            headers = {**data.headers, **(headers or {})}
+        # A body that can only be read once, like a generator or an open file, is never sent to a second host
+        if not upload.is_replayable(data):
+            failover_spec_to_use = None
+
+        attempts = failover_spec_to_use.attempts if failover_spec_to_use else 1
+        deadline = None
+        if failover_spec_to_use and failover_spec_to_use.deadline is not None:
+            deadline = time.monotonic() + failover_spec_to_use.deadline
+        tried_hosts: set[str] = set()
+
+        prepare_request = functools.partial(
+            _build_request_object,
+            adapted_session,
+            service,
+            endpoint,
+            method=method,
+            params=params,
+            data=data,
+            files=files,
+            json=json,
+            headers=headers,
+            cookies=cookies,
+            auth=auth,
+            compression_spec=_get_compression_spec(endpoint, compression_spec),
+            **kwargs,
+        )
+        send_kwargs: dict[str, Any] = {
+            "timeout": (timeout_spec_to_use.connection_timeout, timeout_spec_to_use.read_timeout),
+            "stream": getattr(endpoint, "streaming", False),
+            "allow_redirects": allow_redirects,
+            "proxies": adapted_session.proxies or service.proxies,
+            "retry_spec": retry_spec_to_use,
+            "timer": timer,
+            "rate_limiters": rate_limiters,
+            "concurrency_limiter": service.concurrency_limiter,
+        }
+        hedge_delay = None
+        # Hedged requests are sent at the same time, so they can't share a body that is read as it is sent
+        if method.upper() in retry.Retry.DEFAULT_ALLOWED_METHODS and not upload.is_streamed(data):
+            hedge_delay = endpoint.get_hedge_delay()
+
+        for attempt in range(1, attempts + 1):
+            if timer is not None:
+                timer.attempt = attempt
+                timer.start_lap()
+            host = _choose_host(service, tried_hosts)
+            tried_hosts.add(host)
+            if timer is not None:
+                timer.lap("resolve", host=host)
+
+            request = prepare_request(host)
+            if timer is not None:
+                timer.lap("prepare", host=host)
+
+            logger.info("%s %s", method, request.url)
+
+            try:
+                if hedge_delay is None:
+                    response = _send_request(adapted_session, service, host, request, **send_kwargs)
+                    endpoint.record_latency(response.elapsed.total_seconds())
+                else:
+                    response = _send_hedged_request(
+                        adapted_session,
+                        service,
+                        host,
+                        request,
+                        prepare_request,
+                        hedge_delay,
+                        logger,
+                        endpoint.record_latency,
+                        **send_kwargs,
+                    )
+            except requests.RequestException as exception:
+                if failover_spec_to_use is None or not _should_fail_over(
+                    failover_spec_to_use, method, attempt, deadline, exception=exception
+                ):
+                    raise
+                logger.info("%s %s failed, trying another host: %s", method, request.url, exception)
+                _wait_to_fail_over(failover_spec_to_use, attempt, deadline)
+                continue
 
-    logger.info(
-        "%d %s%s",
-        response.status_code,
-        response.url,
-        f" ({len(response.history)} redirect(s))" if response.history else "",
+            logger.info(
+                "%d %s%s",
+                response.status_code,
+                response.url,
+                f" ({len(response.history)} redirect(s))" if response.history else "",
+            )
+
+            if failover_spec_to_use is None or not _should_fail_over(
+                failover_spec_to_use, method, attempt, deadline, status_code=response.status_code
+            ):
+                break
+
+            response.close()
+            _wait_to_fail_over(failover_spec_to_use, attempt, deadline)
+
+        if response_cache is not None and cache_request_headers is not None:
+            revalidated = _update_cache(response_cache, cache_key, cached_response, response, cache_request_headers)
+            if revalidated is not None:
+                response = revalidated.to_response(response.request)
+
+        # Streaming endpoints are given the options for this call, like its chunk size or a way to resume the stream
+        format_kwargs: dict[str, Any] = {}
+        if chunk_size is not None:
+            format_kwargs["chunk_size"] = chunk_size
+        if getattr(endpoint, "reconnect", False):
+            format_kwargs["resume"] = functools.partial(
+                _resume,
+                service,
+                endpoint,
+                headers,
+                method=method,
+                session=session,
+                params=params,
+                data=data,
+                files=files,
+                json=json,
+                cookies=cookies,
+                auth=auth,
+                session_pool=session_pool,
+                mount_adapter=mount_adapter,
+                encoding=encoding,
+                retry_spec=retry_spec,
+                timeout_spec=timeout_spec,
+                failover_spec=failover_spec,
+                logger=logger,
+                allow_redirects=allow_redirects,
+                compression_spec=compression_spec,
+                **kwargs,
+            )
+
+        if timer is None:
+            return _format_response(endpoint, response, encoding, return_raw_response_object, **format_kwargs)
+        return timer.finish(
+            functools.partial(
+                _format_response, endpoint, response, encoding, return_raw_response_object, **format_kwargs
+            ),
+            host,
+            response.status_code,
+        )
+    except Exception as exception:
+        if timer is not None:
+            timer.fail(exception)
+        raise
+
+
+def _resume(
+    service: apiron.Service,
+    endpoint: apiron.Endpoint,
+    headers: dict[str, Any] | None,
+    resume_headers: dict[str, str],
+    **call_kwargs,
+) -> requests.Response:
+    """
+    Call an endpoint again to resume a stream that ended, like an event stream, adding the headers it resumes from.
+    The raw response is returned unread.
+    """
+    return call(
+        service,
+        endpoint,
+        headers={**(headers or {}), **resume_headers},
+        return_raw_response_object=True,
+        coalesce=False,
+        **call_kwargs,
     )
 
-    if managing_session:
-        adapted_session.close()
 
+def _format_response(
+    endpoint: apiron.Endpoint,
+    response: requests.Response,
+    encoding: str | None,
+    return_raw_response_object: bool | None,
+    **format_kwargs,
+):
     response.raise_for_status()
 
     if encoding:
@@ -297,4 +1234,121 @@ def call(
     else:
         return_raw_response = return_raw_response_object
 
-    return response if return_raw_response else endpoint.format_response(response)
+    return response if return_raw_response else endpoint.format_response(response, **format_kwargs)
+
+
+def call_many(
+    service: apiron.Service,
+    endpoint: apiron.Endpoint,
+    arguments: Iterable[dict[str, Any]],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_per_host: int | None = None,
+    ordered: bool = True,
+    session: requests.Session | None = None,
+    session_pool: pool.SessionPool | None = None,
+    retry_spec: retry.Retry | None = None,
+    timeout_spec: Timeout | None = None,
+    logger: logging.Logger | None = None,
+) -> Iterator[CallResult]:
+    """
+    Call an endpoint once for each set of arguments, several calls at a time
+
+    :param Service service:
+        The service that hosts the endpoint being called
+    :param Endpoint endpoint:
+        The endpoint being called
+    :param arguments:
+        An iterable of dictionaries, each holding the keyword arguments for one :func:`call`,
+        such as ``params`` or the arguments to be formatted into the endpoint's path
+    :param int max_workers:
+        (Default ``10``)
+        The number of calls to run at once
+    :param int max_per_host:
+        (optional)
+        The number of calls to run at once against any single host.
+        Cannot be combined with ``session``, whose connection pools are already configured.
+        (default ``None``)
+    :param bool ordered:
+        (Default ``True``)
+        Whether to produce results in the order of ``arguments`` or as the calls complete
+    :param requests.Session session:
+        (optional)
+        An existing session to share between the calls.
+        When omitted, a pooled session whose connection pool is sized for ``max_workers`` is taken from ``session_pool``.
+        (default ``None``)
+    :param SessionPool session_pool:
+        (optional)
+        The pool to take a session from when no ``session`` is supplied.
+        (default :data:`apiron.pool.DEFAULT_SESSION_POOL`)
+    :param urllib3.util.retry.Retry retry_spec:
+        (optional)
+        An override of the retry behavior for these calls.
+        (default ``None``)
+    :param Timeout timeout_spec:
+        (optional)
+        An override of the timeout behavior for these calls.
+        (default ``None``)
+    :param logging.Logger logger:
+        (optional)
+        An existing logger for logging from the proper caller for better correlation
+    :return:
+        A lazy iterator of ``CallResult(arguments, result, exception)`` tuples.
+        A call that raises a :class:`requests.RequestException` or :class:`apiron.exceptions.APIException`
+        has its exception collected instead of propagated.
+    :rtype:
+        Iterator[CallResult]
+    :raises ValueError:
+        if both ``session`` and ``max_per_host`` are supplied
+    """
+    if session and max_per_host is not None:
+        raise ValueError("max_per_host cannot be combined with session, whose connection pools are already configured")
+
+    pooled = not session
+    if pooled:
+        session = (session_pool or pool.DEFAULT_SESSION_POOL).get_session(
+            service,
+            _get_retry_spec(endpoint, retry_spec),
+            pool_maxsize=max_per_host or max_workers,
+            pool_block=max_per_host is not None,
+        )
+
+    def call_one(call_arguments: dict[str, Any]) -> CallResult:
+        call_kwargs: dict[str, Any] = {
+            "session": session,
+            "mount_adapter": not pooled,
+            "retry_spec": retry_spec,
+            "timeout_spec": timeout_spec,
+            "logger": logger,
+        }
+        call_kwargs.update(call_arguments)
+        try:
+            return CallResult(call_arguments, call(service, endpoint, **call_kwargs), None)
+        except (requests.RequestException, APIException) as exception:
+            return CallResult(call_arguments, None, exception)
+
+    arguments_iterator = iter(arguments)
+    executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+
+    # Only a bounded window of calls is submitted ahead of the consumer, so huge iterables are never materialized
+    pending = collections.deque(
+        executor.submit(call_one, call_arguments)
+        for call_arguments in itertools.islice(arguments_iterator, 2 * max_workers)
+    )
+
+    try:
+        while pending:
+            if ordered:
+                completed = [pending.popleft()]
+            else:
+                done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                completed = [future for future in pending if future in done]
+                for future in completed:
+                    pending.remove(future)
+
+            for call_arguments in itertools.islice(arguments_iterator, len(completed)):
+                pending.append(executor.submit(call_one, call_arguments))
+
+            for future in completed:
+                yield future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable, Hashable
+from concurrent import futures
+from typing import Any
+
+
+class SingleFlight:
+    """
+    Shares the work of identical concurrent calls between threads.
+
+    The first caller for a key runs the function,
+    and callers with the same key that arrive while it is running wait for and receive its result or exception.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, futures.Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """
+        Run ``function``, unless a call with ``key`` is already in flight, in which case share its outcome
+
+        :param key:
+            Identifies calls that are interchangeable
+        :param function:
+            The call to make, taking no arguments
+        :return:
+            The result of ``function`` or of the in-flight call
+        """
+        with self._lock:
+            in_flight = self._calls.get(key)
+            if in_flight is None:
+                future: futures.Future = futures.Future()
+                self._calls[key] = future
+
+        if in_flight is not None:
+            return in_flight.result()
+
+        try:
+            result = function()
+        except BaseException as exception:
+            self._forget(key)
+            future.set_exception(exception)
+            raise
+
+        self._forget(key)
+        future.set_result(result)
+        return result
+
+    def _forget(self, key: Hashable):
+        # Calls arriving after this point start a new flight rather than receiving a finished result
+        with self._lock:
+            del self._calls[key]
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    Shares the work of identical concurrent calls between tasks on an event loop.
+
+    The first caller for a key starts the coroutine as a task that every caller with the same key awaits.
+    Cancelling one of the callers doesn't cancel the shared task.
+    """
+
+    def __init__(self):
+        self._tasks: dict[tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task] = {}
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await ``function()``, unless a call with ``key`` is already in flight, in which case share its outcome
+
+        :param key:
+            Identifies calls that are interchangeable
+        :param function:
+            Creates the awaitable to run, taking no arguments
+        :return:
+            The result of ``function()`` or of the in-flight call
+        """
+        loop_key = (asyncio.get_running_loop(), key)
+
+        task = self._tasks.get(loop_key)
+        if task is None:
+            task = self._tasks[loop_key] = asyncio.ensure_future(function())
+            task.add_done_callback(lambda _: self._tasks.pop(loop_key, None))
+
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
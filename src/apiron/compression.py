@@ -0,0 +1,149 @@
+"""
+Content codings for compressed responses and request bodies.
+
+Responses are decompressed as they are read, including those of streaming endpoints,
+in any coding whose decoder is installed: ``gzip`` and ``deflate`` always,
+``br`` with `brotli <https://github.com/google/brotli>`_ (``pip install apiron[brotli]``),
+and ``zstd`` with `zstandard <https://github.com/indygreg/python-zstandard>`_ (``pip install apiron[zstd]``).
+A service or endpoint's ``accept_encoding`` chooses which of them to ask for,
+and a :class:`Compression` spec compresses the bodies of requests that are large enough to be worth it.
+"""
+
+from __future__ import annotations
+
+import collections
+import functools
+import gzip
+import zlib
+from collections.abc import Callable, Iterable
+
+from urllib3.response import HTTPResponse
+
+DEFAULT_MIN_SIZE = 1024
+
+#: The content codings apiron knows, most compact first
+ENCODINGS = ("zstd", "br", "gzip", "deflate")
+
+# Compression levels that favor speed, since requests are compressed while the caller waits
+_DEFAULT_LEVELS = {"gzip": 6, "deflate": 6, "br": 4, "zstd": 3}
+
+
+class Compression(
+    collections.namedtuple("Compression", ["encoding", "min_size", "level"], defaults=["gzip", DEFAULT_MIN_SIZE, None])
+):
+    """
+    How to compress the bodies of requests to an endpoint
+
+    :param str encoding:
+        (Default ``'gzip'``)
+        The content coding to compress with: ``'gzip'``, ``'deflate'``, ``'br'``, or ``'zstd'``
+    :param int min_size:
+        (Default ``1024``)
+        The number of bytes a body must have to be compressed,
+        since compressing a smaller body saves little and can even make it larger
+    :param int level:
+        (optional)
+        The compression level, or ``None`` for a level of the coding that favors speed
+    """
+
+    __slots__ = ()
+
+
+def available_encodings() -> tuple[str, ...]:
+    """
+    The content codings that responses can be decompressed from with the installed packages
+
+    :return:
+        The names of the codings, most compact first
+    :rtype:
+        tuple
+    """
+    return tuple(encoding for encoding in ENCODINGS if encoding in HTTPResponse.CONTENT_DECODERS)
+
+
+def get_accept_encoding(encodings: str | Iterable[str]) -> str:
+    """
+    The ``Accept-Encoding`` header that asks for ``encodings``, leaving out any whose decoder isn't installed
+
+    :param encodings:
+        The content codings to accept, in order of preference, or ``'identity'`` for uncompressed responses only
+    :return:
+        The value of the header, which is ``'identity'`` when none of ``encodings`` can be decoded
+    :rtype:
+        str
+    :raises ValueError:
+        When one of ``encodings`` isn't a content coding that apiron knows
+    """
+    return _get_accept_encoding((encodings,) if isinstance(encodings, str) else tuple(encodings))
+
+
+@functools.cache
+def _get_accept_encoding(encodings: tuple[str, ...]) -> str:
+    unknown = [encoding for encoding in encodings if encoding not in ENCODINGS and encoding != "identity"]
+    if unknown:
+        raise ValueError(f"Unknown content codings {unknown}; choose from {list(ENCODINGS)} or 'identity'")
+    available = available_encodings()
+    return ", ".join(encoding for encoding in encodings if encoding in available) or "identity"
+
+
+def get_compressor(compression_spec: Compression) -> Callable[[bytes], bytes]:
+    """
+    :param Compression compression_spec:
+        How to compress request bodies
+    :return:
+        A function that compresses a body as ``compression_spec`` says
+    :rtype:
+        callable
+    :raises ValueError:
+        When the spec's ``encoding`` isn't a content coding that apiron can compress with
+    :raises ImportError:
+        When the package that compresses with the spec's ``encoding`` isn't installed
+    """
+    encoding = compression_spec.encoding
+    level = _DEFAULT_LEVELS.get(encoding) if compression_spec.level is None else compression_spec.level
+    if encoding == "gzip":
+        # A fixed modification time makes the same body compress to the same bytes every time
+        return functools.partial(gzip.compress, compresslevel=level, mtime=0)
+    if encoding == "deflate":
+        # HTTP's deflate coding is the zlib format, not a raw deflate stream
+        return functools.partial(zlib.compress, level=level)
+    if encoding == "br":
+        try:
+            import brotli
+        except ImportError:
+            try:
+                import brotlicffi as brotli
+            except ImportError as exc:
+                raise ImportError(
+                    "br compression requires brotli; install it with `pip install apiron[brotli]`"
+                ) from exc
+        return functools.partial(brotli.compress, quality=level)
+    if encoding == "zstd":
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise ImportError(
+                "zstd compression requires zstandard; install it with `pip install apiron[zstd]`"
+            ) from exc
+        return zstandard.ZstdCompressor(level=level).compress
+    raise ValueError(f"Can't compress request bodies with {encoding!r}; choose from {list(ENCODINGS)}")
+
+
+def compress(body: bytes, compression_spec: Compression) -> bytes | None:
+    """
+    Compress a request body as ``compression_spec`` says
+
+    :param bytes body:
+        The body
+    :param Compression compression_spec:
+        How to compress the body
+    :return:
+        The compressed body, or ``None`` when the body is too small to compress
+        or compressing it doesn't make it any smaller
+    :rtype:
+        bytes
+    """
+    if len(body) < compression_spec.min_size:
+        return None
+    compressed = get_compressor(compression_spec)(body)
+    return compressed if len(compressed) < len(body) else None
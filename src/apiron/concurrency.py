@@ -0,0 +1,374 @@
+"""
+Adaptive limits on the number of requests in flight to a service,
+so that calls back off as the service slows down and take up the slack as it recovers,
+without a limit tuned by hand for either.
+
+A :class:`ConcurrencyLimiter` on a service admits up to its current ``limit`` of requests at once.
+Any more wait their turn, in the order they arrive, for up to ``max_wait`` seconds,
+after which they are shed with :class:`apiron.exceptions.ConcurrencyLimitExceededException`.
+The limit follows the latency and errors of the requests that finish:
+:class:`AimdConcurrencyLimiter` grows it steadily and cuts it back on errors,
+and :class:`GradientConcurrencyLimiter` shrinks it as latency rises above the service's usual latency.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import functools
+import math
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from apiron.exceptions import ConcurrencyLimitExceededException
+
+
+def is_failure(status_code: int) -> bool:
+    """
+    :param int status_code:
+        The status of a response
+    :return:
+        Whether the response counts against the service's limit, like a request that raises an exception:
+        ``429 Too Many Requests`` or a ``5xx`` status
+    :rtype:
+        bool
+    """
+    return status_code >= 500 or status_code == 429
+
+
+class _Waiter:
+    __slots__ = ("granted", "wake")
+
+    def __init__(self, wake: Callable[[], Any]):
+        self.granted = False
+        self.wake = wake
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class ConcurrencyLimiter:
+    """
+    Limits the number of requests in flight to a service.
+
+    This class keeps the limit it starts with; its subclasses adapt the limit to how requests go in :meth:`update_limit`.
+    Declare an instance on a service as its ``concurrency_limiter``.
+    :func:`apiron.client.call` takes a slot for every request it sends, including those that fail over or hedge,
+    and gives it back with the request's latency and whether it failed once the response's headers arrive.
+    A request fails if it raises an exception or has a ``429`` or ``5xx`` status; see :func:`is_failure`.
+    Each service should declare its own instance, since the observations are specific to the service.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        max_wait: float | None = None,
+    ):
+        """
+        :param int initial_limit:
+            (optional)
+            The number of requests allowed in flight at once until the limit adapts.
+            (Default ``20``)
+        :param int min_limit:
+            (optional)
+            The lowest the limit can fall.
+            (Default ``1``)
+        :param int max_limit:
+            (optional)
+            The highest the limit can rise.
+            (Default ``200``)
+        :param float max_wait:
+            (optional)
+            The longest a request waits for a slot before failing, or ``0`` to fail straight away.
+            (Default ``None``, which waits as long as it takes)
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError(
+                f"limits must satisfy 1 <= min_limit <= initial_limit <= max_limit, "
+                f"not {min_limit}, {initial_limit}, {max_limit}"
+            )
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_wait = max_wait
+        self.in_flight = 0
+
+        # The limit is kept as a float so that it can move by fractions of a request
+        self._limit = float(initial_limit)
+        self._waiters: collections.deque[_Waiter] = collections.deque()
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        """
+        The number of requests currently allowed in flight at once
+        """
+        return int(self._limit)
+
+    def _admit(self, waiter: _Waiter | None = None) -> bool:
+        with self._lock:
+            if self.in_flight < self.limit and not self._waiters:
+                self.in_flight += 1
+                return True
+            if waiter is not None:
+                self._waiters.append(waiter)
+            return False
+
+    def _grant(self):
+        # Called with the lock held, to hand the free slots to the requests that have waited longest
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            self.in_flight += 1
+            waiter.wake()
+
+    def _withdraw(self, waiter: _Waiter) -> bool:
+        """
+        Stop waiting, returning whether the waiter was granted a slot in the meantime
+        """
+        with self._lock:
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+            return waiter.granted
+
+    def _shed(self, service_name: str):
+        raise ConcurrencyLimitExceededException(service_name, self.limit)
+
+    def acquire(self, service_name: str = "") -> float:
+        """
+        Wait for a slot, which must be given back with :meth:`release`
+
+        :param str service_name:
+            (optional)
+            The name of the service being called, for error messages
+        :return:
+            The number of seconds waited
+        :rtype:
+            float
+        :raises apiron.exceptions.ConcurrencyLimitExceededException:
+            When no slot is free within ``max_wait`` seconds
+        """
+        if self._admit():
+            return 0.0
+        if self.max_wait == 0:
+            self._shed(service_name)
+
+        start = time.perf_counter()
+        event = threading.Event()
+        waiter = _Waiter(event.set)
+        if not self._admit(waiter):
+            try:
+                event.wait(self.max_wait)
+            except BaseException:
+                if self._withdraw(waiter):
+                    self.release(None)
+                raise
+            if not self._withdraw(waiter):
+                self._shed(service_name)
+        return time.perf_counter() - start
+
+    async def acquire_async(self, service_name: str = "") -> float:
+        """
+        Wait for a slot without blocking the event loop, like :meth:`acquire`
+        """
+        if self._admit():
+            return 0.0
+        if self.max_wait == 0:
+            self._shed(service_name)
+
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Slots are given back from any thread, so waking the waiter is handed to its event loop
+        waiter = _Waiter(functools.partial(loop.call_soon_threadsafe, _resolve, future))
+        if not self._admit(waiter):
+            try:
+                await asyncio.wait_for(future, self.max_wait)
+            # Distinct from the built-in TimeoutError before Python 3.11
+            except asyncio.TimeoutError:  # noqa: UP041
+                pass
+            except BaseException:
+                # A cancelled call gives back any slot it was granted as it was cancelled
+                if self._withdraw(waiter):
+                    self.release(None)
+                raise
+            if not self._withdraw(waiter):
+                self._shed(service_name)
+        return time.perf_counter() - start
+
+    def release(self, elapsed: float | None, failed: bool = False):
+        """
+        Give back a slot taken by :meth:`acquire`, adapting the limit to how the request went
+
+        :param float elapsed:
+            The number of seconds the request took,
+            or ``None`` for a request that was cancelled and so says nothing about the service,
+            which leaves the limit as it is
+        :param bool failed:
+            Whether the request failed
+        """
+        with self._lock:
+            if elapsed is not None:
+                limit = self.update_limit(self._limit, elapsed, failed)
+                self._limit = min(max(limit, self.min_limit), self.max_limit)
+            self.in_flight -= 1
+            self._grant()
+
+    def update_limit(self, limit: float, elapsed: float, failed: bool) -> float:
+        """
+        Work out the new limit after a request finishes.
+        This is called with a lock held, so it can keep state of its own without locking it.
+
+        :param float limit:
+            The current limit
+        :param float elapsed:
+            The number of seconds the request took
+        :param bool failed:
+            Whether the request failed
+        :return:
+            The new limit, which is kept between ``min_limit`` and ``max_limit``
+        :rtype:
+            float
+        """
+        return limit
+
+    def _is_limited(self, limit: float) -> bool:
+        # A limit that isn't close to being used says nothing about whether it could be higher,
+        # so it only grows while at least half of it is in use, counting the request that just finished
+        return self.in_flight * 2 >= limit
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(limit={self.limit}, in_flight={self.in_flight}, max_wait={self.max_wait})"
+
+
+class AimdConcurrencyLimiter(ConcurrencyLimiter):
+    """
+    Adapts the limit with additive increase and multiplicative decrease, like TCP's congestion control.
+
+    The limit grows by one for each limit's worth of successful requests,
+    and is multiplied by ``backoff`` each time a request fails or takes longer than ``latency_threshold``.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        max_wait: float | None = None,
+        backoff: float = 0.9,
+        latency_threshold: float | None = None,
+    ):
+        """
+        :param float backoff:
+            (optional)
+            The factor to cut the limit by when a request fails, between ``0`` and ``1``.
+            (Default ``0.9``)
+        :param float latency_threshold:
+            (optional)
+            The number of seconds after which a successful request counts as a failure.
+            (Default ``None``, which counts only errors as failures)
+
+        See :class:`ConcurrencyLimiter` for the other parameters.
+        """
+        if not 0 < backoff < 1:
+            raise ValueError(f"backoff must be between 0 and 1, not {backoff}")
+        super().__init__(initial_limit, min_limit, max_limit, max_wait)
+        self.backoff = backoff
+        self.latency_threshold = latency_threshold
+
+    def update_limit(self, limit: float, elapsed: float, failed: bool) -> float:
+        if failed or (self.latency_threshold is not None and elapsed > self.latency_threshold):
+            return limit * self.backoff
+        if self._is_limited(limit):
+            return limit + 1 / limit
+        return limit
+
+
+class GradientConcurrencyLimiter(ConcurrencyLimiter):
+    """
+    Adapts the limit to the ratio of the service's usual latency to its recent latency, like TCP Vegas.
+
+    While requests are about as fast as usual, the limit grows by the square root of itself,
+    an allowance for requests queueing at the service.
+    As they slow down, which means more are queueing than the service can work through,
+    it shrinks in proportion, by up to half, and a request that fails counts as the largest slowdown.
+    Usual latency is the shortest latency of about the last ``long_window`` requests,
+    recent latency an average over about the last ``short_window``,
+    and recent latency up to ``tolerance`` times the usual latency counts as usual.
+    The limit moves towards its new value with each request that finishes,
+    reaching it over a limit's worth of requests, so that a single slow request doesn't cut it sharply.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        max_wait: float | None = None,
+        tolerance: float = 1.5,
+        short_window: int = 10,
+        long_window: int = 600,
+    ):
+        """
+        :param float tolerance:
+            (optional)
+            How many times the usual latency recent latency can reach before the limit shrinks, at least ``1``.
+            (Default ``1.5``)
+        :param int short_window:
+            (optional)
+            The number of requests that recent latency is averaged over.
+            (Default ``10``)
+        :param int long_window:
+            (optional)
+            The number of requests that usual latency is the shortest of.
+            (Default ``600``)
+
+        See :class:`ConcurrencyLimiter` for the other parameters.
+        """
+        if tolerance < 1:
+            raise ValueError(f"tolerance must be at least 1, not {tolerance}")
+        super().__init__(initial_limit, min_limit, max_limit, max_wait)
+        self.tolerance = tolerance
+        self.long_window = long_window
+        self.recent_latency: float | None = None
+        self.usual_latency: float | None = None
+
+        self._short_weight = 2 / (short_window + 1)
+        # The shortest latency so far of the window that will replace the usual latency,
+        # which lets the usual latency rise when the service gets slower for good
+        self._next_usual_latency = math.inf
+        self._window_requests = 0
+
+    def _observe(self, elapsed: float):
+        if self.recent_latency is None or self.usual_latency is None:
+            self.recent_latency = self.usual_latency = elapsed
+        else:
+            self.recent_latency += (elapsed - self.recent_latency) * self._short_weight
+            self.usual_latency = min(self.usual_latency, elapsed)
+
+        self._next_usual_latency = min(self._next_usual_latency, elapsed)
+        self._window_requests += 1
+        if self._window_requests >= self.long_window:
+            self.usual_latency = self._next_usual_latency
+            self._next_usual_latency = math.inf
+            self._window_requests = 0
+
+    def update_limit(self, limit: float, elapsed: float, failed: bool) -> float:
+        if failed:
+            gradient = 0.5
+        else:
+            self._observe(elapsed)
+            if not self._is_limited(limit):
+                return limit
+            gradient = 1.0
+            recent_latency, usual_latency = self.recent_latency, self.usual_latency
+            if recent_latency and usual_latency is not None:
+                gradient = max(0.5, min(1.0, self.tolerance * usual_latency / recent_latency))
+
+        new_limit = limit * gradient + math.sqrt(limit)
+        return limit + (new_limit - limit) / limit
@@ -0,0 +1,471 @@
+"""
+Decoders that turn the body of a JSON response into Python objects for :class:`apiron.JsonEndpoint`.
+
+Every decoder reads the raw bytes of the body, so it is never first decoded into a string as well.
+:class:`StdlibJsonDecoder` is the default; the faster :class:`OrjsonDecoder` and :class:`MsgspecDecoder`
+can be used when `orjson <https://github.com/ijl/orjson>`_ or `msgspec <https://jcristharif.com/msgspec/>`_
+is installed, either for a single endpoint through its ``decoder`` or for every endpoint through
+:data:`DEFAULT_JSON_DECODER`.
+
+Given a ``response_type``, decoders also validate the document and build instances of that type,
+such as dataclasses, :class:`typing.TypedDict` types, and msgspec ``Struct`` types, or lists of them.
+:class:`MsgspecDecoder` does so in the same pass as decoding; the others :func:`convert` the decoded document.
+"""
+
+from __future__ import annotations
+
+import collections
+import dataclasses
+import enum
+import functools
+import json
+import sys
+import types
+import typing
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from apiron.exceptions import ResponseValidationException
+
+_UNION_TYPES = (typing.Union, getattr(types, "UnionType", typing.Union))
+
+
+class JsonDecoder:
+    """
+    Decodes a JSON document into Python objects
+    """
+
+    def decode(self, content: bytes | str, preserve_order: bool = False, response_type: Any = None) -> Any:
+        """
+        :param content:
+            The JSON document, as UTF-8 bytes or as a string
+        :param bool preserve_order:
+            Whether objects become :class:`collections.OrderedDict` rather than :class:`dict`.
+            Ignored when there is a ``response_type``.
+        :param response_type:
+            (optional)
+            The type to validate the document against and build, like ``list[User]``
+        :return:
+            The decoded document
+        :raises ValueError:
+            When ``content`` isn't valid JSON
+        :raises apiron.exceptions.ResponseValidationException:
+            When the document doesn't match ``response_type``
+        """
+        raise NotImplementedError  # pragma: no cover
+
+
+class StdlibJsonDecoder(JsonDecoder):
+    """
+    Decodes JSON with the standard library's :mod:`json` module
+    """
+
+    def decode(self, content: bytes | str, preserve_order: bool = False, response_type: Any = None) -> Any:
+        if response_type is not None:
+            return convert(json.loads(content), response_type)
+        return json.loads(content, object_pairs_hook=collections.OrderedDict if preserve_order else None)
+
+
+class OrjsonDecoder(JsonDecoder):
+    """
+    Decodes JSON with `orjson <https://github.com/ijl/orjson>`_.
+    Documents whose order must be preserved are decoded by the standard library,
+    since orjson can't build :class:`collections.OrderedDict` objects.
+    """
+
+    def __init__(self):
+        try:
+            import orjson
+        except ImportError as exc:
+            raise ImportError("OrjsonDecoder requires orjson; install it with `pip install apiron[orjson]`") from exc
+        self._loads = orjson.loads
+
+    def decode(self, content: bytes | str, preserve_order: bool = False, response_type: Any = None) -> Any:
+        if response_type is not None:
+            return convert(self._loads(content), response_type)
+        if preserve_order:
+            return StdlibJsonDecoder().decode(content, preserve_order)
+        return self._loads(content)
+
+
+class MsgspecDecoder(JsonDecoder):
+    """
+    Decodes JSON with `msgspec <https://jcristharif.com/msgspec/>`_,
+    validating and building a ``response_type`` in the same pass.
+    Documents whose order must be preserved are decoded by the standard library,
+    since msgspec can't build :class:`collections.OrderedDict` objects.
+    """
+
+    def __init__(self):
+        try:
+            import msgspec
+        except ImportError as exc:
+            raise ImportError("MsgspecDecoder requires msgspec; install it with `pip install apiron[msgspec]`") from exc
+        self._msgspec = msgspec
+        self._decoders: dict[Any, Any] = {None: msgspec.json.Decoder()}
+
+    def _get_decoder(self, response_type: Any):
+        decoder = self._decoders.get(response_type)
+        if decoder is None:
+            decoder = self._decoders[response_type] = self._msgspec.json.Decoder(response_type)
+        return decoder
+
+    def decode(self, content: bytes | str, preserve_order: bool = False, response_type: Any = None) -> Any:
+        if preserve_order and response_type is None:
+            return StdlibJsonDecoder().decode(content, preserve_order)
+        try:
+            return self._get_decoder(response_type).decode(content)
+        except self._msgspec.ValidationError as exception:
+            raise _from_msgspec_error(exception) from exception
+        except self._msgspec.DecodeError as exception:
+            raise ValueError(str(exception)) from exception
+
+
+def _from_msgspec_error(exception: Exception) -> ResponseValidationException:
+    # msgspec reports errors like "Expected `int`, got `str` - at `$[0].id`"
+    problem, _, location = str(exception).partition(" - at `")
+    return ResponseValidationException(location.rstrip("`") or "$", problem)
+
+
+def convert(document: Any, response_type: Any) -> Any:
+    """
+    Validate a decoded JSON document against ``response_type`` and build instances of it.
+
+    Supports dataclasses, :class:`typing.TypedDict` types, msgspec ``Struct`` types, enums,
+    ``list``, ``tuple``, and ``dict`` of those, ``Optional`` and other unions, ``Literal``,
+    and the JSON scalar types ``str``, ``int``, ``float``, ``bool``, and ``None``.
+    Keys of a JSON object that aren't fields of the type are ignored.
+
+    :param document:
+        The decoded document
+    :param response_type:
+        The type to build, like ``list[User]``
+    :return:
+        The document as an instance of ``response_type``
+    :raises apiron.exceptions.ResponseValidationException:
+        When the document doesn't match ``response_type``
+    :raises TypeError:
+        When ``response_type`` isn't supported
+    """
+    try:
+        return _get_converter(response_type)(document)
+    except _Invalid as invalid:
+        raise ResponseValidationException("$" + "".join(reversed(invalid.path)), invalid.problem) from None
+
+
+class _Invalid(Exception):
+    """
+    Raised by converters, collecting where in the document the problem is as it propagates
+    so that locations are only built for invalid documents
+    """
+
+    def __init__(self, problem: str, path: list[str] | None = None):
+        super().__init__(problem)
+        self.problem = problem
+        self.path = path or []
+
+
+def _describe(response_type: Any) -> str:
+    return getattr(response_type, "__name__", None) or repr(response_type)
+
+
+def _mismatch(value: Any, response_type: Any) -> _Invalid:
+    return _Invalid(f"expected {_describe(response_type)}, got {type(value).__name__}")
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+@functools.cache
+def _get_converter(response_type: Any) -> Callable[[Any], Any]:
+    """
+    A function that validates a value against ``response_type`` and builds it,
+    compiled once per type so that documents aren't interpreted against the type on every call
+    """
+    if response_type is Any or response_type is object:
+        return _identity
+    if response_type is None or response_type is type(None):
+        return _get_none_converter()
+
+    origin = typing.get_origin(response_type)
+    arguments = typing.get_args(response_type)
+
+    if origin in _UNION_TYPES:
+        return _get_union_converter(response_type, arguments)
+    if origin is typing.Literal:
+        return _get_literal_converter(arguments)
+    if response_type is list or origin is list:
+        return _get_list_converter(arguments[0] if arguments else Any)
+    if response_type is tuple or origin is tuple:
+        return _get_tuple_converter(arguments)
+    if response_type is dict or origin is dict:
+        return _get_dict_converter(arguments[1] if arguments else Any)
+
+    if not isinstance(response_type, type):
+        raise TypeError(f"Unsupported response_type: {response_type!r}")
+    if hasattr(response_type, "__struct_fields__"):
+        return _get_struct_converter(response_type)
+    if dataclasses.is_dataclass(response_type):
+        return _get_fields_converter(response_type, build=response_type)
+    if issubclass(response_type, dict) and hasattr(response_type, "__required_keys__"):
+        return _get_fields_converter(response_type, build=None)
+    if issubclass(response_type, enum.Enum):
+        return _get_enum_converter(response_type)
+    if response_type is float:
+        return _get_float_converter()
+    if response_type in (str, int, bool):
+        return _get_scalar_converter(response_type)
+
+    raise TypeError(f"Unsupported response_type: {response_type!r}")
+
+
+def _get_none_converter() -> Callable[[Any], Any]:
+    def convert_none(value: Any) -> None:
+        if value is not None:
+            raise _mismatch(value, None)
+
+    return convert_none
+
+
+def _get_scalar_converter(response_type: type) -> Callable[[Any], Any]:
+    def convert_scalar(value: Any) -> Any:
+        # bool is a subclass of int, but true and false aren't integers
+        if type(value) is not response_type:
+            raise _mismatch(value, response_type)
+        return value
+
+    return convert_scalar
+
+
+def _get_float_converter() -> Callable[[Any], Any]:
+    def convert_float(value: Any) -> float:
+        if type(value) is float:
+            return value
+        if type(value) is int:
+            return float(value)
+        raise _mismatch(value, float)
+
+    return convert_float
+
+
+def _get_enum_converter(response_type: type[enum.Enum]) -> Callable[[Any], Any]:
+    def convert_enum(value: Any) -> enum.Enum:
+        try:
+            return response_type(value)
+        except ValueError:
+            raise _Invalid(f"{value!r} is not a valid {_describe(response_type)}") from None
+
+    return convert_enum
+
+
+def _get_literal_converter(values: tuple[Any, ...]) -> Callable[[Any], Any]:
+    def convert_literal(value: Any) -> Any:
+        if value not in values:
+            raise _Invalid(f"expected one of {list(values)!r}, got {value!r}")
+        return value
+
+    return convert_literal
+
+
+def _get_union_converter(response_type: Any, arguments: tuple[Any, ...]) -> Callable[[Any], Any]:
+    converters = [_get_converter(argument) for argument in arguments]
+
+    def convert_union(value: Any) -> Any:
+        for converter in converters:
+            try:
+                return converter(value)
+            except _Invalid:
+                continue
+        raise _mismatch(value, response_type)
+
+    return convert_union
+
+
+def _locate(convert_item: Callable[[Any], Any], items: Iterable[tuple[Any, Any]], segment: str) -> _Invalid:
+    # Find which item of a container is invalid, only once the container is known to have one
+    for key, item in items:
+        try:
+            convert_item(item)
+        except _Invalid as invalid:
+            invalid.path.append(segment.format(key))
+            return invalid
+    return _Invalid("invalid item")  # pragma: no cover
+
+
+def _get_list_converter(item_type: Any) -> Callable[[Any], Any]:
+    convert_item = _get_converter(item_type)
+
+    def convert_list(value: Any) -> list[Any]:
+        if not isinstance(value, list):
+            raise _mismatch(value, list)
+        try:
+            return [convert_item(item) for item in value]
+        except _Invalid:
+            raise _locate(convert_item, enumerate(value), "[{}]") from None
+
+    return convert_list
+
+
+def _get_tuple_converter(arguments: tuple[Any, ...]) -> Callable[[Any], Any]:
+    if len(arguments) == 2 and arguments[1] is Ellipsis:
+        convert_list = _get_list_converter(arguments[0])
+        return lambda value: tuple(convert_list(value))
+
+    item_converters = [_get_converter(argument) for argument in arguments]
+
+    def convert_tuple(value: Any) -> tuple[Any, ...]:
+        if not isinstance(value, list):
+            raise _mismatch(value, tuple)
+        if not item_converters:
+            return tuple(value)
+        if len(item_converters) != len(value):
+            raise _Invalid(f"expected {len(item_converters)} items, got {len(value)}")
+
+        converted = []
+        for index, (convert_item, item) in enumerate(zip(item_converters, value)):
+            try:
+                converted.append(convert_item(item))
+            except _Invalid as invalid:
+                invalid.path.append(f"[{index}]")
+                raise
+        return tuple(converted)
+
+    return convert_tuple
+
+
+def _get_dict_converter(value_type: Any) -> Callable[[Any], Any]:
+    convert_item = _get_converter(value_type)
+
+    def convert_dict(value: Any) -> dict[str, Any]:
+        if not isinstance(value, dict):
+            raise _mismatch(value, dict)
+        try:
+            return {key: convert_item(item) for key, item in value.items()}
+        except _Invalid:
+            raise _locate(convert_item, value.items(), ".{}") from None
+
+    return convert_dict
+
+
+def _get_exact_type(response_type: Any) -> type | None:
+    # Values of exactly this type need no conversion, so fields of it skip calling their converter
+    if response_type in (str, int, bool, float):
+        return response_type
+    if response_type is None or response_type is type(None):
+        return type(None)
+    return None
+
+
+def _resolve_forward_refs(hint: Any, globalns: dict[str, Any], localns: dict[str, Any]) -> Any:
+    # Before Python 3.11, typing.get_type_hints leaves quoted names inside builtin generics like list["Tree"] unresolved
+    if isinstance(hint, typing.ForwardRef):
+        hint = hint.__forward_arg__
+    if isinstance(hint, str):
+        return _resolve_forward_refs(eval(hint, globalns, localns), globalns, localns)
+
+    origin = typing.get_origin(hint)
+    arguments = typing.get_args(hint)
+    # The arguments of a Literal are values rather than types, so strings among them are left alone
+    if origin is None or origin is typing.Literal or not arguments:
+        return hint
+    resolved = tuple(_resolve_forward_refs(argument, globalns, localns) for argument in arguments)
+    if resolved == arguments:
+        return hint
+    if origin in _UNION_TYPES:
+        # Built at runtime, where X | Y doesn't work on every supported version
+        return typing.Union[resolved]  # noqa: UP007
+    if isinstance(hint, types.GenericAlias):
+        return types.GenericAlias(origin, resolved)
+    return hint.copy_with(resolved)
+
+
+def _get_fields(response_type: type) -> list[tuple[str, type | None, Callable[[Any], Any], bool]]:
+    # The name, exact type, converter, and whether a value is required, for each field of a dataclass or TypedDict
+    module = sys.modules.get(response_type.__module__)
+    globalns = vars(module) if module is not None else {}
+    localns = {**vars(response_type), response_type.__name__: response_type}
+    hints = {
+        name: _resolve_forward_refs(hint, globalns, localns)
+        for name, hint in typing.get_type_hints(response_type, globalns, localns).items()
+    }
+    if dataclasses.is_dataclass(response_type):
+        fields = [
+            (
+                field.name,
+                hints.get(field.name, Any),
+                field.default is dataclasses.MISSING and field.default_factory is dataclasses.MISSING,
+            )
+            for field in dataclasses.fields(response_type)
+            if field.init
+        ]
+    else:
+        required_keys = response_type.__required_keys__  # type: ignore[attr-defined]
+        fields = [(name, hint, name in required_keys) for name, hint in hints.items()]
+    return [(name, _get_exact_type(hint), _get_converter(hint), required) for name, hint, required in fields]
+
+
+def _get_fields_converter(response_type: type, build: Callable[..., Any] | None) -> Callable[[Any], Any]:
+    # The fields are looked up on first use so that types can refer to themselves
+    fields: list[tuple[str, type | None, Callable[[Any], Any], bool]] | None = None
+
+    def convert_fields(value: Any) -> Any:
+        nonlocal fields
+        if fields is None:
+            fields = _get_fields(response_type)
+        if not isinstance(value, dict):
+            raise _mismatch(value, response_type)
+
+        converted = {}
+        for name, exact_type, convert_field, required in fields:
+            if name in value:
+                field_value = value[name]
+                if type(field_value) is exact_type:
+                    converted[name] = field_value
+                    continue
+                try:
+                    converted[name] = convert_field(field_value)
+                except _Invalid as invalid:
+                    invalid.path.append(f".{name}")
+                    raise
+            elif required:
+                raise _Invalid(f"object is missing required field `{name}`")
+        return build(**converted) if build is not None else converted
+
+    return convert_fields
+
+
+def _get_struct_converter(response_type: type) -> Callable[[Any], Any]:
+    import msgspec
+
+    def convert_struct(value: Any) -> Any:
+        try:
+            return msgspec.convert(value, response_type)
+        except msgspec.ValidationError as exception:
+            error = _from_msgspec_error(exception)
+            raise _Invalid(error.problem, [error.location[1:]]) from None
+
+    return convert_struct
+
+
+def fastest_available() -> JsonDecoder:
+    """
+    The fastest decoder whose backend is installed
+
+    :return:
+        An :class:`OrjsonDecoder` or :class:`MsgspecDecoder` when their backend can be imported,
+        otherwise a :class:`StdlibJsonDecoder`
+    :rtype:
+        JsonDecoder
+    """
+    for decoder_class in (OrjsonDecoder, MsgspecDecoder):
+        try:
+            return decoder_class()
+        except ImportError:
+            continue
+    return StdlibJsonDecoder()
+
+
+#: The decoder used by a :class:`apiron.JsonEndpoint` without a ``decoder`` of its own.
+#: Replace it, e.g. with ``fastest_available()``, to change how every such endpoint decodes responses.
+DEFAULT_JSON_DECODER: JsonDecoder = StdlibJsonDecoder()
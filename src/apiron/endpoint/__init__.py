@@ -1,6 +1,17 @@
 from apiron.endpoint.endpoint import Endpoint
 from apiron.endpoint.json import JsonEndpoint
+from apiron.endpoint.ndjson import NdjsonEndpoint
+from apiron.endpoint.sse import ServerSentEventsEndpoint
 from apiron.endpoint.streaming import StreamingEndpoint
+from apiron.endpoint.streaming_json import StreamingJsonEndpoint
 from apiron.endpoint.stub import StubEndpoint
 
-__all__ = ["Endpoint", "JsonEndpoint", "StreamingEndpoint", "StubEndpoint"]
+__all__ = [
+    "Endpoint",
+    "JsonEndpoint",
+    "NdjsonEndpoint",
+    "ServerSentEventsEndpoint",
+    "StreamingEndpoint",
+    "StreamingJsonEndpoint",
+    "StubEndpoint",
+]
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import collections
+import functools
+import inspect
 import logging
-import string
+import re
 import sys
 import warnings
 from collections.abc import Iterable
@@ -14,6 +17,9 @@ if TYPE_CHECKING:  # pragma: no cover
     else:
         from typing_extensions import Concatenate, ParamSpec
 
+    from apiron.cache import ResponseCache
+    from apiron.compression import Compression
+    from apiron.ratelimit import RateLimiter
     from apiron.service import Service
 
     P = ParamSpec("P")
@@ -22,11 +28,17 @@ if TYPE_CHECKING:  # pragma: no cover
 import requests
 from urllib3.util import retry
 
-from apiron import Timeout, client
+from apiron import Timeout, client, compression
+from apiron.client import Failover
+from apiron.endpoint.template import PathTemplate
 from apiron.exceptions import UnfulfilledParameterException
 
 LOGGER = logging.getLogger(__name__)
 
+HEDGE_LATENCY_WINDOW = 1000
+HEDGE_LATENCY_MIN_SAMPLES = 20
+HEDGE_LATENCY_UPDATE_INTERVAL = 50
+
 
 def _create_caller(
     call_fn: Callable[Concatenate[Service, Endpoint, P], R],
@@ -36,14 +48,56 @@ def _create_caller(
     return partial(call_fn, instance, owner)
 
 
+@functools.cache
+def _get_caller_signature(call_fn: Callable[..., Any]) -> inspect.Signature:
+    # Bound callers take every argument of the call function except the service and endpoint they are bound to
+    signature = inspect.signature(call_fn)
+    return signature.replace(parameters=list(signature.parameters.values())[2:])
+
+
+def _bind_caller(call_fn: Callable[..., Any], owner: Any, endpoint: Endpoint) -> Callable[..., Any]:
+    caller = _create_caller(call_fn, owner, endpoint)
+    update_wrapper(caller, call_fn)
+    caller.__signature__ = _get_caller_signature(call_fn)  # type: ignore[attr-defined]
+    return caller
+
+
 class Endpoint:
     """
     A basic service endpoint that responds with the default ``Content-Type`` for that endpoint
     """
 
+    # Whether required_headers is the same on every call, so it can be merged into a request template once
+    _static_required_headers = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Headers that a subclass computes may change from call to call unless it says otherwise
+        if "required_headers" in vars(cls) and "_static_required_headers" not in vars(cls):
+            cls._static_required_headers = False
+
     def __get__(self, instance, owner):
-        caller = _create_caller(client.call, owner, self)
-        update_wrapper(caller, client.call)
+        # Services keep the callers bound to their endpoints so that attribute access is a dictionary lookup
+        asynchronous = getattr(owner, "asynchronous", False)
+        bound_callers = owner.__dict__.get("_bound_callers")
+        if bound_callers is not None:
+            bound = bound_callers.get(self)
+            if bound is not None and bound[0] == asynchronous:
+                return bound[1]
+
+        caller = self._bind(owner, asynchronous)
+        if bound_callers is not None:
+            bound_callers[self] = (asynchronous, caller)
+        return caller
+
+    def _bind(self, owner: Any, asynchronous: bool) -> Callable[..., Any]:
+        if asynchronous:
+            from apiron import aio
+
+            return _bind_caller(aio.call, owner, self)
+
+        caller = _bind_caller(client.call, owner, self)
+        caller.map = _bind_caller(client.call_many, owner, self)  # type: ignore[attr-defined]
         return caller
 
     def __call__(self):
@@ -58,6 +112,14 @@ class Endpoint:
         return_raw_response_object: bool = False,
         timeout_spec: Timeout | None = None,
         retry_spec: retry.Retry | None = None,
+        failover_spec: Failover | None = None,
+        hedge_after: float | str | None = None,
+        cache: ResponseCache | None = None,
+        coalesce: bool = False,
+        encode_path_values: bool = True,
+        accept_encoding: str | Iterable[str] | None = None,
+        compression_spec: Compression | None = None,
+        rate_limiter: RateLimiter | None = None,
     ):
         """
         :param str path:
@@ -83,6 +145,45 @@ class Endpoint:
             (optional)
             An override of the retry behavior for calls to this endpoint.
             (default ``None``)
+        :param Failover failover_spec:
+            (optional)
+            How to retry calls to this endpoint on a different host after a failure.
+            (default ``None``)
+        :param hedge_after:
+            (optional)
+            For idempotent calls, the number of seconds to wait for a response
+            before sending an identical request to another host and using whichever response arrives first.
+            A percentile of recent latencies like ``'p95'`` adapts the delay to the endpoint's observed latency.
+            (default ``None``)
+        :param ResponseCache cache:
+            (optional)
+            Where to store responses to ``GET`` calls to this endpoint so they can be served again
+            without a request, for as long as their ``Cache-Control`` headers allow.
+            (default ``None``)
+        :param bool coalesce:
+            Whether concurrent idempotent calls with identical arguments share a single request and its result.
+            Every call sharing a request receives the same result object, so treat it as read-only.
+            This can be overridden when calling the endpoint.
+            (Default ``False``)
+        :param bool encode_path_values:
+            Whether to percent-encode the values formatted into ``path`` so that each stays within its path segment.
+            Turn this off for values that are deliberately several segments, like ``'a/b'``.
+            (Default ``True``)
+        :param accept_encoding:
+            (optional)
+            The content codings to accept compressed responses in, in order of preference,
+            like ``('zstd', 'br', 'gzip')``, or ``'identity'`` for uncompressed responses.
+            Codings whose decoder isn't installed are left out.
+            (Default is the service's ``accept_encoding``)
+        :param Compression compression_spec:
+            (optional)
+            How to compress the ``data`` or ``json`` bodies of calls to this endpoint.
+            This can be overridden when calling the endpoint.
+            (default ``None``)
+        :param RateLimiter rate_limiter:
+            (optional)
+            The rate to limit requests to this endpoint to, within any limit of the service's ``rate_limiter``.
+            (default ``None``)
         """
         self.default_method = default_method
 
@@ -97,9 +198,71 @@ class Endpoint:
         self.path = path
         self.default_params = default_params or {}
         self.required_params = required_params or set()
-        self.return_raw_response_object = return_raw_response_object
-        self.timeout_spec = timeout_spec
-        self.retry_spec = retry_spec
+        self.return_raw_response_object: bool = return_raw_response_object
+        self.timeout_spec: Timeout | None = timeout_spec
+        self.retry_spec: retry.Retry | None = retry_spec
+        self.failover_spec: Failover | None = failover_spec
+        self.hedge_after: float | str | None = hedge_after
+        self.cache: ResponseCache | None = cache
+        self.coalesce: bool = coalesce
+        self.encode_path_values: bool = encode_path_values
+        self.accept_encoding: str | Iterable[str] | None = accept_encoding
+        self.compression_spec: Compression | None = compression_spec
+        self.rate_limiter: RateLimiter | None = rate_limiter
+
+        # Fail when the endpoint is declared rather than on its first call
+        if accept_encoding is not None:
+            compression.get_accept_encoding(accept_encoding)
+        if compression_spec is not None:
+            compression.get_compressor(compression_spec)
+
+        self._hedge_percentile = None
+        if isinstance(hedge_after, str):
+            match = re.fullmatch(r"p(\d+(?:\.\d+)?)", hedge_after)
+            if not match or not 0 < float(match.group(1)) < 100:
+                raise ValueError(
+                    f"hedge_after must be a number of seconds or a percentile like 'p95', not {hedge_after!r}"
+                )
+            self._hedge_percentile = float(match.group(1))
+            self._latencies: collections.deque[float] = collections.deque(maxlen=HEDGE_LATENCY_WINDOW)
+            self._latencies_since_update = 0
+            self._hedge_delay: float | None = None
+
+    def record_latency(self, seconds: float):
+        """
+        Record how long a call to this endpoint took, for endpoints that hedge after a latency percentile
+
+        :param float seconds:
+            The latency of the call
+        """
+        if self._hedge_percentile is None:
+            return
+
+        self._latencies.append(seconds)
+        self._latencies_since_update += 1
+
+        # Recompute the percentile periodically rather than on every call
+        if self._latencies_since_update >= HEDGE_LATENCY_UPDATE_INTERVAL or (
+            self._hedge_delay is None and len(self._latencies) >= HEDGE_LATENCY_MIN_SAMPLES
+        ):
+            latencies = sorted(self._latencies)
+            index = min(int(len(latencies) * self._hedge_percentile / 100), len(latencies) - 1)
+            self._hedge_delay = latencies[index]
+            self._latencies_since_update = 0
+
+    def get_hedge_delay(self) -> float | None:
+        """
+        The number of seconds to wait before hedging a call to this endpoint
+
+        :return:
+            The configured delay, the current latency percentile,
+            or ``None`` when calls should not be hedged, including before enough latencies have been recorded
+        :rtype:
+            float
+        """
+        if self._hedge_percentile is not None:
+            return self._hedge_delay
+        return self.hedge_after  # type: ignore[return-value]
 
     def format_response(self, response: requests.Response) -> str | dict[str, Any] | Iterable[bytes]:
         """
@@ -126,18 +289,32 @@ class Endpoint:
         """
         return {}
 
+    @property
+    def path(self) -> str:
+        """
+        The URL path for this endpoint, compiled into a :class:`PathTemplate` whenever it is set
+        """
+        return self._path_template.path
+
+    @path.setter
+    def path(self, path: str):
+        self._path_template = PathTemplate(path)
+
     def get_formatted_path(self, **kwargs) -> str:
         """
-        Format this endpoint's path with the supplied keyword arguments
+        Format this endpoint's path with the supplied keyword arguments,
+        percent-encoding each value so that it stays within its path segment unless ``encode_path_values`` is off
 
         :return:
             The fully-formatted path
         :rtype:
             str
         """
-        self._validate_path_placeholders(self.path_placeholders, kwargs)
+        path_template = self._path_template
+        if kwargs:
+            self._validate_path_placeholders(path_template.placeholder_names, kwargs)
 
-        return self.path.format(**kwargs)
+        return path_template.render(kwargs, self.encode_path_values)
 
     @property
     def path_placeholders(self) -> list[str]:
@@ -150,12 +327,10 @@ class Endpoint:
             >>> endpoint.path_placeholders
             ['foo', 'bar']
         """
+        return list(self._path_template.placeholders)
 
-        parser = string.Formatter()
-        return [placeholder_name for _, placeholder_name, _, _ in parser.parse(self.path) if placeholder_name]
-
-    def _validate_path_placeholders(self, placeholder_names: list[str], path_kwargs: dict[str, Any]):
-        if any(path_kwarg not in placeholder_names for path_kwarg in path_kwargs):
+    def _validate_path_placeholders(self, placeholder_names: frozenset[str], path_kwargs: dict[str, Any]):
+        if not placeholder_names.issuperset(path_kwargs):
             warnings.warn(
                 f"An unknown path kwarg was supplied to {self}. kwargs supplied: {path_kwargs}",
                 RuntimeWarning,
@@ -1,15 +1,26 @@
-import collections
+import codecs
 from collections.abc import Iterable
-from typing import Any, Optional
+from typing import Any, Optional, Union
 
+from apiron import decoders
 from apiron.endpoint.endpoint import Endpoint
 
 
+def _get_json_content(response) -> Union[bytes, str]:
+    # JSON is UTF-8, so the body is decoded straight from its bytes unless the response declares another charset
+    encoding = response.encoding
+    if encoding and codecs.lookup(encoding).name != "utf-8":
+        return response.text
+    return response.content
+
+
 class JsonEndpoint(Endpoint):
     """
     An endpoint that returns :mimetype:`application/json`
     """
 
+    _static_required_headers = True
+
     def __init__(
         self,
         *args,
@@ -18,11 +29,35 @@ class JsonEndpoint(Endpoint):
         default_params: Optional[dict[str, Any]] = None,
         required_params: Optional[Iterable[str]] = None,
         preserve_order: bool = False,
+        decoder: Optional[decoders.JsonDecoder] = None,
+        response_type: Any = None,
+        **kwargs,
     ):
+        """
+        :param bool preserve_order:
+            (Default ``False``)
+            Whether JSON objects are returned as :class:`collections.OrderedDict` rather than :class:`dict`
+        :param apiron.decoders.JsonDecoder decoder:
+            (optional)
+            How to decode responses from this endpoint,
+            such as :class:`apiron.decoders.OrjsonDecoder` when orjson is installed.
+            (Default :data:`apiron.decoders.DEFAULT_JSON_DECODER`)
+        :param response_type:
+            (optional)
+            The type to validate responses against and decode them into,
+            such as a dataclass, a :class:`typing.TypedDict`, a msgspec ``Struct``, or a list of one of them.
+            (Default ``None``)
+        """
         super().__init__(
-            path=path, default_method=default_method, default_params=default_params, required_params=required_params
+            path=path,
+            default_method=default_method,
+            default_params=default_params,
+            required_params=required_params,
+            **kwargs,
         )
         self.preserve_order = preserve_order
+        self.decoder = decoder
+        self.response_type = response_type
 
     def format_response(self, response) -> dict[str, Any]:
         """
@@ -31,14 +66,31 @@ class JsonEndpoint(Endpoint):
         :param requests.Response response:
             The original response from :mod:`requests`
         :return:
-            The response's JSON content
+            The response's JSON content, decoded by this endpoint's ``decoder``
+        :rtype:
+            ``response_type`` if there is one
         :rtype:
             :class:`dict` if ``preserve_order`` is ``False``
         :rtype:
             :class:`collections.OrderedDict` if ``preserve_order`` is ``True``
+        :raises ValueError:
+            When the response isn't valid JSON
+        :raises apiron.exceptions.ResponseValidationException:
+            When the response doesn't match ``response_type``
+        """
+        return self.decode(_get_json_content(response))
+
+    def decode(self, content: Union[bytes, str]) -> Any:
         """
+        Decode a JSON document with this endpoint's ``decoder``, ``preserve_order``, and ``response_type``
 
-        return response.json(object_pairs_hook=collections.OrderedDict if self.preserve_order else None)
+        :param content:
+            The JSON document, as UTF-8 bytes or as a string
+        :return:
+            The decoded document
+        """
+        decoder = self.decoder or decoders.DEFAULT_JSON_DECODER
+        return decoder.decode(content, self.preserve_order, self.response_type)
 
     @property
     def required_headers(self) -> dict[str, str]:
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import codecs
+import json
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from typing import Any
+
+from apiron import decoders
+from apiron.endpoint.json import JsonEndpoint
+from apiron.endpoint.streaming import _LineSplitter
+
+
+class NdjsonEndpoint(JsonEndpoint):
+    """
+    An endpoint that returns newline-delimited JSON (NDJSON, also known as JSON Lines),
+    decoded one record at a time as the response arrives
+    """
+
+    streaming = True
+    _static_required_headers = True
+
+    def __init__(self, *args, chunk_size: int | None = None, **kwargs):
+        """
+        :param int chunk_size:
+            (optional)
+            The number of bytes to read from the response at a time,
+            or ``None`` to handle data as soon as it arrives.
+            (Default ``None``)
+        :param response_type:
+            (optional)
+            The type to validate each record against and decode it into, like a dataclass
+        """
+        super().__init__(*args, **kwargs)
+        self.chunk_size = chunk_size
+
+    def _get_record_decoder(self, encoding: str | None) -> Callable[[bytes], Any]:
+        # NDJSON is UTF-8, but a response may declare another charset that ASCII line endings are still valid in
+        if encoding and codecs.lookup(encoding).name != "utf-8":
+            return lambda line: self.decode(line.decode(encoding))
+        decoder = self.decoder or decoders.DEFAULT_JSON_DECODER
+        if isinstance(decoder, decoders.StdlibJsonDecoder) and self.response_type is None and not self.preserve_order:
+            return json.loads
+        return self.decode
+
+    def iter_elements(self, chunks: Iterable[bytes], encoding: str | None = None) -> Iterator[Any]:
+        """
+        Decode the records from the pieces of a response body.
+        Each record is decoded only when it is reached,
+        and the next piece of the body is only read once the records before it have been consumed.
+
+        :param chunks:
+            The response body, a piece at a time
+        :param str encoding:
+            (Default ``'utf-8'``)
+            The character encoding of the body
+        :return:
+            Each record, decoded
+        :rtype:
+            generator
+        :raises ValueError:
+            When a line isn't valid JSON
+        """
+        decode = self._get_record_decoder(encoding)
+        splitter = _LineSplitter()
+        for chunk in chunks:
+            for line in splitter.feed(chunk):
+                if line and not line.isspace():
+                    yield decode(line)
+        for line in splitter.close():
+            if not line.isspace():
+                yield decode(line)
+
+    async def aiter_elements(self, chunks: AsyncIterator[bytes], encoding: str | None = None) -> AsyncIterator[Any]:
+        """
+        Decode the records from the pieces of a response body that arrive asynchronously,
+        like :meth:`iter_elements`
+        """
+        decode = self._get_record_decoder(encoding)
+        splitter = _LineSplitter()
+        async for chunk in chunks:
+            for line in splitter.feed(chunk):
+                if line and not line.isspace():
+                    yield decode(line)
+        for line in splitter.close():
+            if not line.isspace():
+                yield decode(line)
+
+    def format_response(self, response, chunk_size: int | None = None) -> Iterator[Any]:  # type: ignore[override]
+        """
+        Decode the records as the response arrives
+
+        :param requests.Response response:
+            The original response from :mod:`requests`
+        :param int chunk_size:
+            (optional)
+            An override of this endpoint's ``chunk_size`` for this response
+        :return:
+            Each record, decoded by this endpoint's ``decoder``
+        :rtype:
+            generator
+        """
+        return self._iter_response(response, self.chunk_size if chunk_size is None else chunk_size)
+
+    def _iter_response(self, response, chunk_size: int | None) -> Iterator[Any]:
+        try:
+            yield from self.iter_elements(response.iter_content(chunk_size=chunk_size), response.encoding)
+        finally:
+            response.close()
+
+    @property
+    def required_headers(self) -> dict[str, str]:
+        return {"Accept": "application/x-ndjson"}
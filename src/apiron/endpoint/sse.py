@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from typing import Any
+
+import requests
+
+from apiron import decoders
+from apiron.endpoint.streaming import StreamingEndpoint, _LineSplitter
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_RETRY_DELAY = 3.0
+
+# The errors that end a stream early, after which it is resumed from the last event
+_STREAM_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+
+class ServerSentEvent(collections.namedtuple("ServerSentEvent", ["event", "data", "id"])):
+    """
+    An event from a :mimetype:`text/event-stream` response
+
+    :param str event:
+        The type of the event, ``'message'`` unless the server says otherwise
+    :param str data:
+        The event's data, with the lines of multi-line data joined by ``\\n``
+    :param str id:
+        The ID of the last event the server identified, which the stream is resumed from after a reconnect
+    """
+
+    __slots__ = ()
+
+    def json(self) -> Any:
+        """
+        Decode the event's data as JSON, with :data:`apiron.decoders.DEFAULT_JSON_DECODER`
+        """
+        return decoders.DEFAULT_JSON_DECODER.decode(self.data)
+
+
+class _EventParser:
+    """
+    Parses a :mimetype:`text/event-stream` body into events as its chunks arrive,
+    following the `HTML standard <https://html.spec.whatwg.org/multipage/server-sent-events.html>`_
+    """
+
+    def __init__(self):
+        self.last_event_id = ""
+        #: The number of seconds the server asked to wait before reconnecting, if it has
+        self.retry: float | None = None
+        self.reset()
+
+    def reset(self):
+        # A new connection starts a new body, and an event that was cut off is never dispatched
+        self._splitter = _LineSplitter()
+        self._at_start = True
+        self._event = ""
+        self._data: list[str] = []
+
+    def feed(self, chunk: bytes) -> list[ServerSentEvent]:
+        if self._at_start and chunk:
+            self._at_start = False
+            if chunk.startswith(b"\xef\xbb\xbf"):
+                chunk = chunk[3:]
+
+        events = []
+        for line in self._splitter.feed(chunk):
+            if not line:
+                if self._data:
+                    events.append(ServerSentEvent(self._event or "message", "\n".join(self._data), self.last_event_id))
+                self._event = ""
+                self._data = []
+                continue
+
+            field, _, value = line.decode("utf-8", "replace").partition(":")
+            if not field:
+                # A comment, often sent to keep the connection alive
+                continue
+            value = value.removeprefix(" ")
+
+            if field == "data":
+                self._data.append(value)
+            elif field == "event":
+                self._event = value
+            elif field == "id" and "\0" not in value:
+                self.last_event_id = value
+            elif field == "retry" and value.isascii() and value.isdigit():
+                self.retry = int(value) / 1000
+        return events
+
+    @property
+    def resume_headers(self) -> dict[str, str]:
+        return {"Last-Event-ID": self.last_event_id} if self.last_event_id else {}
+
+
+class ServerSentEventsEndpoint(StreamingEndpoint):
+    """
+    An endpoint that returns a stream of server-sent events (:mimetype:`text/event-stream`),
+    parsed into :class:`ServerSentEvent` objects as they arrive.
+    When the connection is lost, the endpoint is called again with a ``Last-Event-ID`` header
+    so that the server can resume the stream where it left off.
+    """
+
+    _static_required_headers = True
+
+    def __init__(
+        self,
+        *args,
+        reconnect: bool = True,
+        retry_delay: float = DEFAULT_RETRY_DELAY,
+        max_reconnects: int | None = None,
+        **kwargs,
+    ):
+        """
+        :param bool reconnect:
+            (Default ``True``)
+            Whether to call the endpoint again when the stream ends or the connection is lost
+        :param float retry_delay:
+            (Default ``3.0``)
+            The number of seconds to wait before reconnecting, until the server sends a ``retry`` field
+        :param int max_reconnects:
+            (optional)
+            The number of times in a row to reconnect without receiving an event before giving up,
+            or ``None`` to keep reconnecting.
+            (Default ``None``)
+        """
+        super().__init__(*args, **kwargs)
+        self.reconnect = reconnect
+        self.retry_delay = retry_delay
+        self.max_reconnects = max_reconnects
+
+    def _get_retry_delay(self, parser: _EventParser) -> float:
+        return self.retry_delay if parser.retry is None else parser.retry
+
+    def _should_reconnect(self, reconnects: int) -> bool:
+        return self.max_reconnects is None or reconnects < self.max_reconnects
+
+    def format_response(  # type: ignore[override]
+        self,
+        response,
+        chunk_size: int | None = None,
+        resume: Callable[[dict[str, str]], requests.Response] | None = None,
+    ) -> Iterator[ServerSentEvent]:
+        """
+        Parse the events as the response arrives
+
+        :param requests.Response response:
+            The original response from :mod:`requests`
+        :param int chunk_size:
+            (optional)
+            An override of this endpoint's ``chunk_size`` for this response and the ones it reconnects to
+        :param resume:
+            (optional)
+            Calls the endpoint again with the given extra headers and returns the raw, unread response.
+            Without it, the events end with the response.
+        :return:
+            Each event, across reconnects
+        :rtype:
+            generator
+        """
+        chunk_size = self.chunk_size if chunk_size is None else chunk_size
+        return self._iter_events(response, chunk_size, resume if self.reconnect else None)
+
+    def _iter_events(self, response, chunk_size: int | None, resume) -> Iterator[ServerSentEvent]:
+        parser = _EventParser()
+        reconnects = 0
+        while True:
+            error = None
+            try:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    for event in parser.feed(chunk):
+                        reconnects = 0
+                        yield event
+            except _STREAM_ERRORS as exception:
+                if resume is None:
+                    raise
+                error = exception
+            finally:
+                response.close()
+            if resume is None:
+                return
+
+            response = None
+            while response is None:
+                if not self._should_reconnect(reconnects):
+                    if error is not None:
+                        raise error
+                    return
+                reconnects += 1
+                LOGGER.info("Event stream ended, reconnecting: %s", error or "end of response")
+                time.sleep(self._get_retry_delay(parser))
+                try:
+                    response = resume(parser.resume_headers)
+                except _STREAM_ERRORS as exception:
+                    error = exception
+
+            # The server tells clients to stop reconnecting with 204 No Content
+            if response.status_code == 204:
+                response.close()
+                return
+            parser.reset()
+
+    async def aiter_elements(
+        self,
+        chunks: AsyncIterator[bytes],
+        encoding: str | None = None,
+        resume: Callable[[dict[str, str]], Awaitable[Any]] | None = None,
+        chunk_size: int | None = None,
+    ) -> AsyncIterator[ServerSentEvent]:
+        """
+        Parse the events from the pieces of a response body that arrive asynchronously,
+        reconnecting with ``resume`` like :meth:`format_response`.
+        Event streams are always UTF-8, so ``encoding`` is ignored.
+        """
+        from apiron import aio
+
+        resume = resume if self.reconnect else None
+        parser = _EventParser()
+        reconnects = 0
+        while True:
+            error = None
+            try:
+                async for chunk in chunks:
+                    for event in parser.feed(chunk):
+                        reconnects = 0
+                        yield event
+            except aio.httpx.TransportError as exception:
+                if resume is None:
+                    raise
+                error = exception
+            if resume is None:
+                return
+
+            response = None
+            while response is None:
+                if not self._should_reconnect(reconnects):
+                    if error is not None:
+                        raise error
+                    return
+                reconnects += 1
+                LOGGER.info("Event stream ended, reconnecting: %s", error or "end of response")
+                await asyncio.sleep(self._get_retry_delay(parser))
+                try:
+                    response = await resume(parser.resume_headers)
+                except aio.httpx.TransportError as exception:
+                    error = exception
+
+            if response.status_code == 204:
+                await response.aclose()
+                return
+            chunks = aio._iter_response(response, self.chunk_size if chunk_size is None else chunk_size)
+            parser.reset()
+
+    @property
+    def required_headers(self) -> dict[str, str]:
+        return {"Accept": "text/event-stream", "Cache-Control": "no-cache"}
@@ -1,7 +1,190 @@
-from collections.abc import Iterable
+from __future__ import annotations
+
+import sys
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, BinaryIO
+
+import requests
+from urllib3 import exceptions
 
 from apiron.endpoint.endpoint import Endpoint
 
+if TYPE_CHECKING:  # pragma: no cover
+    if sys.version_info >= (3, 11):
+        from typing import Self
+    else:
+        from typing_extensions import Self
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def _read(raw, size: int) -> bytes:
+    # Read up to size bytes from a urllib3 response, undoing any Content-Encoding like gzip,
+    # and raise the same exceptions as requests.Response.iter_content
+    try:
+        return raw.read(size, decode_content=True)
+    except exceptions.ProtocolError as exception:
+        raise requests.exceptions.ChunkedEncodingError(exception) from exception
+    except exceptions.DecodeError as exception:
+        raise requests.exceptions.ContentDecodingError(exception) from exception
+    except exceptions.ReadTimeoutError as exception:
+        raise requests.exceptions.ConnectionError(exception) from exception
+    except exceptions.SSLError as exception:
+        raise requests.exceptions.SSLError(exception) from exception
+
+
+class _LineSplitter:
+    """
+    Splits a body into lines as its chunks arrive.
+    Lines end with ``\\n``, ``\\r\\n``, or ``\\r``, and are returned without their ending.
+
+    Lines that lie within a single chunk are sliced straight out of it;
+    only a line that spans chunks is held back, in pieces, until its end arrives.
+    """
+
+    def __init__(self):
+        self._pieces: list[bytes] = []
+        # A chunk that ends with \r may be followed by a chunk that starts with the \n of the same \r\n
+        self._after_carriage_return = False
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        """
+        :param bytes chunk:
+            The next chunk of the body
+        :return:
+            Each line completed by ``chunk``, in order
+        :rtype:
+            list
+        """
+        if self._after_carriage_return:
+            self._after_carriage_return = False
+            if chunk[:1] == b"\n":
+                chunk = chunk[1:]
+        if not chunk:
+            return []
+
+        last = chunk[-1:]
+        lines = chunk.splitlines()
+        partial = b"" if last in (b"\n", b"\r") else lines.pop()
+        self._after_carriage_return = last == b"\r"
+
+        if self._pieces and lines:
+            self._pieces.append(lines[0])
+            lines[0] = b"".join(self._pieces)
+            self._pieces = []
+        if partial:
+            self._pieces.append(partial)
+        return lines
+
+    def close(self) -> list[bytes]:
+        """
+        :return:
+            The last line, if the body didn't end with a line ending
+        :rtype:
+            list
+        """
+        line = b"".join(self._pieces)
+        self._pieces = []
+        return [line] if line else []
+
+
+class ResponseStream:
+    """
+    The body of a streamed response.
+    Iterate over it for chunks of ``chunk_size`` bytes,
+    fill a buffer of your own with :meth:`readinto`, or copy the whole body to a file with :meth:`stream_to`.
+    Use one of these ways to read a given response.
+    """
+
+    def __init__(self, response, chunk_size: int | None = None):
+        """
+        :param requests.Response response:
+            The streamed response from :mod:`requests`
+        :param int chunk_size:
+            (optional)
+            The number of bytes in each chunk when iterating,
+            or ``None`` for chunks of whatever size arrives.
+            (Default ``None``)
+        """
+        self.response = response
+        self.chunk_size = chunk_size
+        self._chunks: Iterator[bytes] | None = None
+
+    def __iter__(self) -> Self:
+        return self
+
+    def __next__(self) -> bytes:
+        raw = self.response.raw
+        if self.chunk_size is not None and hasattr(raw, "stream"):
+            # urllib3 streams a chunked response a chunk of its framing at a time, however small,
+            # where reading gathers whole chunks of the size asked for
+            data = _read(raw, self.chunk_size)
+            if not data:
+                raise StopIteration
+            return data
+
+        if self._chunks is None:
+            self._chunks = self.response.iter_content(chunk_size=self.chunk_size)
+        return next(self._chunks)
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:
+        """
+        Read the next part of the body into ``buffer``, filling it unless the body ends first
+
+        :param buffer:
+            A writable buffer, such as a :class:`bytearray` or a :class:`memoryview` of part of one
+        :return:
+            The number of bytes read, which is ``0`` once the whole body has been read
+        :rtype:
+            int
+        """
+        view = memoryview(buffer).cast("B")
+        raw = self.response.raw
+        if not hasattr(raw, "stream"):
+            return raw.readinto(view) or 0
+        data = _read(raw, len(view))
+        view[: len(data)] = data
+        return len(data)
+
+    def stream_to(self, file_obj: BinaryIO, buffer_size: int | None = None) -> int:
+        """
+        Write the rest of the body to ``file_obj`` through a single reused buffer, then close the response
+
+        :param file_obj:
+            A file or other object with a ``write`` method that accepts a :class:`memoryview`
+        :param int buffer_size:
+            (optional)
+            The number of bytes to read at a time.
+            (Default ``chunk_size``, or ``65536`` when that isn't set)
+        :return:
+            The number of bytes written
+        :rtype:
+            int
+        """
+        view = memoryview(bytearray(buffer_size or self.chunk_size or DEFAULT_CHUNK_SIZE))
+        written = 0
+        try:
+            while True:
+                read = self.readinto(view)
+                if not read:
+                    return written
+                file_obj.write(view[:read])
+                written += read
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Close the response, releasing its connection
+        """
+        self.response.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
 
 class StreamingEndpoint(Endpoint):
     """
@@ -10,16 +193,31 @@ class StreamingEndpoint(Endpoint):
 
     streaming = True
 
-    def format_response(self, response) -> Iterable[bytes]:
+    def __init__(self, *args, chunk_size: int | None = None, **kwargs):
+        """
+        :param int chunk_size:
+            (optional)
+            The number of bytes to read from the response at a time,
+            or ``None`` to handle data in whatever size it arrives.
+            Larger chunks mean fewer, larger reads, particularly for responses that arrive in many small pieces.
+            This can be overridden when calling the endpoint.
+            (Default ``None``)
+        """
+        super().__init__(*args, **kwargs)
+        self.chunk_size = chunk_size
+
+    def format_response(self, response, chunk_size: int | None = None) -> ResponseStream:  # type: ignore[override]
         """
         Stream response in chunks
 
         :param requests.Response response:
             The original response from :mod:`requests`
+        :param int chunk_size:
+            (optional)
+            An override of this endpoint's ``chunk_size`` for this response
         :return:
-            The response's content
+            The response's content, which can also be read into a buffer or streamed to a file
         :rtype:
-            generator
+            ResponseStream
         """
-
-        return response.iter_content(chunk_size=None)
+        return ResponseStream(response, self.chunk_size if chunk_size is None else chunk_size)
@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+import codecs
+import collections
+import functools
+import json
+import re
+from collections.abc import AsyncIterator, Callable, Generator, Iterable, Iterator
+from typing import Any
+
+from apiron import decoders
+from apiron.endpoint.json import JsonEndpoint
+from apiron.endpoint.streaming import DEFAULT_CHUNK_SIZE
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# The characters that end a number, true, false, or null
+_SCALAR_END = re.compile(r"[,\]}: \t\n\r]")
+# While finding the end of an object or array, strings are skipped whole and brackets are counted.
+# A string that hasn't ended yet matches without its closing quote.
+_CONTAINER_TOKENS = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*("?)|[\[\]{}]', re.DOTALL)
+# The rest of a string that started in an earlier piece of the document
+_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*("?)', re.DOTALL)
+
+
+# Yielded by the parsing steps when they need more of the document
+_MORE = object()
+
+
+def _parse_pointer(pointer: str) -> list[str]:
+    # A JSON pointer (RFC 6901) like "/data/items" is split into its unescaped reference tokens
+    if pointer and not pointer.startswith("/"):
+        raise ValueError(f"A JSON pointer must be empty or start with '/', not {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer.split("/")[1:]]
+
+
+class JsonArrayParser:
+    """
+    Finds the elements of a JSON array in a document that arrives a piece at a time,
+    so that an array of any size can be processed while only one element is held in memory.
+
+    Feed the document's text to :meth:`feed` as it arrives; each call returns the elements it completed,
+    as text or decoded by ``decoder``.
+    Values are located by scanning for their end rather than by decoding them,
+    so values skipped on the way to the array are never decoded at all.
+
+    Example:
+
+        >>> parser = JsonArrayParser('/results')
+        >>> parser.feed('{"count": 2, "results": [{"id": 1}, {"i')
+        ['{"id": 1}']
+        >>> parser.feed('d": 2}]}')
+        ['{"id": 2}']
+    """
+
+    def __init__(self, pointer: str = "", decoder: json.JSONDecoder | None = None):
+        """
+        :param str pointer:
+            A JSON pointer like ``'/data/items'`` to the array, or ``''`` when the document is the array itself
+        :param json.JSONDecoder decoder:
+            (optional)
+            Decodes each element, which also finds where the element ends without scanning it separately
+        """
+        self.pointer = pointer
+        self.decoder = decoder
+        self._tokens = _parse_pointer(pointer)
+        self._text = ""
+        # The position in the whole document of the first character still held in _text
+        self._offset = 0
+        # The position in the whole document of the next character to parse
+        self._position = 0
+        # Text before this position in the whole document is no longer needed
+        self._mark = 0
+        self._finished = False
+        self.done = False
+        self._steps = self._parse()
+
+    def feed(self, text: str, final: bool = False) -> list[Any]:
+        """
+        Parse the next piece of the document
+
+        :param str text:
+            The text that follows what has been fed so far
+        :param bool final:
+            Whether this is the end of the document
+        :return:
+            Each element completed by ``text``, in order, as text or decoded by ``decoder``
+        :rtype:
+            list
+        :raises ValueError:
+            When the document isn't valid JSON, has no array at the pointer,
+            or ends before the array does when ``final`` is set
+        """
+        dropped = self._mark - self._offset
+        if dropped > 0:
+            self._text = self._text[dropped:]
+            self._offset = self._mark
+        self._text += text
+        self._finished = final
+
+        elements: list[Any] = []
+        while not self.done:
+            try:
+                element = next(self._steps)
+            except StopIteration:
+                self.done = True
+                break
+            if element is _MORE:
+                break
+            elements.append(element)
+        return elements
+
+    def _error(self, problem: str) -> ValueError:
+        return ValueError(f"{problem} at character {self._position} of the JSON document")
+
+    def _wait(self, mark: int) -> Generator[Any, None, None]:
+        # Ask for more of the document, keeping everything from mark onwards
+        if self._finished:
+            raise self._error("Unexpected end")
+        self._mark = mark
+        yield _MORE
+
+    def _peek(self) -> Generator[Any, None, str]:
+        # The next character that isn't whitespace, without consuming it
+        while True:
+            index = self._position - self._offset
+            index = _WHITESPACE.match(self._text, index).end()  # type: ignore[union-attr]
+            self._position = self._offset + index
+            if index < len(self._text):
+                return self._text[index]
+            yield from self._wait(self._position)
+
+    def _expect(self, character: str) -> Generator[Any, None, None]:
+        if (yield from self._peek()) != character:
+            raise self._error(f"Expected {character!r}")
+        self._position += 1
+
+    def _has_next(self, closing: str, first: bool) -> Generator[Any, None, bool]:
+        # Consume the separator before the next member of an object or array, or the end of it
+        character = yield from self._peek()
+        if character == closing:
+            self._position += 1
+            return False
+        if not first:
+            if character != ",":
+                raise self._error(f"Expected ',' or {closing!r}")
+            self._position += 1
+        return True
+
+    def _scan_value(self, keep: bool) -> Generator[Any, None, str]:
+        """
+        Find the end of the value at the current position and consume it
+
+        :return:
+            The value's text if ``keep`` is set, otherwise ``''`` since the value is dropped as it is scanned
+        """
+        first = yield from self._peek()
+        start = self._position
+        scalar = first not in '{["'
+        # Scalars end at the first delimiter, which may be the first character when a value is missing
+        scan = start if scalar else start + 1
+        in_string = first == '"'
+        depth = 1 if first in "{[" else 0
+
+        while True:
+            text = self._text
+            index = scan - self._offset
+            end = None
+            if scalar:
+                match = _SCALAR_END.search(text, index)
+                if match:
+                    end = match.start()
+                elif self._finished:
+                    end = len(text)
+                index = len(text)
+            else:
+                while end is None:
+                    if in_string:
+                        match = _STRING_REST.match(text, index)
+                        index = match.end()  # type: ignore[union-attr]
+                        if not match.group(1):  # type: ignore[union-attr]
+                            break
+                        in_string = False
+                        if depth == 0:
+                            end = index
+                        continue
+
+                    match = _CONTAINER_TOKENS.search(text, index)
+                    if not match:
+                        index = len(text)
+                        break
+                    index = match.end()
+                    token = text[match.start()]
+                    if token == '"':
+                        if not match.group(1):
+                            in_string = True
+                            break
+                    elif token in "[{":
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if depth == 0:
+                            end = index
+
+            if end is not None:
+                self._position = self._offset + end
+                if end <= start - self._offset:
+                    raise self._error("Expected a value")
+                return text[start - self._offset : end] if keep else ""
+
+            scan = self._offset + index
+            yield from self._wait(start if keep else scan)
+
+    def _decode_value(self) -> Any:
+        # Decode the value at the current position if it is complete, in a single pass, or return _MORE
+        try:
+            value, end = self.decoder.raw_decode(self._text, self._position - self._offset)  # type: ignore[union-attr]
+        except ValueError:
+            return _MORE
+        # A number at the very end of the text so far might continue in the next piece
+        if end >= len(self._text):
+            return _MORE
+        self._position = self._offset + end
+        return value
+
+    def _parse(self) -> Generator[Any, None, None]:
+        for token in self._tokens:
+            character = yield from self._peek()
+            if character == "{":
+                self._position += 1
+                first = True
+                while (yield from self._has_next("}", first)):
+                    first = False
+                    key = json.loads((yield from self._scan_value(keep=True)))
+                    yield from self._expect(":")
+                    if key == token:
+                        break
+                    yield from self._scan_value(keep=False)
+                else:
+                    raise ValueError(f"The JSON document has no value at {self.pointer!r}")
+            elif character == "[" and token.isdigit():
+                self._position += 1
+                for index in range(int(token) + 1):
+                    if not (yield from self._has_next("]", index == 0)):
+                        raise ValueError(f"The JSON document has no value at {self.pointer!r}")
+                    if index < int(token):
+                        yield from self._scan_value(keep=False)
+            else:
+                raise ValueError(f"The JSON document has no value at {self.pointer!r}")
+
+        if (yield from self._peek()) != "[":
+            raise ValueError(f"The value at {self.pointer!r} in the JSON document isn't an array")
+        self._position += 1
+
+        first = True
+        while (yield from self._has_next("]", first)):
+            first = False
+            if self.decoder is None:
+                yield (yield from self._scan_value(keep=True))
+                continue
+
+            # Elements that aren't complete yet, or aren't valid, are scanned before they're decoded
+            yield from self._peek()
+            value = self._decode_value()
+            if value is _MORE:
+                value = self.decoder.decode((yield from self._scan_value(keep=True)))
+            yield value
+
+
+class _ElementReader:
+    """
+    Turns the bytes of a response body into the decoded elements of the array a :class:`JsonArrayParser` finds
+    """
+
+    def __init__(self, parser: JsonArrayParser, encoding: str | None, finish: Callable[[Any], Any] | None = None):
+        self.parser = parser
+        self.finish = finish
+        self._text_decoder = codecs.getincrementaldecoder(encoding or "utf-8")()
+
+    @property
+    def done(self) -> bool:
+        return self.parser.done
+
+    def read(self, chunk: bytes, final: bool = False) -> list[Any]:
+        elements = self.parser.feed(self._text_decoder.decode(chunk, final), final)
+        if self.finish is None:
+            return elements
+        return [self.finish(element) for element in elements]
+
+
+class StreamingJsonEndpoint(JsonEndpoint):
+    """
+    An endpoint that returns a large JSON array, decoded one element at a time as the response arrives
+    """
+
+    streaming = True
+
+    def __init__(
+        self,
+        *args,
+        item_pointer: str = "",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        **kwargs,
+    ):
+        """
+        :param str item_pointer:
+            (Default ``''``)
+            A JSON pointer like ``'/data/items'`` to the array whose elements are yielded.
+            The default is the whole response body.
+        :param int chunk_size:
+            (Default ``65536``)
+            The number of bytes to read from the response at a time
+        :param response_type:
+            (optional)
+            The type to validate each element against and decode it into, like a dataclass
+        """
+        _parse_pointer(item_pointer)
+        super().__init__(*args, **kwargs)
+        self.item_pointer = item_pointer
+        self.chunk_size = chunk_size
+
+    def _get_element_reader(self, encoding: str | None) -> _ElementReader:
+        decoder = self.decoder or decoders.DEFAULT_JSON_DECODER
+        if not isinstance(decoder, decoders.StdlibJsonDecoder):
+            return _ElementReader(JsonArrayParser(self.item_pointer), encoding, self.decode)
+
+        # The standard library decodes each element while finding where it ends
+        object_pairs_hook = collections.OrderedDict if self.preserve_order and self.response_type is None else None
+        parser = JsonArrayParser(self.item_pointer, json.JSONDecoder(object_pairs_hook=object_pairs_hook))
+        if self.response_type is None:
+            return _ElementReader(parser, encoding)
+        return _ElementReader(parser, encoding, functools.partial(decoders.convert, response_type=self.response_type))
+
+    def iter_elements(self, chunks: Iterable[bytes], encoding: str | None = None) -> Iterator[Any]:
+        """
+        Decode the elements of the array from the pieces of a response body
+
+        :param chunks:
+            The response body, a piece at a time
+        :param str encoding:
+            (Default ``'utf-8'``)
+            The character encoding of the body
+        :return:
+            Each element of the array, decoded
+        :rtype:
+            generator
+        :raises ValueError:
+            When the body isn't valid JSON or has no array at ``item_pointer``
+        """
+        reader = self._get_element_reader(encoding)
+        for chunk in chunks:
+            yield from reader.read(chunk)
+            if reader.done:
+                return
+        yield from reader.read(b"", final=True)
+
+    async def aiter_elements(self, chunks: AsyncIterator[bytes], encoding: str | None = None) -> AsyncIterator[Any]:
+        """
+        Decode the elements of the array from the pieces of a response body that arrive asynchronously,
+        like :meth:`iter_elements`
+        """
+        reader = self._get_element_reader(encoding)
+        async for chunk in chunks:
+            for element in reader.read(chunk):
+                yield element
+            if reader.done:
+                return
+        for element in reader.read(b"", final=True):
+            yield element
+
+    def format_response(  # type: ignore[override]
+        self, response, chunk_size: int | None = None
+    ) -> Generator[Any, None, None]:
+        """
+        Decode the elements of the array as the response arrives
+
+        :param requests.Response response:
+            The original response from :mod:`requests`
+        :param int chunk_size:
+            (optional)
+            An override of this endpoint's ``chunk_size`` for this response
+        :return:
+            Each element of the array at ``item_pointer``, decoded by this endpoint's ``decoder``
+        :rtype:
+            generator
+        """
+        return self._iter_response(response, self.chunk_size if chunk_size is None else chunk_size)
+
+    def _iter_response(self, response, chunk_size: int) -> Generator[Any, None, None]:
+        try:
+            yield from self.iter_elements(response.iter_content(chunk_size=chunk_size), response.encoding)
+        finally:
+            response.close()
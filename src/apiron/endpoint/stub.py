@@ -12,8 +12,13 @@ class StubEndpoint(Endpoint):
     """
 
     def __get__(self, instance, owner):
+        if getattr(owner, "asynchronous", False):
+            return self._async_stub_response
         return self.stub_response
 
+    async def _async_stub_response(self, *args, **kwargs):
+        return self.stub_response(*args, **kwargs)
+
     def __init__(self, stub_response: Optional[Any] = None, **kwargs):
         """
         :param stub_response:
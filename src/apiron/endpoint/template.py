@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import re
+import string
+from collections.abc import Callable
+from typing import Any
+from urllib import parse
+
+# Characters allowed unescaped in a path segment, besides letters, digits, and "_.-~" (RFC 3986 "pchar")
+SEGMENT_SAFE_CHARACTERS = "!$&'()*+,;=:@"
+
+_CONVERSIONS: dict[str, Callable[[Any], str]] = {"r": repr, "s": str, "a": ascii}
+
+_is_segment_safe = re.compile(r"(?:[A-Za-z0-9_.~!$&'()*+,;=:@-]|%[0-9A-Fa-f]{2})*").fullmatch
+# Runs of text between the percent-escapes that a value already contains
+_unescaped_text = re.compile(r"(?:[^%]|%(?![0-9A-Fa-f]{2}))+")
+
+
+def quote_segment(text: str) -> str:
+    """
+    Percent-encode ``text`` so that it stays within one path segment,
+    leaving any ``%XX`` escapes it already contains as they are
+
+    :param str text:
+        The text to encode
+    :return:
+        The encoded text
+    :rtype:
+        str
+    """
+    if _is_segment_safe(text):
+        return text
+    return _unescaped_text.sub(lambda match: parse.quote(match.group(), safe=SEGMENT_SAFE_CHARACTERS), text)
+
+
+class PathTemplate:
+    """
+    An endpoint path like ``'/users/{user_id}/posts'``, parsed once so that it can be rendered quickly on every call.
+
+    Values are percent-encoded so that each one stays within its path segment;
+    a value containing ``/``, ``?``, or ``#`` can't change the structure of the URL.
+    Escapes like ``%20`` already in a value are kept rather than encoded twice.
+    Placeholders support the same conversions and format specs as :meth:`str.format`.
+
+    Example:
+
+        >>> template = PathTemplate('/users/{user_id}/posts')
+        >>> template.render({'user_id': 'a b/c'})
+        '/users/a%20b%2Fc/posts'
+        >>> template.render({'user_id': 'a%20b'})
+        '/users/a%20b/posts'
+    """
+
+    __slots__ = ("_fields", "_tail", "path", "placeholder_names", "placeholders")
+
+    def __init__(self, path: str):
+        self.path = path
+
+        fields = []
+        pending_literal = ""
+        for literal, field_name, format_spec, conversion in string.Formatter().parse(path):
+            # Escaped braces split the literal text into several parts without a field
+            pending_literal += literal
+            if field_name is not None:
+                # Plain names with no format spec or conversion take the fast path when rendering
+                simple = field_name.isidentifier() and not format_spec and not conversion
+                fields.append((pending_literal, field_name, simple, format_spec, conversion))
+                pending_literal = ""
+        self._fields = tuple(fields)
+        self._tail = pending_literal
+
+        #: The placeholder names in the order they appear
+        self.placeholders: tuple[str, ...] = tuple(field[1] for field in self._fields if field[1])
+        #: The placeholder names, for fast membership checks
+        self.placeholder_names: frozenset[str] = frozenset(self.placeholders)
+
+    def render(self, values: dict[str, Any], encode: bool = True) -> str:
+        """
+        Fill the placeholders with ``values``
+
+        :param dict values:
+            Placeholder name, value pairs
+        :param bool encode:
+            (Default ``True``)
+            Whether to percent-encode the values, or insert them as they are
+        :return:
+            The rendered path
+        :rtype:
+            str
+        :raises KeyError:
+            When a placeholder has no value
+        """
+        rendered = []
+        for literal, field_name, simple, format_spec, conversion in self._fields:
+            if simple:
+                value = values[field_name]
+                text = value if type(value) is str else str(value)
+            else:
+                text = self._format_field(values, field_name, format_spec, conversion)
+
+            rendered.append(literal)
+            rendered.append(quote_segment(text) if encode else text)
+
+        rendered.append(self._tail)
+        return "".join(rendered)
+
+    @staticmethod
+    def _format_field(values: dict[str, Any], field_name: str, format_spec: str | None, conversion: str | None) -> str:
+        value, _ = string.Formatter().get_field(field_name, (), values)
+        if conversion:
+            value = _CONVERSIONS[conversion](value)
+        return format(value, format_spec or "")
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.path!r})"
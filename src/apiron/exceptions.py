@@ -12,3 +12,31 @@ class UnfulfilledParameterException(APIException):
     def __init__(self, endpoint_path: str, unfulfilled_params: set[str]):
         message = f"The {endpoint_path} endpoint was called without required parameters: {unfulfilled_params}"
         super().__init__(message)
+
+
+class CircuitOpenException(APIException):
+    def __init__(self, service_name: str):
+        message = f"Circuit open for service: {service_name}"
+        super().__init__(message)
+
+
+class ResponseValidationException(APIException):
+    def __init__(self, location: str, problem: str):
+        message = f"Invalid response at {location}: {problem}"
+        super().__init__(message)
+        self.location = location
+        self.problem = problem
+
+
+class RateLimitExceededException(APIException):
+    def __init__(self, service_name: str, retry_after: float):
+        message = f"Rate limit exceeded for service: {service_name}; next request allowed in {retry_after:.3f}s"
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimitExceededException(APIException):
+    def __init__(self, service_name: str, limit: int):
+        message = f"Concurrency limit of {limit} requests in flight reached for service: {service_name}"
+        super().__init__(message)
+        self.limit = limit
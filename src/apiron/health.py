@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+
+from apiron.exceptions import CircuitOpenException
+
+# The probe claimed by the call running in this thread or task, as (circuit breaker, host, whether it probes the circuit)
+_PROBE: contextvars.ContextVar[tuple[CircuitBreaker, str | None, bool] | None] = contextvars.ContextVar(
+    "apiron_circuit_probe", default=None
+)
+
+
+class _HostHealth:
+    def __init__(self):
+        self.consecutive_failures = 0
+        self.ejected_until: float | None = None
+        self.probe_claimed_at: float | None = None
+
+
+class CircuitBreaker:
+    """
+    Tracks the health of a service's hosts and stops calling them when they fail.
+
+    A host that fails ``host_failure_threshold`` times in a row is ejected for ``host_ejection_seconds``
+    and receives no traffic while other hosts are available.
+    Once its ejection ends, the next call is sent to it as a single probe;
+    success restores the host, while failure ejects it again.
+
+    When the service as a whole fails ``failure_threshold`` times in a row, the circuit opens
+    and calls fail fast with :class:`apiron.exceptions.CircuitOpenException` for ``reset_seconds``.
+    After that a single probe call is let through to decide whether to close the circuit again.
+    Only the probe's own outcome decides; requests that were already in flight when the circuit opened
+    or the host was ejected are ignored.
+
+    Declare an instance on a service as its ``circuit_breaker``.
+    A request fails when it raises an error or responds with a server error status.
+    """
+
+    def __init__(
+        self,
+        host_failure_threshold: int = 5,
+        host_ejection_seconds: float = 30,
+        failure_threshold: int = 20,
+        reset_seconds: float = 30,
+    ):
+        """
+        :param int host_failure_threshold:
+            (Default ``5``)
+            The number of consecutive failures after which a host is ejected
+        :param float host_ejection_seconds:
+            (Default ``30``)
+            How long an ejected host receives no traffic before it is probed
+        :param int failure_threshold:
+            (Default ``20``)
+            The number of consecutive failures across all hosts after which the circuit opens
+        :param float reset_seconds:
+            (Default ``30``)
+            How long the circuit stays open before a probe call is allowed
+        """
+        self.host_failure_threshold = host_failure_threshold
+        self.host_ejection_seconds = host_ejection_seconds
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+
+        self.consecutive_failures = 0
+        self.opened_until: float | None = None
+        self._probe_claimed_at: float | None = None
+        self._hosts: dict[str, _HostHealth] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """
+        Whether calls are currently being failed fast
+        """
+        now = time.monotonic()
+        return self.opened_until is not None and (
+            now < self.opened_until or self._is_claimed(self._probe_claimed_at, self.reset_seconds, now)
+        )
+
+    @staticmethod
+    def _is_claimed(claimed_at: float | None, seconds: float, now: float) -> bool:
+        # A claimed probe that never reports back, such as one whose request couldn't be built,
+        # frees the slot again after the same wait as the ejection or open circuit
+        return claimed_at is not None and now < claimed_at + seconds
+
+    def available_hosts(self, service_name: str, hosts: list[str]) -> list[str]:
+        """
+        Filter out the hosts that are currently ejected.
+
+        When the circuit or a host is ready to be probed, the slot is claimed for the calling thread or task,
+        and a recovering host is the only host returned so that the probe is sent to it.
+
+        :param str service_name:
+            The name of the service, for error messages
+        :param list hosts:
+            All the hosts of the service
+        :return:
+            The hosts that may receive the next request
+        :rtype:
+            list
+        :raises apiron.exceptions.CircuitOpenException:
+            When the circuit is open or every host is ejected
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            probes_circuit = False
+            if self.opened_until is not None:
+                if now < self.opened_until or self._is_claimed(self._probe_claimed_at, self.reset_seconds, now):
+                    raise CircuitOpenException(service_name)
+                probes_circuit = True
+
+            available = []
+            probe_host = None
+            for host in hosts:
+                health = self._hosts.get(host)
+                if health is None or health.ejected_until is None:
+                    available.append(host)
+                elif (
+                    probe_host is None
+                    and now >= health.ejected_until
+                    and not self._is_claimed(health.probe_claimed_at, self.host_ejection_seconds, now)
+                ):
+                    probe_host = host
+
+            if probe_host is not None:
+                self._hosts[probe_host].probe_claimed_at = now
+                available = [probe_host]
+            if not available:
+                raise CircuitOpenException(service_name)
+            if probes_circuit:
+                self._probe_claimed_at = now
+
+        # Set on every call so a claim left behind by an earlier attempt in this thread or task isn't reused
+        _PROBE.set((self, probe_host, probes_circuit) if probe_host is not None or probes_circuit else None)
+        return available
+
+    def on_request_start(self, host: str):
+        """
+        Record that a request to ``host`` has been sent
+        """
+
+    def on_request_end(self, host: str, elapsed: float, failed: bool):
+        """
+        Record the outcome of a request to ``host``.
+        While the circuit is open or the host is ejected, only the outcome of the claimed probe counts.
+        """
+        now = time.monotonic()
+
+        probe = _PROBE.get()
+        if probe is not None and probe[0] is self:
+            _PROBE.set(None)
+            _, probe_host, probes_circuit = probe
+        else:
+            probe_host, probes_circuit = None, False
+
+        with self._lock:
+            health = self._hosts.setdefault(host, _HostHealth())
+            if probe_host == host:
+                health.probe_claimed_at = None
+                health.consecutive_failures = 0 if not failed else health.consecutive_failures + 1
+                health.ejected_until = now + self.host_ejection_seconds if failed else None
+            elif health.ejected_until is None:
+                if not failed:
+                    health.consecutive_failures = 0
+                else:
+                    health.consecutive_failures += 1
+                    if health.consecutive_failures >= self.host_failure_threshold:
+                        health.ejected_until = now + self.host_ejection_seconds
+
+            if probes_circuit:
+                self._probe_claimed_at = None
+                self.consecutive_failures = 0 if not failed else self.consecutive_failures + 1
+                self.opened_until = now + self.reset_seconds if failed else None
+            elif self.opened_until is None:
+                if not failed:
+                    self.consecutive_failures = 0
+                else:
+                    self.consecutive_failures += 1
+                    if self.consecutive_failures >= self.failure_threshold:
+                        self.opened_until = now + self.reset_seconds
+
+    def reset(self):
+        """
+        Forget all failures, closing the circuit and restoring every host
+        """
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_until = None
+            self._probe_claimed_at = None
+            self._hosts.clear()
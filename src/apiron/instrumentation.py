@@ -0,0 +1,308 @@
+"""
+Timing events for each phase of a call, for finding where the time goes.
+
+Subscribe a function with :func:`subscribe` and it is passed a :class:`TimingEvent`
+as each phase of every call made through :func:`apiron.client.call` ends:
+
+``start``
+    Sent as the call starts, before any of the others, and always ``0`` seconds long
+``resolve``
+    Choosing a host, including the service's ``get_hosts``, load balancer, and circuit breaker
+``prepare``
+    Building the request: formatting its path and encoding its parameters, headers, and body
+``throttle``
+    Waiting for a token from the rate limiters of the service or endpoint, or for a slot from its concurrency limiter,
+    when the request had to wait
+``connect``
+    Opening a new connection, including the TLS handshake. Reused connections have no ``connect`` phase.
+``first_byte``
+    Waiting for the response's status and headers once the request is sent, less any ``connect`` phase
+``download``
+    Reading the body of a response that isn't streamed
+``format``
+    The endpoint's ``format_response``, such as decoding JSON
+``call``
+    The whole call, from start to finish, whether it returns or raises an exception
+
+A call that fails over or is hedged has a ``resolve``, ``prepare``, and so on for each request it sends.
+Until something subscribes, calls skip timing altogether.
+"""
+
+from __future__ import annotations
+
+import collections
+import contextvars
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from urllib3 import connection, connectionpool
+
+if TYPE_CHECKING:
+    import apiron  # pragma: no cover
+
+LOGGER = logging.getLogger(__name__)
+
+TimingEvent = collections.namedtuple(
+    "TimingEvent",
+    ["phase", "seconds", "service", "path", "method", "host", "attempt", "status_code", "bytes", "error"],
+)
+TimingEvent.__doc__ = """
+How long a phase of a call took
+
+:param str phase:
+    The name of the phase, like ``'connect'``
+:param float seconds:
+    How long the phase took
+:param Service service:
+    The service that was called
+:param str path:
+    The path of the endpoint that was called, before arguments were formatted into it
+:param str method:
+    The HTTP method of the call
+:param str host:
+    The host the request was sent to, once one has been chosen
+:param int attempt:
+    Which attempt at the call the phase was part of, counting from ``1``, when the call fails over
+:param int status_code:
+    The status of the response, once it has arrived
+:param int bytes:
+    The size of the response body, once it has been read
+:param Exception error:
+    The exception the call raised, on the ``call`` event of a call that failed
+"""
+
+_LISTENERS: tuple[Callable[[TimingEvent], Any], ...] = ()
+_LISTENERS_LOCK = threading.Lock()
+
+# The connections opened by the request being sent in this thread or task, as a list of how long each took to open
+_CONNECT_TIMES: contextvars.ContextVar[list[float] | None] = contextvars.ContextVar(
+    "apiron_connect_times", default=None
+)
+
+
+def subscribe(listener: Callable[[TimingEvent], Any]) -> Callable[[], None]:
+    """
+    Call ``listener`` with a :class:`TimingEvent` as each phase of every call ends.
+    Listeners are called while the call is being made, so they should be quick,
+    and may be called from more than one thread at once when calls are made concurrently or hedged.
+    An exception a listener raises is logged rather than failing the call.
+
+    :param listener:
+        The function to call with each event
+    :return:
+        A function that unsubscribes ``listener``
+    :rtype:
+        callable
+    """
+    global _LISTENERS
+
+    with _LISTENERS_LOCK:
+        _LISTENERS = (*_LISTENERS, listener)
+    return lambda: unsubscribe(listener)
+
+
+def unsubscribe(listener: Callable[[TimingEvent], Any]):
+    """
+    Stop calling a ``listener`` that was subscribed with :func:`subscribe`
+
+    :param listener:
+        The function to stop calling
+    """
+    global _LISTENERS
+
+    with _LISTENERS_LOCK:
+        listeners = list(_LISTENERS)
+        if listener in listeners:
+            listeners.remove(listener)
+        _LISTENERS = tuple(listeners)
+
+
+def start_call(service: apiron.Service, endpoint: apiron.Endpoint, method: str) -> CallTimer | None:
+    """
+    Start timing a call
+
+    :return:
+        A timer for the call, or ``None`` when nothing is subscribed
+    :rtype:
+        CallTimer
+    """
+    listeners = _LISTENERS
+    if not listeners:
+        return None
+    timer = CallTimer(listeners, service, endpoint.path, method)
+    timer.emit("start", 0.0)
+    return timer
+
+
+class CallTimer:
+    """
+    Times the phases of a single call and sends an event to each listener as each one ends
+    """
+
+    def __init__(
+        self,
+        listeners: tuple[Callable[[TimingEvent], Any], ...],
+        service: apiron.Service,
+        path: str,
+        method: str,
+    ):
+        self.listeners = listeners
+        self.service = service
+        self.path = path
+        self.method = method
+        self.attempt = 1
+        self.host: str | None = None
+        self.started_at = time.perf_counter()
+        self._lap_started_at = self.started_at
+
+    def emit(
+        self,
+        phase: str,
+        seconds: float,
+        host: str | None = None,
+        status_code: int | None = None,
+        bytes: int | None = None,
+        error: Exception | None = None,
+    ):
+        """
+        Send an event for a phase of the call to each listener
+        """
+        event = TimingEvent(
+            phase, seconds, self.service, self.path, self.method, host, self.attempt, status_code, bytes, error
+        )
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception:
+                LOGGER.exception("Timing listener %r failed", listener)
+
+    def start_lap(self):
+        """
+        Start timing the next phase
+        """
+        self._lap_started_at = time.perf_counter()
+
+    def lap(self, phase: str, **fields):
+        """
+        End the current phase, and start the next one
+        """
+        now = time.perf_counter()
+        self.host = fields.get("host", self.host)
+        self.emit(phase, now - self._lap_started_at, **fields)
+        self._lap_started_at = now
+
+    def send(self, send: Callable[[], Any], host: str, stream: bool = False) -> Any:
+        """
+        Send a request with ``send``, timing its ``connect``, ``first_byte``, and ``download`` phases
+
+        :param send:
+            A function that sends the request and returns the response
+        :param str host:
+            The host the request is sent to
+        :param bool stream:
+            Whether the body of the response is left unread, so there is no ``download`` phase
+        :return:
+            The response
+        :rtype:
+            requests.Response
+        """
+        connect_times: list[float] = []
+        token = _CONNECT_TIMES.set(connect_times)
+        start = time.perf_counter()
+        try:
+            response = send()
+        finally:
+            _CONNECT_TIMES.reset(token)
+            for seconds in connect_times:
+                self.emit("connect", seconds, host=host)
+        total = time.perf_counter() - start
+
+        # requests times a response until its headers arrive, which is before it reads the body
+        elapsed = response.elapsed.total_seconds()
+        self.emit("first_byte", max(elapsed - sum(connect_times), 0), host=host, status_code=response.status_code)
+        if not stream:
+            self.emit(
+                "download",
+                max(total - elapsed, 0),
+                host=host,
+                status_code=response.status_code,
+                bytes=len(response.content),
+            )
+        return response
+
+    def finish(self, format_response: Callable[[], Any], host: str | None, status_code: int) -> Any:
+        """
+        Format the response with ``format_response``, timing the ``format`` phase and then the whole ``call``.
+        When formatting raises an exception, like the one for an error status, only the ``format`` phase is timed,
+        and the call is expected to :meth:`fail`.
+
+        :return:
+            The formatted response
+        """
+        start = time.perf_counter()
+        try:
+            result = format_response()
+        finally:
+            end = time.perf_counter()
+            self.emit("format", end - start, host=host, status_code=status_code)
+        self.emit("call", end - self.started_at, host=host, status_code=status_code)
+        return result
+
+    def fail(self, exception: Exception):
+        """
+        Time the whole ``call`` when it raises an exception
+
+        :param Exception exception:
+            The exception the call raised
+        """
+        response = getattr(exception, "response", None)
+        self.emit(
+            "call",
+            time.perf_counter() - self.started_at,
+            host=self.host,
+            status_code=getattr(response, "status_code", None),
+            error=exception,
+        )
+
+
+class _TimedConnectionMixin(connection.HTTPConnection):
+    def connect(self):
+        connect_times = _CONNECT_TIMES.get()
+        if connect_times is None:
+            return super().connect()
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            connect_times.append(time.perf_counter() - start)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, connection.HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, connection.HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(connectionpool.HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(connectionpool.HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+def time_connections(adapter: Any):
+    """
+    Have ``adapter`` open its connections so that calls can time the ``connect`` phase
+
+    :param requests.adapters.HTTPAdapter adapter:
+        An adapter whose connection pools haven't been created yet
+    """
+    pool_manager = getattr(adapter, "poolmanager", None)
+    if pool_manager is not None:
+        pool_manager.pool_classes_by_scheme = {"http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool}
@@ -0,0 +1,319 @@
+"""
+Request counts, error counts, latency histograms, and in-flight gauges for every endpoint that is called.
+
+A :class:`MetricsRegistry` subscribes to the timing events of :mod:`apiron.instrumentation`
+and keeps a series for each service, endpoint, method, and class of response status,
+in memory that stays the same size however many calls are made.
+Its metrics can be exported in the Prometheus text format or as a snapshot of plain data.
+"""
+
+from __future__ import annotations
+
+import bisect
+import collections
+import itertools
+import threading
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from apiron import instrumentation
+
+#: Upper bounds of latency buckets, in seconds, from a few milliseconds to the default read timeout and beyond
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, 30.0)
+
+#: The quantiles included in snapshots
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+SeriesKey = collections.namedtuple("SeriesKey", ["service", "endpoint", "method", "status"])
+
+
+class Histogram:
+    """
+    Counts observations in fixed buckets, so it takes the same memory however many values it sees.
+    Quantiles are estimated from the buckets, so they are only as precise as the buckets are narrow.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        """
+        :param buckets:
+            (Default :data:`DEFAULT_BUCKETS`)
+            The upper bound of each bucket. Values above the largest are counted in one more, unbounded, bucket.
+        """
+        self.buckets = tuple(sorted(buckets))
+        if not self.buckets:
+            raise ValueError("A histogram needs at least one bucket")
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """
+        Count a value in the bucket it falls in
+
+        :param float value:
+            The value, like a latency in seconds
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def get_counts(self) -> tuple[list[int], float]:
+        """
+        :return:
+            The number of values in each bucket, including the unbounded one, and the sum of all values
+        :rtype:
+            tuple
+        """
+        with self._lock:
+            return list(self._counts), self._sum
+
+    @property
+    def count(self) -> int:
+        """
+        The number of values observed
+        """
+        return sum(self.get_counts()[0])
+
+    def get_quantile(self, quantile: float) -> float | None:
+        """
+        Estimate a quantile of the observed values, interpolating linearly within the bucket it falls in
+        as Prometheus's ``histogram_quantile`` does
+
+        :param float quantile:
+            The quantile, from ``0`` to ``1``, like ``0.99`` for the 99th percentile
+        :return:
+            The estimate, or ``None`` if no values have been observed.
+            A quantile in the unbounded bucket is estimated as the largest bucket's upper bound.
+        :rtype:
+            float
+        """
+        return _get_quantile(self.buckets, self.get_counts()[0], quantile)
+
+
+def _get_quantile(buckets: tuple[float, ...], counts: list[int], quantile: float) -> float | None:
+    if not 0 <= quantile <= 1:
+        raise ValueError(f"quantile must be between 0 and 1, not {quantile}")
+    total = sum(counts)
+    if not total:
+        return None
+    rank = quantile * total
+    seen = 0
+    for index, count in enumerate(counts):
+        if count and seen + count >= rank:
+            if index == len(buckets):
+                return buckets[-1]
+            lower = buckets[index - 1] if index else 0.0
+            return lower + (buckets[index] - lower) * (rank - seen) / count
+        seen += count
+    return buckets[-1]  # pragma: no cover
+
+
+class _CallStats(Histogram):
+    """
+    The latencies of the calls in a series, and how many of them raised an exception
+    """
+
+    def __init__(self, buckets: Iterable[float]):
+        super().__init__(buckets)
+        self.errors = 0
+
+    def observe_call(self, seconds: float, failed: bool):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += seconds
+            self.errors += failed
+
+
+class _Gauge:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def add(self, amount: int):
+        with self._lock:
+            self.value += amount
+
+
+def get_status_class(status_code: int | None) -> str:
+    """
+    :param int status_code:
+        The status of a response, or ``None`` for a call that failed before one arrived
+    :return:
+        The class of the status, like ``'2xx'``, or ``'error'`` when there is no status
+    :rtype:
+        str
+    """
+    return "error" if status_code is None else f"{status_code // 100}xx"
+
+
+def _get_service_name(service: Any) -> str:
+    # Services are usually called as classes, but instances of them can be called too
+    return getattr(service, "__name__", None) or type(service).__name__
+
+
+class MetricsRegistry:
+    """
+    Keeps metrics about calls from the timing events they send:
+
+    - the number of calls, and the number of those that raised an exception,
+      for each service, endpoint path, method, and class of response status, like ``'2xx'``.
+      Calls that failed before a response arrived, like those that couldn't connect, have a status of ``'error'``.
+    - a histogram of the latency of those calls
+    - the number of calls in flight for each service, endpoint path, and method
+
+    Create one and :meth:`subscribe` it to start collecting metrics.
+    """
+
+    def __init__(
+        self,
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+        namespace: str = "apiron",
+        quantiles: Iterable[float] = DEFAULT_QUANTILES,
+    ):
+        """
+        :param buckets:
+            (Default :data:`DEFAULT_BUCKETS`)
+            The upper bounds of the latency histogram buckets, in seconds
+        :param str namespace:
+            (Default ``'apiron'``)
+            The prefix of the name of each Prometheus metric
+        :param quantiles:
+            (Default :data:`DEFAULT_QUANTILES`)
+            The quantiles of latency to estimate in snapshots
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.namespace = namespace
+        self.quantiles = tuple(quantiles)
+        self._calls: dict[SeriesKey, _CallStats] = {}
+        self._in_flight: dict[tuple[str, str, str], _Gauge] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> Callable[[], None]:
+        """
+        Start collecting metrics from every call
+
+        :return:
+            A function that stops collecting them
+        :rtype:
+            callable
+        """
+        return instrumentation.subscribe(self.record)
+
+    def record(self, event: instrumentation.TimingEvent):
+        """
+        Update the metrics with a timing event.
+        Only ``start`` and ``call`` events are counted; the other phases are ignored.
+
+        :param TimingEvent event:
+            The event
+        """
+        if event.phase not in ("start", "call"):
+            return
+        service = _get_service_name(event.service)
+        key = (service, event.path, event.method)
+        gauge = self._in_flight.get(key)
+        if gauge is None:
+            with self._lock:
+                gauge = self._in_flight.setdefault(key, _Gauge())
+        if event.phase == "start":
+            gauge.add(1)
+            return
+
+        gauge.add(-1)
+        series_key = SeriesKey(*key, get_status_class(event.status_code))
+        stats = self._calls.get(series_key)
+        if stats is None:
+            with self._lock:
+                stats = self._calls.setdefault(series_key, _CallStats(self.buckets))
+        stats.observe_call(event.seconds, event.error is not None)
+
+    def _get_series(self) -> list[tuple[SeriesKey, _CallStats]]:
+        with self._lock:
+            return sorted(self._calls.items())
+
+    def _get_in_flight(self) -> list[tuple[tuple[str, str, str], _Gauge]]:
+        with self._lock:
+            return sorted(self._in_flight.items())
+
+    def snapshot(self) -> dict[str, list[dict[str, Any]]]:
+        """
+        The current metrics as plain data, to log or serve as JSON
+
+        :return:
+            A dictionary with a list of ``'calls'``, one for each series,
+            with its labels, ``count``, ``errors``, latency ``sum``, cumulative ``buckets``,
+            and estimated latency ``quantiles``, and a list of ``'in_flight'`` gauges with their labels and ``value``
+        :rtype:
+            dict
+        """
+        calls = []
+        for key, stats in self._get_series():
+            counts, total = stats.get_counts()
+            calls.append(
+                {
+                    **key._asdict(),
+                    "count": sum(counts),
+                    "errors": stats.errors,
+                    "sum": total,
+                    "buckets": dict(zip([*self.buckets, float("inf")], itertools.accumulate(counts))),
+                    "quantiles": {
+                        quantile: _get_quantile(self.buckets, counts, quantile) for quantile in self.quantiles
+                    },
+                }
+            )
+        in_flight = [
+            {"service": service, "endpoint": endpoint, "method": method, "value": gauge.value}
+            for (service, endpoint, method), gauge in self._get_in_flight()
+        ]
+        return {"calls": calls, "in_flight": in_flight}
+
+    def to_prometheus(self) -> str:
+        """
+        The current metrics in the Prometheus text exposition format, to serve from a ``/metrics`` endpoint
+
+        :rtype:
+            str
+        """
+        name = self.namespace
+        lines = [
+            f"# HELP {name}_requests_total Calls made to an endpoint, by the class of response status",
+            f"# TYPE {name}_requests_total counter",
+        ]
+        series = [(_format_labels(key._asdict()), stats, *stats.get_counts()) for key, stats in self._get_series()]
+        lines += [f"{name}_requests_total{{{labels}}} {sum(counts)}" for labels, _, counts, _ in series]
+        lines += [
+            f"# HELP {name}_request_errors_total Calls made to an endpoint that raised an exception",
+            f"# TYPE {name}_request_errors_total counter",
+        ]
+        lines += [f"{name}_request_errors_total{{{labels}}} {stats.errors}" for labels, stats, _, _ in series]
+        lines += [
+            f"# HELP {name}_request_duration_seconds How long calls made to an endpoint took",
+            f"# TYPE {name}_request_duration_seconds histogram",
+        ]
+        for labels, _, counts, total in series:
+            for bound, count in zip([*self.buckets, float("inf")], itertools.accumulate(counts)):
+                lines.append(f'{name}_request_duration_seconds_bucket{{{labels},le="{_format_value(bound)}"}} {count}')
+            lines.append(f"{name}_request_duration_seconds_sum{{{labels}}} {_format_value(total)}")
+            lines.append(f"{name}_request_duration_seconds_count{{{labels}}} {sum(counts)}")
+        lines += [
+            f"# HELP {name}_requests_in_flight Calls to an endpoint that haven't finished",
+            f"# TYPE {name}_requests_in_flight gauge",
+        ]
+        for (service, endpoint, method), gauge in self._get_in_flight():
+            labels = _format_labels({"service": service, "endpoint": endpoint, "method": method})
+            lines.append(f"{name}_requests_in_flight{{{labels}}} {gauge.value}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
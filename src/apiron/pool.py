@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import functools
+import os
+import sys
+import threading
+import time
+import weakref
+from collections.abc import Hashable
+from http import cookiejar
+from typing import TYPE_CHECKING, Any
+
+import requests
+from requests import adapters
+from urllib3.util import retry
+
+from apiron import instrumentation
+
+if TYPE_CHECKING:  # pragma: no cover
+    if sys.version_info >= (3, 11):
+        from typing import Self
+    else:
+        from typing_extensions import Self
+
+    import apiron
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_IDLE_TIMEOUT = 60
+
+
+def _create_session() -> requests.Session:
+    session = requests.Session()
+    # Shared sessions are used by many unrelated calls, so they must never carry cookies between them
+    session.cookies = requests.cookies.RequestsCookieJar(policy=cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return frozenset((key, _freeze(item)) for key, item in value.items())
+    return value
+
+
+def _retry_spec_key(retry_spec: retry.Retry) -> Hashable:
+    """
+    Identifies a retry spec by its settings rather than by object identity,
+    so that equal specs created for each call share one adapter and its connections
+    """
+    return (
+        type(retry_spec),
+        tuple(sorted((name, _freeze(value)) for name, value in vars(retry_spec).items() if name != "history")),
+    )
+
+
+def _reset_after_fork(pool_reference: weakref.ReferenceType[SessionPool]):
+    session_pool = pool_reference()
+    if session_pool is not None:
+        session_pool._reset_after_fork()
+
+
+class _PoolEntry:
+    def __init__(self, session: requests.Session):
+        self.session = session
+        self.last_used = time.monotonic()
+
+    def is_in_use(self) -> bool:
+        """
+        Whether any of the session's connections are checked out,
+        like one still reading a streamed response after the call that sent its request has returned
+        """
+        for adapter in self.session.adapters.values():
+            if not isinstance(adapter, adapters.HTTPAdapter):
+                continue
+            for pool_manager in (adapter.poolmanager, *adapter.proxy_manager.values()):
+                # The container of connection pools refuses to be iterated, but lists its keys
+                for key in pool_manager.pools.keys():  # noqa: SIM118
+                    connection_pool = pool_manager.pools.get(key)
+                    # A connection pool's queue is full of idle connections or placeholders until one is checked out
+                    queue = getattr(connection_pool, "pool", None)
+                    if queue is not None and queue.qsize() < queue.maxsize:
+                        return True
+        return False
+
+
+class SessionPool:
+    """
+    A process-wide store of long-lived :class:`requests.Session` objects, one per service and retry spec.
+
+    Each session keeps a urllib3 connection pool per host,
+    so repeated calls to the same service reuse keep-alive connections
+    instead of paying for a new TCP and TLS handshake every time.
+    Pooled sessions refuse to store cookies, so no state leaks from one call to the next;
+    pass your own ``session`` to a call when cookies need to persist.
+
+    Each session has a single adapter for its retry spec mounted when it is created,
+    so concurrent calls with different retry specs never change the adapter another call is using.
+    Sessions that go unused for longer than ``idle_timeout`` are closed and evicted,
+    unless a connection is still checked out of them, like one streaming a long response.
+    The pool starts over in the child when the process forks
+    so that sockets are never shared between processes.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        idle_timeout: float | None = DEFAULT_IDLE_TIMEOUT,
+    ):
+        """
+        :param int pool_connections:
+            (Default ``10``)
+            The number of per-host connection pools to cache in each session
+        :param int pool_maxsize:
+            (Default ``10``)
+            The maximum number of connections to keep alive for each host
+        :param float idle_timeout:
+            (Default ``60``)
+            The number of seconds a session may go unused before it is closed.
+            ``None`` keeps sessions open until the pool is closed.
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.idle_timeout = idle_timeout
+        self._entries: dict[Any, _PoolEntry] = {}
+        self._lock = threading.Lock()
+
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=functools.partial(_reset_after_fork, weakref.ref(self)))
+
+    def get_session(
+        self,
+        service: apiron.Service | type[apiron.Service],
+        retry_spec: retry.Retry,
+        pool_maxsize: int | None = None,
+        pool_block: bool = False,
+    ) -> requests.Session:
+        """
+        Get the pooled session for a service, creating it if necessary
+
+        :param Service service:
+            The service being called
+        :param urllib3.util.retry.Retry retry_spec:
+            The retry behavior the session's adapter should use
+        :param int pool_maxsize:
+            (optional)
+            The maximum number of connections to keep alive for each host,
+            for callers that need a different size than the pool's ``pool_maxsize``
+        :param bool pool_block:
+            (Default ``False``)
+            Whether to wait for a free connection rather than open more than ``pool_maxsize`` at once
+        :return:
+            A session with an adapter for ``retry_spec`` mounted
+        :rtype:
+            requests.Session
+        """
+        now = time.monotonic()
+        pool_maxsize = pool_maxsize or self.pool_maxsize
+        key = (service, _retry_spec_key(retry_spec), pool_maxsize, pool_block)
+
+        with self._lock:
+            self._evict_idle(now)
+
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _PoolEntry(self._create_session(retry_spec, pool_maxsize, pool_block))
+
+            entry.last_used = now
+            return entry.session
+
+    def _create_session(self, retry_spec: retry.Retry, pool_maxsize: int, pool_block: bool) -> requests.Session:
+        session = _create_session()
+        adapter = adapters.HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=retry_spec,
+        )
+        instrumentation.time_connections(adapter)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _reset_after_fork(self):
+        # The parent process still owns these sockets, so drop them without closing.
+        # Another thread may have held the lock when the process forked, so it is replaced rather than acquired.
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def _evict_idle(self, now: float):
+        if self.idle_timeout is None:
+            return
+
+        idle_keys = [
+            key
+            for key, entry in self._entries.items()
+            if now - entry.last_used > self.idle_timeout and not entry.is_in_use()
+        ]
+        for key in idle_keys:
+            self._close_entry(self._entries.pop(key))
+
+    @staticmethod
+    def _close_entry(entry: _PoolEntry):
+        entry.session.close()
+
+    def close(self):
+        """
+        Close every pooled session and the connections they hold
+        """
+        with self._lock:
+            entries, self._entries = self._entries, {}
+
+        for entry in entries.values():
+            self._close_entry(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+DEFAULT_SESSION_POOL = SessionPool()
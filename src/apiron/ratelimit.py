@@ -0,0 +1,262 @@
+"""
+Client-side rate limits, so calls stay within the quotas that upstream services enforce
+rather than finding them with bursts of ``429 Too Many Requests``.
+
+A :class:`RateLimiter` on a service or endpoint is a token bucket:
+``burst`` requests can be sent at once, and the bucket refills at ``rate`` requests a second.
+Its state is a single timestamp, which threads share in memory
+or processes on the same machine share in a small file, like the workers of a web server.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import os
+import struct
+import threading
+import time
+from collections.abc import Callable, Mapping
+from typing import Any
+
+from apiron.exceptions import RateLimitExceededException
+
+#: The response statuses whose ``Retry-After`` header pauses a rate limiter
+RETRY_AFTER_STATUSES = frozenset({429, 503})
+
+_TIMESTAMP = struct.Struct("d")
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    :param str value:
+        The value of a ``Retry-After`` header: a number of seconds, or an HTTP date
+    :return:
+        The number of seconds from now to wait, or ``None`` if the value is missing or invalid
+    :rtype:
+        float
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at - time.time(), 0.0)
+
+
+class _LocalState:
+    """
+    A rate limiter's timestamp, shared by the threads of this process
+    """
+
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self):
+        self._value = float("-inf")
+        self._lock = threading.Lock()
+
+    def update(self, update: Callable[[float, float], tuple[float, Any]]) -> Any:
+        with self._lock:
+            self._value, result = update(self._value, self.clock())
+            return result
+
+
+class _FileState:
+    """
+    A rate limiter's timestamp, shared by every process on the machine that opens the same file.
+    Updates hold an exclusive lock on the file, and a thread lock, since the file lock is shared by a process's threads.
+    """
+
+    # The monotonic clock of one process can't be compared with another's
+    clock = staticmethod(time.time)
+
+    def __init__(self, path: str | os.PathLike):
+        # Fail when the limiter is declared on a platform without file locks, rather than on its first call
+        import fcntl  # noqa: F401
+
+        self.path = os.fspath(path)
+        self._fd: int | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> int:
+        # A file opened before a fork shares its lock with the parent, so each process opens its own
+        fd = self._fd
+        if fd is None or self._pid != os.getpid():
+            fd = self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return fd
+
+    def update(self, update: Callable[[float, float], tuple[float, Any]]) -> Any:
+        import fcntl
+
+        with self._lock:
+            fd = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                data = os.pread(fd, _TIMESTAMP.size, 0)
+                value = _TIMESTAMP.unpack(data)[0] if len(data) == _TIMESTAMP.size else float("-inf")
+                value, result = update(value, self.clock())
+                os.pwrite(fd, _TIMESTAMP.pack(value), 0)
+                return result
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class RateLimiter:
+    """
+    Limits the rate of requests to a service or endpoint with a token bucket.
+
+    Each request takes a token, and a request that finds the bucket empty waits for the next token,
+    up to ``max_wait`` seconds, after which it fails with :class:`apiron.exceptions.RateLimitExceededException`.
+    Requests wait in the order they arrive, without polling: each reserves the next token and sleeps until it is due.
+    A ``429 Too Many Requests`` or ``503 Service Unavailable`` response with a ``Retry-After`` header
+    empties the bucket until that time, so that no requests are sent before the service is ready for them.
+
+    Declare an instance on a service as its ``rate_limiter``, or pass one to an endpoint;
+    a call to an endpoint that has its own limiter and is on a service with one must get a token from each.
+    Every request counts, including those that fail over to another host or hedge a slow one.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int | None = None,
+        max_wait: float | None = None,
+        path: str | os.PathLike | None = None,
+    ):
+        """
+        :param float rate:
+            The number of requests a second to allow, on average
+        :param int burst:
+            (optional)
+            The number of requests that can be sent at once after a quiet period.
+            (Default is one second's worth of requests, and at least ``1``)
+        :param float max_wait:
+            (optional)
+            The longest a request waits for a token before failing, or ``0`` to fail straight away.
+            (Default ``None``, which waits as long as it takes)
+        :param path:
+            (optional)
+            A file to keep the state of the limiter in, shared by every process on the machine that uses the same path,
+            rather than in the memory of this process. Requires :mod:`fcntl`, which is available on Unix.
+            (Default ``None``)
+        """
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, not {rate}")
+        self.rate = rate
+        self.burst = max(int(rate), 1) if burst is None else burst
+        if self.burst < 1:
+            raise ValueError(f"burst must be at least 1, not {burst}")
+        self.max_wait = max_wait
+        self.path = path
+
+        self._interval = 1 / rate
+        # How far ahead of the current time the bucket's timestamp can run before it is empty
+        self._tolerance = (self.burst - 1) * self._interval
+        self._state: _LocalState | _FileState = _LocalState() if path is None else _FileState(path)
+
+    def reserve(self, max_wait: float | None = None) -> float | None:
+        """
+        Take the next token, which may not be due yet
+
+        :param float max_wait:
+            (optional)
+            The longest the caller is willing to wait for the token.
+            (Default ``None``, which reserves a token however long it takes)
+        :return:
+            The number of seconds until the token is due, which the caller must wait before sending its request,
+            or ``None`` if the token isn't due within ``max_wait`` seconds, in which case no token is taken
+        :rtype:
+            float
+        """
+
+        def take(theoretical_arrival: float, now: float) -> tuple[float, float | None]:
+            # The generic cell rate algorithm: the bucket is a single timestamp that each token moves ahead
+            theoretical_arrival = max(theoretical_arrival, now)
+            wait = max(theoretical_arrival - self._tolerance - now, 0.0)
+            if max_wait is not None and wait > max_wait:
+                return theoretical_arrival, None
+            return theoretical_arrival + self._interval, wait
+
+        return self._state.update(take)
+
+    def get_wait(self) -> float:
+        """
+        :return:
+            The number of seconds until the next token is due, without taking it
+        :rtype:
+            float
+        """
+        return self._state.update(
+            lambda theoretical_arrival, now: (
+                theoretical_arrival,
+                max(theoretical_arrival - self._tolerance - now, 0.0),
+            )
+        )
+
+    def acquire(self, service_name: str = "") -> float:
+        """
+        Wait for a token
+
+        :param str service_name:
+            (optional)
+            The name of the service being called, for error messages
+        :return:
+            The number of seconds waited
+        :rtype:
+            float
+        :raises apiron.exceptions.RateLimitExceededException:
+            When no token is due within ``max_wait`` seconds
+        """
+        wait = self.reserve(self.max_wait)
+        if wait is None:
+            raise RateLimitExceededException(service_name, self.get_wait())
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, service_name: str = "") -> float:
+        """
+        Wait for a token without blocking the event loop, like :meth:`acquire`
+        """
+        wait = self.reserve(self.max_wait)
+        if wait is None:
+            raise RateLimitExceededException(service_name, self.get_wait())
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float):
+        """
+        Empty the bucket until ``seconds`` from now, so no request is sent before then
+
+        :param float seconds:
+            How long to send no requests for
+        """
+
+        def empty(theoretical_arrival: float, now: float) -> tuple[float, None]:
+            return max(theoretical_arrival, now + seconds + self._tolerance), None
+
+        self._state.update(empty)
+
+    def on_response(self, status_code: int, headers: Mapping[str, str]):
+        """
+        Pause for as long as a response's ``Retry-After`` header asks, if it is a response to too many requests
+
+        :param int status_code:
+            The status of the response
+        :param headers:
+            The headers of the response
+        """
+        if status_code in RETRY_AFTER_STATUSES:
+            seconds = parse_retry_after(headers.get("Retry-After"))
+            if seconds:
+                self.pause(seconds)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(rate={self.rate}, burst={self.burst}, max_wait={self.max_wait})"
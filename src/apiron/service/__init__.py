@@ -1,4 +1,4 @@
 from apiron.service.base import Service, ServiceBase
-from apiron.service.discoverable import DiscoverableService
+from apiron.service.discoverable import DiscoverableService, HostCache
 
-__all__ = ["Service", "ServiceBase", "DiscoverableService"]
+__all__ = ["Service", "ServiceBase", "DiscoverableService", "HostCache"]
@@ -1,9 +1,26 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
 from typing import Any
 
 from apiron import Endpoint
+from apiron.balancing import LoadBalancer
+from apiron.concurrency import ConcurrencyLimiter
+from apiron.health import CircuitBreaker
+from apiron.ratelimit import RateLimiter
 
 
 class ServiceMeta(type):
+    def __init__(cls, name, bases, namespace, **kwargs):
+        super().__init__(name, bases, namespace, **kwargs)
+
+        # Bind the endpoints of the service and its bases up front, so that calls never pay for it
+        cls._bound_callers: dict[Endpoint, tuple[bool, Any]] = {}
+        for klass in reversed(cls.__mro__):
+            for attr in vars(klass).values():
+                if isinstance(attr, Endpoint):
+                    attr.__get__(None, cls)
+
     @property
     def required_headers(cls) -> dict[str, str]:
         return cls().required_headers
@@ -23,6 +40,12 @@ class ServiceBase(metaclass=ServiceMeta):
     required_headers: dict[str, Any] = {}
     auth = ()
     proxies: dict[str, str] = {}
+    asynchronous: bool = False
+    load_balancer: LoadBalancer | None = None
+    circuit_breaker: CircuitBreaker | None = None
+    rate_limiter: RateLimiter | None = None
+    concurrency_limiter: ConcurrencyLimiter | None = None
+    accept_encoding: str | Iterable[str] | None = None
 
     @classmethod
     def get_hosts(cls) -> list[str]:
@@ -43,6 +66,11 @@ class Service(ServiceBase):
     A base class for low-level services.
 
     A service has a domain off of which one or more endpoints stem.
+    Set ``asynchronous = True`` to make its endpoints awaitable through :func:`apiron.aio.call`.
+    Set ``accept_encoding`` to the content codings to accept compressed responses in, like ``('zstd', 'br', 'gzip')``.
+    Set ``rate_limiter`` to a :class:`apiron.ratelimit.RateLimiter` to stay within the service's quota of requests.
+    Set ``concurrency_limiter`` to a :class:`apiron.concurrency.ConcurrencyLimiter`
+    to keep the requests in flight to as many as the service can take.
     """
 
     domain: str
@@ -1,27 +1,176 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Callable
 from typing import Protocol
 
 from apiron.service.base import ServiceBase
 
+LOGGER = logging.getLogger(__name__)
+
 
 class Resolver(Protocol):
     @staticmethod
     def resolve(service_name: str) -> list[str]: ...
 
 
+class HostCache:
+    """
+    Caches the hosts returned by a resolver for a limited time.
+
+    Fresh results are served for ``ttl`` seconds.
+    For a further ``stale_ttl`` seconds the stale hosts are still served
+    while a background thread asks the resolver for new ones.
+    Empty results are cached for ``negative_ttl`` seconds
+    so that an unresolvable service does not hit the resolver on every call.
+    """
+
+    def __init__(
+        self,
+        resolve: Callable[[], list[str]],
+        ttl: float,
+        stale_ttl: float = 0,
+        negative_ttl: float = 0,
+    ):
+        self.resolve = resolve
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+
+        self._hosts: list[str] | None = None
+        self._resolved_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._resolve_lock = threading.Lock()
+
+    def get_hosts(self) -> list[str]:
+        """
+        The cached hosts, resolving them first if the cache is empty or expired
+
+        :return:
+            The hostname strings from the most recent resolution
+        :rtype:
+            list
+        """
+        with self._lock:
+            hosts = self._get_cached_hosts(time.monotonic())
+        if hosts is not None:
+            return hosts
+
+        with self._resolve_lock:
+            # Another thread may have resolved the hosts while this one waited
+            with self._lock:
+                hosts = self._get_cached_hosts(time.monotonic(), count_miss=True)
+            if hosts is not None:
+                return hosts
+
+            return self._store(self.resolve())
+
+    def _get_cached_hosts(self, now: float, count_miss: bool = False) -> list[str] | None:
+        if self._hosts is not None:
+            age = now - self._resolved_at
+
+            if not self._hosts:
+                if age < self.negative_ttl:
+                    self.hits += 1
+                    self.negative_hits += 1
+                    return self._hosts
+            elif age < self.ttl:
+                self.hits += 1
+                return self._hosts
+            elif age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh, daemon=True).start()
+                return self._hosts
+
+        if count_miss:
+            self.misses += 1
+        return None
+
+    def _store(self, hosts: list[str]) -> list[str]:
+        with self._lock:
+            self._hosts = hosts
+            self._resolved_at = time.monotonic()
+        return hosts
+
+    def _refresh(self):
+        try:
+            with self._resolve_lock:
+                self._store(self.resolve())
+        except Exception:
+            LOGGER.exception("Refreshing hosts failed; stale hosts will be served until they expire")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def clear(self):
+        """
+        Forget the cached hosts so that the next lookup asks the resolver again
+        """
+        with self._lock:
+            self._hosts = None
+
+
 class DiscoverableService(ServiceBase):
     """
     A Service whose hosts are determined via a host resolver.
     A host resolver is any class with a :func:`resolve` method
     that takes a service name as its sole argument
     and returns a list of host names that correspond to that service.
+
+    Set ``host_cache_ttl`` to cache resolved hosts for that many seconds
+    instead of asking the resolver on every call.
+    ``host_cache_stale_ttl`` and ``host_cache_negative_ttl`` tune the cache further; see :class:`HostCache`.
     """
 
     host_resolver_class: type[Resolver]
     service_name: str
 
+    host_cache_ttl: float | None = None
+    host_cache_stale_ttl: float = 0
+    host_cache_negative_ttl: float = 0
+
+    # Set on each class by get_host_cache, never inherited
+    _host_cache: HostCache
+    _host_cache_lock = threading.Lock()
+
     @classmethod
     def get_hosts(cls) -> list[str]:
-        return cls.host_resolver_class.resolve(cls.service_name)
+        if cls.host_cache_ttl is None:
+            return cls.host_resolver_class.resolve(cls.service_name)
+        return cls.get_host_cache().get_hosts()
+
+    @classmethod
+    def get_host_cache(cls) -> HostCache:
+        """
+        The host cache belonging to this service, including its hit and miss counters
+
+        :rtype:
+            HostCache
+        """
+        # Look in this class's own namespace so that subclasses never share a parent's cache
+        host_cache = cls.__dict__.get("_host_cache")
+        if host_cache is None:
+            with cls._host_cache_lock:
+                host_cache = cls.__dict__.get("_host_cache")
+                if host_cache is None:
+                    host_cache = HostCache(
+                        lambda: cls.host_resolver_class.resolve(cls.service_name),
+                        ttl=cls.host_cache_ttl or 0,
+                        stale_ttl=cls.host_cache_stale_ttl,
+                        negative_ttl=cls.host_cache_negative_ttl,
+                    )
+                    cls._host_cache = host_cache
+        return host_cache
 
     def __str__(self) -> str:
         return self.service_name
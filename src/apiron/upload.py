@@ -0,0 +1,363 @@
+"""
+Request bodies that are sent as they are read rather than built in memory first,
+so uploading a file of any size takes the same, small amount of memory.
+
+:func:`apiron.client.call` sends ``files`` through a :class:`MultipartEncoder`,
+and a :class:`MappedFile` can be sent as ``data`` to upload a file straight from a memory map of it.
+Any other iterable of bytes, like a generator, or an open binary file can also be sent as ``data``;
+requests sends a body of unknown length with chunked transfer encoding.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import mmap
+import os
+from collections.abc import AsyncIterator, Iterable, Iterator, Mapping
+from typing import Any, BinaryIO
+
+from requests.utils import guess_filename, to_key_val_list
+from urllib3.fields import RequestField
+from urllib3.filepost import choose_boundary
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def iter_chunks(body: Any, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Read a body that is sent as a stream, a chunk at a time
+
+    :param body:
+        A file-like object with a ``read`` method, or an iterable of bytes
+    :param int chunk_size:
+        (Default ``65536``)
+        The number of bytes to read from a file at a time
+    :return:
+        The body, a chunk at a time
+    :rtype:
+        generator
+    """
+    if not hasattr(body, "read"):
+        for chunk in body:
+            yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        return
+    while True:
+        chunk = body.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+async def aiter_chunks(body: Any, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Read a body that is sent as a stream, a chunk at a time, like :func:`iter_chunks`.
+    Each chunk is read in a worker thread, so that reading from a file doesn't block the event loop.
+    """
+    chunks = iter_chunks(body, chunk_size)
+    while True:
+        chunk = await asyncio.to_thread(next, chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def is_streamed(body: Any) -> bool:
+    """
+    Whether a request body is sent as a stream rather than from bytes or fields already in memory
+
+    :param body:
+        The ``data`` of a call
+    :rtype:
+        bool
+    """
+    return body is not None and not isinstance(body, (str, bytes, bytearray, Mapping, list, tuple))
+
+
+def is_replayable(body: Any) -> bool:
+    """
+    Whether a request body can be sent again, as it must be to retry the request on another host.
+    A generator or an open file can only be read once,
+    where an iterable that starts over each time it is iterated can be sent again.
+
+    :param body:
+        The ``data`` of a call
+    :rtype:
+        bool
+    """
+    if isinstance(body, StreamingBody):
+        return body.replayable
+    if not is_streamed(body):
+        return True
+    return not hasattr(body, "read") and isinstance(body, Iterable) and iter(body) is not body
+
+
+def encode_files(data: Any, files: Any, chunk_size: int = DEFAULT_CHUNK_SIZE) -> tuple[Any, Any]:
+    """
+    Replace the ``files`` of a call, along with any fields in its ``data``,
+    with a :class:`MultipartEncoder` that streams them as the request is sent
+
+    :param data:
+        The ``data`` of the call
+    :param files:
+        The ``files`` of the call
+    :param int chunk_size:
+        (Default ``65536``)
+        The number of bytes to read from each file at a time
+    :return:
+        The ``data`` and ``files`` to send instead, which are left alone when there are no files
+        or when ``data`` isn't a collection of fields
+    :rtype:
+        tuple
+    """
+    if not files or not (data is None or isinstance(data, (Mapping, list, tuple))):
+        return data, files
+    return MultipartEncoder(data, files, chunk_size=chunk_size), None
+
+
+class StreamingBody:
+    """
+    A request body that is read as it is sent.
+    Iterating over it starts the body over from the beginning, so that a replayable body can be sent again.
+    """
+
+    #: The media type of the body, if it has one
+    content_type: str | None = None
+
+    @property
+    def len(self) -> int | None:
+        """
+        The length of the body in bytes, or ``None`` if it can't be known before the body is read.
+        :mod:`requests` reads this attribute to decide between a ``Content-Length`` and chunked transfer encoding.
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    @property
+    def replayable(self) -> bool:
+        """
+        Whether the body can be iterated over more than once
+        """
+        return True
+
+    @property
+    def headers(self) -> dict[str, str]:
+        """
+        The ``Content-Type`` and ``Content-Length`` headers for the body, where they are known
+        """
+        headers = {}
+        if self.content_type is not None:
+            headers["Content-Type"] = self.content_type
+        length = self.len
+        if length is not None:
+            headers["Content-Length"] = str(length)
+        return headers
+
+    def __iter__(self) -> Iterator[bytes]:
+        raise NotImplementedError  # pragma: no cover
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return aiter_chunks(self)
+
+
+class MappedFile(StreamingBody):
+    """
+    A file, or a range of bytes in a file, sent from a memory map of it.
+    The body is sent in :class:`memoryview` slices of the map,
+    so its pages go from the operating system's cache to the socket without being copied into Python objects.
+    """
+
+    def __init__(
+        self,
+        file: str | os.PathLike | BinaryIO,
+        offset: int = 0,
+        length: int | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        """
+        :param file:
+            The path of the file, or the file itself, opened for reading in binary mode
+        :param int offset:
+            (Default ``0``)
+            The position in the file to start sending from
+        :param int length:
+            (optional)
+            The number of bytes to send, or ``None`` to send the rest of the file.
+            (Default ``None``)
+        :param int chunk_size:
+            (Default ``65536``)
+            The number of bytes in each slice of the map that is sent
+        """
+        self.file = file
+        self.offset = offset
+        self.chunk_size = chunk_size
+        size = os.fstat(file.fileno()).st_size if hasattr(file, "fileno") else os.stat(file).st_size
+        if not 0 <= offset <= size:
+            raise ValueError(f"offset {offset} is outside of a file of {size} bytes")
+        available = size - offset
+        if length is not None and not 0 <= length <= available:
+            raise ValueError(f"length {length} is more than the {available} bytes after offset {offset}")
+        self._length = available if length is None else length
+
+    @property
+    def len(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[memoryview]:
+        if not self._length:
+            # An empty file can't be mapped
+            return
+        if hasattr(self.file, "fileno"):
+            view = self._map(self.file.fileno())
+        else:
+            with open(self.file, "rb") as file:
+                view = self._map(file.fileno())
+        for start in range(self.offset, self.offset + self._length, self.chunk_size):
+            yield view[start : min(start + self.chunk_size, self.offset + self._length)]
+
+    def _map(self, fileno: int) -> memoryview:
+        # The map is closed when it is garbage collected, once no slice of it is still being sent
+        return memoryview(mmap.mmap(fileno, 0, access=mmap.ACCESS_READ))
+
+
+class _Part:
+    """
+    A part of a multipart body: its headers, and the data that follows them
+    """
+
+    def __init__(self, headers: bytes, data: Any):
+        self.headers = headers
+        self.data = data
+        # Files are sent from where they are positioned now, every time the body is sent
+        self.position = None
+        if hasattr(data, "read") and _is_seekable(data):
+            self.position = data.tell()
+
+    @property
+    def length(self) -> int | None:
+        if isinstance(self.data, (bytes, bytearray, memoryview)):
+            return len(self.data)
+        if isinstance(self.data, MappedFile):
+            return self.data.len
+        if self.position is not None and not isinstance(self.data, io.TextIOBase):
+            end = self.data.seek(0, io.SEEK_END)
+            self.data.seek(self.position)
+            return end - self.position
+        return None
+
+    @property
+    def replayable(self) -> bool:
+        if hasattr(self.data, "read"):
+            return self.position is not None
+        return is_replayable(self.data)
+
+    def iter_data(self, chunk_size: int) -> Iterator[bytes]:
+        if isinstance(self.data, (bytes, bytearray, memoryview)):
+            yield self.data
+            return
+        if self.position is not None:
+            self.data.seek(self.position)
+        yield from iter_chunks(self.data, chunk_size)
+
+
+def _is_seekable(file: Any) -> bool:
+    try:
+        return file.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+
+class MultipartEncoder(StreamingBody):
+    """
+    A :mimetype:`multipart/form-data` body, encoded the way :mod:`requests` encodes ``files``,
+    that reads each file a chunk at a time as the body is sent rather than reading every file into memory first.
+    Its length is known ahead of time when every file's is, so it is usually sent with a ``Content-Length``.
+    """
+
+    def __init__(
+        self,
+        fields: Any = None,
+        files: Any = None,
+        boundary: str | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        """
+        :param fields:
+            (optional)
+            A :class:`dict` or list of pairs of form fields to send before the files
+        :param files:
+            (optional)
+            A :class:`dict` or list of pairs of form field names and files,
+            each a file-like object, bytes, a :class:`MappedFile`, an iterable of bytes,
+            or a tuple of ``(filename, file)``, ``(filename, file, content_type)``
+            or ``(filename, file, content_type, headers)``, as :mod:`requests` accepts
+        :param str boundary:
+            (optional)
+            The boundary between parts, or ``None`` for a random one.
+            (Default ``None``)
+        :param int chunk_size:
+            (Default ``65536``)
+            The number of bytes to read from each file at a time
+        """
+        self.boundary = boundary or choose_boundary()
+        self.chunk_size = chunk_size
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self._parts: list[_Part] = []
+
+        for name, values in to_key_val_list(fields or {}):
+            if isinstance(values, (str, bytes)) or not hasattr(values, "__iter__"):
+                values = [values]
+            for value in values:
+                if value is None:
+                    continue
+                if not isinstance(value, bytes):
+                    value = str(value).encode("utf-8")
+                self._add_part(name.decode("utf-8") if isinstance(name, bytes) else name, value)
+
+        for name, value in to_key_val_list(files or {}):
+            filename, content_type, headers = None, None, None
+            if isinstance(value, (tuple, list)):
+                if len(value) == 2:
+                    filename, value = value
+                elif len(value) == 3:
+                    filename, value, content_type = value
+                else:
+                    filename, value, content_type, headers = value
+            else:
+                filename = guess_filename(value) or name
+            if value is None:
+                continue
+            if isinstance(value, str):
+                value = value.encode("utf-8")
+            self._add_part(name, value, filename, content_type, headers)
+
+    def _add_part(self, name: str, data: Any, filename: str | None = None, content_type=None, headers=None):
+        field = RequestField(name=name, data=b"", filename=filename, headers=headers)
+        field.make_multipart(content_type=content_type)
+        # Each part after the first starts by ending the part before it
+        separator = b"\r\n" if self._parts else b""
+        rendered = f"--{self.boundary}\r\n{field.render_headers()}".encode()
+        self._parts.append(_Part(separator + rendered, data))
+
+    @property
+    def _end(self) -> bytes:
+        return (b"\r\n" if self._parts else b"") + f"--{self.boundary}--\r\n".encode()
+
+    @property
+    def len(self) -> int | None:
+        length = len(self._end)
+        for part in self._parts:
+            part_length = part.length
+            if part_length is None:
+                return None
+            length += len(part.headers) + part_length
+        return length
+
+    @property
+    def replayable(self) -> bool:
+        return all(part.replayable for part in self._parts)
+
+    def __iter__(self) -> Iterator[bytes]:
+        for part in self._parts:
+            yield part.headers
+            yield from part.iter_data(self.chunk_size)
+        yield self._end
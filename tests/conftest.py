@@ -1,6 +1,11 @@
+import io
+
 import pytest
 import requests
 
+from apiron import Service, pool
+from apiron.service.base import ServiceMeta
+
 
 @pytest.fixture(autouse=True)
 def hobble_network(monkeypatch, request):
@@ -13,3 +18,45 @@ def hobble_network(monkeypatch, request):
         raise RuntimeError(f"requests hobbled for testing: tried calling {request_object.url}")
 
     monkeypatch.setattr(requests.Session, "send", hobbled_send)
+
+
+@pytest.fixture(autouse=True)
+def reset_session_pool():
+    """Keep pooled sessions from leaking between tests"""
+
+    yield
+    pool.DEFAULT_SESSION_POOL.close()
+
+
+@pytest.fixture
+def make_service():
+    """Build a service class with the given endpoints, hosted on one or more hosts"""
+
+    def make(*hosts, **endpoints):
+        hosts = hosts or ("http://host1.biz",)
+        namespace = {"domain": hosts[0], **endpoints}
+        if len(hosts) > 1:
+            namespace["get_hosts"] = classmethod(lambda cls: list(hosts))
+        return ServiceMeta("SomeService", (Service,), namespace)
+
+    return make
+
+
+@pytest.fixture
+def make_response():
+    """Build a response to a prepared request, whose content is the request's URL unless given"""
+
+    def make(request=None, status_code=200, headers=None, content=None):
+        response = requests.Response()
+        response.status_code = status_code
+        response.raw = io.BytesIO(b"")
+        response.headers.update(headers or {})
+        if request is not None:
+            response.url = request.url
+            response.request = request
+        if content is None:
+            content = request.url.encode() if request is not None and status_code != 304 else b""
+        response._content = content
+        return response
+
+    return make
@@ -1,3 +1,6 @@
+from typing import ClassVar
+from unittest import mock
+
 import pytest
 
 from apiron import DiscoverableService
@@ -28,3 +31,107 @@ class TestDiscoverableService:
 
     def test_repr_method_on_class(self, service):
         assert "FakeService(service_name=fake-service, host_resolver=FakeResolver)" == repr(service)
+
+
+class CountingResolver:
+    hosts: ClassVar[list[str]] = ["fake"]
+    calls = 0
+
+    @classmethod
+    def resolve(cls, service_name):
+        cls.calls += 1
+        return list(cls.hosts)
+
+
+@pytest.fixture
+def cached_service():
+    class Resolver(CountingResolver):
+        pass
+
+    class CachedService(DiscoverableService):
+        service_name = "cached-service"
+        host_resolver_class = Resolver
+        host_cache_ttl = 10
+        host_cache_stale_ttl = 10
+        host_cache_negative_ttl = 5
+
+    return CachedService
+
+
+class TestHostCache:
+    def test_hosts_are_cached_within_ttl(self, cached_service):
+        with mock.patch("apiron.service.discoverable.time.monotonic", return_value=100):
+            assert ["fake"] == cached_service.get_hosts()
+            assert ["fake"] == cached_service.get_hosts()
+
+        host_cache = cached_service.get_host_cache()
+        assert 1 == cached_service.host_resolver_class.calls
+        assert 1 == host_cache.misses
+        assert 1 == host_cache.hits
+
+    def test_stale_hosts_are_served_while_refreshing(self, cached_service):
+        with mock.patch("apiron.service.discoverable.time.monotonic", return_value=100):
+            cached_service.get_hosts()
+
+        cached_service.host_resolver_class.hosts = ["new"]
+        with (
+            mock.patch("apiron.service.discoverable.threading.Thread") as MockThread,
+            mock.patch("apiron.service.discoverable.time.monotonic", return_value=115),
+        ):
+            assert ["fake"] == cached_service.get_hosts()
+            assert ["fake"] == cached_service.get_hosts()
+
+        MockThread.assert_called_once()
+        assert 2 == cached_service.get_host_cache().stale_hits
+
+        MockThread.call_args[1]["target"]()
+        assert ["new"] == cached_service.get_hosts()
+
+    def test_expired_hosts_are_resolved_again(self, cached_service):
+        with mock.patch("apiron.service.discoverable.time.monotonic", return_value=100):
+            cached_service.get_hosts()
+
+        cached_service.host_resolver_class.hosts = ["new"]
+        with mock.patch("apiron.service.discoverable.time.monotonic", return_value=121):
+            assert ["new"] == cached_service.get_hosts()
+
+        assert 2 == cached_service.get_host_cache().misses
+
+    def test_empty_results_are_negatively_cached(self, cached_service):
+        cached_service.host_resolver_class.hosts = []
+        with mock.patch("apiron.service.discoverable.time.monotonic", return_value=100):
+            assert [] == cached_service.get_hosts()
+            assert [] == cached_service.get_hosts()
+
+        assert 1 == cached_service.get_host_cache().negative_hits
+
+        cached_service.host_resolver_class.hosts = ["fake"]
+        with mock.patch("apiron.service.discoverable.time.monotonic", return_value=106):
+            assert ["fake"] == cached_service.get_hosts()
+
+    def test_failed_refresh_keeps_stale_hosts(self, cached_service):
+        with mock.patch("apiron.service.discoverable.time.monotonic", return_value=100):
+            cached_service.get_hosts()
+
+        host_cache = cached_service.get_host_cache()
+        with mock.patch.object(host_cache, "resolve", side_effect=RuntimeError("resolver down")):
+            host_cache._refresh()
+
+        with mock.patch("apiron.service.discoverable.time.monotonic", return_value=105):
+            assert ["fake"] == cached_service.get_hosts()
+
+    def test_clear(self, cached_service):
+        cached_service.get_hosts()
+        cached_service.get_host_cache().clear()
+        cached_service.get_hosts()
+        assert 2 == cached_service.host_resolver_class.calls
+
+    def test_subclasses_do_not_share_cache(self, cached_service):
+        class SubService(cached_service):  # type: ignore[valid-type,misc]
+            pass
+
+        assert cached_service.get_host_cache() is not SubService.get_host_cache()
+
+    def test_uncached_service_has_no_cache_by_default(self):
+        assert FakeService.host_cache_ttl is None
+        assert ["fake"] == FakeService.get_hosts()
@@ -0,0 +1,610 @@
+import asyncio
+import collections
+import gzip
+import json
+from unittest import mock
+
+import pytest
+from urllib3.util import retry
+
+import apiron
+from apiron import cache, upload
+from apiron.concurrency import AimdConcurrencyLimiter
+
+httpx = pytest.importorskip("httpx")
+
+from apiron import aio
+
+
+class SomeService(apiron.Service):
+    domain = "http://host1.biz"
+    asynchronous = True
+
+    plain = apiron.Endpoint(path="/plain/{thing}")
+    getter = apiron.JsonEndpoint(path="/get", preserve_order=True)
+    streamer = apiron.StreamingEndpoint(path="/stream")
+    json_streamer = apiron.StreamingJsonEndpoint(path="/records", item_pointer="/records")
+    ndjson = apiron.NdjsonEndpoint(path="/records.ndjson")
+    events = apiron.ServerSentEventsEndpoint(path="/events", retry_delay=0)
+    stub = apiron.StubEndpoint(stub_response={"stub": "response"})
+
+
+def make_session(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestCall:
+    def test_endpoint_is_awaitable(self):
+        def handler(request):
+            assert "http://host1.biz/plain/foo?bar=baz" == str(request.url)
+            return httpx.Response(200, text="hello")
+
+        async def main():
+            async with make_session(handler) as session:
+                return await SomeService.plain(thing="foo", params={"bar": "baz"}, session=session)
+
+        assert "hello" == run(main())
+
+    def test_json_endpoint(self):
+        def handler(request):
+            assert "application/json" == request.headers["Accept"]
+            return httpx.Response(200, content=json.dumps({"b": 1, "a": 2}).encode())
+
+        async def main():
+            async with make_session(handler) as session:
+                return await SomeService.getter(session=session)
+
+        result = run(main())
+        assert isinstance(result, collections.OrderedDict)
+        assert ["b", "a"] == list(result)
+
+    def test_streaming_endpoint(self):
+        def handler(request):
+            return httpx.Response(200, content=b"0123456789")
+
+        async def main():
+            async with make_session(handler) as session:
+                chunks = await SomeService.streamer(session=session)
+                return b"".join([chunk async for chunk in chunks])
+
+        assert b"0123456789" == run(main())
+
+    def test_streaming_endpoint_in_chunks(self):
+        def handler(request):
+            return httpx.Response(200, stream=httpx.ByteStream(b"0123456789"))
+
+        async def main():
+            async with make_session(handler) as session:
+                chunks = await SomeService.streamer(session=session, chunk_size=4)
+                return [chunk async for chunk in chunks]
+
+        assert [b"0123", b"4567", b"89"] == run(main())
+
+    def test_streaming_json_endpoint(self):
+        def handler(request):
+            body = json.dumps({"records": [{"id": index} for index in range(3)]}).encode()
+            return httpx.Response(200, stream=httpx.ByteStream(body))
+
+        async def main():
+            async with make_session(handler) as session:
+                records = await SomeService.json_streamer(session=session)
+                return [record async for record in records]
+
+        assert [{"id": 0}, {"id": 1}, {"id": 2}] == run(main())
+
+    def test_ndjson_endpoint(self):
+        def handler(request):
+            assert "application/x-ndjson" == request.headers["Accept"]
+            return httpx.Response(200, stream=httpx.ByteStream(b'{"id": 0}\n{"id": 1}\n'))
+
+        async def main():
+            async with make_session(handler) as session:
+                records = await SomeService.ndjson(session=session)
+                return [record async for record in records]
+
+        assert [{"id": 0}, {"id": 1}] == run(main())
+
+    def test_server_sent_events_endpoint_reconnects_from_the_last_event(self):
+        last_event_ids = []
+
+        def handler(request):
+            last_event_ids.append(request.headers.get("Last-Event-ID"))
+            if len(last_event_ids) == 1:
+                return httpx.Response(200, stream=httpx.ByteStream(b"id: 1\ndata: a\n\n"))
+            if len(last_event_ids) == 2:
+                raise httpx.ConnectError("refused", request=request)
+            if len(last_event_ids) == 3:
+                return httpx.Response(200, stream=httpx.ByteStream(b"id: 2\ndata: b\n\n"))
+            return httpx.Response(204)
+
+        async def main():
+            async with make_session(handler) as session:
+                events = await SomeService.events(session=session)
+                return [event.data async for event in events]
+
+        assert ["a", "b"] == run(main())
+        assert [None, "1", "1", "2"] == last_event_ids
+
+    def test_raw_response(self):
+        def handler(request):
+            return httpx.Response(200, text="hello")
+
+        async def main():
+            async with make_session(handler) as session:
+                return await SomeService.plain(thing="foo", session=session, return_raw_response_object=True)
+
+        response = run(main())
+        assert isinstance(response, httpx.Response)
+        assert "hello" == response.text
+
+    def test_bad_status_raises(self):
+        def handler(request):
+            return httpx.Response(404)
+
+        async def main():
+            async with make_session(handler) as session:
+                return await SomeService.plain(thing="foo", session=session)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            run(main())
+
+    def test_retries_on_bad_status(self):
+        statuses = iter([503, 200])
+
+        def handler(request):
+            return httpx.Response(next(statuses), text="hello")
+
+        async def main():
+            async with make_session(handler) as session:
+                return await SomeService.plain(
+                    thing="foo",
+                    session=session,
+                    retry_spec=retry.Retry(total=1, status_forcelist=[503], backoff_factor=0),
+                )
+
+        assert "hello" == run(main())
+
+    @pytest.mark.parametrize(
+        "retry_spec",
+        [
+            retry.Retry(total=None, status=2, status_forcelist=[503], backoff_factor=0),
+            retry.Retry(status=2, status_forcelist=[503], backoff_factor=0),
+        ],
+    )
+    def test_persistent_bad_status_exhausts_status_retries(self, retry_spec):
+        statuses = []
+
+        def handler(request):
+            statuses.append(503)
+            return httpx.Response(503, text="unavailable")
+
+        async def main():
+            async with make_session(handler) as session:
+                return await SomeService.plain(thing="foo", session=session, retry_spec=retry_spec)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            run(main())
+        assert 3 == len(statuses)
+
+    def test_explicit_encoding(self):
+        def handler(request):
+            return httpx.Response(200, content="héllo".encode("latin-1"))
+
+        async def main():
+            async with make_session(handler) as session:
+                return await SomeService.plain(thing="foo", session=session, encoding="latin-1")
+
+        assert "héllo" == run(main())
+
+    def test_pooled_client_is_reused(self):
+        async def main():
+            retry_spec = retry.Retry(total=1)
+            client = aio._get_client(SomeService, retry_spec)
+            assert client is aio._get_client(SomeService, retry_spec)
+            await aio.close()
+            assert client.is_closed
+
+        run(main())
+
+    def test_no_hosts_available(self):
+        class NoHostService(apiron.ServiceBase):
+            asynchronous = True
+            plain = apiron.Endpoint()
+
+        async def main():
+            async with make_session(mock.Mock()) as session:
+                return await NoHostService.plain(session=session)
+
+        with pytest.raises(apiron.NoHostsAvailableException):
+            run(main())
+
+    def test_streamed_bodies(self, tmp_path):
+        path = tmp_path / "upload.bin"
+        path.write_bytes(b"0123456789")
+        received = []
+
+        async def handler(request):
+            received.append((request.headers, await request.aread()))
+            return httpx.Response(200)
+
+        async def generate():
+            yield b"async "
+            yield b"chunks"
+
+        async def main(file):
+            async with make_session(handler) as session:
+                await SomeService.plain(thing="a", method="POST", session=session, data=upload.MappedFile(path))
+                await SomeService.plain(thing="b", method="POST", session=session, files={"file": file})
+                await SomeService.plain(thing="c", method="POST", session=session, data=iter([b"sync ", b"chunks"]))
+                await SomeService.plain(thing="d", method="POST", session=session, data=generate())
+
+        with open(path, "rb") as file:
+            run(main(file))
+
+        (mapped_headers, mapped), (multipart_headers, multipart), (_, sync), (chunked_headers, chunked) = received
+        assert b"0123456789" == mapped
+        assert "10" == mapped_headers["Content-Length"]
+        assert multipart_headers["Content-Type"].startswith("multipart/form-data; boundary=")
+        assert str(len(multipart)) == multipart_headers["Content-Length"]
+        assert b'filename="upload.bin"\r\n\r\n0123456789\r\n' in multipart
+        assert b"sync chunks" == sync
+        assert b"async chunks" == chunked
+        assert "chunked" == chunked_headers["Transfer-Encoding"]
+
+    def test_accept_encoding_and_request_compression(self):
+        received = []
+
+        def handler(request):
+            received.append(request)
+            return httpx.Response(200)
+
+        class CompressingService(SomeService):
+            accept_encoding = "deflate"
+            upload = apiron.Endpoint(path="/upload", default_method="POST", compression_spec=apiron.Compression())
+
+        async def main():
+            async with make_session(handler) as session:
+                await CompressingService.upload(session=session, json={"values": list(range(1000))})
+                await CompressingService.upload(session=session, data=b"small")
+
+        run(main())
+
+        large, small = received
+        assert "deflate" == large.headers["Accept-Encoding"]
+        assert "gzip" == large.headers["Content-Encoding"]
+        assert str(len(large.content)) == large.headers["Content-Length"]
+        assert {"values": list(range(1000))} == json.loads(gzip.decompress(large.content))
+        assert "Content-Encoding" not in small.headers
+        assert b"small" == small.content
+
+    def test_rate_limited_calls_honour_retry_after(self):
+        received = []
+
+        def handler(request):
+            received.append(request)
+            return httpx.Response(429, headers={"Retry-After": "60"})
+
+        class LimitedService(SomeService):
+            rate_limiter = apiron.RateLimiter(rate=100, burst=5, max_wait=1)
+            plain = apiron.Endpoint(path="/plain", retry_spec=retry.Retry(total=0, status=0))
+
+        async def main():
+            async with make_session(handler) as session:
+                with pytest.raises(httpx.HTTPStatusError):
+                    await LimitedService.plain(session=session)
+                with pytest.raises(apiron.RateLimitExceededException):
+                    await LimitedService.plain(session=session)
+
+        run(main())
+
+        assert 1 == len(received)
+
+    def test_concurrency_limited_calls_adapt_the_limit(self):
+        in_flight = []
+
+        class LimitedService(SomeService):
+            concurrency_limiter = AimdConcurrencyLimiter(initial_limit=10, backoff=0.5)
+            plain = apiron.Endpoint(path="/plain", retry_spec=retry.Retry(total=0, status=0))
+
+        def handler(request):
+            in_flight.append(LimitedService.concurrency_limiter.in_flight)
+            return httpx.Response(503)
+
+        async def main():
+            async with make_session(handler) as session:
+                with pytest.raises(httpx.HTTPStatusError):
+                    await LimitedService.plain(session=session)
+
+        run(main())
+
+        assert [1] == in_flight
+        assert 0 == LimitedService.concurrency_limiter.in_flight
+        assert 5 == LimitedService.concurrency_limiter.limit
+
+
+class MultiHostService(apiron.Service):
+    domain = "unused"
+    asynchronous = True
+
+    plain = apiron.Endpoint(path="/plain", failover_spec=apiron.Failover(attempts=2, backoff_factor=0))
+
+    @classmethod
+    def get_hosts(cls):
+        return ["http://host1.biz", "http://host2.biz"]
+
+
+class TestFailover:
+    def test_connection_error_fails_over_to_another_host(self):
+        hosts = []
+
+        def handler(request):
+            hosts.append(request.url.host)
+            if len(hosts) == 1:
+                raise httpx.ConnectError("refused", request=request)
+            return httpx.Response(200, text=request.url.host)
+
+        async def main():
+            async with make_session(handler) as session:
+                return await MultiHostService.plain(session=session)
+
+        result = run(main())
+        assert hosts[1] == result
+        assert {"host1.biz", "host2.biz"} == set(hosts)
+
+    def test_failover_status_fails_over(self):
+        hosts = []
+
+        def handler(request):
+            hosts.append(request.url.host)
+            return httpx.Response(503 if len(hosts) == 1 else 200, text="hello")
+
+        async def main():
+            async with make_session(handler) as session:
+                return await MultiHostService.plain(session=session, retry_spec=retry.Retry(total=0))
+
+        assert "hello" == run(main())
+        assert 2 == len(set(hosts))
+
+    def test_non_idempotent_calls_only_fail_over_connect_timeouts(self):
+        hosts = []
+
+        def handler(request):
+            hosts.append(request.url.host)
+            if len(hosts) == 1:
+                raise httpx.ConnectTimeout("timed out", request=request)
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        async def main():
+            async with make_session(handler) as session:
+                return await MultiHostService.plain(
+                    session=session, method="POST", failover_spec=apiron.Failover(attempts=3, backoff_factor=0)
+                )
+
+        with pytest.raises(httpx.ReadTimeout):
+            run(main())
+        assert 2 == len(hosts)
+
+    def test_no_failover_without_spec(self):
+        def handler(request):
+            raise httpx.ConnectError("refused", request=request)
+
+        async def main():
+            async with make_session(handler) as session:
+                return await SomeService.plain(thing="foo", session=session)
+
+        with pytest.raises(httpx.ConnectError):
+            run(main())
+
+
+class TestHedging:
+    @pytest.fixture
+    def service(self):
+        class HedgingService(MultiHostService):
+            plain = apiron.Endpoint(path="/plain", hedge_after=0.01)
+
+        return HedgingService
+
+    def test_fast_response_is_not_hedged(self, service):
+        hosts = []
+
+        def handler(request):
+            hosts.append(request.url.host)
+            return httpx.Response(200, text=request.url.host)
+
+        async def main():
+            async with make_session(handler) as session:
+                return await service.plain(session=session)
+
+        run(main())
+        assert 1 == len(hosts)
+
+    def test_slow_response_is_hedged_to_another_host(self, service):
+        hosts = []
+
+        async def handler(request):
+            hosts.append(request.url.host)
+            if len(hosts) == 1:
+                await asyncio.sleep(0.2)
+            return httpx.Response(200, text=request.url.host)
+
+        async def main():
+            async with make_session(handler) as session:
+                result = await service.plain(session=session)
+                await asyncio.sleep(0.3)
+                return result
+
+        result = run(main())
+        assert hosts[1] == result
+
+    def test_losing_primary_latency_is_recorded(self, service):
+        latencies: list[float] = []
+        hosts = []
+
+        async def handler(request):
+            hosts.append(request.url.host)
+            if len(hosts) == 1:
+                await asyncio.sleep(0.1)
+            return httpx.Response(200, text=request.url.host)
+
+        async def main():
+            async with make_session(handler) as session:
+                await service.plain(session=session)
+                assert [] == latencies
+                await asyncio.sleep(0.2)
+
+        with mock.patch.object(vars(service)["plain"], "record_latency", side_effect=latencies.append):
+            run(main())
+
+        assert 1 == len(latencies)
+        assert latencies[0] >= 0.1
+
+    def test_failed_hedge_falls_back_to_primary(self, service):
+        hosts = []
+
+        async def handler(request):
+            hosts.append(request.url.host)
+            if len(hosts) == 1:
+                await asyncio.sleep(0.05)
+                return httpx.Response(200, text=request.url.host)
+            raise httpx.ConnectError("refused", request=request)
+
+        async def main():
+            async with make_session(handler) as session:
+                return await service.plain(session=session)
+
+        result = run(main())
+        assert hosts[0] == result
+
+
+class TestResponseCache:
+    @pytest.fixture
+    def service(self):
+        class CachingService(apiron.Service):
+            domain = "http://host1.biz"
+            asynchronous = True
+            getter = apiron.JsonEndpoint(path="/get/{thing}", cache=cache.MemoryCache())
+
+        return CachingService
+
+    def test_fresh_response_is_served_without_a_request(self, service):
+        requests_sent = []
+
+        def handler(request):
+            requests_sent.append(request)
+            return httpx.Response(200, json={"thing": request.url.path}, headers={"Cache-Control": "max-age=60"})
+
+        async def main():
+            async with make_session(handler) as session:
+                return [
+                    await service.getter(thing="a", session=session),
+                    await service.getter(thing="a", session=session),
+                    await service.getter(thing="b", session=session),
+                ]
+
+        assert [{"thing": "/get/a"}, {"thing": "/get/a"}, {"thing": "/get/b"}] == run(main())
+        assert 2 == len(requests_sent)
+
+    def test_stale_response_is_revalidated(self, service):
+        sent_headers = []
+
+        def handler(request):
+            sent_headers.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"abc"':
+                return httpx.Response(304, headers={"Cache-Control": "max-age=60"})
+            return httpx.Response(200, json={"a": 1}, headers={"ETag": '"abc"', "Cache-Control": "no-cache"})
+
+        async def main():
+            async with make_session(handler) as session:
+                return [await service.getter(thing="a", session=session) for _ in range(3)]
+
+        assert [{"a": 1}] * 3 == run(main())
+        assert [None, '"abc"'] == sent_headers
+
+    def test_compressed_response_is_not_decoded_twice(self, service):
+        def handler(request):
+            content = gzip.compress(json.dumps({"a": 1}).encode())
+            return httpx.Response(
+                200, content=content, headers={"Content-Encoding": "gzip", "Cache-Control": "max-age=60"}
+            )
+
+        async def main():
+            async with make_session(handler) as session:
+                return [await service.getter(thing="a", session=session) for _ in range(2)]
+
+        assert [{"a": 1}] * 2 == run(main())
+
+    def test_calls_with_credentials_are_not_cached(self, service):
+        requests_sent = []
+
+        def handler(request):
+            requests_sent.append(request)
+            return httpx.Response(200, json={}, headers={"Cache-Control": "max-age=60"})
+
+        async def main():
+            async with make_session(handler) as session:
+                await service.getter(thing="a", session=session, headers={"Authorization": "Bearer abc"})
+                await service.getter(thing="a", session=session, headers={"Authorization": "Bearer abc"})
+
+        run(main())
+        assert 2 == len(requests_sent)
+        assert 0 == len(vars(service)["getter"].cache)
+
+
+class TestStubEndpoint:
+    def test_stub_is_awaitable(self):
+        assert {"stub": "response"} == run(SomeService.stub())
+
+
+class TestCoalescing:
+    def test_identical_calls_share_a_request(self):
+        class CoalescingService(apiron.Service):
+            domain = "http://host1.biz"
+            asynchronous = True
+            plain = apiron.Endpoint(path="/plain/{thing}", coalesce=True)
+
+        requests_sent = []
+
+        async def handler(request):
+            requests_sent.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, text="hello")
+
+        async def main():
+            async with make_session(handler) as session:
+                return await asyncio.gather(
+                    *(CoalescingService.plain(thing="foo", session=session) for _ in range(3)),
+                    CoalescingService.plain(thing="bar", session=session),
+                )
+
+        assert ["hello"] * 4 == run(main())
+        assert 2 == len(requests_sent)
+
+    def test_calls_with_different_options_do_not_share_a_request(self):
+        class CoalescingService(apiron.Service):
+            domain = "http://host1.biz"
+            asynchronous = True
+            plain = apiron.Endpoint(path="/plain", coalesce=True)
+
+        requests_sent = []
+
+        async def handler(request):
+            requests_sent.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, text="hello")
+
+        async def main():
+            async with make_session(handler) as session:
+                return await asyncio.gather(
+                    CoalescingService.plain(session=session),
+                    CoalescingService.plain(session=session, return_raw_response_object=True),
+                    CoalescingService.plain(session=session, encoding="latin-1"),
+                )
+
+        text, raw, _ = run(main())
+        assert "hello" == text
+        assert isinstance(raw, httpx.Response)
+        assert 3 == len(requests_sent)
@@ -0,0 +1,113 @@
+from unittest import mock
+
+import pytest
+import requests
+
+from apiron import Endpoint, Service, balancing, client
+
+HOSTS = ["http://host1.biz", "http://host2.biz", "http://host3.biz"]
+
+
+class TestRoundRobinLoadBalancer:
+    def test_cycles_through_hosts(self):
+        load_balancer = balancing.RoundRobinLoadBalancer()
+        assert HOSTS * 2 == [load_balancer.choose(HOSTS) for _ in range(6)]
+
+
+class TestLeastOutstandingLoadBalancer:
+    def test_chooses_host_with_fewest_outstanding_requests(self):
+        load_balancer = balancing.LeastOutstandingLoadBalancer()
+        load_balancer.on_request_start(HOSTS[0])
+        load_balancer.on_request_start(HOSTS[2])
+        assert HOSTS[1] == load_balancer.choose(HOSTS)
+
+    def test_finished_requests_are_no_longer_outstanding(self):
+        load_balancer = balancing.LeastOutstandingLoadBalancer()
+        load_balancer.on_request_start(HOSTS[0])
+        load_balancer.on_request_end(HOSTS[0], 0.1, failed=False)
+        assert 0 == load_balancer.outstanding[HOSTS[0]]
+
+
+class TestPowerOfTwoChoicesLoadBalancer:
+    def test_chooses_less_busy_of_two(self):
+        load_balancer = balancing.PowerOfTwoChoicesLoadBalancer()
+        load_balancer.on_request_start(HOSTS[0])
+
+        with mock.patch("apiron.balancing.random.sample", return_value=HOSTS[:2]):
+            assert HOSTS[1] == load_balancer.choose(HOSTS)
+
+    def test_single_host(self):
+        assert HOSTS[0] == balancing.PowerOfTwoChoicesLoadBalancer().choose(HOSTS[:1])
+
+
+class TestEwmaLoadBalancer:
+    def test_chooses_faster_of_two(self):
+        load_balancer = balancing.EwmaLoadBalancer()
+        load_balancer.on_request_start(HOSTS[0])
+        load_balancer.on_request_end(HOSTS[0], 2.0, failed=False)
+        load_balancer.on_request_start(HOSTS[1])
+        load_balancer.on_request_end(HOSTS[1], 0.1, failed=False)
+
+        with mock.patch("apiron.balancing.random.sample", return_value=HOSTS[:2]):
+            assert HOSTS[1] == load_balancer.choose(HOSTS)
+
+    def test_failures_are_penalized(self):
+        load_balancer = balancing.EwmaLoadBalancer(failure_penalty=5.0)
+        load_balancer.on_request_start(HOSTS[0])
+        load_balancer.on_request_end(HOSTS[0], 0.01, failed=True)
+        assert 5.0 == load_balancer.latencies[HOSTS[0]]
+
+    def test_latency_decays_toward_recent_observations(self):
+        load_balancer = balancing.EwmaLoadBalancer(decay_seconds=1.0)
+
+        with mock.patch("apiron.balancing.time.monotonic", return_value=100):
+            load_balancer.on_request_start(HOSTS[0])
+            load_balancer.on_request_end(HOSTS[0], 1.0, failed=False)
+        with mock.patch("apiron.balancing.time.monotonic", return_value=101):
+            load_balancer.on_request_start(HOSTS[0])
+            load_balancer.on_request_end(HOSTS[0], 0.0, failed=False)
+
+        assert 0.3 < load_balancer.latencies[HOSTS[0]] < 0.4
+
+
+class TestCallWithLoadBalancer:
+    @pytest.fixture
+    def service(self):
+        class SomeService(Service):
+            domain = "unused"
+            load_balancer = balancing.RoundRobinLoadBalancer()
+            thing = Endpoint(path="/thing")
+
+            @classmethod
+            def get_hosts(cls):
+                return HOSTS
+
+        return SomeService
+
+    def test_call_uses_load_balancer_and_reports_outcome(self, service):
+        response = requests.Response()
+        response.status_code = 503
+        session = requests.Session()
+
+        with (
+            mock.patch.object(session, "send", return_value=response) as mock_send,
+            mock.patch.object(service.load_balancer, "on_request_end") as mock_on_request_end,
+            pytest.raises(requests.HTTPError),
+        ):
+            service.thing(session=session)
+
+        assert "http://host1.biz/thing" == mock_send.call_args[0][0].url
+        assert HOSTS[0] == mock_on_request_end.call_args[0][0]
+        assert mock_on_request_end.call_args[1]["failed"]
+
+    def test_call_reports_exceptions(self, service):
+        session = mock.Mock()
+        session.send.side_effect = requests.ConnectionError
+
+        with pytest.raises(requests.ConnectionError):
+            service.thing(session=session)
+
+        assert 0 == service.load_balancer.outstanding[HOSTS[0]]
+
+    def test_choose_host_uses_load_balancer(self, service):
+        assert HOSTS == [client._choose_host(service) for _ in HOSTS]
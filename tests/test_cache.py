@@ -0,0 +1,158 @@
+import time
+
+import requests
+from requests import structures
+
+from apiron import cache
+
+
+def make_response(headers=None, content=b"content", status_code=200):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = content
+    response.url = "http://host1.biz/thing"
+    return response
+
+
+def make_cached_response(content=b"content", expires_at=None):
+    return cache.CachedResponse(
+        status_code=200,
+        headers={"ETag": '"abc"'},
+        content=content,
+        url="http://host1.biz/thing",
+        encoding="utf-8",
+        expires_at=time.time() + 60 if expires_at is None else expires_at,
+    )
+
+
+class TestGetExpiry:
+    def test_max_age(self):
+        assert 160 == cache.get_expiry(make_response({"Cache-Control": "public, max-age=60"}), now=100)
+
+    def test_max_age_minus_age(self):
+        assert 150 == cache.get_expiry(make_response({"Cache-Control": "max-age=60", "Age": "10"}), now=100)
+
+    def test_no_store(self):
+        assert cache.get_expiry(make_response({"Cache-Control": "no-store, max-age=60"}), now=100) is None
+
+    def test_no_cache_is_immediately_stale(self):
+        assert 100 == cache.get_expiry(make_response({"Cache-Control": "no-cache"}), now=100)
+
+    def test_expires(self):
+        response = make_response({"Expires": "Thu, 01 Jan 1970 00:10:00 GMT"})
+        assert 600 == cache.get_expiry(response, now=100)
+
+    def test_invalid_expires_is_stale(self):
+        assert 100 == cache.get_expiry(make_response({"Expires": "0"}), now=100)
+
+    def test_default_ttl(self):
+        assert 130 == cache.get_expiry(make_response(), default_ttl=30, now=100)
+
+
+class TestGetVary:
+    def test_no_vary(self):
+        assert {} == cache.get_vary(make_response().headers, {"Accept": "text/plain"})
+
+    def test_request_header_values(self):
+        request_headers = structures.CaseInsensitiveDict({"Accept-Language": "en"})
+        vary = cache.get_vary(make_response({"Vary": "Accept-Language, Accept"}).headers, request_headers)
+        assert {"accept-language": "en", "accept": None} == vary
+
+    def test_vary_star(self):
+        assert cache.get_vary(make_response({"Vary": "Accept, *"}).headers, {}) is None
+
+
+class TestCachedResponse:
+    def test_round_trip(self):
+        cached_response = cache.CachedResponse.from_response(make_response({"ETag": '"abc"'}), expires_at=0)
+        response = cached_response.to_response()
+        assert 200 == response.status_code
+        assert b"content" == response.content
+        assert '"abc"' == response.headers["etag"]
+        assert '"abc"' == cached_response.etag
+
+    def test_is_fresh(self):
+        assert make_cached_response().is_fresh()
+        assert not make_cached_response(expires_at=time.time() - 1).is_fresh()
+
+    def test_matches(self):
+        cached_response = cache.CachedResponse.from_response(make_response(), expires_at=0, vary={"accept": "a/b"})
+        assert cached_response.matches(structures.CaseInsensitiveDict({"Accept": "a/b"}))
+        assert not cached_response.matches(structures.CaseInsensitiveDict({"Accept": "c/d"}))
+        assert not cached_response.matches(structures.CaseInsensitiveDict())
+
+
+class TestMemoryCache:
+    def test_get_and_set(self):
+        memory_cache = cache.MemoryCache()
+        cached_response = make_cached_response()
+        memory_cache.set("key", cached_response)
+        assert cached_response is memory_cache.get("key")
+        assert memory_cache.get("other") is None
+
+    def test_evicts_least_recently_used(self):
+        size = make_cached_response().size
+        memory_cache = cache.MemoryCache(max_bytes=2 * size)
+        memory_cache.set("first", make_cached_response())
+        memory_cache.set("second", make_cached_response())
+        memory_cache.get("first")
+        memory_cache.set("third", make_cached_response())
+        assert memory_cache.get("first") is not None
+        assert memory_cache.get("second") is None
+        assert 2 == len(memory_cache)
+        assert 2 * size == memory_cache.size
+
+    def test_too_large_response_is_not_stored(self):
+        memory_cache = cache.MemoryCache(max_bytes=10)
+        memory_cache.set("key", make_cached_response(content=b"x" * 100))
+        assert 0 == len(memory_cache)
+
+    def test_replacing_keeps_size(self):
+        memory_cache = cache.MemoryCache()
+        memory_cache.set("key", make_cached_response())
+        memory_cache.set("key", make_cached_response())
+        assert make_cached_response().size == memory_cache.size
+
+    def test_delete_and_clear(self):
+        memory_cache = cache.MemoryCache()
+        memory_cache.set("first", make_cached_response())
+        memory_cache.set("second", make_cached_response())
+        memory_cache.delete("first")
+        assert memory_cache.get("first") is None
+        memory_cache.clear()
+        assert 0 == len(memory_cache)
+        assert 0 == memory_cache.size
+
+
+class TestDiskCache:
+    def test_get_and_set(self, tmp_path):
+        disk_cache = cache.DiskCache(str(tmp_path))
+        disk_cache.set("key", make_cached_response(content=b"line one\nline two"))
+        cached_response = cache.DiskCache(str(tmp_path)).get("key")
+        assert cached_response is not None
+        assert b"line one\nline two" == cached_response.content
+        assert '"abc"' == cached_response.etag
+        assert cached_response.is_fresh()
+
+    def test_vary_round_trip(self, tmp_path):
+        disk_cache = cache.DiskCache(str(tmp_path))
+        cached_response = make_cached_response()
+        cached_response.vary = {"accept": "a/b"}
+        disk_cache.set("key", cached_response)
+        cached_response = disk_cache.get("key")
+        assert cached_response is not None
+        assert {"accept": "a/b"} == cached_response.vary
+
+    def test_missing(self, tmp_path):
+        assert cache.DiskCache(str(tmp_path)).get("key") is None
+
+    def test_delete_and_clear(self, tmp_path):
+        disk_cache = cache.DiskCache(str(tmp_path))
+        disk_cache.set("first", make_cached_response())
+        disk_cache.set("second", make_cached_response())
+        disk_cache.delete("first")
+        disk_cache.delete("first")
+        assert disk_cache.get("first") is None
+        disk_cache.clear()
+        assert disk_cache.get("second") is None
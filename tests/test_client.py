@@ -1,9 +1,34 @@
+import datetime
+import functools
+import gzip
+import io
+import json
+import threading
+import time
+import zlib
+from concurrent import futures
 from unittest import mock
 
 import pytest
+import requests
+from requests import adapters
 from urllib3.util import retry
 
-from apiron import NoHostsAvailableException, Timeout, client
+from apiron import (
+    Compression,
+    Endpoint,
+    Failover,
+    JsonEndpoint,
+    NoHostsAvailableException,
+    ServerSentEventsEndpoint,
+    StreamingEndpoint,
+    Timeout,
+    cache,
+    client,
+    instrumentation,
+    pool,
+    upload,
+)
 
 
 @pytest.fixture
@@ -20,10 +45,30 @@ def mock_endpoint():
     endpoint.get_formatted_path.return_value = "/foo/"
     endpoint.timeout_spec = None
     endpoint.retry_spec = None
+    endpoint.failover_spec = None
+    endpoint.get_hedge_delay.return_value = None
+    endpoint.cache = None
+    endpoint.coalesce = False
+    endpoint.accept_encoding = None
+    endpoint.compression_spec = None
+    endpoint.rate_limiter = None
     del endpoint.stub_response
     return endpoint
 
 
+@pytest.fixture
+def mock_service():
+    service = mock.Mock()
+    service.get_hosts.return_value = ["http://host1.biz"]
+    service.required_headers = {}
+    service.load_balancer = None
+    service.circuit_breaker = None
+    service.accept_encoding = None
+    service.rate_limiter = None
+    service.concurrency_limiter = None
+    return service
+
+
 @pytest.fixture
 def mock_logger():
     return mock.Mock()
@@ -38,8 +83,67 @@ def test_adapt_session(mock_session):
     assert adapter == adapted_session.get_adapter("https://foo.com")
 
 
-def test_get_required_headers(mock_endpoint):
-    service = mock.Mock()
+def test_adapt_session_for_retry_spec_mounts_adapter_once():
+    session = requests.Session()
+    retry_spec = retry.Retry(total=3)
+
+    client._adapt_session_for_retry_spec(session, retry_spec)
+    adapter = session.get_adapter("https://foo.com")
+    assert isinstance(adapter, client._RetrySpecAdapter)
+    assert retry_spec is adapter.get_adapter(retry_spec).max_retries
+
+    with mock.patch.object(session, "mount") as mock_mount:
+        client._adapt_session_for_retry_spec(session, retry.Retry(total=5))
+        assert not mock_mount.called
+
+
+def test_retry_spec_adapter_reuses_adapters_for_equal_specs():
+    adapter = client._RetrySpecAdapter(retry.Retry(total=3))
+    assert adapter.get_adapter(retry.Retry(total=3)) is adapter.get_adapter(retry.Retry(total=3))
+    assert adapter.get_adapter(retry.Retry(total=3)) is not adapter.get_adapter(retry.Retry(total=5))
+
+
+@pytest.mark.no_hobble_network
+def test_retry_spec_adapter_uses_each_calls_retry_spec(mock_service):
+    session = requests.Session()
+    default_retry_spec = retry.Retry(total=1)
+    client._adapt_session_for_retry_spec(session, default_retry_spec)
+    barrier = threading.Barrier(2, timeout=5)
+    used_retry_specs = {}
+
+    def send(adapter, request, **kwargs):
+        if request.url != "http://third.biz/":
+            barrier.wait()
+        used_retry_specs[request.url] = adapter.max_retries
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+    def call_with(retry_spec, url):
+        request = requests.Request("GET", url).prepare()
+        client._send_request(session, mock_service, url, request, retry_spec=retry_spec)
+
+    first_retry_spec = retry.Retry(total=3)
+    second_retry_spec = retry.Retry(total=5)
+    with mock.patch.object(adapters.HTTPAdapter, "send", autospec=True, side_effect=send):
+        threads = [
+            threading.Thread(target=call_with, args=(first_retry_spec, "http://first.biz/")),
+            threading.Thread(target=call_with, args=(second_retry_spec, "http://second.biz/")),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        session.send(requests.Request("GET", "http://third.biz/").prepare())
+
+    assert first_retry_spec is used_retry_specs["http://first.biz/"]
+    assert second_retry_spec is used_retry_specs["http://second.biz/"]
+    assert default_retry_spec is used_retry_specs["http://third.biz/"]
+
+
+def test_get_required_headers(mock_endpoint, mock_service):
+    service = mock_service
     service.required_headers = {"one": "two"}
     mock_endpoint.required_headers = {"foo": "bar"}
     expected_headers = {}
@@ -51,11 +155,14 @@ def test_get_required_headers(mock_endpoint):
 @mock.patch("apiron.client.requests.Request")
 @mock.patch("apiron.client._get_required_headers")
 def test_build_request_object_passes_arguments_to_request_constructor(
-    mock_get_required_headers, mock_request_constructor, mock_endpoint
+    mock_get_required_headers,
+    mock_request_constructor,
+    mock_endpoint,
+    mock_service,
 ):
     session = mock.Mock()
 
-    service = mock.Mock()
+    service = mock_service
     service.get_hosts.return_value = ["http://host1.biz"]
 
     mock_endpoint.default_method = "POST"
@@ -106,6 +213,139 @@ def test_build_request_object_passes_arguments_to_request_constructor(
         assert 1 == mock_prepare_request.call_count
 
 
+def _prepare_with_session(session, service, endpoint, host, method="GET", **kwargs):
+    # How requests are prepared when they can't be prepared from a request template
+    with mock.patch("apiron.client._can_prepare_directly", return_value=False):
+        return client._build_request_object(session, service, endpoint, host, method=method, **kwargs)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"params": {"page": 2, "tags": ["a", None, "b c"]}},
+        {"json": {"name": "ünïcode"}, "headers": {"X-Request": "1"}},
+        {"data": {"field": "value"}, "headers": {"Accept": None}},
+        {"data": b"raw"},
+    ],
+)
+def test_build_request_object_from_template_matches_prepare_request(make_service, kwargs):
+    endpoint = JsonEndpoint(path="/users/{user_id}/posts", default_params={"expand": "author"})
+    service = make_service("http://host1.biz/v2", endpoint=endpoint, required_headers={"X-Service": "service"})
+    session = requests.Session()
+
+    with mock.patch.object(session, "prepare_request", wraps=session.prepare_request) as mock_prepare_request:
+        prepared = client._build_request_object(
+            session, service, endpoint, "http://host1.biz/v2", method="POST", user_id="a b", **kwargs
+        )
+    expected = _prepare_with_session(
+        session, service, endpoint, "http://host1.biz/v2", method="POST", user_id="a b", **kwargs
+    )
+
+    assert not mock_prepare_request.called
+    assert expected.method == prepared.method
+    assert expected.url == prepared.url
+    assert expected.headers == prepared.headers
+    assert expected.body == prepared.body
+
+
+@pytest.mark.parametrize(
+    ("path", "value"),
+    [
+        ("/files/{name}", "../secret"),
+        ("/files/{name}", "a:b"),
+        ("/files/{name}/", "a b"),
+    ],
+)
+def test_build_request_object_falls_back_to_prepare_request_for_paths_it_would_change(make_service, path, value):
+    endpoint = Endpoint(path=path, encode_path_values=False)
+    service = make_service(endpoint=endpoint)
+    session = requests.Session()
+
+    prepared = client._build_request_object(session, service, endpoint, "http://host1.biz", name=value)
+
+    assert _prepare_with_session(session, service, endpoint, "http://host1.biz", name=value).url == prepared.url
+
+
+@pytest.mark.parametrize(
+    "configure",
+    [
+        lambda session: session.cookies.set("chocolate-chip", "yes"),
+        lambda session: setattr(session, "auth", ("user", "password")),
+        lambda session: session.params.update({"page": 2}),
+        lambda session: session.hooks["response"].append(print),
+    ],
+)
+def test_build_request_object_uses_prepare_request_for_sessions_with_state_to_merge(make_service, configure):
+    endpoint = Endpoint(path="/foo")
+    service = make_service(endpoint=endpoint)
+    session = requests.Session()
+    configure(session)
+
+    with mock.patch.object(session, "prepare_request", wraps=session.prepare_request) as mock_prepare_request:
+        client._build_request_object(session, service, endpoint, "http://host1.biz")
+
+    assert mock_prepare_request.called
+
+
+def test_build_request_object_uses_netrc_credentials(make_service, tmp_path, monkeypatch):
+    netrc = tmp_path / ".netrc"
+    netrc.write_text("machine netrc-host.biz login user password secret\n")
+    monkeypatch.setenv("NETRC", str(netrc))
+    endpoint = Endpoint(path="/foo")
+    service = make_service("http://netrc-host.biz", endpoint=endpoint)
+
+    prepared = client._build_request_object(requests.Session(), service, endpoint, "http://netrc-host.biz")
+
+    assert prepared.headers["Authorization"].startswith("Basic ")
+
+
+def test_request_template_merges_static_required_headers_once(make_service):
+    endpoint = JsonEndpoint(path="/foo")
+    service = make_service(endpoint=endpoint, required_headers={"X-Service": "service"})
+
+    template = client._RequestTemplate(service, endpoint, "http://host1.biz")
+
+    assert "http://host1.biz/" == template.base_url
+    assert {"Accept": "application/json"} == template.endpoint_headers
+    assert {"X-Service": "service", "Accept": "application/json"} == template.get_required_headers(service, endpoint)
+
+
+def test_request_template_follows_changes_to_service_required_headers(make_service):
+    endpoint = Endpoint(path="/foo")
+    service = make_service(endpoint=endpoint, required_headers={"X-Service": "first"})
+    session = requests.Session()
+
+    first = client._build_request_object(session, service, endpoint, "http://host1.biz")
+    service.required_headers["X-Service"] = "second"
+    second = client._build_request_object(session, service, endpoint, "http://host1.biz", cookies={"a": "b"})
+    third = client._build_request_object(session, service, endpoint, "http://host1.biz")
+
+    assert "first" == first.headers["X-Service"]
+    assert "second" == second.headers["X-Service"]
+    assert "second" == third.headers["X-Service"]
+
+
+def test_request_template_merges_computed_required_headers_on_every_call(make_service):
+    class TokenEndpoint(Endpoint):
+        token = "first"
+
+        @property
+        def required_headers(self):
+            return {"Authorization": f"Bearer {self.token}"}
+
+    endpoint = TokenEndpoint(path="/foo")
+    service = make_service(endpoint=endpoint)
+    session = requests.Session()
+
+    first = client._build_request_object(session, service, endpoint, "http://host1.biz")
+    endpoint.token = "second"
+    second = client._build_request_object(session, service, endpoint, "http://host1.biz")
+
+    assert client._RequestTemplate(service, endpoint, "http://host1.biz").endpoint_headers is None
+    assert "Bearer first" == first.headers["Authorization"]
+    assert "Bearer second" == second.headers["Authorization"]
+
+
 @mock.patch("apiron.client.Timeout")
 @mock.patch("apiron.client._adapt_session")
 @mock.patch("apiron.client._build_request_object")
@@ -120,8 +360,9 @@ def test_call(
     mock_response,
     mock_endpoint,
     mock_logger,
+    mock_service,
 ):
-    service = mock.Mock()
+    service = mock_service
     service.get_hosts.return_value = ["http://host1.biz"]
 
     mock_endpoint.default_method = "GET"
@@ -142,7 +383,10 @@ def test_call(
 
     client.call(service, mock_endpoint, timeout_spec=mock_timeout, logger=mock_logger)
 
-    mock_adapt_session.assert_called_once_with(mock_session, MockAdapter())
+    mock_adapt_session.assert_not_called()
+    mock_session.mount.assert_any_call("http://", MockAdapter())
+    mock_session.mount.assert_any_call("https://", MockAdapter())
+    assert not mock_session.close.called
     mock_session.send.assert_called_once_with(
         request,
         timeout=(mock_timeout.connection_timeout, mock_timeout.read_timeout),
@@ -188,8 +432,10 @@ def test_call(
 @mock.patch("apiron.client._build_request_object")
 @mock.patch("apiron.client._adapt_session")
 @mock.patch("requests.Session", autospec=True)
-def test_call_auth_priority(MockSession, mock_adapt_session, mock_build_request_object, mock_endpoint, mock_logger):
-    service = mock.Mock()
+def test_call_auth_priority(
+    MockSession, mock_adapt_session, mock_build_request_object, mock_endpoint, mock_logger, mock_service
+):
+    service = mock_service
     service.get_hosts.return_value = ["http://host1.biz"]
     service.required_headers = {}
     service.auth = ("service-user", "p455w0rd!")
@@ -211,8 +457,8 @@ def test_call_auth_priority(MockSession, mock_adapt_session, mock_build_request_
     assert mock_build_request_object.call_args[1]["auth"] == ("service-user", "p455w0rd!")
 
 
-def test_call_with_existing_session(mock_response, mock_endpoint, mock_logger):
-    service = mock.Mock()
+def test_call_with_existing_session(mock_response, mock_endpoint, mock_logger, mock_service):
+    service = mock_service
     service.get_hosts.return_value = ["http://host1.biz"]
     service.required_headers = {}
 
@@ -224,8 +470,36 @@ def test_call_with_existing_session(mock_response, mock_endpoint, mock_logger):
     assert not session.close.called
 
 
-def test_call_with_explicit_encoding(mock_response, mock_endpoint, mock_logger):
-    service = mock.Mock()
+def test_call_with_existing_session_mounts_adapter_once(mock_response, mock_endpoint, mock_logger, mock_service):
+    service = mock_service
+    service.get_hosts.return_value = ["http://host1.biz"]
+    service.required_headers = {}
+
+    session = mock.Mock()
+    session.send.return_value = mock_response
+
+    client.call(service, mock_endpoint, session=session, logger=mock_logger)
+    client.call(service, mock_endpoint, session=session, logger=mock_logger)
+
+    assert 2 == session.mount.call_count
+
+
+def test_call_without_mounting_adapter(mock_response, mock_endpoint, mock_logger, mock_service):
+    service = mock_service
+    service.get_hosts.return_value = ["http://host1.biz"]
+    service.required_headers = {}
+
+    session = mock.Mock()
+    session.send.return_value = mock_response
+
+    client.call(service, mock_endpoint, session=session, logger=mock_logger, mount_adapter=False)
+
+    assert not session.mount.called
+    assert 1 == session.send.call_count
+
+
+def test_call_with_explicit_encoding(mock_response, mock_endpoint, mock_logger, mock_service):
+    service = mock_service
     service.get_hosts.return_value = ["http://host1.biz"]
     service.required_headers = {}
 
@@ -241,9 +515,15 @@ def test_call_with_explicit_encoding(mock_response, mock_endpoint, mock_logger):
 @mock.patch("apiron.client._adapt_session")
 @mock.patch("requests.Session", autospec=True)
 def test_call_uses_configured_endpoint_timeout_spec(
-    MockSession, mock_adapt_session, mock_build_request_object, mock_response, mock_endpoint, mock_logger
+    MockSession,
+    mock_adapt_session,
+    mock_build_request_object,
+    mock_response,
+    mock_endpoint,
+    mock_logger,
+    mock_service,
 ):
-    service = mock.Mock()
+    service = mock_service
     service.get_hosts.return_value = ["http://host1.biz"]
     service.required_headers = {}
 
@@ -275,9 +555,15 @@ def test_call_uses_configured_endpoint_timeout_spec(
 @mock.patch("apiron.client.adapters.HTTPAdapter", autospec=True)
 @mock.patch("requests.Session", autospec=True)
 def test_call_uses_configured_endpoint_retry_spec(
-    MockSession, MockAdapter, mock_build_request_object, mock_response, mock_endpoint, mock_logger
+    MockSession,
+    MockAdapter,
+    mock_build_request_object,
+    mock_response,
+    mock_endpoint,
+    mock_logger,
+    mock_service,
 ):
-    service = mock.Mock()
+    service = mock_service
     service.get_hosts.return_value = ["http://host1.biz"]
     service.required_headers = {}
 
@@ -299,35 +585,36 @@ def test_call_uses_configured_endpoint_retry_spec(
     mock_session.proxies = {}
     mock_session.auth = ()
 
-    client.call(service, mock_endpoint, session=mock_session, logger=mock_logger)
+    with mock.patch.object(client, "_send_request", return_value=mock_response) as mock_send_request:
+        client.call(service, mock_endpoint, session=mock_session, logger=mock_logger)
 
-    MockAdapter.assert_called_once_with(max_retries=retry_spec)
+    assert retry_spec is mock_send_request.call_args[1]["retry_spec"]
 
 
-def test_build_request_object_raises_no_host_exception():
-    service = mock.Mock()
+def test_build_request_object_raises_no_host_exception(mock_service):
+    service = mock_service
     service.get_hosts.return_value = []
 
     with pytest.raises(NoHostsAvailableException):
         client._build_request_object(mock.Mock(), service, mock.Mock())
 
 
-def test_choose_host_returns_one_of_the_available_hosts():
+def test_choose_host_returns_one_of_the_available_hosts(mock_service):
     hosts = ["foo", "bar", "baz"]
-    service = mock.Mock()
+    service = mock_service
     service.get_hosts.return_value = hosts
     assert client._choose_host(service) in hosts
 
 
-def test_choose_host_raises_exception_when_no_hosts_available():
-    service = mock.Mock()
+def test_choose_host_raises_exception_when_no_hosts_available(mock_service):
+    service = mock_service
     service.get_hosts.return_value = []
     with pytest.raises(NoHostsAvailableException):
         client._choose_host(service)
 
 
-def test_call_when_raw_response_object_requested(mock_response, mock_endpoint, mock_logger):
-    service = mock.Mock()
+def test_call_when_raw_response_object_requested(mock_response, mock_endpoint, mock_logger, mock_service):
+    service = mock_service
     service.get_hosts.return_value = ["http://host1.biz"]
     service.required_headers = {}
 
@@ -339,8 +626,8 @@ def test_call_when_raw_response_object_requested(mock_response, mock_endpoint, m
     assert response is mock_response
 
 
-def test_call_when_raw_response_object_requested_on_endpoint(mock_response, mock_endpoint):
-    service = mock.Mock()
+def test_call_when_raw_response_object_requested_on_endpoint(mock_response, mock_endpoint, mock_service):
+    service = mock_service
     service.get_hosts.return_value = ["http://host1.biz"]
     service.required_headers = {}
 
@@ -354,8 +641,8 @@ def test_call_when_raw_response_object_requested_on_endpoint(mock_response, mock
     assert response is mock_response
 
 
-def test_return_raw_response_object_in_call_overrides_endpoint(mock_response, mock_endpoint):
-    service = mock.Mock()
+def test_return_raw_response_object_in_call_overrides_endpoint(mock_response, mock_endpoint, mock_service):
+    service = mock_service
     service.get_hosts.return_value = ["http://host1.biz"]
     service.required_headers = {}
 
@@ -390,3 +677,741 @@ def test_return_raw_response_object_in_call_overrides_endpoint(mock_response, mo
 )
 def test_build_url(host, path, url):
     assert url == client._build_url(host, path)
+
+
+class TestCallMany:
+    @pytest.fixture
+    def service(self, make_service):
+        return make_service()
+
+    @pytest.fixture
+    def send(self, make_response):
+        def send(session, request, **kwargs):
+            if "fail" in request.url:
+                raise requests.ConnectionError(request.url)
+            return make_response(request)
+
+        return send
+
+    def test_results_are_in_order(self, service, send):
+        endpoint = service.thing = Endpoint(path="/{thing}")
+        arguments = [{"thing": str(i)} for i in range(25)]
+
+        with mock.patch.object(requests.Session, "send", send):
+            results = list(client.call_many(service, endpoint, arguments, max_workers=3))
+
+        assert arguments == [result.arguments for result in results]
+        assert [f"http://host1.biz/{i}" for i in range(25)] == [result.result for result in results]
+        assert all(result.exception is None for result in results)
+
+    def test_results_as_completed(self, service, send):
+        endpoint = service.thing = Endpoint(path="/{thing}")
+        arguments = [{"thing": str(i)} for i in range(25)]
+
+        with mock.patch.object(requests.Session, "send", send):
+            results = list(client.call_many(service, endpoint, arguments, max_workers=3, ordered=False))
+
+        assert sorted(f"http://host1.biz/{i}" for i in range(25)) == sorted(result.result for result in results)
+
+    def test_exceptions_are_collected(self, service, send):
+        endpoint = service.thing = Endpoint(path="/{thing}")
+        arguments = [{"thing": "ok"}, {"thing": "fail"}, {"thing": "ok-again"}]
+
+        with mock.patch.object(requests.Session, "send", send):
+            results = list(client.call_many(service, endpoint, arguments))
+
+        assert "http://host1.biz/ok" == results[0].result
+        assert isinstance(results[1].exception, requests.ConnectionError)
+        assert results[1].result is None
+        assert "http://host1.biz/ok-again" == results[2].result
+
+    def test_pooled_session_limits_connections_per_host(self, service):
+        endpoint = service.thing = Endpoint(path="/{thing}")
+
+        with pool.SessionPool() as session_pool:
+            list(client.call_many(service, endpoint, [], max_workers=8, max_per_host=2, session_pool=session_pool))
+            session = session_pool.get_session(service, client.DEFAULT_RETRY, pool_maxsize=2, pool_block=True)
+            assert 1 == len(session_pool)
+
+        adapter = session.get_adapter("http://host1.biz")
+        assert isinstance(adapter, adapters.HTTPAdapter)
+        assert 2 == adapter.poolmanager.connection_pool_kw["maxsize"]
+        assert adapter.poolmanager.connection_pool_kw["block"]
+
+    def test_pooled_session_is_sized_for_workers_and_kept(self, service, send):
+        endpoint = service.thing = Endpoint(path="/{thing}")
+
+        with pool.SessionPool(pool_maxsize=4) as session_pool, mock.patch.object(requests.Session, "send", send):
+            list(client.call_many(service, endpoint, [{"thing": "a"}], max_workers=8, session_pool=session_pool))
+            session = session_pool.get_session(service, client.DEFAULT_RETRY, pool_maxsize=8)
+            assert 1 == len(session_pool)
+
+        adapter = session.get_adapter("http://host1.biz")
+        assert isinstance(adapter, adapters.HTTPAdapter)
+        assert 8 == adapter.poolmanager.connection_pool_kw["maxsize"]
+
+    def test_max_per_host_with_session_raises(self, service):
+        endpoint = service.thing = Endpoint(path="/{thing}")
+
+        with pytest.raises(ValueError, match="max_per_host"):
+            list(client.call_many(service, endpoint, [], session=mock.Mock(), max_per_host=2))
+
+    def test_unexpected_exceptions_propagate(self, service):
+        endpoint = service.thing = Endpoint(path="/{thing}")
+
+        with mock.patch.object(client, "call", side_effect=KeyError("bug")), pytest.raises(KeyError):
+            list(client.call_many(service, endpoint, [{"thing": "a"}]))
+
+    def test_existing_session_is_not_closed(self, service, mock_response):
+        endpoint = service.thing = Endpoint(path="/{thing}")
+        session = mock.Mock()
+        session.send.return_value = mock_response
+
+        results = list(client.call_many(service, endpoint, [{"thing": "a"}, {"thing": "b"}], session=session))
+
+        assert 2 == session.send.call_count
+        assert all(result.exception is None for result in results)
+        assert not session.close.called
+
+    def test_endpoint_map(self, service):
+        endpoint = service.thing = JsonEndpoint(path="/{thing}")
+
+        with mock.patch("apiron.client.call_many") as mock_call_many:
+            service.thing.map([{"thing": "a"}], max_workers=2)  # type: ignore[attr-defined]
+
+        mock_call_many.assert_called_once_with(service, endpoint, [{"thing": "a"}], max_workers=2)
+
+
+class TestFailover:
+    @pytest.fixture
+    def service(self, make_service):
+        return make_service(
+            "http://host1.biz",
+            "http://host2.biz",
+            thing=Endpoint(path="/thing", failover_spec=Failover(attempts=3, backoff_factor=0)),
+        )
+
+    def test_connection_error_fails_over_to_another_host(self, service, make_response):
+        session = requests.Session()
+        sent_urls = []
+
+        def send(request, **kwargs):
+            sent_urls.append(request.url)
+            if len(sent_urls) == 1:
+                raise requests.ConnectionError
+            return make_response(status_code=200)
+
+        with mock.patch.object(session, "send", side_effect=send):
+            service.thing(session=session)
+
+        assert 2 == len(sent_urls)
+        assert sent_urls[0] != sent_urls[1]
+
+    def test_retryable_status_fails_over(self, service, make_response):
+        session = requests.Session()
+
+        with mock.patch.object(
+            session, "send", side_effect=[make_response(status_code=503), make_response(status_code=200)]
+        ) as mock_send:
+            service.thing(session=session)
+
+        assert 2 == mock_send.call_count
+
+    def test_each_attempt_is_timed(self, service, make_response):
+        session = requests.Session()
+        events: list[instrumentation.TimingEvent] = []
+        unsubscribe = instrumentation.subscribe(events.append)
+
+        try:
+            with mock.patch.object(
+                session, "send", side_effect=[make_response(status_code=503), make_response(status_code=200)]
+            ):
+                service.thing(session=session)
+        finally:
+            unsubscribe()
+
+        assert [
+            ("start", 1, None),
+            ("resolve", 1, None),
+            ("prepare", 1, None),
+            ("first_byte", 1, 503),
+            ("download", 1, 503),
+            ("resolve", 2, None),
+            ("prepare", 2, None),
+            ("first_byte", 2, 200),
+            ("download", 2, 200),
+            ("format", 2, 200),
+            ("call", 2, 200),
+        ] == [(event.phase, event.attempt, event.status_code) for event in events]
+        assert events[1].host != events[5].host
+
+    def test_gives_up_after_attempts(self, service):
+        session = requests.Session()
+
+        with (
+            mock.patch.object(session, "send", side_effect=requests.ReadTimeout) as mock_send,
+            pytest.raises(requests.ReadTimeout),
+        ):
+            service.thing(session=session)
+
+        assert 3 == mock_send.call_count
+
+    def test_last_bad_status_is_raised(self, service, make_response):
+        session = requests.Session()
+
+        with (
+            mock.patch.object(session, "send", return_value=make_response(status_code=503)) as mock_send,
+            pytest.raises(requests.HTTPError),
+        ):
+            service.thing(session=session)
+
+        assert 3 == mock_send.call_count
+
+    def test_non_idempotent_method_only_fails_over_on_connect_timeout(self, service, make_response):
+        session = requests.Session()
+
+        with (
+            mock.patch.object(session, "send", side_effect=requests.ReadTimeout) as mock_send,
+            pytest.raises(requests.ReadTimeout),
+        ):
+            service.thing(session=session, method="POST")
+        assert 1 == mock_send.call_count
+
+        with mock.patch.object(
+            session, "send", side_effect=[requests.ConnectTimeout, make_response(status_code=200)]
+        ) as mock_send:
+            service.thing(session=session, method="POST")
+        assert 2 == mock_send.call_count
+
+    def test_body_that_can_only_be_read_once_is_not_failed_over(self, service, make_response):
+        session = requests.Session()
+
+        with (
+            mock.patch.object(session, "send", side_effect=requests.ConnectTimeout) as mock_send,
+            pytest.raises(requests.ConnectTimeout),
+        ):
+            service.thing(session=session, method="PUT", data=(chunk for chunk in [b"a", b"b"]))
+        assert 1 == mock_send.call_count
+
+        with mock.patch.object(
+            session, "send", side_effect=[requests.ConnectTimeout, make_response(status_code=200)]
+        ) as mock_send:
+            service.thing(session=session, method="PUT", files={"file": io.BytesIO(b"contents")})
+        assert 2 == mock_send.call_count
+        first, second = (b"".join(call.args[0].body) for call in mock_send.call_args_list)
+        assert b"contents" in first
+        assert first == second
+
+    def test_deadline_stops_failing_over(self, service):
+        session = requests.Session()
+
+        with (
+            mock.patch("apiron.client.time.monotonic", side_effect=[100, 106]),
+            mock.patch.object(session, "send", side_effect=requests.ConnectionError) as mock_send,
+            pytest.raises(requests.ConnectionError),
+        ):
+            service.thing(session=session, failover_spec=Failover(deadline=5, backoff_factor=0))
+
+        assert 1 == mock_send.call_count
+
+    def test_backoff_is_capped(self):
+        with mock.patch("apiron.client.time.sleep") as mock_sleep:
+            client._wait_to_fail_over(Failover(backoff_factor=10, max_backoff=1), 5, None)
+        assert 0 <= mock_sleep.call_args[0][0] <= 1
+
+    def test_choose_host_excludes_tried_hosts(self, service):
+        assert "http://host2.biz" == client._choose_host(service, {"http://host1.biz"})
+        assert client._choose_host(service, {"http://host1.biz", "http://host2.biz"}) in service.get_hosts()
+
+
+class TestHedging:
+    @pytest.fixture
+    def service(self, make_service):
+        return make_service("http://host1.biz", "http://host2.biz", thing=Endpoint(path="/thing", hedge_after=0.01))
+
+    def test_fast_response_is_not_hedged(self, service, make_response):
+        session = requests.Session()
+
+        with mock.patch.object(session, "send", side_effect=lambda request, **kwargs: make_response(request)) as send:
+            service.thing(session=session)
+
+        assert 1 == send.call_count
+
+    def test_slow_response_is_hedged_to_another_host(self, service, make_response):
+        session = requests.Session()
+        release_slow = threading.Event()
+        slow_host: list[str] = []
+
+        def send(request, **kwargs):
+            if not slow_host:
+                slow_host.append(request.url)
+                release_slow.wait(5)
+            return make_response(request)
+
+        with mock.patch.object(session, "send", side_effect=send) as mock_send:
+            result = service.thing(session=session)
+            release_slow.set()
+
+        assert 2 == mock_send.call_count
+        assert result != slow_host[0]
+
+    def test_failed_hedge_falls_back_to_primary(self, service, make_response):
+        session = requests.Session()
+        calls = []
+
+        def send(request, **kwargs):
+            calls.append(request.url)
+            if len(calls) == 1:
+                time.sleep(0.05)
+                return make_response(request)
+            raise requests.ConnectionError
+
+        with mock.patch.object(session, "send", side_effect=send):
+            result = service.thing(session=session)
+
+        assert calls[0] == result
+
+    def test_streamed_body_is_not_hedged(self, service, make_response):
+        session = requests.Session()
+
+        def send(request, **kwargs):
+            time.sleep(0.05)
+            return make_response(request)
+
+        with mock.patch.object(session, "send", side_effect=send) as mock_send:
+            service.thing(session=session, method="PUT", data=upload.MappedFile(__file__))
+
+        assert 1 == mock_send.call_count
+
+    def test_both_failures_raise(self, service):
+        session = requests.Session()
+
+        def send(request, **kwargs):
+            time.sleep(0.02)
+            raise requests.ConnectionError
+
+        with mock.patch.object(session, "send", side_effect=send), pytest.raises(requests.ConnectionError):
+            service.thing(session=session)
+
+    def test_time_queued_for_a_worker_does_not_trigger_a_hedge(self, service, make_response):
+        session = requests.Session()
+        executor = futures.ThreadPoolExecutor(max_workers=1)
+        executor.submit(time.sleep, 0.05)
+
+        with (
+            mock.patch("apiron.client._get_hedge_executor", return_value=executor),
+            mock.patch.object(session, "send", side_effect=lambda request, **kwargs: make_response(request)) as send,
+        ):
+            service.thing(session=session)
+
+        executor.shutdown()
+        assert 1 == send.call_count
+
+    def test_losing_primary_latency_is_recorded(self, service, make_response):
+        session = requests.Session()
+        release_slow = threading.Event()
+        latencies: list[float] = []
+
+        def send(request, **kwargs):
+            response = make_response(request)
+            if not latencies and "host1" in request.url:
+                release_slow.wait(5)
+                response.elapsed = datetime.timedelta(seconds=3)
+            return response
+
+        with (
+            mock.patch.object(vars(service)["thing"], "record_latency", side_effect=latencies.append),
+            mock.patch.object(session, "send", side_effect=send),
+            mock.patch("apiron.client._choose_host", side_effect=["http://host1.biz", "http://host2.biz"]),
+        ):
+            service.thing(session=session)
+            assert [] == latencies
+
+            release_slow.set()
+            for _ in range(100):
+                if latencies:
+                    break
+                time.sleep(0.01)
+
+        assert [3] == latencies
+
+    def test_non_idempotent_calls_are_not_hedged(self, service, make_response):
+        session = requests.Session()
+
+        with (
+            mock.patch("apiron.client._send_hedged_request") as mock_send_hedged_request,
+            mock.patch.object(session, "send", side_effect=lambda request, **kwargs: make_response(request)),
+        ):
+            service.thing(session=session, method="POST")
+
+        assert not mock_send_hedged_request.called
+
+
+class TestResponseCache:
+    @pytest.fixture
+    def service(self, make_service):
+        return make_service(thing=Endpoint(path="/thing/{id}", cache=cache.MemoryCache()))
+
+    def test_fresh_response_is_served_without_a_request(self, service, make_response):
+        session = requests.Session()
+        send = mock.Mock(
+            side_effect=lambda request, **kwargs: make_response(request, headers={"Cache-Control": "max-age=60"})
+        )
+
+        with mock.patch.object(session, "send", send), mock.patch("apiron.client._choose_host") as mock_choose_host:
+            mock_choose_host.return_value = "http://host1.biz"
+            first = service.thing(session=session, id=1)
+            second = service.thing(session=session, id=1)
+            service.thing(session=session, id=2)
+
+        assert first == second
+        assert 2 == send.call_count
+        assert 2 == mock_choose_host.call_count
+
+    def test_fresh_response_is_timed(self, service, make_response):
+        session = requests.Session()
+        events: list[instrumentation.TimingEvent] = []
+        send = mock.Mock(
+            side_effect=lambda request, **kwargs: make_response(request, headers={"Cache-Control": "max-age=60"})
+        )
+
+        with mock.patch.object(session, "send", send):
+            service.thing(session=session, id=1)
+            unsubscribe = instrumentation.subscribe(events.append)
+            try:
+                service.thing(session=session, id=1)
+            finally:
+                unsubscribe()
+
+        assert [("start", None, None), ("format", None, 200), ("call", None, 200)] == [
+            (event.phase, event.host, event.status_code) for event in events
+        ]
+
+    def test_params_are_part_of_the_key(self, service, make_response):
+        session = requests.Session()
+        send = mock.Mock(
+            side_effect=lambda request, **kwargs: make_response(request, headers={"Cache-Control": "max-age=60"})
+        )
+
+        with mock.patch.object(session, "send", send):
+            service.thing(session=session, id=1, params={"a": 1, "b": 2})
+            service.thing(session=session, id=1, params={"b": 2, "a": 1})
+            service.thing(session=session, id=1, params={"a": 2})
+
+        assert 2 == send.call_count
+
+    def test_stale_response_is_revalidated(self, service, make_response):
+        session = requests.Session()
+        sent_headers = []
+
+        def send(request, **kwargs):
+            sent_headers.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"abc"':
+                return make_response(request, status_code=304, headers={"Cache-Control": "max-age=60"})
+            return make_response(request, headers={"ETag": '"abc"', "Cache-Control": "no-cache"})
+
+        with mock.patch.object(session, "send", side_effect=send):
+            first = service.thing(session=session, id=1)
+            second = service.thing(session=session, id=1)
+            third = service.thing(session=session, id=1)
+
+        assert [None, '"abc"'] == sent_headers
+        assert first == second == third
+
+    def test_no_store_is_not_cached(self, service, make_response):
+        session = requests.Session()
+        send = mock.Mock(
+            side_effect=lambda request, **kwargs: make_response(request, headers={"Cache-Control": "no-store"})
+        )
+
+        with mock.patch.object(session, "send", send):
+            service.thing(session=session, id=1)
+            service.thing(session=session, id=1)
+
+        assert 2 == send.call_count
+
+    def test_non_get_calls_are_not_cached(self, service, make_response):
+        session = requests.Session()
+        send = mock.Mock(
+            side_effect=lambda request, **kwargs: make_response(request, headers={"Cache-Control": "max-age=60"})
+        )
+
+        with mock.patch.object(session, "send", send):
+            service.thing(session=session, id=1, method="POST")
+            service.thing(session=session, id=1, method="POST")
+
+        assert 2 == send.call_count
+        assert 0 == len(service.__dict__["thing"].cache)
+
+    def test_errors_are_not_cached(self, service, make_response):
+        session = requests.Session()
+        send = mock.Mock(side_effect=lambda request, **kwargs: make_response(request, status_code=404))
+
+        with mock.patch.object(session, "send", send), pytest.raises(requests.HTTPError):
+            service.thing(session=session, id=1)
+
+        assert 0 == len(service.__dict__["thing"].cache)
+
+    @pytest.mark.parametrize(
+        "call_kwargs",
+        [
+            {"auth": ("user", "password")},
+            {"cookies": {"session": "abc"}},
+            {"headers": {"Authorization": "Bearer abc"}},
+            {"headers": {"cookie": "session=abc"}},
+        ],
+    )
+    def test_calls_with_credentials_are_not_cached(self, service, call_kwargs, make_response):
+        session = requests.Session()
+        send = mock.Mock(
+            side_effect=lambda request, **kwargs: make_response(request, headers={"Cache-Control": "max-age=60"})
+        )
+
+        with mock.patch.object(session, "send", send):
+            service.thing(session=session, id=1)
+            service.thing(session=session, id=1, **call_kwargs)
+            service.thing(session=session, id=1, **call_kwargs)
+
+        assert 3 == send.call_count
+
+    def test_sessions_with_cookies_are_not_cached(self, service, make_response):
+        session = requests.Session()
+        session.cookies.set("session", "abc")
+        send = mock.Mock(
+            side_effect=lambda request, **kwargs: make_response(request, headers={"Cache-Control": "max-age=60"})
+        )
+
+        with mock.patch.object(session, "send", send):
+            service.thing(session=session, id=1)
+            service.thing(session=session, id=1)
+
+        assert 2 == send.call_count
+        assert 0 == len(service.__dict__["thing"].cache)
+
+    def test_vary_headers_must_match(self, service, make_response):
+        session = requests.Session()
+        send = mock.Mock(
+            side_effect=lambda request, **kwargs: make_response(
+                request, headers={"Cache-Control": "max-age=60", "Vary": "Accept-Language"}
+            )
+        )
+
+        with mock.patch.object(session, "send", send):
+            service.thing(session=session, id=1, headers={"Accept-Language": "en"})
+            service.thing(session=session, id=1, headers={"Accept-Language": "en"})
+            service.thing(session=session, id=1, headers={"Accept-Language": "fr"})
+
+        assert 2 == send.call_count
+
+    def test_vary_star_is_not_cached(self, service, make_response):
+        session = requests.Session()
+        send = mock.Mock(
+            side_effect=lambda request, **kwargs: make_response(
+                request, headers={"Cache-Control": "max-age=60", "Vary": "*"}
+            )
+        )
+
+        with mock.patch.object(session, "send", send):
+            service.thing(session=session, id=1)
+            service.thing(session=session, id=1)
+
+        assert 2 == send.call_count
+        assert 0 == len(service.__dict__["thing"].cache)
+
+
+class TestCoalescing:
+    @pytest.fixture
+    def service(self, make_service):
+        return make_service(thing=Endpoint(path="/thing/{id}", coalesce=True))
+
+    @pytest.fixture
+    def call_concurrently(self, make_response):
+        return functools.partial(self._call_concurrently, make_response)
+
+    @staticmethod
+    def _call_concurrently(make_response, *calls):
+        started = threading.Event()
+        release = threading.Event()
+        sent = []
+
+        def send(session, request, **kwargs):
+            sent.append(request.url)
+            started.set()
+            release.wait(5)
+            return make_response(request)
+
+        results = [None] * len(calls)
+
+        def run(index):
+            results[index] = calls[index]()
+
+        with mock.patch.object(requests.Session, "send", side_effect=send, autospec=True):
+            leader = threading.Thread(target=run, args=(0,))
+            leader.start()
+            started.wait(5)
+            followers = [threading.Thread(target=run, args=(index,)) for index in range(1, len(calls))]
+            for follower in followers:
+                follower.start()
+            time.sleep(0.05)
+            release.set()
+            for thread in [leader, *followers]:
+                thread.join(5)
+
+        return sent, results
+
+    def test_identical_calls_share_a_request(self, service, call_concurrently):
+        sent, results = call_concurrently(*[lambda: service.thing(id=1, params={"a": 1})] * 3)
+        assert 1 == len(sent)
+        assert ["http://host1.biz/thing/1?a=1"] * 3 == results
+
+    def test_different_calls_do_not_share_a_request(self, service, call_concurrently):
+        sent, _ = call_concurrently(
+            lambda: service.thing(id=1),
+            lambda: service.thing(id=2),
+            lambda: service.thing(id=1, headers={"X-Thing": "yes"}),
+        )
+        assert 3 == len(sent)
+
+    def test_calls_with_different_options_do_not_share_a_request(self, service, call_concurrently):
+        sent, results = call_concurrently(
+            lambda: service.thing(id=1),
+            lambda: service.thing(id=1, return_raw_response_object=True),
+            lambda: service.thing(id=1, timeout_spec=Timeout(1, 1)),
+            lambda: service.thing(id=1, allow_redirects=False),
+        )
+        assert 4 == len(sent)
+        assert isinstance(results[1], requests.Response)
+
+    def test_equal_retry_specs_share_a_request(self, service, call_concurrently):
+        sent, _ = call_concurrently(
+            lambda: service.thing(id=1, retry_spec=retry.Retry(total=2)),
+            lambda: service.thing(id=1, retry_spec=retry.Retry(total=2)),
+        )
+        assert 1 == len(sent)
+
+    def test_calls_with_a_body_are_not_coalesced(self, service, call_concurrently):
+        sent, _ = call_concurrently(*[lambda: service.thing(id=1, method="PUT", json={"a": 1})] * 2)
+        assert 2 == len(sent)
+
+    def test_coalescing_can_be_disabled_per_call(self, service, call_concurrently):
+        sent, _ = call_concurrently(*[lambda: service.thing(id=1, coalesce=False)] * 2)
+        assert 2 == len(sent)
+
+
+def test_call_resumes_an_event_stream_with_the_last_event_id(make_service):
+    endpoint = ServerSentEventsEndpoint(path="/events", retry_delay=0)
+    service = make_service(events=endpoint)
+    bodies = iter([b"id: 1\ndata: a\n\n", b"id: 2\ndata: b\n\n"])
+    sent = []
+
+    def send(session, request, **kwargs):
+        sent.append(request)
+        response = requests.Response()
+        response.request = request
+        response.raw = io.BytesIO(next(bodies, b""))
+        response.status_code = 200 if len(sent) <= 2 else 204
+        return response
+
+    with mock.patch.object(requests.Session, "send", send):
+        events = list(client.call(service, endpoint, headers={"X-Thing": "yes"}))
+
+    assert ["a", "b"] == [event.data for event in events]
+    assert [None, "1", "2"] == [request.headers.get("Last-Event-ID") for request in sent]
+    assert all("yes" == request.headers["X-Thing"] for request in sent)
+    assert all("text/event-stream" == request.headers["Accept"] for request in sent)
+
+
+def test_call_reads_a_stream_in_chunks_of_the_size_given(make_service):
+    endpoint = StreamingEndpoint(path="/download", chunk_size=4)
+    service = make_service(download=endpoint)
+
+    def send(session, request, **kwargs):
+        assert kwargs["stream"]
+        response = requests.Response()
+        response.raw = io.BytesIO(b"0123456789")
+        response.status_code = 200
+        return response
+
+    with mock.patch.object(requests.Session, "send", send):
+        assert [b"0123", b"4567", b"89"] == list(client.call(service, endpoint))
+        assert [b"01234", b"56789"] == list(client.call(service, endpoint, chunk_size=5))
+
+
+def test_call_with_chunk_size_for_endpoint_that_does_not_stream(make_service):
+    endpoint = Endpoint(path="/thing")
+    service = make_service(thing=endpoint)
+
+    with pytest.raises(ValueError, match="only applies to streaming endpoints"):
+        client.call(service, endpoint, chunk_size=5)
+
+
+def test_call_streams_files_as_multipart_body(make_service):
+    endpoint = Endpoint(path="/upload", default_method="POST")
+    service = make_service(upload=endpoint)
+    sent = []
+
+    def send(session, request, **kwargs):
+        sent.append(request)
+        response = requests.Response()
+        response.raw = io.BytesIO(b"")
+        response.status_code = 201
+        return response
+
+    with mock.patch.object(requests.Session, "send", send):
+        client.call(service, endpoint, data={"name": "report"}, files={"file": ("report.csv", io.BytesIO(b"a,b\n"))})
+
+    body = sent[0].body
+    assert isinstance(body, upload.MultipartEncoder)
+    assert body.content_type == sent[0].headers["Content-Type"]
+    assert str(body.len) == sent[0].headers["Content-Length"]
+    assert b'filename="report.csv"' in b"".join(body)
+
+
+def _send_and_record(sent):
+    def send(session, request, **kwargs):
+        sent.append(request)
+        response = requests.Response()
+        response.raw = io.BytesIO(b"")
+        response.status_code = 200
+        return response
+
+    return send
+
+
+def test_call_accepts_the_encodings_of_the_endpoint_or_service(make_service):
+    service = make_service(
+        default=Endpoint(path="/default"),
+        identity=Endpoint(path="/identity", accept_encoding="identity"),
+    )
+    service.accept_encoding = ("br", "gzip")
+    sent: list[requests.PreparedRequest] = []
+
+    with mock.patch.object(requests.Session, "send", _send_and_record(sent)):
+        service.default()
+        service.identity()
+        service.default(headers={"accept-encoding": "deflate"})
+
+    assert ["gzip", "identity", "deflate"] == [request.headers["Accept-Encoding"] for request in sent]
+
+
+@pytest.mark.parametrize("cookies", [None, {"session": "1"}])
+def test_call_compresses_large_bodies(make_service, cookies):
+    service = make_service(upload=Endpoint(path="/upload", default_method="POST", compression_spec=Compression()))
+    document = {"values": list(range(1000))}
+    sent: list[requests.PreparedRequest] = []
+
+    with mock.patch.object(requests.Session, "send", _send_and_record(sent)):
+        service.upload(json=document, cookies=cookies)
+        service.upload(json={"small": True}, cookies=cookies)
+        service.upload(data={"field": "x" * 2000}, compression_spec=Compression("deflate"), cookies=cookies)
+
+    large, small, form = sent
+    assert isinstance(large.body, bytes)
+    assert isinstance(form.body, bytes)
+    assert "gzip" == large.headers["Content-Encoding"]
+    assert str(len(large.body)) == large.headers["Content-Length"]
+    assert json.loads(gzip.decompress(large.body)) == document
+    assert "Content-Encoding" not in small.headers
+    assert b'{"small": true}' == small.body
+    assert "deflate" == form.headers["Content-Encoding"]
+    assert b"field=" + b"x" * 2000 == zlib.decompress(form.body)
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+
+import pytest
+
+from apiron import coalescing
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_result(self):
+        single_flight = coalescing.SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def function():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return object()
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(single_flight.do("key", function)))
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(single_flight.do("key", function))) for _ in range(3)
+        ]
+        for follower in followers:
+            follower.start()
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        assert 1 == len(calls)
+        assert 4 == len(results)
+        assert 1 == len({id(result) for result in results})
+        assert 0 == len(single_flight)
+
+    def test_sequential_calls_are_not_shared(self):
+        single_flight = coalescing.SingleFlight()
+        assert [1, 2] == [single_flight.do("key", lambda: 1), single_flight.do("key", lambda: 2)]
+
+    def test_different_keys_are_not_shared(self):
+        single_flight = coalescing.SingleFlight()
+        assert 2 == single_flight.do("first", lambda: single_flight.do("second", lambda: 2))
+
+    def test_exception_is_shared(self):
+        single_flight = coalescing.SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def function():
+            started.set()
+            release.wait(5)
+            raise ValueError("boom")
+
+        def run():
+            try:
+                single_flight.do("key", function)
+            except ValueError as exception:
+                errors.append(exception)
+
+        leader = threading.Thread(target=run)
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=run)
+        follower.start()
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        assert 2 == len(errors)
+        assert 0 == len(single_flight)
+
+        with pytest.raises(ValueError):
+            single_flight.do("key", function)
+
+
+class TestAsyncSingleFlight:
+    def test_concurrent_calls_share_one_result(self):
+        single_flight = coalescing.AsyncSingleFlight()
+        calls = []
+
+        async def function():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return object()
+
+        async def main():
+            return await asyncio.gather(*(single_flight.do("key", function) for _ in range(5)))
+
+        results = asyncio.run(main())
+        assert 1 == len(calls)
+        assert 1 == len({id(result) for result in results})
+        assert 0 == len(single_flight)
+
+    def test_cancelling_a_caller_does_not_cancel_the_call(self):
+        single_flight = coalescing.AsyncSingleFlight()
+
+        async def function():
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def main():
+            first = asyncio.ensure_future(single_flight.do("key", function))
+            second = asyncio.ensure_future(single_flight.do("key", function))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        assert "result" == asyncio.run(main())
+
+    def test_exception_is_shared(self):
+        single_flight = coalescing.AsyncSingleFlight()
+
+        async def function():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def main():
+            return await asyncio.gather(*(single_flight.do("key", function) for _ in range(2)), return_exceptions=True)
+
+        assert all(isinstance(result, ValueError) for result in asyncio.run(main()))
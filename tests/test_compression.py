@@ -0,0 +1,99 @@
+import gzip
+import os
+import zlib
+
+import pytest
+from urllib3.response import HTTPResponse
+
+import apiron
+from apiron import compression
+
+
+@pytest.fixture
+def decoders(monkeypatch):
+    """Pretend that only some content codings can be decoded"""
+
+    def set_decoders(*encodings):
+        monkeypatch.setattr(HTTPResponse, "CONTENT_DECODERS", list(encodings))
+        compression._get_accept_encoding.cache_clear()
+
+    yield set_decoders
+    compression._get_accept_encoding.cache_clear()
+
+
+def test_available_encodings(decoders):
+    decoders("gzip", "x-gzip", "deflate", "zstd")
+    assert ("zstd", "gzip", "deflate") == compression.available_encodings()
+
+
+@pytest.mark.parametrize(
+    "encodings, expected",
+    [
+        (("br", "gzip"), "gzip"),
+        (["gzip", "deflate"], "gzip, deflate"),
+        ("deflate", "deflate"),
+        ("br", "identity"),
+        ("identity", "identity"),
+        (("zstd", "br", "deflate", "gzip"), "zstd, deflate, gzip"),
+    ],
+)
+def test_get_accept_encoding_leaves_out_codings_that_cannot_be_decoded(decoders, encodings, expected):
+    decoders("gzip", "deflate", "zstd")
+    assert expected == compression.get_accept_encoding(encodings)
+
+
+def test_get_accept_encoding_rejects_unknown_codings():
+    with pytest.raises(ValueError, match="compress"):
+        compression.get_accept_encoding(["gzip", "compress"])
+
+
+@pytest.mark.parametrize("encoding, decompress", [("gzip", gzip.decompress), ("deflate", zlib.decompress)])
+def test_compress(encoding, decompress):
+    body = b'{"key": "value"}' * 100
+
+    compressed = compression.compress(body, apiron.Compression(encoding))
+
+    assert compressed is not None
+    assert len(compressed) < len(body)
+    assert body == decompress(compressed)
+    assert compressed == compression.compress(body, apiron.Compression(encoding))
+
+
+def test_compress_skips_small_bodies():
+    body = b"x" * 100
+    assert compression.compress(body, apiron.Compression()) is None
+    assert compression.compress(body, apiron.Compression(min_size=100)) is not None
+
+
+def test_compress_skips_bodies_that_do_not_get_smaller():
+    assert compression.compress(os.urandom(4096), apiron.Compression()) is None
+
+
+def test_compress_at_level():
+    body = os.urandom(512) * 64
+    fast = compression.compress(body, apiron.Compression(level=1))
+    small = compression.compress(body, apiron.Compression(level=9))
+    assert fast is not None
+    assert small is not None
+    assert len(fast) > len(small)
+
+
+@pytest.mark.parametrize("encoding, module", [("br", "brotli"), ("zstd", "zstandard")])
+def test_get_compressor_requires_packages(monkeypatch, encoding, module):
+    monkeypatch.setitem(__import__("sys").modules, module, None)
+    monkeypatch.setitem(__import__("sys").modules, "brotlicffi", None)
+
+    with pytest.raises(ImportError, match=f"apiron\\[{'brotli' if encoding == 'br' else 'zstd'}\\]"):
+        compression.get_compressor(apiron.Compression(encoding))
+
+
+def test_get_compressor_rejects_unknown_codings():
+    with pytest.raises(ValueError, match="compress"):
+        compression.get_compressor(apiron.Compression("compress"))
+
+
+def test_endpoint_rejects_unknown_codings():
+    with pytest.raises(ValueError):
+        apiron.Endpoint(accept_encoding=["gzip", "lzma"])
+    with pytest.raises(ValueError):
+        apiron.Endpoint(compression_spec=apiron.Compression("lzma"))
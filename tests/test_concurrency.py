@@ -0,0 +1,308 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+import pytest
+import requests
+
+from apiron import ConcurrencyLimitExceededException, Endpoint, instrumentation
+from apiron.concurrency import (
+    AimdConcurrencyLimiter,
+    ConcurrencyLimiter,
+    GradientConcurrencyLimiter,
+    is_failure,
+)
+
+
+def fill(limiter, requests_in_flight):
+    for _ in range(requests_in_flight):
+        limiter.acquire()
+
+
+def test_sheds_requests_over_the_limit():
+    limiter = ConcurrencyLimiter(initial_limit=2, max_wait=0)
+    fill(limiter, 2)
+
+    with pytest.raises(ConcurrencyLimitExceededException) as exc_info:
+        limiter.acquire("SomeService")
+
+    assert 2 == exc_info.value.limit
+    assert "SomeService" in str(exc_info.value)
+    limiter.release(0.1)
+    assert 0 == limiter.acquire()
+
+
+def test_waiting_requests_get_slots_in_order():
+    limiter = ConcurrencyLimiter(initial_limit=1)
+    limiter.acquire()
+    admitted = []
+
+    def wait(name):
+        limiter.acquire()
+        admitted.append(name)
+
+    threads = []
+    for name in ("first", "second"):
+        thread = threading.Thread(target=wait, args=(name,))
+        thread.start()
+        threads.append(thread)
+        while len(limiter._waiters) < len(threads):
+            time.sleep(0.001)
+
+    limiter.release(0.1)
+    threads[0].join(1)
+    assert ["first"] == admitted
+    limiter.release(0.1)
+    threads[1].join(1)
+    assert ["first", "second"] == admitted
+    assert 1 == limiter.in_flight
+
+
+def test_waiting_gives_up_after_max_wait():
+    limiter = ConcurrencyLimiter(initial_limit=1, max_wait=0.01)
+    limiter.acquire()
+
+    with pytest.raises(ConcurrencyLimitExceededException):
+        limiter.acquire()
+
+    assert not limiter._waiters
+    limiter.release(0.1)
+    assert 0 == limiter.in_flight
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"initial_limit": 0, "min_limit": 0},
+        {"initial_limit": 5, "min_limit": 10},
+        {"initial_limit": 50, "max_limit": 10},
+    ],
+)
+def test_rejects_invalid_limits(kwargs):
+    with pytest.raises(ValueError):
+        ConcurrencyLimiter(**kwargs)
+
+
+@pytest.mark.parametrize(
+    "status_code, failed",
+    [(200, False), (404, False), (429, True), (500, True), (503, True)],
+)
+def test_is_failure(status_code, failed):
+    assert failed == is_failure(status_code)
+
+
+class TestAimdConcurrencyLimiter:
+    def test_grows_by_one_for_each_limit_of_successes(self):
+        limiter = AimdConcurrencyLimiter(initial_limit=10)
+        fill(limiter, 10)
+
+        for _ in range(10 + 11 + 12):
+            limiter.release(0.1)
+            limiter.acquire()
+
+        assert pytest.approx(13, abs=0.2) == limiter._limit
+
+    def test_does_not_grow_while_underused(self):
+        limiter = AimdConcurrencyLimiter(initial_limit=10)
+
+        for _ in range(100):
+            limiter.acquire()
+            limiter.release(0.1)
+
+        assert 10 == limiter.limit
+
+    def test_backs_off_on_failures_and_slow_requests(self):
+        limiter = AimdConcurrencyLimiter(initial_limit=100, backoff=0.5, latency_threshold=1)
+        fill(limiter, 3)
+
+        limiter.release(0.1, failed=True)
+        limiter.release(2)
+        limiter.release(0.1)
+
+        assert 25 == limiter.limit
+
+    def test_stays_within_bounds(self):
+        limiter = AimdConcurrencyLimiter(initial_limit=2, min_limit=2, max_limit=3)
+
+        fill(limiter, 2)
+        limiter.release(0.1, failed=True)
+        limiter.release(0.1, failed=True)
+        assert 2 == limiter.limit
+
+        for _ in range(20):
+            fill(limiter, 2)
+            limiter.release(0.1)
+            limiter.release(0.1)
+        assert 3 == limiter.limit
+
+    def test_rejects_invalid_backoff(self):
+        with pytest.raises(ValueError):
+            AimdConcurrencyLimiter(backoff=1)
+
+
+class TestGradientConcurrencyLimiter:
+    def run(self, limiter, latency, requests_finished, failed=False):
+        # Keep the limiter full, as under heavy load
+        for _ in range(requests_finished):
+            while limiter.in_flight < limiter.limit:
+                limiter.acquire()
+            limiter.release(latency, failed=failed)
+
+    def test_grows_by_about_its_square_root_while_latency_is_steady(self):
+        limiter = GradientConcurrencyLimiter(initial_limit=100)
+
+        self.run(limiter, 0.1, 100)
+
+        assert 109 == limiter.limit
+
+    def test_shrinks_as_latency_rises(self):
+        limiter = GradientConcurrencyLimiter(initial_limit=100, max_limit=100)
+        self.run(limiter, 0.1, 100)
+
+        self.run(limiter, 0.4, 100)
+
+        assert limiter.limit < 70
+
+    def test_tolerates_some_extra_latency(self):
+        limiter = GradientConcurrencyLimiter(initial_limit=100, max_limit=100)
+        self.run(limiter, 0.1, 100)
+
+        self.run(limiter, 0.12, 100)
+
+        assert 100 == limiter.limit
+
+    def test_shrinks_on_failures(self):
+        limiter = GradientConcurrencyLimiter(initial_limit=100)
+
+        self.run(limiter, 0.1, 100, failed=True)
+
+        assert limiter.limit < 70
+
+    def test_usual_latency_follows_a_service_that_gets_slower_for_good(self):
+        limiter = GradientConcurrencyLimiter(initial_limit=10, long_window=50)
+        self.run(limiter, 0.1, 50)
+
+        self.run(limiter, 0.4, 100)
+
+        assert 0.4 == limiter.usual_latency
+
+    def test_does_not_grow_while_underused(self):
+        limiter = GradientConcurrencyLimiter(initial_limit=10)
+
+        for _ in range(100):
+            limiter.acquire()
+            limiter.release(0.1)
+
+        assert 10 == limiter.limit
+
+    def test_tolerates_zero_latency(self):
+        limiter = GradientConcurrencyLimiter(initial_limit=10)
+
+        self.run(limiter, 0.0, 10)
+
+        assert limiter.limit > 10
+
+
+class TestAcquireAsync:
+    def test_waits_for_a_slot(self):
+        limiter = ConcurrencyLimiter(initial_limit=1, max_wait=1)
+        limiter.acquire()
+
+        async def main():
+            asyncio.get_running_loop().call_later(0.01, limiter.release, 0.1)
+            return await limiter.acquire_async()
+
+        assert asyncio.run(main()) > 0
+        assert 1 == limiter.in_flight
+
+    def test_gives_up_after_max_wait(self):
+        limiter = ConcurrencyLimiter(initial_limit=1, max_wait=0.01)
+        limiter.acquire()
+
+        with pytest.raises(ConcurrencyLimitExceededException):
+            asyncio.run(limiter.acquire_async())
+
+        assert not limiter._waiters
+
+    def test_cancelled_waiters_give_up_their_place(self):
+        limiter = ConcurrencyLimiter(initial_limit=1)
+        limiter.acquire()
+
+        async def main():
+            task = asyncio.ensure_future(limiter.acquire_async())
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(main())
+
+        assert not limiter._waiters
+        limiter.release(0.1)
+        assert 0 == limiter.in_flight
+
+
+class TestCalls:
+    @pytest.fixture
+    def service(self, make_service):
+        service = make_service(thing=Endpoint(path="/thing"))
+        service.concurrency_limiter = AimdConcurrencyLimiter(initial_limit=10, backoff=0.5, max_wait=0)
+        return service
+
+    def test_requests_hold_a_slot_until_they_are_answered(self, service, make_response):
+        session = requests.Session()
+        in_flight = []
+
+        def send(request, **kwargs):
+            in_flight.append(service.concurrency_limiter.in_flight)
+            return make_response(request)
+
+        with mock.patch.object(session, "send", side_effect=send):
+            service.thing(session=session)
+
+        assert [1] == in_flight
+        assert 0 == service.concurrency_limiter.in_flight
+
+    @pytest.mark.parametrize(
+        "send_kwargs",
+        [
+            {"side_effect": requests.ConnectionError},
+            {"status_code": 503},
+        ],
+    )
+    def test_failures_lower_the_limit(self, service, make_response, send_kwargs):
+        session = requests.Session()
+        if "status_code" in send_kwargs:
+            send_kwargs = {"return_value": make_response(**send_kwargs)}
+
+        with mock.patch.object(session, "send", **send_kwargs), pytest.raises(requests.RequestException):
+            service.thing(session=session)
+
+        assert 5 == service.concurrency_limiter.limit
+        assert 0 == service.concurrency_limiter.in_flight
+
+    def test_calls_over_the_limit_are_shed(self, service):
+        session = requests.Session()
+        fill(service.concurrency_limiter, 10)
+
+        with mock.patch.object(session, "send") as mock_send, pytest.raises(ConcurrencyLimitExceededException):
+            service.thing(session=session)
+
+        mock_send.assert_not_called()
+
+    def test_waiting_is_timed(self, service, make_response):
+        session = requests.Session()
+        service.concurrency_limiter = ConcurrencyLimiter(initial_limit=1)
+        service.concurrency_limiter.acquire()
+        threading.Timer(0.01, service.concurrency_limiter.release, args=(0.1,)).start()
+        events: list[instrumentation.TimingEvent] = []
+
+        unsubscribe = instrumentation.subscribe(events.append)
+        try:
+            with mock.patch.object(session, "send", return_value=make_response()):
+                service.thing(session=session)
+        finally:
+            unsubscribe()
+
+        assert [event.seconds > 0 for event in events if event.phase == "throttle"] == [True]
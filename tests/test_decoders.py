@@ -0,0 +1,157 @@
+import collections
+import dataclasses
+import enum
+import sys
+from typing import Any, Literal, Optional, TypedDict
+from unittest import mock
+
+import pytest
+
+from apiron import ResponseValidationException, decoders
+
+DECODER_CLASSES = [decoders.StdlibJsonDecoder, decoders.OrjsonDecoder, decoders.MsgspecDecoder]
+
+
+@pytest.fixture(params=DECODER_CLASSES, ids=lambda decoder_class: decoder_class.__name__)
+def decoder(request):
+    try:
+        return request.param()
+    except ImportError:
+        pytest.skip(f"the backend for {request.param.__name__} isn't installed")
+
+
+class TestDecoders:
+    def test_decode_bytes(self, decoder):
+        document = decoder.decode('{"name": "ünïcode", "values": [1, 2.5, null, true]}'.encode())
+        assert {"name": "ünïcode", "values": [1, 2.5, None, True]} == document
+        assert dict is type(document)
+
+    def test_decode_string(self, decoder):
+        assert [{"a": 1}] == decoder.decode('[{"a": 1}]')
+
+    def test_decode_preserving_order(self, decoder):
+        document = decoder.decode(b'{"b": {"d": 1, "c": 2}, "a": 3}', preserve_order=True)
+        assert ["b", "a"] == list(document)
+        assert collections.OrderedDict is type(document["b"])
+
+    def test_invalid_json_raises_value_error(self, decoder):
+        with pytest.raises(ValueError):
+            decoder.decode(b'{"unterminated": ')
+
+
+class TestMissingBackends:
+    @pytest.mark.parametrize(
+        ("decoder_class", "module"), [(decoders.OrjsonDecoder, "orjson"), (decoders.MsgspecDecoder, "msgspec")]
+    )
+    def test_missing_backend_raises_import_error(self, decoder_class, module):
+        with mock.patch.dict(sys.modules, {module: None}), pytest.raises(ImportError, match=f"apiron\\[{module}\\]"):
+            decoder_class()
+
+    def test_fastest_available_falls_back_to_stdlib(self):
+        with mock.patch.dict(sys.modules, {"orjson": None, "msgspec": None}):
+            assert isinstance(decoders.fastest_available(), decoders.StdlibJsonDecoder)
+
+    def test_fastest_available_prefers_orjson(self):
+        pytest.importorskip("orjson")
+        assert isinstance(decoders.fastest_available(), decoders.OrjsonDecoder)
+
+
+class Color(enum.Enum):
+    RED = "red"
+    BLUE = "blue"
+
+
+@dataclasses.dataclass
+class Owner:
+    __slots__ = ("email", "id")
+    id: int
+    email: Optional[str]
+
+
+@dataclasses.dataclass
+class Record:
+    id: int
+    score: float
+    owner: Owner
+    color: Color
+    tags: list[str] = dataclasses.field(default_factory=list)
+
+
+@dataclasses.dataclass
+class Tree:
+    name: str
+    children: list["Tree"]
+
+
+class Point(TypedDict):
+    x: int
+    y: int
+
+
+RECORDS = b"""[
+    {"id": 1, "score": 2, "owner": {"id": 7, "email": null}, "color": "red", "tags": ["a"], "extra": true},
+    {"id": 2, "score": 0.5, "owner": {"id": 8, "email": "owner@example.com"}, "color": "blue"}
+]"""
+
+
+class TestResponseType:
+    def test_decode_into_list_of_dataclasses(self, decoder):
+        assert [
+            Record(id=1, score=2.0, owner=Owner(id=7, email=None), color=Color.RED, tags=["a"]),
+            Record(id=2, score=0.5, owner=Owner(id=8, email="owner@example.com"), color=Color.BLUE),
+        ] == decoder.decode(RECORDS, response_type=list[Record])
+
+    def test_decode_into_typed_dict(self, decoder):
+        assert {"x": 1, "y": 2} == decoder.decode(b'{"x": 1, "y": 2, "z": 3}', response_type=Point)
+
+    def test_decode_into_containers(self, decoder):
+        document = b'{"a": [1, "one"], "b": [2, null]}'
+        response_type = dict[str, tuple[int, Optional[str]]]
+        assert {"a": (1, "one"), "b": (2, None)} == decoder.decode(document, response_type=response_type)
+
+    @pytest.mark.parametrize(
+        ("document", "location"),
+        [
+            (b'[{"id": "1", "score": 1, "owner": {"id": 1, "email": null}, "color": "red"}]', "$[0].id"),
+            (b'[{"id": 1, "score": 1, "owner": {"id": 1}, "color": "red"}]', "$[0].owner"),
+            (b'[{"id": 1, "score": 1, "owner": {"id": 1, "email": null}, "color": "green"}]', "$[0].color"),
+            (b'[{"id": 1, "score": true, "owner": {"id": 1, "email": null}, "color": "red"}]', "$[0].score"),
+            (b'{"id": 1}', "$"),
+        ],
+    )
+    def test_invalid_document_raises_response_validation_exception(self, decoder, document, location):
+        with pytest.raises(ResponseValidationException) as exception_info:
+            decoder.decode(document, response_type=list[Record])
+        assert location == exception_info.value.location
+
+
+class TestConvert:
+    def test_literal(self):
+        assert "a" == decoders.convert("a", Literal["a", "b"])
+        with pytest.raises(ResponseValidationException, match="expected one of"):
+            decoders.convert("c", Literal["a", "b"])
+
+    def test_booleans_are_not_integers(self):
+        with pytest.raises(ResponseValidationException, match="expected int, got bool"):
+            decoders.convert(True, int)
+
+    def test_recursive_type(self):
+        document = {"name": "root", "children": [{"name": "leaf", "children": []}]}
+        assert Tree("root", [Tree("leaf", [])]) == decoders.convert(document, Tree)
+
+    def test_recursive_type_defined_in_a_function(self):
+        @dataclasses.dataclass
+        class Node:
+            value: int
+            children: dict[str, "Node"]
+
+        document = {"value": 1, "children": {"a": {"value": 2, "children": {}}}}
+        assert Node(1, {"a": Node(2, {})}) == decoders.convert(document, Node)
+
+    def test_any_is_left_as_it_is(self):
+        document = {"anything": [1, "two"]}
+        assert document is decoders.convert(document, Any)
+
+    def test_unsupported_response_type(self):
+        with pytest.raises(TypeError):
+            decoders.convert(1, complex)
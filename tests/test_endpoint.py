@@ -1,9 +1,29 @@
 import collections
+import dataclasses
+import gzip
+import http.client
+import inspect
+import io
+import json
 from unittest import mock
 
 import pytest
+import requests
+import urllib3
 
 import apiron
+from apiron import compression, decoders
+from apiron.endpoint.sse import ServerSentEvent
+from apiron.endpoint.streaming import _LineSplitter
+from apiron.endpoint.streaming_json import JsonArrayParser
+from apiron.endpoint.template import PathTemplate
+
+
+@dataclasses.dataclass
+class Record:
+    __slots__ = ("id", "name")
+    id: int
+    name: str
 
 
 @pytest.fixture
@@ -33,6 +53,44 @@ class TestEndpoint:
         service.foo = apiron.Endpoint()
         service.foo()
 
+    def test_bound_caller_is_cached(self, service):
+        service.foo = apiron.Endpoint()
+        assert service.foo is service.foo
+        assert service.foo.map is service.foo.map  # type: ignore[attr-defined]
+
+    def test_bound_caller_is_created_with_the_service(self):
+        class SomeService(apiron.Service):
+            domain = "http://foo.com"
+            foo = apiron.Endpoint()
+
+        assert SomeService.__dict__["foo"] in SomeService._bound_callers
+
+    def test_bound_caller_is_bound_to_subclass(self):
+        class SomeService(apiron.Service):
+            domain = "http://foo.com"
+            foo = apiron.Endpoint()
+
+        class SomeOtherService(SomeService):
+            domain = "http://bar.com"
+
+        assert SomeService is SomeService.foo.args[0]
+        assert SomeOtherService is SomeOtherService.foo.args[0]
+
+    def test_bound_caller_follows_asynchronous(self, service):
+        service.foo = apiron.Endpoint()
+        synchronous_caller = service.foo
+        service.asynchronous = True
+        assert synchronous_caller is not service.foo
+        assert not hasattr(service.foo, "map")
+
+    def test_bound_caller_signature(self, service):
+        service.foo = apiron.Endpoint()
+        parameters = list(inspect.signature(service.foo).parameters)
+        assert "service" not in parameters
+        assert "endpoint" not in parameters
+        assert "method" == parameters[0]
+        assert "call" == service.foo.__name__  # type: ignore[attr-defined]
+
     def test_call_without_service_raises_exception(self):
         foo = apiron.Endpoint()
         with pytest.raises(TypeError):
@@ -84,6 +142,20 @@ class TestEndpoint:
         with pytest.warns(RuntimeWarning, match="An unknown path kwarg was supplied"):
             assert "/foo/bar/" == foo.get_formatted_path(**path_kwargs)
 
+    def test_format_path_percent_encodes_values(self):
+        foo = apiron.Endpoint(path="/{one}/{two}/")
+        assert "/a%20b%2Fc/x%3Fy%23z/" == foo.get_formatted_path(one="a b/c", two="x?y#z")
+
+    def test_format_path_without_encoding_values(self):
+        foo = apiron.Endpoint(path="/files/{file_path}", encode_path_values=False)
+        assert "/files/docs/read me.txt" == foo.get_formatted_path(file_path="docs/read me.txt")
+
+    def test_setting_path_recompiles_it(self):
+        foo = apiron.Endpoint(path="/{one}/")
+        foo.path = "/{two}/"
+        assert ["two"] == foo.path_placeholders
+        assert "/bar/" == foo.get_formatted_path(two="bar")
+
     def test_query_parameter_in_path_generates_warning(self):
         with pytest.warns(UserWarning, match=r"Endpoint path \('/\?foo=bar'\) may contain query parameters"):
             _ = apiron.Endpoint(path="/?foo=bar")
@@ -107,6 +179,26 @@ class TestEndpoint:
         foo = apiron.Endpoint(default_params={"foo": "bar"}, required_params={"foo"})
         assert {"foo": "bar"} == foo.get_merged_params()
 
+    def test_hedge_delay_when_not_hedging(self):
+        assert apiron.Endpoint().get_hedge_delay() is None
+
+    def test_hedge_delay_when_fixed(self):
+        assert 0.25 == apiron.Endpoint(hedge_after=0.25).get_hedge_delay()
+
+    def test_hedge_delay_from_percentile(self):
+        foo = apiron.Endpoint(hedge_after="p90")
+        for latency in range(1, 20):
+            foo.record_latency(latency / 100)
+        assert foo.get_hedge_delay() is None
+
+        foo.record_latency(0.2)
+        assert 0.19 == foo.get_hedge_delay()
+
+    @pytest.mark.parametrize("hedge_after", ["fast", "p0", "p100"])
+    def test_invalid_hedge_percentile(self, hedge_after):
+        with pytest.raises(ValueError, match="hedge_after must be"):
+            apiron.Endpoint(hedge_after=hedge_after)
+
     def test_str_method(self):
         foo = apiron.Endpoint(path="/bar/baz")
         assert str(foo) == "/bar/baz"
@@ -116,24 +208,95 @@ class TestEndpoint:
         assert repr(foo) == "Endpoint(path='/bar/baz')"
 
 
+class TestPathTemplate:
+    def test_placeholders(self):
+        template = PathTemplate("/{one}/{two}/{one}")
+        assert ("one", "two", "one") == template.placeholders
+        assert frozenset({"one", "two"}) == template.placeholder_names
+
+    def test_static_path(self):
+        template = PathTemplate("/foo/{{literal}}/")
+        assert () == template.placeholders
+        assert "/foo/{literal}/" == template.render({})
+
+    def test_render(self):
+        assert "/users/42/posts" == PathTemplate("/users/{user_id}/posts").render({"user_id": 42})
+
+    def test_render_keeps_segment_safe_characters(self):
+        assert "/a:b@c,d=e/" == PathTemplate("/{one}/").render({"one": "a:b@c,d=e"})
+
+    def test_render_encodes_non_ascii(self):
+        assert "/caf%C3%A9/" == PathTemplate("/{one}/").render({"one": "café"})
+
+    def test_render_keeps_existing_escapes(self):
+        assert "/a%20b%2Fc%25%25zz/" == PathTemplate("/{one}/").render({"one": "a%20b%2Fc%%zz"})
+
+    def test_render_without_encoding(self):
+        assert "/a b/c/" == PathTemplate("/{one}/").render({"one": "a b/c"}, encode=False)
+
+    def test_render_format_spec_and_conversion(self):
+        assert "/007/'x'/" == PathTemplate("/{one:03d}/{two!r}/").render({"one": 7, "two": "x"})
+
+    def test_render_attribute_access(self):
+        thing = mock.Mock(id="abc")
+        assert "/abc/" == PathTemplate("/{thing.id}/").render({"thing": thing})
+
+    def test_render_missing_value(self):
+        with pytest.raises(KeyError):
+            PathTemplate("/{one}/").render({})
+
+
 class TestJsonEndpoint:
+    @staticmethod
+    def _response(content, content_type="application/json"):
+        response = requests.Response()
+        response.headers["Content-Type"] = content_type
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = content
+        return response
+
     def test_format_response_when_unordered(self):
         foo = apiron.JsonEndpoint()
-        mock_response = mock.Mock()
-
-        with mock.patch.object(mock_response, "json") as mock_json:
-            mock_json.return_value = {"foo": "bar"}
-            assert {"foo": "bar"} == foo.format_response(mock_response)
-            mock_json.assert_called_once_with(object_pairs_hook=None)
+        result = foo.format_response(self._response(b'{"foo": "bar", "baz": [1, 2]}'))
+        assert {"foo": "bar", "baz": [1, 2]} == result
+        assert dict is type(result)
 
     def test_format_response_when_ordered(self):
         foo = apiron.JsonEndpoint(preserve_order=True)
-        mock_response = mock.Mock()
+        result = foo.format_response(self._response(b'{"foo": {"b": 1, "a": 2}}'))
+        assert collections.OrderedDict(foo=collections.OrderedDict(b=1, a=2)) == result
+        assert collections.OrderedDict is type(result["foo"])
+
+    def test_format_response_decodes_the_body_bytes(self):
+        decoder = mock.Mock()
+        foo = apiron.JsonEndpoint(decoder=decoder)
+        assert decoder.decode.return_value == foo.format_response(self._response(b"{}"))
+        decoder.decode.assert_called_once_with(b"{}", False, None)
+
+    def test_format_response_decodes_other_charsets_as_text(self):
+        foo = apiron.JsonEndpoint()
+        response = self._response('{"name": "ünïcode"}'.encode("utf-16"), "application/json; charset=utf-16")
+        assert {"name": "ünïcode"} == foo.format_response(response)
+
+    def test_format_response_uses_the_default_decoder(self):
+        foo = apiron.JsonEndpoint()
+        with mock.patch.object(decoders, "DEFAULT_JSON_DECODER") as mock_decoder:
+            assert mock_decoder.decode.return_value == foo.format_response(self._response(b"{}"))
 
-        with mock.patch.object(mock_response, "json") as mock_json:
-            mock_json.return_value = {"foo": "bar"}
-            assert {"foo": "bar"} == foo.format_response(mock_response)
-            mock_json.assert_called_once_with(object_pairs_hook=collections.OrderedDict)
+    def test_format_response_into_response_type(self):
+        foo = apiron.JsonEndpoint(response_type=list[Record])
+        result = foo.format_response(self._response(b'[{"id": 1, "name": "one"}, {"id": 2, "name": "two"}]'))
+        assert [Record(id=1, name="one"), Record(id=2, name="two")] == result
+
+    def test_format_response_with_invalid_response_type(self):
+        foo = apiron.JsonEndpoint(response_type=list[Record])
+        with pytest.raises(apiron.ResponseValidationException, match=r"\$\[0\]\.id"):
+            foo.format_response(self._response(b'[{"id": "1", "name": "one"}]'))
+
+    def test_format_response_with_invalid_json(self):
+        foo = apiron.JsonEndpoint()
+        with pytest.raises(ValueError):
+            foo.format_response(self._response(b"{"))
 
     def test_required_headers(self):
         foo = apiron.JsonEndpoint()
@@ -152,7 +315,96 @@ class TestStreamingEndpoint:
     def test_format_response(self):
         foo = apiron.StreamingEndpoint()
         mock_response = mock.Mock()
-        assert mock_response.iter_content(chunk_size=None) == foo.format_response(mock_response)
+        mock_response.iter_content.return_value = iter([b"a", b"bc"])
+
+        assert [b"a", b"bc"] == list(foo.format_response(mock_response))
+        mock_response.iter_content.assert_called_once_with(chunk_size=None)
+
+    @pytest.mark.parametrize(("endpoint_chunk_size", "chunk_size", "expected"), [(4, None, 4), (4, 2, 2), (None, 3, 3)])
+    def test_format_response_in_chunks(self, endpoint_chunk_size, chunk_size, expected):
+        foo = apiron.StreamingEndpoint(chunk_size=endpoint_chunk_size)
+        chunks = list(foo.format_response(_streamed_response(b"0123456789"), chunk_size=chunk_size))
+        assert [b"0123456789"[start : start + expected] for start in range(0, 10, expected)] == chunks
+
+    def test_format_response_gathers_small_chunks(self):
+        socket = mock.Mock()
+        socket.makefile.return_value = io.BytesIO(
+            b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n" + b"2\r\nab\r\n" * 5 + b"0\r\n\r\n"
+        )
+        original_response = http.client.HTTPResponse(socket, method="GET")
+        original_response.begin()
+        response = _streamed_response(b"")
+        response.raw = urllib3.HTTPResponse(
+            body=original_response,
+            headers=dict(original_response.getheaders()),
+            original_response=original_response,
+            preload_content=False,
+        )
+
+        assert [b"abab", b"abab", b"ab"] == list(apiron.StreamingEndpoint(chunk_size=4).format_response(response))
+
+    def test_readinto(self):
+        stream = apiron.StreamingEndpoint().format_response(_streamed_response(b"0123456789"))
+        buffer = bytearray(4)
+
+        assert 4 == stream.readinto(buffer)
+        assert b"0123" == buffer
+        assert 2 == stream.readinto(memoryview(buffer)[1:3])
+        assert b"0453" == buffer
+
+    def test_readinto_decodes_content(self):
+        raw = urllib3.HTTPResponse(
+            body=io.BytesIO(gzip.compress(b"0123456789")),
+            headers={"Content-Encoding": "gzip"},
+            preload_content=False,
+            decode_content=False,
+        )
+        response = _streamed_response(b"")
+        response.raw = raw
+        buffer = bytearray(6)
+        stream = apiron.StreamingEndpoint().format_response(response)
+
+        assert [6, 4, 0] == [stream.readinto(buffer) for _ in range(3)]
+        assert b"678945" == buffer
+
+    @pytest.mark.parametrize("chunk_size", [None, 4])
+    @pytest.mark.parametrize("encoding", compression.ENCODINGS)
+    def test_chunks_are_decompressed_as_they_are_read(self, encoding, chunk_size):
+        if encoding not in compression.available_encodings():
+            pytest.skip(f"no decoder for {encoding} is installed")
+        body = b"0123456789" * 100
+        compressed = compression.get_compressor(apiron.Compression(encoding))(body)
+        socket = mock.Mock()
+        socket.makefile.return_value = io.BytesIO(
+            f"HTTP/1.1 200 OK\r\nContent-Encoding: {encoding}\r\nContent-Length: {len(compressed)}\r\n\r\n".encode()
+            + compressed
+        )
+        original_response = http.client.HTTPResponse(socket, method="GET")
+        original_response.begin()
+        response = _streamed_response(b"")
+        response.raw = urllib3.HTTPResponse(
+            body=original_response,
+            headers=dict(original_response.getheaders()),
+            original_response=original_response,
+            preload_content=False,
+        )
+
+        chunks = list(apiron.StreamingEndpoint(chunk_size=chunk_size).format_response(response))
+
+        assert body == b"".join(chunks)
+        if chunk_size:
+            assert {chunk_size} == {len(chunk) for chunk in chunks}
+
+    @pytest.mark.parametrize("buffer_size", [None, 3])
+    def test_stream_to(self, buffer_size):
+        response = _streamed_response(b"0123456789" * 10)
+        file_obj = io.BytesIO()
+
+        written = apiron.StreamingEndpoint().format_response(response).stream_to(file_obj, buffer_size=buffer_size)
+
+        assert 100 == written
+        assert b"0123456789" * 10 == file_obj.getvalue()
+        assert response.raw.closed
 
     def test_str_method(self):
         foo = apiron.StreamingEndpoint(path="/bar/baz")
@@ -163,6 +415,23 @@ class TestStreamingEndpoint:
         assert repr(foo) == "StreamingEndpoint(path='/bar/baz')"
 
 
+class TestLineSplitter:
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 1000])
+    def test_lines(self, chunk_size):
+        body = b"one\ntwo\r\nthree\rfour\n\r\nlong line\r"
+        splitter = _LineSplitter()
+        lines = []
+        for start in range(0, len(body), chunk_size):
+            lines.extend(splitter.feed(body[start : start + chunk_size]))
+        lines.extend(splitter.close())
+        assert [b"one", b"two", b"three", b"four", b"", b"long line"] == lines
+
+    def test_unterminated_last_line(self):
+        splitter = _LineSplitter()
+        assert [b"a"] == splitter.feed(b"a\nb")
+        assert [b"bc"] == splitter.feed(b"c") + splitter.close()
+
+
 class TestStubEndpoint:
     def test_stub_default_response(self, service):
         service.stub_endpoint = apiron.StubEndpoint()
@@ -193,3 +462,194 @@ class TestStubEndpoint:
     def test_repr_method(self):
         foo = apiron.StubEndpoint(path="/bar/baz")
         assert repr(foo) == "StubEndpoint(path='/bar/baz')"
+
+
+class TestJsonArrayParser:
+    @staticmethod
+    def _parse(document, pointer="", decoder=None, chunk_size=1):
+        parser = JsonArrayParser(pointer, decoder)
+        elements = []
+        for start in range(0, len(document), chunk_size):
+            elements.extend(parser.feed(document[start : start + chunk_size]))
+        elements.extend(parser.feed("", final=True))
+        return elements
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 7, 1000])
+    @pytest.mark.parametrize("decoder", [None, json.JSONDecoder()], ids=["text", "decoded"])
+    def test_elements(self, chunk_size, decoder):
+        elements = [{"id": 1, "text": 'a "quoted" ]}{ \\ string'}, [1.5e3, None, True], "\\", "", 12345, None]
+        document = json.dumps(elements)
+
+        parsed = self._parse(document, decoder=decoder, chunk_size=chunk_size)
+
+        assert elements == (parsed if decoder else [json.loads(element) for element in parsed])
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 1000])
+    def test_pointer(self, chunk_size):
+        document = json.dumps({"meta": {"skip": [1, {"]": "}"}]}, "data": {"a/b": [0, [{"id": 1}, {"id": 2}]]}})
+        assert ['{"id": 1}', '{"id": 2}'] == self._parse(document, "/data/a~1b/1", chunk_size=chunk_size)
+
+    def test_stops_after_the_array(self):
+        parser = JsonArrayParser("/items")
+        assert ["1"] == parser.feed('{"items": [1], "rest": ')
+        assert parser.done
+
+    def test_empty_array(self):
+        assert [] == self._parse(" [ ] ")
+
+    @pytest.mark.parametrize(
+        ("document", "pointer", "message"),
+        [
+            ("[1,]", "", "Expected a value"),
+            ("[1 2]", "", "Expected ',' or ']'"),
+            ("[1, 2", "", "Unexpected end"),
+            ('{"items": 1}', "/items", "isn't an array"),
+            ('{"items": []}', "/other", "no value at '/other'"),
+            ("[[1]]", "/1", "no value at '/1'"),
+        ],
+    )
+    def test_invalid_documents(self, document, pointer, message):
+        with pytest.raises(ValueError, match=message):
+            self._parse(document, pointer)
+
+    def test_invalid_pointer(self):
+        with pytest.raises(ValueError, match="must be empty or start with '/'"):
+            JsonArrayParser("items")
+
+
+class TestStreamingJsonEndpoint:
+    @staticmethod
+    def _response(document):
+        response = requests.Response()
+        response.raw = io.BytesIO(json.dumps(document).encode())
+        response.status_code = 200
+        return response
+
+    def test_format_response(self):
+        foo = apiron.StreamingJsonEndpoint(item_pointer="/data", chunk_size=5)
+        response = self._response({"data": [{"id": 1}, {"id": 2}]})
+
+        assert [{"id": 1}, {"id": 2}] == list(foo.format_response(response))
+        assert response.raw.closed
+
+    def test_format_response_closes_an_abandoned_response(self):
+        foo = apiron.StreamingJsonEndpoint(chunk_size=5)
+        response = self._response(list(range(100)))
+
+        elements = foo.format_response(response)
+        assert 0 == next(elements)
+        elements.close()
+        assert response.raw.closed
+
+    def test_format_response_into_response_type(self):
+        foo = apiron.StreamingJsonEndpoint(response_type=Record)
+        response = self._response([{"id": 1, "name": "one"}])
+        assert [Record(id=1, name="one")] == list(foo.format_response(response))
+
+    def test_format_response_preserving_order(self):
+        foo = apiron.StreamingJsonEndpoint(preserve_order=True)
+        (element,) = foo.format_response(self._response([{"b": 1, "a": 2}]))
+        assert collections.OrderedDict is type(element)
+
+    def test_format_response_with_another_decoder(self):
+        decoder = mock.Mock()
+        decoder.decode.side_effect = lambda content, preserve_order, response_type: content
+        foo = apiron.StreamingJsonEndpoint(decoder=decoder)
+        assert ['{"id": 1}', "2"] == list(foo.format_response(self._response([{"id": 1}, 2])))
+
+    def test_invalid_item_pointer(self):
+        with pytest.raises(ValueError):
+            apiron.StreamingJsonEndpoint(item_pointer="data")
+
+
+def _streamed_response(body, status_code=200):
+    response = requests.Response()
+    response.raw = io.BytesIO(body)
+    response.status_code = status_code
+    return response
+
+
+class TestNdjsonEndpoint:
+    def test_format_response(self):
+        foo = apiron.NdjsonEndpoint(chunk_size=3)
+        response = _streamed_response(b'{"id": 1}\n\n  \r\n{"id": 2}\r\n[3]')
+
+        assert [{"id": 1}, {"id": 2}, [3]] == list(foo.format_response(response))
+
+    def test_records_are_decoded_lazily(self):
+        foo = apiron.NdjsonEndpoint()
+        records = foo.format_response(_streamed_response(b'{"id": 1}\nnot json\n'))
+        assert {"id": 1} == next(records)
+        with pytest.raises(ValueError):
+            next(records)
+
+    def test_format_response_into_response_type(self):
+        foo = apiron.NdjsonEndpoint(response_type=Record)
+        response = _streamed_response(b'{"id": 1, "name": "one"}\n')
+        assert [Record(id=1, name="one")] == list(foo.format_response(response))
+
+    def test_required_headers(self):
+        assert {"Accept": "application/x-ndjson"} == apiron.NdjsonEndpoint().required_headers
+
+
+class TestServerSentEventsEndpoint:
+    @pytest.mark.parametrize("chunk_size", [1, 5, None])
+    def test_format_response(self, chunk_size):
+        foo = apiron.ServerSentEventsEndpoint(chunk_size=chunk_size)
+        body = (
+            b"\xef\xbb\xbf: keep-alive\n\n"
+            b"data: first\n\n"
+            b'event: update\r\nid: 7\r\ndata:{"a": 1}\r\ndata: \r\n\r\n'
+            b"retry: 10\nunknown: field\ndata\n\n"
+            b"data: cut off"
+        )
+
+        events = list(foo.format_response(_streamed_response(body)))
+
+        assert [
+            ServerSentEvent("message", "first", ""),
+            ServerSentEvent("update", '{"a": 1}\n', "7"),
+            ServerSentEvent("message", "", "7"),
+        ] == events
+        assert {"a": 1} == events[1].json()
+
+    def test_reconnects_from_the_last_event(self):
+        foo = apiron.ServerSentEventsEndpoint(retry_delay=0)
+        resume = mock.Mock(
+            side_effect=[
+                requests.ConnectionError("lost"),
+                _streamed_response(b"id: 2\ndata: b\n\n"),
+                _streamed_response(b"", status_code=204),
+            ]
+        )
+
+        events = list(foo.format_response(_streamed_response(b"id: 1\ndata: a\n\nid: 9\ndata: cut"), resume=resume))
+
+        assert ["a", "b"] == [event.data for event in events]
+        assert [mock.call({"Last-Event-ID": "9"})] * 2 + [mock.call({"Last-Event-ID": "2"})] == resume.call_args_list
+
+    def test_gives_up_after_max_reconnects(self):
+        foo = apiron.ServerSentEventsEndpoint(retry_delay=0, max_reconnects=2)
+        resume = mock.Mock(side_effect=requests.ConnectionError("lost"))
+
+        with pytest.raises(requests.ConnectionError):
+            list(foo.format_response(_streamed_response(b"data: a\n\n"), resume=resume))
+        assert 2 == resume.call_count
+
+    def test_waits_as_long_as_the_server_asks(self):
+        foo = apiron.ServerSentEventsEndpoint(max_reconnects=1)
+        resume = mock.Mock(return_value=_streamed_response(b"", status_code=204))
+
+        with mock.patch("time.sleep") as sleep:
+            list(foo.format_response(_streamed_response(b"retry: 1500\n\n"), resume=resume))
+        sleep.assert_called_once_with(1.5)
+
+    def test_does_not_reconnect_when_turned_off(self):
+        foo = apiron.ServerSentEventsEndpoint(reconnect=False)
+        resume = mock.Mock()
+
+        assert ["a"] == [event.data for event in foo.format_response(_streamed_response(b"data: a\n\n"), resume=resume)]
+        assert not resume.called
+
+    def test_required_headers(self):
+        assert "text/event-stream" == apiron.ServerSentEventsEndpoint().required_headers["Accept"]
@@ -0,0 +1,184 @@
+import contextvars
+from unittest import mock
+
+import pytest
+import requests
+
+from apiron import CircuitOpenException, Endpoint, Service
+from apiron.health import CircuitBreaker
+
+HOSTS = ["http://host1.biz", "http://host2.biz"]
+
+
+@pytest.fixture
+def circuit_breaker():
+    return CircuitBreaker(host_failure_threshold=2, host_ejection_seconds=10, failure_threshold=4, reset_seconds=30)
+
+
+def fail(circuit_breaker, host, times=1):
+    for _ in range(times):
+        circuit_breaker.on_request_start(host)
+        circuit_breaker.on_request_end(host, 0.1, failed=True)
+
+
+def succeed(circuit_breaker, host):
+    circuit_breaker.on_request_start(host)
+    circuit_breaker.on_request_end(host, 0.1, failed=False)
+
+
+def in_another_call(function, *args, **kwargs):
+    # Each call runs in its own thread or task, with its own context
+    return contextvars.Context().run(function, *args, **kwargs)
+
+
+@mock.patch("apiron.health.time.monotonic", return_value=100)
+class TestCircuitBreaker:
+    def test_all_hosts_available_initially(self, mock_monotonic, circuit_breaker):
+        assert HOSTS == circuit_breaker.available_hosts("svc", HOSTS)
+
+    def test_host_is_ejected_after_consecutive_failures(self, mock_monotonic, circuit_breaker):
+        fail(circuit_breaker, HOSTS[0])
+        assert HOSTS == circuit_breaker.available_hosts("svc", HOSTS)
+
+        fail(circuit_breaker, HOSTS[0])
+        assert HOSTS[1:] == circuit_breaker.available_hosts("svc", HOSTS)
+
+    def test_success_resets_host_failures(self, mock_monotonic, circuit_breaker):
+        fail(circuit_breaker, HOSTS[0])
+        succeed(circuit_breaker, HOSTS[0])
+        fail(circuit_breaker, HOSTS[0])
+        assert HOSTS == circuit_breaker.available_hosts("svc", HOSTS)
+
+    def test_ejected_host_is_probed_once(self, mock_monotonic, circuit_breaker):
+        fail(circuit_breaker, HOSTS[0], times=2)
+
+        mock_monotonic.return_value = 111
+        assert HOSTS[:1] == circuit_breaker.available_hosts("svc", HOSTS)
+        assert HOSTS[1:] == in_another_call(circuit_breaker.available_hosts, "svc", HOSTS)
+
+        succeed(circuit_breaker, HOSTS[0])
+        assert HOSTS == circuit_breaker.available_hosts("svc", HOSTS)
+
+    def test_failed_probe_ejects_host_again(self, mock_monotonic, circuit_breaker):
+        fail(circuit_breaker, HOSTS[0], times=2)
+
+        mock_monotonic.return_value = 111
+        circuit_breaker.available_hosts("svc", HOSTS)
+        fail(circuit_breaker, HOSTS[0])
+        assert HOSTS[1:] == circuit_breaker.available_hosts("svc", HOSTS)
+
+        mock_monotonic.return_value = 122
+        assert HOSTS[:1] == circuit_breaker.available_hosts("svc", HOSTS)
+
+    def test_only_the_probe_restores_an_ejected_host(self, mock_monotonic, circuit_breaker):
+        fail(circuit_breaker, HOSTS[0], times=2)
+
+        mock_monotonic.return_value = 111
+        circuit_breaker.available_hosts("svc", HOSTS)
+        in_another_call(succeed, circuit_breaker, HOSTS[0])
+        assert HOSTS[1:] == in_another_call(circuit_breaker.available_hosts, "svc", HOSTS)
+
+    def test_unreported_probe_is_claimed_again(self, mock_monotonic, circuit_breaker):
+        fail(circuit_breaker, HOSTS[0], times=2)
+
+        mock_monotonic.return_value = 111
+        in_another_call(circuit_breaker.available_hosts, "svc", HOSTS)
+        assert HOSTS[1:] == circuit_breaker.available_hosts("svc", HOSTS)
+
+        mock_monotonic.return_value = 121
+        assert HOSTS[:1] == circuit_breaker.available_hosts("svc", HOSTS)
+
+    def test_every_host_ejected_fails_fast(self, mock_monotonic, circuit_breaker):
+        fail(circuit_breaker, HOSTS[0], times=2)
+        fail(circuit_breaker, HOSTS[1], times=1)
+
+        with pytest.raises(CircuitOpenException, match="svc"):
+            circuit_breaker.available_hosts("svc", HOSTS[:1])
+
+    def test_circuit_opens_after_consecutive_failures(self, mock_monotonic, circuit_breaker):
+        fail(circuit_breaker, HOSTS[0])
+        fail(circuit_breaker, HOSTS[1])
+        fail(circuit_breaker, HOSTS[0])
+        assert not circuit_breaker.is_open
+
+        fail(circuit_breaker, HOSTS[1])
+        assert circuit_breaker.is_open
+        with pytest.raises(CircuitOpenException):
+            circuit_breaker.available_hosts("svc", HOSTS)
+
+    def test_circuit_is_half_open_after_reset(self, mock_monotonic, circuit_breaker):
+        for _ in range(2):
+            fail(circuit_breaker, HOSTS[0])
+            fail(circuit_breaker, HOSTS[1])
+
+        mock_monotonic.return_value = 131
+        assert HOSTS[:1] == circuit_breaker.available_hosts("svc", HOSTS)
+        with pytest.raises(CircuitOpenException):
+            in_another_call(circuit_breaker.available_hosts, "svc", HOSTS)
+
+        succeed(circuit_breaker, HOSTS[0])
+        assert not circuit_breaker.is_open
+
+    def test_failed_probe_opens_circuit_again(self, mock_monotonic, circuit_breaker):
+        for _ in range(2):
+            fail(circuit_breaker, HOSTS[0])
+            fail(circuit_breaker, HOSTS[1])
+
+        mock_monotonic.return_value = 131
+        circuit_breaker.available_hosts("svc", HOSTS)
+        fail(circuit_breaker, HOSTS[1])
+        assert circuit_breaker.is_open
+
+        mock_monotonic.return_value = 160
+        assert circuit_breaker.is_open
+
+    def test_only_the_probe_closes_the_circuit(self, mock_monotonic, circuit_breaker):
+        for _ in range(2):
+            fail(circuit_breaker, HOSTS[0])
+            fail(circuit_breaker, HOSTS[1])
+
+        mock_monotonic.return_value = 131
+        circuit_breaker.available_hosts("svc", HOSTS)
+        in_another_call(succeed, circuit_breaker, HOSTS[0])
+        assert circuit_breaker.is_open
+
+        fail(circuit_breaker, HOSTS[0])
+        assert circuit_breaker.is_open
+
+    def test_in_flight_failures_do_not_extend_an_open_circuit(self, mock_monotonic, circuit_breaker):
+        for _ in range(2):
+            fail(circuit_breaker, HOSTS[0])
+            fail(circuit_breaker, HOSTS[1])
+
+        mock_monotonic.return_value = 120
+        fail(circuit_breaker, HOSTS[0])
+
+        mock_monotonic.return_value = 131
+        assert HOSTS[:1] == circuit_breaker.available_hosts("svc", HOSTS)
+
+    def test_reset(self, mock_monotonic, circuit_breaker):
+        for _ in range(2):
+            fail(circuit_breaker, HOSTS[0])
+            fail(circuit_breaker, HOSTS[1])
+
+        circuit_breaker.reset()
+        assert HOSTS == circuit_breaker.available_hosts("svc", HOSTS)
+
+
+class TestCallWithCircuitBreaker:
+    def test_open_circuit_fails_fast_without_sending(self):
+        class SomeService(Service):
+            domain = "http://host1.biz"
+            circuit_breaker = CircuitBreaker(host_failure_threshold=1, failure_threshold=1)
+            thing = Endpoint(path="/thing")
+
+        session = mock.Mock()
+        session.send.side_effect = requests.ConnectTimeout
+
+        with pytest.raises(requests.ConnectTimeout):
+            SomeService.thing(session=session)
+
+        with pytest.raises(CircuitOpenException):
+            SomeService.thing(session=session)
+
+        assert 1 == session.send.call_count
@@ -0,0 +1,136 @@
+import datetime
+import http.server
+import threading
+from unittest import mock
+
+import pytest
+import requests
+
+from apiron import Endpoint, JsonEndpoint, instrumentation, pool
+
+
+@pytest.fixture
+def events():
+    events: list[instrumentation.TimingEvent] = []
+    unsubscribe = instrumentation.subscribe(events.append)
+    yield events
+    unsubscribe()
+
+
+def test_calls_are_not_timed_without_listeners():
+    assert instrumentation.start_call(None, Endpoint(path="/"), "GET") is None  # type: ignore[arg-type]
+
+
+def test_unsubscribe():
+    events: list[instrumentation.TimingEvent] = []
+    unsubscribe = instrumentation.subscribe(events.append)
+    timer = instrumentation.start_call(None, Endpoint(path="/"), "GET")  # type: ignore[arg-type]
+    unsubscribe()
+    instrumentation.unsubscribe(events.append)
+
+    assert () == instrumentation._LISTENERS
+    assert instrumentation.start_call(None, Endpoint(path="/"), "GET") is None  # type: ignore[arg-type]
+    assert timer is not None
+    timer.emit("resolve", 0.5, host="http://host1.biz")
+    assert ["start", "resolve"] == [event.phase for event in events]
+
+
+def test_failing_listeners_do_not_fail_calls(events, caplog):
+    instrumentation.subscribe(failing := mock.Mock(side_effect=RuntimeError("oops")))
+    try:
+        timer = instrumentation.start_call("service", Endpoint(path="/foo/"), "GET")  # type: ignore[arg-type]
+        assert timer is not None
+        timer.emit("resolve", 0.5, host="http://host1.biz")
+    finally:
+        instrumentation.unsubscribe(failing)
+
+    assert (
+        instrumentation.TimingEvent("resolve", 0.5, "service", "/foo/", "GET", "http://host1.biz", 1, None, None, None)
+        == events[-1]
+    )
+    assert "Timing listener" in caplog.text
+
+
+def test_send_times_the_first_byte_and_download():
+    events: list[instrumentation.TimingEvent] = []
+    timer = instrumentation.CallTimer((events.append,), "service", "/foo/", "GET")  # type: ignore[arg-type]
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b"body"
+    response.elapsed = datetime.timedelta(0)
+
+    assert response is timer.send(lambda: response, "http://host1.biz")
+    assert [("first_byte", 200, None), ("download", 200, 4)] == [
+        (event.phase, event.status_code, event.bytes) for event in events
+    ]
+    events.clear()
+
+    timer.send(lambda: response, "http://host1.biz", stream=True)
+    assert ["first_byte"] == [event.phase for event in events]
+
+
+def test_failed_calls_are_timed(make_service, events):
+    service = make_service(item=Endpoint(path="/items/{item_id}"))
+
+    with pytest.raises(RuntimeError):
+        service.item(item_id=1)
+
+    assert ["start", "resolve", "prepare", "call"] == [event.phase for event in events]
+    assert isinstance(events[-1].error, RuntimeError)
+    assert "http://host1.biz" == events[-1].host
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"id": 1}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.no_hobble_network
+@pytest.mark.parametrize("use_session", [False, True])
+def test_call_emits_an_event_per_phase(server, make_service, events, use_session):
+    host = f"http://127.0.0.1:{server.server_port}"
+    service = make_service(host, item=JsonEndpoint(path="/items/{item_id}"))
+    session_pool = pool.SessionPool()
+    session = requests.Session() if use_session else None
+
+    try:
+        assert {"id": 1} == service.item(item_id=1, session=session, session_pool=session_pool)
+        assert {"id": 1} == service.item(item_id=2, session=session, session_pool=session_pool)
+    finally:
+        session_pool.close()
+        if session:
+            session.close()
+
+    first_call = ["start", "resolve", "prepare", "connect", "first_byte", "download", "format", "call"]
+    # The second call reuses the connection the first opened
+    assert first_call + [phase for phase in first_call if phase != "connect"] == [event.phase for event in events]
+    assert all(event.seconds >= 0 for event in events)
+    assert {(service, "/items/{item_id}", "GET", host, 1)} == {
+        (event.service, event.path, event.method, event.host, event.attempt)
+        for event in events
+        if event.phase != "start"
+    }
+    assert {200} == {
+        event.status_code for event in events if event.phase not in ("start", "resolve", "prepare", "connect")
+    }
+    assert [9, 9] == [event.bytes for event in events if event.phase == "download"]
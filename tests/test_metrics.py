@@ -0,0 +1,167 @@
+import threading
+from unittest import mock
+
+import pytest
+import requests
+
+from apiron import Endpoint, MetricsRegistry, metrics
+from apiron.instrumentation import TimingEvent
+
+
+class SomeService:
+    pass
+
+
+def _event(phase, seconds=0.0, status_code=None, error=None, path="/items", method="GET"):
+    return TimingEvent(phase, seconds, SomeService, path, method, None, 1, status_code, None, error)
+
+
+class TestHistogram:
+    def test_counts_values_in_buckets(self):
+        histogram = metrics.Histogram([4, 1, 2])
+
+        for value in [0.5, 1, 1.5, 1.5, 3, 10]:
+            histogram.observe(value)
+
+        assert (1, 2, 4) == histogram.buckets
+        assert ([2, 2, 1, 1], 17.5) == histogram.get_counts()
+        assert 6 == histogram.count
+
+    @pytest.mark.parametrize(
+        "quantile, expected",
+        [(0.0, 0.0), (0.25, 1.0), (0.5, 2.0), (0.75, 10 / 3), (0.99, 4)],
+    )
+    def test_estimates_quantiles_within_buckets(self, quantile, expected):
+        histogram = metrics.Histogram([1, 2, 4])
+
+        for value in [0.5, 0.5, 1.5, 1.5, 3, 3, 3, 10]:
+            histogram.observe(value)
+
+        assert expected == pytest.approx(histogram.get_quantile(quantile))
+
+    def test_quantiles_of_nothing(self):
+        assert metrics.Histogram().get_quantile(0.5) is None
+        with pytest.raises(ValueError):
+            metrics.Histogram().get_quantile(1.5)
+
+    def test_needs_buckets(self):
+        with pytest.raises(ValueError):
+            metrics.Histogram([])
+
+    def test_counts_every_value_from_many_threads(self):
+        histogram = metrics.Histogram()
+
+        def observe():
+            for _ in range(10_000):
+                histogram.observe(0.01)
+
+        threads = [threading.Thread(target=observe) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert 80_000 == histogram.count
+
+
+@pytest.mark.parametrize("status_code, status_class", [(200, "2xx"), (304, "3xx"), (503, "5xx"), (None, "error")])
+def test_get_status_class(status_code, status_class):
+    assert status_class == metrics.get_status_class(status_code)
+
+
+def test_registry_counts_calls_by_status_class():
+    registry = MetricsRegistry(buckets=[0.1, 1])
+
+    for event in [
+        _event("start"),
+        _event("start"),
+        _event("start"),
+        _event("resolve", 0.01),
+        _event("call", 0.05, status_code=200),
+        _event("call", 0.5, status_code=201),
+        _event("start", path="/other"),
+    ]:
+        registry.record(event)
+    registry.record(_event("call", 2, error=requests.ConnectionError()))
+
+    snapshot = registry.snapshot()
+
+    assert [
+        {
+            "service": "SomeService",
+            "endpoint": "/items",
+            "method": "GET",
+            "status": "2xx",
+            "count": 2,
+            "errors": 0,
+            "sum": pytest.approx(0.55),
+            "buckets": {0.1: 1, 1: 2, float("inf"): 2},
+            "quantiles": {0.5: 0.1, 0.9: pytest.approx(0.82), 0.99: pytest.approx(0.982)},
+        },
+        {
+            "service": "SomeService",
+            "endpoint": "/items",
+            "method": "GET",
+            "status": "error",
+            "count": 1,
+            "errors": 1,
+            "sum": 2,
+            "buckets": {0.1: 0, 1: 0, float("inf"): 1},
+            "quantiles": {0.5: 1, 0.9: 1, 0.99: 1},
+        },
+    ] == snapshot["calls"]
+    assert [
+        {"service": "SomeService", "endpoint": "/items", "method": "GET", "value": 0},
+        {"service": "SomeService", "endpoint": "/other", "method": "GET", "value": 1},
+    ] == snapshot["in_flight"]
+
+
+def test_registry_exports_prometheus_text():
+    registry = MetricsRegistry(buckets=[0.1, 1], namespace="upstream")
+    for event in [
+        _event("start", path='/say/"hi"'),
+        _event("call", 0.25, status_code=404, error=requests.HTTPError(), path='/say/"hi"'),
+    ]:
+        registry.record(event)
+
+    labels = 'service="SomeService",endpoint="/say/\\"hi\\"",method="GET"'
+    assert [
+        "# HELP upstream_requests_total Calls made to an endpoint, by the class of response status",
+        "# TYPE upstream_requests_total counter",
+        f'upstream_requests_total{{{labels},status="4xx"}} 1',
+        "# HELP upstream_request_errors_total Calls made to an endpoint that raised an exception",
+        "# TYPE upstream_request_errors_total counter",
+        f'upstream_request_errors_total{{{labels},status="4xx"}} 1',
+        "# HELP upstream_request_duration_seconds How long calls made to an endpoint took",
+        "# TYPE upstream_request_duration_seconds histogram",
+        f'upstream_request_duration_seconds_bucket{{{labels},status="4xx",le="0.1"}} 0',
+        f'upstream_request_duration_seconds_bucket{{{labels},status="4xx",le="1.0"}} 1',
+        f'upstream_request_duration_seconds_bucket{{{labels},status="4xx",le="+Inf"}} 1',
+        f'upstream_request_duration_seconds_sum{{{labels},status="4xx"}} 0.25',
+        f'upstream_request_duration_seconds_count{{{labels},status="4xx"}} 1',
+        "# HELP upstream_requests_in_flight Calls to an endpoint that haven't finished",
+        "# TYPE upstream_requests_in_flight gauge",
+        f"upstream_requests_in_flight{{{labels}}} 0",
+    ] == registry.to_prometheus().splitlines()
+
+
+def test_registry_collects_metrics_from_calls(make_service, make_response):
+    service = make_service(item=Endpoint(path="/items/{item_id}"))
+    registry = MetricsRegistry()
+    session = requests.Session()
+    responses = [make_response(status_code=200), make_response(status_code=500)]
+
+    unsubscribe = registry.subscribe()
+    try:
+        with mock.patch.object(session, "send", side_effect=responses):
+            service.item(item_id=1, session=session)
+            with pytest.raises(requests.HTTPError):
+                service.item(item_id=2, session=session)
+    finally:
+        unsubscribe()
+
+    assert [("2xx", 1, 0), ("5xx", 1, 1)] == [
+        (series["status"], series["count"], series["errors"]) for series in registry.snapshot()["calls"]
+    ]
+    assert {"SomeService"} == {series["service"] for series in registry.snapshot()["calls"]}
+    assert [0] == [gauge["value"] for gauge in registry.snapshot()["in_flight"]]
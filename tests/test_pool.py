@@ -0,0 +1,153 @@
+import http.client
+import os
+import weakref
+from unittest import mock
+
+import pytest
+import requests
+from requests import cookies
+from urllib3.util import retry
+
+from apiron import Service, pool
+
+
+class SomeService(Service):
+    domain = "http://foo.com"
+
+
+class OtherService(Service):
+    domain = "http://bar.com"
+
+
+@pytest.fixture
+def session_pool():
+    with pool.SessionPool(pool_connections=2, pool_maxsize=4, idle_timeout=60) as session_pool:
+        yield session_pool
+
+
+@pytest.fixture
+def retry_spec():
+    return retry.Retry(total=1)
+
+
+class TestRetrySpecKey:
+    def test_equal_specs_have_equal_keys(self):
+        assert pool._retry_spec_key(retry.Retry(total=3, status_forcelist=[500])) == pool._retry_spec_key(
+            retry.Retry(total=3, status_forcelist=[500])
+        )
+
+    def test_different_specs_have_different_keys(self):
+        assert pool._retry_spec_key(retry.Retry(total=3)) != pool._retry_spec_key(retry.Retry(total=4))
+
+
+class TestSessionPool:
+    def test_same_service_reuses_session(self, session_pool, retry_spec):
+        session = session_pool.get_session(SomeService, retry_spec)
+        assert session is session_pool.get_session(SomeService, retry_spec)
+        assert 1 == len(session_pool)
+
+    def test_different_services_get_different_sessions(self, session_pool, retry_spec):
+        assert session_pool.get_session(SomeService, retry_spec) is not session_pool.get_session(
+            OtherService, retry_spec
+        )
+        assert 2 == len(session_pool)
+
+    def test_adapter_is_configured_from_pool(self, session_pool, retry_spec):
+        session = session_pool.get_session(SomeService, retry_spec)
+        adapter = session.get_adapter("https://foo.com")
+        assert retry_spec is adapter.max_retries
+        assert 2 == adapter._pool_connections
+        assert 4 == adapter._pool_maxsize
+
+    def test_equal_retry_specs_share_a_session(self, session_pool, retry_spec):
+        session = session_pool.get_session(SomeService, retry_spec)
+        assert session is session_pool.get_session(SomeService, retry.Retry(total=1))
+        assert 1 == len(session_pool)
+
+    def test_different_retry_specs_get_different_sessions(self, session_pool, retry_spec):
+        other_retry_spec = retry.Retry(total=5)
+        session = session_pool.get_session(SomeService, retry_spec)
+        other_session = session_pool.get_session(SomeService, other_retry_spec)
+
+        assert session is not other_session
+        assert retry_spec is session.get_adapter("https://foo.com").max_retries
+        assert other_retry_spec is other_session.get_adapter("https://foo.com").max_retries
+
+    def test_pooled_sessions_do_not_store_cookies(self, session_pool, retry_spec):
+        session = session_pool.get_session(SomeService, retry_spec)
+        message = http.client.HTTPMessage()
+        message["Set-Cookie"] = "foo=bar"
+        response = mock.Mock()
+        response._original_response.msg = message
+
+        request = requests.Request("GET", "http://foo.com/").prepare()
+        cookies.extract_cookies_to_jar(session.cookies, request, response)
+
+        assert 0 == len(session.cookies)
+
+    def test_idle_sessions_are_evicted(self, retry_spec):
+        session_pool = pool.SessionPool(idle_timeout=10)
+        with mock.patch("apiron.pool.time.monotonic", return_value=100):
+            session = session_pool.get_session(SomeService, retry_spec)
+
+        with mock.patch.object(session, "close") as mock_close:
+            with mock.patch("apiron.pool.time.monotonic", return_value=111):
+                assert session is not session_pool.get_session(SomeService, retry_spec)
+            mock_close.assert_called_once_with()
+
+    def test_sessions_with_connections_in_use_are_not_evicted(self, retry_spec):
+        session_pool = pool.SessionPool(idle_timeout=10)
+        with mock.patch("apiron.pool.time.monotonic", return_value=100):
+            session = session_pool.get_session(SomeService, retry_spec)
+        adapter = session.get_adapter("http://foo.com")
+        assert isinstance(adapter, requests.adapters.HTTPAdapter)
+        connection_pool = adapter.poolmanager.connection_from_url("http://foo.com/")
+        # Checked out as if streaming a response that outlives the idle timeout
+        connection = connection_pool._get_conn()
+
+        with mock.patch("apiron.pool.time.monotonic", return_value=111):
+            assert session is session_pool.get_session(SomeService, retry_spec)
+
+        connection_pool._put_conn(connection)
+        with mock.patch("apiron.pool.time.monotonic", return_value=122):
+            assert session is not session_pool.get_session(SomeService, retry_spec)
+
+    def test_sessions_are_dropped_after_fork(self, session_pool, retry_spec):
+        session = session_pool.get_session(SomeService, retry_spec)
+
+        with mock.patch.object(session, "close") as mock_close:
+            pool._reset_after_fork(weakref.ref(session_pool))
+            assert session is not session_pool.get_session(SomeService, retry_spec)
+        assert not mock_close.called
+
+    def test_lock_held_at_fork_is_replaced(self, session_pool, retry_spec):
+        session_pool._lock.acquire()
+        pool._reset_after_fork(weakref.ref(session_pool))
+        assert session_pool.get_session(SomeService, retry_spec)
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+    def test_child_process_starts_over(self, session_pool, retry_spec):
+        session_pool.get_session(SomeService, retry_spec)
+
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            os._exit(len(session_pool))
+
+        _, status = os.waitpid(pid, 0)
+        assert 0 == os.waitstatus_to_exitcode(status)
+        assert 1 == len(session_pool)
+
+    def test_close_closes_sessions(self, retry_spec):
+        session_pool = pool.SessionPool()
+        session = session_pool.get_session(SomeService, retry_spec)
+
+        with mock.patch.object(session, "close") as mock_close:
+            session_pool.close()
+            mock_close.assert_called_once_with()
+
+        assert 0 == len(session_pool)
+
+    def test_context_manager_closes_pool(self, retry_spec):
+        with pool.SessionPool() as session_pool:
+            session_pool.get_session(SomeService, retry_spec)
+        assert 0 == len(session_pool)
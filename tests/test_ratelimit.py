@@ -0,0 +1,243 @@
+import asyncio
+import email.utils
+import http.server
+import threading
+import time
+from unittest import mock
+
+import pytest
+import requests
+
+from apiron import (
+    Endpoint,
+    RateLimiter,
+    RateLimitExceededException,
+    instrumentation,
+    ratelimit,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit._LocalState, "clock", staticmethod(clock))
+    monkeypatch.setattr(ratelimit._FileState, "clock", staticmethod(clock))
+    monkeypatch.setattr(ratelimit.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_burst_is_sent_at_once_then_tokens_arrive_at_the_rate(clock):
+    limiter = RateLimiter(rate=10, burst=3)
+
+    assert [0, 0, 0, pytest.approx(0.1), pytest.approx(0.2)] == [limiter.reserve() for _ in range(5)]
+
+    clock.now += 10
+    assert [0, 0, 0] == [limiter.reserve() for _ in range(3)]
+
+
+def test_acquire_waits_for_its_token(clock):
+    limiter = RateLimiter(rate=2, burst=1)
+
+    limiter.acquire()
+    waited = limiter.acquire()
+
+    assert 0.5 == waited
+    assert 1000.5 == clock.now
+
+
+def test_burst_defaults_to_a_second_of_requests():
+    assert 5 == RateLimiter(rate=5).burst
+    assert 1 == RateLimiter(rate=0.5).burst
+
+
+@pytest.mark.parametrize("kwargs", [{"rate": 0}, {"rate": 1, "burst": 0}])
+def test_rejects_invalid_limits(kwargs):
+    with pytest.raises(ValueError):
+        RateLimiter(**kwargs)
+
+
+def test_fails_fast_without_taking_a_token(clock):
+    limiter = RateLimiter(rate=1, burst=1, max_wait=0.5)
+    limiter.acquire()
+
+    with pytest.raises(RateLimitExceededException) as exc_info:
+        limiter.acquire("SomeService")
+
+    assert 1.0 == exc_info.value.retry_after
+    assert "SomeService" in str(exc_info.value)
+    clock.now += 0.5
+    assert 0.5 == limiter.acquire()
+
+
+@pytest.mark.parametrize("status_code", [429, 503])
+def test_retry_after_pauses_the_limiter(clock, status_code):
+    limiter = RateLimiter(rate=10, burst=10, max_wait=0)
+
+    limiter.on_response(status_code, {"Retry-After": "30"})
+
+    assert 30 == limiter.get_wait()
+    with pytest.raises(RateLimitExceededException):
+        limiter.acquire()
+    clock.now += 30
+    assert 0 == limiter.acquire()
+
+
+def test_other_responses_do_not_pause_the_limiter(clock):
+    limiter = RateLimiter(rate=10)
+
+    limiter.on_response(200, {"Retry-After": "30"})
+    limiter.on_response(429, {})
+
+    assert 0 == limiter.get_wait()
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [
+        ("120", 120),
+        (" 5 ", 5),
+        ("soon", None),
+        (None, None),
+    ],
+)
+def test_parse_retry_after(value, seconds):
+    assert seconds == ratelimit.parse_retry_after(value)
+
+
+def test_parse_retry_after_dates():
+    assert pytest.approx(60, abs=2) == ratelimit.parse_retry_after(
+        email.utils.formatdate(time.time() + 60, usegmt=True)
+    )
+    assert 0 == ratelimit.parse_retry_after(email.utils.formatdate(time.time() - 60, usegmt=True))
+
+
+def test_limiters_with_the_same_path_share_a_bucket(clock, tmp_path):
+    first = RateLimiter(rate=10, burst=2, path=tmp_path / "limit")
+    second = RateLimiter(rate=10, burst=2, path=tmp_path / "limit")
+
+    assert [0, 0, pytest.approx(0.1)] == [first.reserve(), second.reserve(), first.reserve()]
+    assert pytest.approx(0.2) == second.get_wait()
+
+
+def test_threads_share_the_rate():
+    limiter = RateLimiter(rate=200, burst=1)
+    start = time.monotonic()
+
+    threads = [threading.Thread(target=lambda: [limiter.acquire() for _ in range(5)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert time.monotonic() - start >= 19 / 200
+
+
+def test_acquire_async():
+    limiter = RateLimiter(rate=100, burst=1)
+
+    async def main():
+        return [await limiter.acquire_async() for _ in range(3)]
+
+    first, *rest = asyncio.run(main())
+    assert 0 == first
+    assert all(0 < wait <= 0.02 for wait in rest)
+
+
+class _UnavailableHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests_received = 0
+
+    def do_GET(self):
+        type(self).requests_received += 1
+        self.send_response(503)
+        self.send_header("Retry-After", "2")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCalls:
+    @pytest.fixture
+    def service(self, make_service):
+        service = make_service(
+            thing=Endpoint(path="/thing"),
+            limited=Endpoint(path="/limited", rate_limiter=RateLimiter(rate=1, burst=1, max_wait=0)),
+        )
+        service.rate_limiter = RateLimiter(rate=1, burst=2, max_wait=0)
+        return service
+
+    def test_endpoint_and_service_limits_both_apply(self, service, make_response):
+        session = requests.Session()
+
+        with mock.patch.object(session, "send", return_value=make_response()) as mock_send:
+            service.limited(session=session)
+            with pytest.raises(RateLimitExceededException):
+                service.limited(session=session)
+            service.thing(session=session)
+            with pytest.raises(RateLimitExceededException):
+                service.thing(session=session)
+
+        assert 2 == mock_send.call_count
+
+    def test_retry_after_pauses_calls(self, service, make_response):
+        session = requests.Session()
+        service.rate_limiter = RateLimiter(rate=100, max_wait=1)
+
+        with mock.patch.object(
+            session, "send", return_value=make_response(status_code=429, headers={"Retry-After": "120"})
+        ) as mock_send:
+            with pytest.raises(requests.HTTPError):
+                service.thing(session=session)
+            with pytest.raises(RateLimitExceededException) as exc_info:
+                service.thing(session=session)
+
+        assert 1 == mock_send.call_count
+        assert 119 < exc_info.value.retry_after <= 120
+
+    @pytest.mark.no_hobble_network
+    def test_retry_after_pauses_calls_under_the_default_retry_spec(self, make_service):
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _UnavailableHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        service = make_service(f"http://127.0.0.1:{server.server_port}", thing=Endpoint(path="/thing"))
+        service.rate_limiter = RateLimiter(rate=100, max_wait=1)
+
+        try:
+            with pytest.raises(requests.HTTPError):
+                service.thing()
+            with pytest.raises(RateLimitExceededException) as exc_info:
+                service.thing()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        # The 503 reaches the rate limiter rather than being retried by urllib3 until retries run out
+        assert 1 == _UnavailableHandler.requests_received
+        assert 1 < exc_info.value.retry_after <= 2
+
+    def test_waiting_is_timed(self, service, make_response, clock):
+        session = requests.Session()
+        service.rate_limiter = RateLimiter(rate=4, burst=1)
+        events: list[instrumentation.TimingEvent] = []
+
+        with mock.patch.object(session, "send", return_value=make_response()):
+            service.thing(session=session)
+            unsubscribe = instrumentation.subscribe(events.append)
+            try:
+                service.thing(session=session)
+            finally:
+                unsubscribe()
+
+        assert [0.25] == [event.seconds for event in events if event.phase == "throttle"]
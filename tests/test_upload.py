@@ -0,0 +1,221 @@
+import asyncio
+import http.server
+import io
+import threading
+import tracemalloc
+
+import pytest
+import requests
+
+from apiron import upload
+
+
+@pytest.fixture
+def fixed_boundary(monkeypatch):
+    """Make requests encode files with the same boundary as the encoders under test"""
+
+    monkeypatch.setattr("urllib3.filepost.choose_boundary", lambda: "boundary")
+
+
+@pytest.fixture
+def big_file(tmp_path):
+    path = tmp_path / "big.bin"
+    path.write_bytes(bytes(range(256)) * 4096)
+    return path
+
+
+def _read(body):
+    return b"".join(bytes(chunk) for chunk in body)
+
+
+@pytest.mark.parametrize(
+    "fields, files",
+    [
+        (None, {"file": b"contents"}),
+        ({"name": "value", "numbers": [1, 2], "skipped": None}, {"file": ("report.csv", b"a,b\n1,2\n", "text/csv")}),
+        ([("name", b"raw")], [("a", ("a.txt", "ünïcode")), ("b", ("b.bin", b"\0", None, {"X-Part": "1"}))]),
+        (None, {"file": io.BytesIO(b"from a file"), "empty": ("empty", b""), "none": None}),
+    ],
+)
+def test_multipart_encoder_encodes_like_requests(fixed_boundary, fields, files):
+    encoder = upload.MultipartEncoder(fields, files, boundary="boundary")
+    expected = requests.Request("POST", "http://host1.biz", data=fields, files=files).prepare()
+
+    body = _read(encoder)
+
+    assert expected.body == body
+    assert expected.headers["Content-Type"] == encoder.content_type
+    assert len(body) == encoder.len
+
+
+def test_multipart_encoder_names_files_after_their_paths(fixed_boundary, big_file):
+    with open(big_file, "rb") as file:
+        body = _read(upload.MultipartEncoder(files={"upload": file}, boundary="boundary"))
+
+    assert b'name="upload"; filename="big.bin"' in body
+
+
+def test_multipart_encoder_sends_files_from_where_they_are_positioned_each_time():
+    file = io.BytesIO(b"skipped|sent")
+    file.seek(8)
+    encoder = upload.MultipartEncoder(files={"file": file})
+
+    first = _read(encoder)
+
+    assert b"\r\n\r\nsent\r\n" in first
+    assert encoder.replayable
+    assert first == _read(encoder)
+
+
+def test_multipart_encoder_length_is_unknown_for_generators():
+    encoder = upload.MultipartEncoder(files={"file": ("generated", (chunk for chunk in [b"a", b"b"]))})
+
+    assert encoder.len is None
+    assert "Content-Length" not in encoder.headers
+    assert not encoder.replayable
+    assert b"\r\n\r\nab\r\n" in _read(encoder)
+
+
+def test_multipart_encoder_reads_files_a_chunk_at_a_time(big_file):
+    tracemalloc.start()
+    try:
+        with open(big_file, "rb") as file:
+            sent = sum(len(chunk) for chunk in upload.MultipartEncoder(files={"file": file}))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert sent > big_file.stat().st_size
+    assert peak < 4 * upload.DEFAULT_CHUNK_SIZE
+
+
+class TestMappedFile:
+    def test_sends_the_file_in_slices(self, big_file):
+        mapped = upload.MappedFile(big_file, chunk_size=100_000)
+
+        chunks = list(mapped)
+
+        assert all(isinstance(chunk, memoryview) for chunk in chunks)
+        assert [100_000] * 10 + [48_576] == [len(chunk) for chunk in chunks]
+        assert big_file.read_bytes() == _read(chunks)
+        assert {"Content-Length": "1048576"} == mapped.headers
+        assert big_file.read_bytes() == _read(mapped)
+
+    def test_sends_a_range_of_an_open_file(self, big_file):
+        with open(big_file, "rb") as file:
+            mapped = upload.MappedFile(file, offset=10, length=1000, chunk_size=300)
+            body = _read(mapped)
+
+        assert big_file.read_bytes()[10:1010] == body
+        assert 1000 == mapped.len
+
+    def test_sends_nothing_for_an_empty_file(self, tmp_path):
+        path = tmp_path / "empty"
+        path.write_bytes(b"")
+
+        assert [] == list(upload.MappedFile(path))
+
+    @pytest.mark.parametrize("offset, length", [(-1, None), (1_048_577, None), (1_048_000, 1000)])
+    def test_rejects_ranges_outside_the_file(self, big_file, offset, length):
+        with pytest.raises(ValueError):
+            upload.MappedFile(big_file, offset=offset, length=length)
+
+    def test_is_a_multipart_file(self, big_file):
+        mapped = upload.MappedFile(big_file)
+        encoder = upload.MultipartEncoder(files={"file": ("big.bin", mapped)})
+
+        body = _read(encoder)
+
+        assert encoder.len == len(body)
+        assert encoder.replayable
+        assert big_file.read_bytes() in body
+
+
+@pytest.mark.parametrize(
+    "body, streamed, replayable",
+    [
+        (None, False, True),
+        (b"raw", False, True),
+        ({"field": "value"}, False, True),
+        ((chunk for chunk in [b"a"]), True, False),
+        (io.BytesIO(b"file"), True, False),
+        (upload.MultipartEncoder(files={"file": b"contents"}), True, True),
+        (upload.MultipartEncoder(files={"file": iter([b"contents"])}), True, False),
+        (range(3), True, True),
+    ],
+)
+def test_streamed_and_replayable_bodies(body, streamed, replayable):
+    assert streamed == upload.is_streamed(body)
+    assert replayable == upload.is_replayable(body)
+
+
+def test_encode_files_leaves_bodies_without_fields_alone():
+    assert (b"raw", {"file": b"x"}) == upload.encode_files(b"raw", {"file": b"x"})
+    assert ({"field": "value"}, None) == upload.encode_files({"field": "value"}, None)
+
+    data, files = upload.encode_files({"field": "value"}, {"file": b"x"})
+    assert isinstance(data, upload.MultipartEncoder)
+    assert files is None
+
+
+def test_aiter_chunks_reads_files_off_the_event_loop():
+    async def main():
+        return [chunk async for chunk in upload.aiter_chunks(io.BytesIO(b"abcde"), chunk_size=2)]
+
+    assert [b"ab", b"cd", b"e"] == asyncio.run(main())
+
+
+class _RecordingServer(http.server.ThreadingHTTPServer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.received: list[tuple[dict[str, str], bytes]] = []
+
+
+class _RecordingHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _RecordingServer
+
+    def do_POST(self):
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            body = b""
+            while size := int(self.rfile.readline(), 16):
+                body += self.rfile.read(size)
+                self.rfile.readline()
+            self.rfile.readline()
+        else:
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.received.append((dict(self.headers), body))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = _RecordingServer(("127.0.0.1", 0), _RecordingHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.no_hobble_network
+def test_bodies_are_sent_over_the_wire(server, big_file, fixed_boundary):
+    url = f"http://127.0.0.1:{server.server_port}/upload"
+    with requests.Session() as session, open(big_file, "rb") as file:
+        encoder = upload.MultipartEncoder({"field": "value"}, {"file": file}, boundary="boundary")
+        session.post(url, data=encoder, headers=encoder.headers)
+        session.post(url, data=upload.MappedFile(big_file))
+        session.post(url, data=(chunk for chunk in [b"generated ", b"body"]))
+
+    (multipart_headers, multipart), (mapped_headers, mapped), (generated_headers, generated) = server.received
+    with open(big_file, "rb") as file:
+        assert requests.Request("POST", url, data={"field": "value"}, files={"file": file}).prepare().body == multipart
+    assert str(len(multipart)) == multipart_headers["Content-Length"]
+    assert big_file.read_bytes() == mapped
+    assert "1048576" == mapped_headers["Content-Length"]
+    assert b"generated body" == generated
+    assert "chunked" == generated_headers["Transfer-Encoding"]